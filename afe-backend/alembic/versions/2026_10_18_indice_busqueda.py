@@ -0,0 +1,88 @@
+"""Índice de búsqueda embebido (términos + trigramas)
+
+Revision ID: indice_busqueda_2026_10_18
+Revises: cola_contabilidad_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- La búsqueda de proveedores y facturas usaba LIKE '%texto%': escaneo
+  completo, sin ranking, sin tolerancia a errores de digitación y sin
+  buscar en descripciones de ítems.
+
+SOLUCIÓN:
+- Índice invertido en tablas propias, mantenido incrementalmente por el
+  scheduler (marca de agua sobre facturas.actualizado_en):
+  * busqueda_documentos: una fila por proveedor / factura (con grupo_id)
+  * busqueda_terminos: vocabulario normalizado + frecuencia de documento
+  * busqueda_trigramas: trigramas de cada término (tolerancia a errores)
+  * busqueda_postings: término → documento con peso
+- Se prefiere a FULLTEXT de MySQL porque las facturas llegan por SQL
+  directo desde invoice_extractor (el índice se alimenta por marca de agua
+  igual que los patrones), el ranking y el filtro por grupo se resuelven en
+  la misma consulta, y el esquema funciona también en SQLite (tests).
+- El índice se llena en la primera ejecución del trabajo 'indice_busqueda'
+  (reconciliación completa).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'indice_busqueda_2026_10_18'
+down_revision = 'cola_contabilidad_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'busqueda_documentos',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('tipo', sa.String(20), nullable=False, comment='proveedor | factura'),
+        sa.Column('entidad_id', sa.BigInteger(), nullable=False, comment='ID en proveedores / facturas'),
+        sa.Column('grupo_id', sa.BigInteger(), nullable=True,
+                  comment='Grupo de la factura (NULL en proveedores: catálogo global)'),
+        sa.Column('proveedor_id', sa.BigInteger(), nullable=True),
+        sa.Column('titulo', sa.String(255), nullable=True, comment='Número de factura o razón social'),
+        sa.Column('subtitulo', sa.String(255), nullable=True, comment='Razón social del proveedor o NIT'),
+        sa.Column('huella', sa.String(32), nullable=False,
+                  comment='MD5 del contenido indexado (omite reindexar sin cambios)'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('tipo', 'entidad_id', name='uq_busqueda_documento_entidad'),
+    )
+    op.create_index('idx_busqueda_documento_grupo', 'busqueda_documentos', ['grupo_id'])
+
+    op.create_table(
+        'busqueda_terminos',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('termino', sa.String(64), nullable=False, unique=True,
+                  comment='Término normalizado (minúsculas, sin tildes)'),
+        sa.Column('documentos', sa.Integer(), nullable=False, server_default='0',
+                  comment='Frecuencia de documento (para idf)'),
+    )
+
+    op.create_table(
+        'busqueda_trigramas',
+        sa.Column('trigrama', sa.String(3), primary_key=True),
+        sa.Column('termino_id', sa.BigInteger(),
+                  sa.ForeignKey('busqueda_terminos.id', ondelete='CASCADE'), primary_key=True),
+    )
+
+    op.create_table(
+        'busqueda_postings',
+        sa.Column('termino_id', sa.BigInteger(),
+                  sa.ForeignKey('busqueda_terminos.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('documento_id', sa.BigInteger(),
+                  sa.ForeignKey('busqueda_documentos.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('peso', sa.SmallInteger(), nullable=False,
+                  comment='Peso del término en el documento (campo × frecuencia)'),
+    )
+    op.create_index('idx_busqueda_posting_documento', 'busqueda_postings', ['documento_id'])
+
+
+def downgrade():
+    op.drop_index('idx_busqueda_posting_documento', table_name='busqueda_postings')
+    op.drop_table('busqueda_postings')
+    op.drop_table('busqueda_trigramas')
+    op.drop_table('busqueda_terminos')
+    op.drop_index('idx_busqueda_documento_grupo', table_name='busqueda_documentos')
+    op.drop_table('busqueda_documentos')
@@ -0,0 +1,34 @@
+"""Índice (estado, creado_en, id) para la cola de revisión de Contabilidad
+
+Revision ID: cola_contabilidad_2026_10_18
+Revises: leases_tareas_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- /accounting/facturas/por-revisar filtraba con extract(month/year) sobre
+  creado_en y paginaba con OFFSET: escaneo completo de facturas aprobadas.
+
+SOLUCIÓN:
+- Filtro por rango de fechas + paginación keyset sobre (creado_en, id).
+  Este índice resuelve el filtro por estado, el rango del mes y el orden.
+"""
+from alembic import op
+
+
+revision = 'cola_contabilidad_2026_10_18'
+down_revision = 'leases_tareas_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_facturas_estado_creado',
+        'facturas',
+        ['estado', 'creado_en', 'id'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('idx_facturas_estado_creado', table_name='facturas')
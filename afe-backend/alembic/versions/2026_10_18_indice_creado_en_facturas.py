@@ -0,0 +1,33 @@
+"""Índice (creado_en, id) en facturas para filtros por período
+
+Revision ID: creado_en_facturas_2026_10_18
+Revises: indice_busqueda_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- Dashboard, histórico y resumen mensual filtraban con
+  extract(month/year) sobre creado_en: no usa índices ni permite partition
+  pruning.
+
+SOLUCIÓN:
+- Los filtros por período son ahora rangos semiabiertos
+  (creado_en >= inicio AND creado_en < fin; DateHelper.create_mes_filter).
+  fecha_emision ya tiene idx_facturas_fecha_estado; este índice cubre los
+  rangos sobre creado_en sin filtro de estado (histórico, conteo del mes,
+  facturas por grupo del mes).
+"""
+from alembic import op
+
+
+revision = 'creado_en_facturas_2026_10_18'
+down_revision = 'indice_busqueda_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_facturas_creado_en', 'facturas', ['creado_en', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_facturas_creado_en', table_name='facturas')
@@ -0,0 +1,52 @@
+"""Lease distribuido para schedulers en proceso
+
+Revision ID: leases_tareas_2026_10_18
+Revises: patrones_incremental_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- lifespan arrancaba el scheduler de automatización, el de notificaciones y
+  la automatización inicial en CADA worker: con N workers la automatización
+  corría N veces y los correos semanales se enviaban N veces.
+
+SOLUCIÓN:
+- leases_tareas_programadas: una fila por trabajo. Un worker ejecuta una
+  ejecución programada solo si reclama el lease con un UPDATE condicional
+  (lease vencido y slot aún no reclamado). La misma tabla la usa el
+  scheduler de invoice_extractor.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'leases_tareas_2026_10_18'
+down_revision = 'patrones_incremental_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'leases_tareas_programadas',
+        sa.Column('nombre', sa.String(100), primary_key=True, comment='Identificador del trabajo programado'),
+        sa.Column('origen', sa.String(50), nullable=True,
+                  comment='Proceso que lo programa: afe-backend | invoice_extractor'),
+        sa.Column('titular', sa.String(150), nullable=True,
+                  comment='host:pid:token del último worker que reclamó el lease'),
+        sa.Column('lease_expira_en', sa.DateTime(timezone=True), nullable=True,
+                  comment='Vencimiento del lease (UTC); NULL = libre'),
+        sa.Column('ultimo_slot', sa.DateTime(timezone=True), nullable=True,
+                  comment='Última ejecución programada reclamada (UTC, sin jitter)'),
+        sa.Column('ultimo_inicio', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('ultimo_fin', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('ultima_duracion_seg', sa.Float(), nullable=True),
+        sa.Column('ultimo_estado', sa.String(20), nullable=True, comment='en_ejecucion | exitoso | error'),
+        sa.Column('ultimo_error', sa.String(500), nullable=True),
+        sa.Column('proxima_ejecucion', sa.DateTime(timezone=True), nullable=True,
+                  comment='Próximo slot programado (UTC)'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('leases_tareas_programadas')
@@ -0,0 +1,66 @@
+"""Columna motivo_cuarentena en facturas + índice para el resumen de cuarentena
+
+Revision ID: motivo_cuarentena_2026_10_18
+Revises: registro_ingesta_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- GET /cuarentena/resumen (y el dashboard de admin) cargaba todas las
+  facturas en cuarentena como objetos ORM, consultaba el workflow de cada
+  una para leer metadata_workflow.tipo_error y agregaba en Python.
+
+SOLUCIÓN:
+- El tipo de problema se guarda en facturas.motivo_cuarentena al entrar en
+  cuarentena; el resumen es un GROUP BY (motivo, grupo_id) resuelto con el
+  índice (estado, motivo_cuarentena, grupo_id).
+- Backfill: facturas ya en cuarentena toman el tipo_error de su workflow
+  (o SIN_CLASIFICAR).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'motivo_cuarentena_2026_10_18'
+down_revision = 'registro_ingesta_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'facturas',
+        sa.Column(
+            'motivo_cuarentena',
+            sa.String(50),
+            nullable=True,
+            comment="Tipo de problema de cuarentena (p.ej. GRUPO_SIN_RESPONSABLES)"
+        )
+    )
+
+    op.execute("""
+        UPDATE facturas f
+        SET f.motivo_cuarentena = COALESCE(
+            (
+                SELECT JSON_UNQUOTE(JSON_EXTRACT(w.metadata_workflow, '$.tipo_error'))
+                FROM workflow_aprobacion_facturas w
+                WHERE w.factura_id = f.id
+                  AND JSON_EXTRACT(w.metadata_workflow, '$.tipo_error') IS NOT NULL
+                ORDER BY w.id
+                LIMIT 1
+            ),
+            'SIN_CLASIFICAR'
+        )
+        WHERE f.estado = 'en_cuarentena'
+    """)
+
+    op.create_index(
+        'idx_facturas_estado_motivo_grupo',
+        'facturas',
+        ['estado', 'motivo_cuarentena', 'grupo_id'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('idx_facturas_estado_motivo_grupo', table_name='facturas')
+    op.drop_column('facturas', 'motivo_cuarentena')
@@ -0,0 +1,63 @@
+"""Agregados acumulados en patrones_facturas y estado de tareas programadas
+
+Revision ID: patrones_incremental_2026_10_18
+Revises: add_pdf_filename_2025_12_23
+Create Date: 2026-10-18
+
+PROBLEMA:
+- analisis_patrones_task recalculaba TODOS los patrones de 12 meses en cada
+  ejecución (tiempo proporcional al historial, no a las facturas nuevas).
+
+SOLUCIÓN:
+- patrones_facturas guarda agregados acumulados (suma, suma de cuadrados,
+  primera fecha) y pagos_detalle con una entrada por factura.
+- estado_tareas_programadas guarda la marca de agua (máximo actualizado_en
+  procesado) y la fecha de la última reconciliación completa.
+
+Patrones existentes quedan con agregados NULL: el modo incremental los
+recalcula desde el historial la primera vez que reciben facturas nuevas, y
+la primera ejecución sin marca de agua hace una reconciliación completa.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'patrones_incremental_2026_10_18'
+down_revision = 'add_pdf_filename_2025_12_23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('patrones_facturas',
+        sa.Column('suma_montos', sa.Numeric(20, 2), nullable=True,
+                  comment='Suma de montos de las facturas del patrón (NULL = sin agregados)'))
+    op.add_column('patrones_facturas',
+        sa.Column('suma_cuadrados_montos', sa.Numeric(40, 4), nullable=True,
+                  comment='Suma de cuadrados de montos (varianza incremental exacta)'))
+    op.add_column('patrones_facturas',
+        sa.Column('primer_pago_fecha', sa.DateTime(timezone=True), nullable=True,
+                  comment='Fecha de la primera factura dentro de la ventana'))
+
+    op.create_table(
+        'estado_tareas_programadas',
+        sa.Column('nombre', sa.String(100), primary_key=True,
+                  comment="Identificador de la tarea (p.ej. 'analisis_patrones')"),
+        sa.Column('marca_agua', sa.DateTime(timezone=True), nullable=True,
+                  comment='Máximo actualizado_en ya procesado de la tabla fuente'),
+        sa.Column('ultima_reconciliacion', sa.DateTime(timezone=True), nullable=True,
+                  comment='Última regeneración completa (reconciliación)'),
+        sa.Column('detalle', sa.JSON(), nullable=True, comment='Resumen de la última ejecución'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Índice para leer facturas desde la marca de agua
+    op.create_index('idx_facturas_actualizado_en', 'facturas', ['actualizado_en'])
+
+
+def downgrade():
+    op.drop_index('idx_facturas_actualizado_en', table_name='facturas')
+    op.drop_table('estado_tareas_programadas')
+    op.drop_column('patrones_facturas', 'primer_pago_fecha')
+    op.drop_column('patrones_facturas', 'suma_cuadrados_montos')
+    op.drop_column('patrones_facturas', 'suma_montos')
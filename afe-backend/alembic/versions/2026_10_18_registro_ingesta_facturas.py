@@ -0,0 +1,38 @@
+"""Registro de ingesta con huella por CUFE
+
+Revision ID: registro_ingesta_2026_10_18
+Revises: creado_en_facturas_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- Cada ejecución de invoice_extractor relee consolidado.json completo y
+  reenvía TODAS las facturas históricas: INSERT ... ON DUPLICATE KEY UPDATE,
+  SELECT id por CUFE y revisión de items, aunque nada haya cambiado.
+
+SOLUCIÓN:
+- registro_ingesta_facturas: CUFE → huella (MD5) del JSON ingerido. La
+  ingesta consulta las huellas de cada lote en una sola consulta y omite las
+  facturas sin cambios. Sin llave foránea: la consulta cruza con facturas
+  por CUFE, así que una factura borrada se vuelve a ingerir.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'registro_ingesta_2026_10_18'
+down_revision = 'creado_en_facturas_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'registro_ingesta_facturas',
+        sa.Column('cufe', sa.String(100), primary_key=True, comment='CUFE de la factura ingerida'),
+        sa.Column('huella', sa.String(32), nullable=False, comment='MD5 del JSON consolidado ingerido'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('registro_ingesta_facturas')
@@ -0,0 +1,39 @@
+"""Tabla versiones_cache para la caché HTTP compartida entre workers
+
+Revision ID: versiones_cache_2026_10_18
+Revises: motivo_cuarentena_2026_10_18
+Create Date: 2026-10-18
+
+PROBLEMA:
+- Dashboards, árbol de grupos y períodos se recalculan en cada sondeo de
+  cada pestaña aunque los datos solo cambien al moverse las facturas.
+
+SOLUCIÓN:
+- app/core/cache_http.py cachea esas respuestas y las invalida con una
+  versión de datos. Con HTTP_CACHE_BACKEND=bd la versión vive en esta
+  tabla (una fila 'datos', lectura por PK) y la comparten todos los
+  workers; con 'memoria' la tabla no se usa.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'versiones_cache_2026_10_18'
+down_revision = 'motivo_cuarentena_2026_10_18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tabla = op.create_table(
+        'versiones_cache',
+        sa.Column('nombre', sa.String(50), primary_key=True, comment="Conjunto de datos versionado (p.ej. 'datos')"),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0',
+                  comment='Se incrementa en cada commit que escribe en las tablas versionadas'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.bulk_insert(tabla, [{'nombre': 'datos', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('versiones_cache')
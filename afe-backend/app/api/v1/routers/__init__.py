@@ -13,11 +13,13 @@ from app.api.v1.routers import (
     flujo_automatizacion,
     email_config,
     email_health,  # Health check para servicios de email
+    metricas,  # GET /health/metrics (métricas SQL y caché HTTP)
     admin_sync,  # Admin: Sincronización de facturas
     accounting,  # Recepción y registro de facturas por contabilidad
     dashboard,  # Dashboard optimizado
     grupos,  # Gestión de grupos multi-tenant con jerarquía
     cuarentena,  # Gestión de facturas en cuarentena (2025-12-27)
+    search,  # Búsqueda global de proveedores y facturas
 )
 
 # Router principal con prefijo global
@@ -41,8 +43,10 @@ api_router.include_router(asignacion_nit.router, tags=["Asignación NIT"])  #
 api_router.include_router(flujo_automatizacion.router, tags=["Flujo de Automatización"])
 api_router.include_router(email_config.router, tags=["Email Configuration"])
 api_router.include_router(email_health.router, tags=["Email Health"])
+api_router.include_router(metricas.router, tags=["Health Check"])
 api_router.include_router(admin_sync.router, tags=["Admin Sync"])  # Admin: Sincronización
 api_router.include_router(accounting.router, prefix="/accounting", tags=["Contabilidad"])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 api_router.include_router(grupos.router, prefix="/grupos", tags=["Grupos"])
 api_router.include_router(cuarentena.router, tags=["Cuarentena"])
+api_router.include_router(search.router, prefix="/search", tags=["Búsqueda"])
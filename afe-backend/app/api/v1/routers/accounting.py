@@ -7,7 +7,7 @@ Gestiona operaciones específicas del departamento de contabilidad.
 
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 
@@ -18,6 +18,7 @@ from app.schemas.factura import FacturaRead
 from app.schemas.common import ErrorResponse
 from app.models.factura import Factura, EstadoFactura
 from app.models.workflow_aprobacion import WorkflowAprobacionFactura, EstadoFacturaWorkflow
+from app.services.cola_contabilidad import ColaContabilidadService
 from app.services.unified_email_service import UnifiedEmailService
 from app.services.email_template_service import EmailTemplateService
 from app.utils.logger import logger
@@ -68,80 +69,53 @@ class ValidacionResponse(BaseModel):
     **Permisos:** Solo usuarios con rol 'contador' pueden ejecutar.
 
     **Retorna:**
-    - Facturas en estado 'aprobada' o 'aprobada_auto'
+    - Facturas en estado 'aprobada' o 'aprobada_auto' del mes actual
     - Información para tomar decisión de validación
-    - Estadísticas de pendientes
+    - Estadísticas de pendientes (total y monto de toda la cola)
+
+    **Paginación:** por cursor. Usar `paginacion.next_cursor` como `cursor`
+    para la página siguiente (tiempo constante por página).
     """
 )
 async def obtener_facturas_por_revisar(
     current_user=Depends(require_role("contador")),
     db: Session = Depends(get_db),
     solo_pendientes: bool = True,
-    pagina: int = 1,
-    limit: int = 50
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior (paginacion.next_cursor)"),
+    pagina: int = Query(1, deprecated=True, description="Reemplazado por cursor; solo se admite 1"),
+    limit: int = Query(50, ge=1, le=500)
 ):
     """Obtener facturas pendientes de validación por Contador"""
-    from sqlalchemy import extract
-    from datetime import datetime
-
-    # Obtener mes y año actual
-    mes_actual = datetime.now().month
-    año_actual = datetime.now().year
-
-    # Query base: facturas aprobadas DEL MES ACTUAL
-    from sqlalchemy.orm import joinedload
-
-    query = db.query(Factura).options(
-        joinedload(Factura.proveedor),
-        joinedload(Factura.usuario),
-        joinedload(Factura.workflow_history)
-    ).filter(
-        Factura.estado.in_([EstadoFactura.aprobada, EstadoFactura.aprobada_auto]),
-        extract('month', Factura.creado_en) == mes_actual,
-        extract('year', Factura.creado_en) == año_actual
-    )
+    if pagina > 1 and not cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La paginación por número de página fue reemplazada: usar el parámetro 'cursor'"
+        )
 
-    # Opcional: si quiere ver SOLO las no validadas aún
-    if solo_pendientes:
-        # (en realidad esto es redundante porque la query ya filtra aprobadas)
-        pass
-
-    # Ordenar por fecha más reciente
-    query = query.order_by(Factura.creado_en.desc())
-
-    # Paginación
-    total = query.count()
-    skip = (pagina - 1) * limit
-    facturas = query.offset(skip).limit(limit).all()
-
-    # Convertir a schema
-    facturas_data = [FacturaRead.model_validate(f) for f in facturas]
-
-    # Estadísticas
-    estadisticas = {
-        "total_pendiente": total,
-        "monto_pendiente": sum(
-            float(f.total_a_pagar or 0) for f in facturas
-        ),
-        "validadas_hoy": db.query(Factura).filter(
-            Factura.estado == EstadoFactura.validada_contabilidad,
-            Factura.actualizado_en >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        ).count()
-    }
+    # solo_pendientes es redundante: la cola solo contiene facturas aprobadas
+    cola = ColaContabilidadService(db)
+    try:
+        resultado = cola.obtener_pagina(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    facturas_data = [FacturaRead.model_validate(f) for f in resultado.facturas]
+    estadisticas = cola.estadisticas()
 
     logger.info(
-        "Contador consultó facturas por revisar: %s facturas, página %s",
-        len(facturas),
-        pagina,
+        "Contador consultó facturas por revisar: %s facturas (cursor=%s)",
+        len(resultado.facturas),
+        bool(cursor),
         extra={"contador": current_user.usuario}
     )
 
     return {
         "facturas": facturas_data,
         "paginacion": {
-            "pagina": pagina,
             "limit": limit,
-            "total": total
+            "total": estadisticas["total_pendiente"],
+            "has_more": resultado.has_more,
+            "next_cursor": resultado.next_cursor
         },
         "estadisticas": estadisticas
     }
@@ -1,7 +1,7 @@
 """
 Router administrativo para sincronización y mantenimiento
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
 
@@ -10,7 +10,7 @@ from app.core.security import require_role
 from app.models.usuario import Usuario
 from app.models.workflow_aprobacion import AsignacionNitResponsable
 from app.models.factura import Factura
-from app.models.proveedor import Proveedor
+from app.services.sincronizacion_responsables import SincronizacionResponsablesService, TAMANO_LOTE
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -22,6 +22,8 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
     description="Reasigna TODAS las facturas basado en los NITs asignados en AsignacionNitResponsable"
 )
 def sincronizar_facturas(
+    dry_run: bool = Query(False, description="Solo calcular el diff, sin escribir"),
+    tamano_lote: int = Query(TAMANO_LOTE, ge=100, le=50000, description="Facturas (rango de id) por transacción"),
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
@@ -29,95 +31,39 @@ def sincronizar_facturas(
     Sincroniza las facturas con las asignaciones de NITs.
 
     Cada factura será asignada al usuario cuyo NIT coincida
-    con el proveedor de la factura en AsignacionNitResponsable.
+    con el proveedor de la factura en AsignacionNitResponsable
+    (si hay varios, el de mayor id). Se ejecuta con UPDATEs por conjuntos
+    en lotes de `tamano_lote` ids, confirmando cada lote.
 
     Retorna:
-    - Total de facturas actualizadas
+    - Total de facturas actualizadas (o por actualizar con dry_run)
     - Total de facturas que ya estaban correctas
     - Detalles por responsable
+    - Con dry_run: muestra del diff (factura, responsable actual → nuevo)
     """
     try:
-        usuarios = db.query(Usuario).all()
-
-        total_actualizadas = 0
-        total_ignoradas = 0
-        detalles = []
-
-        for resp in usuarios:
-            # Obtener NITs asignados
-            asignaciones = db.query(AsignacionNitResponsable.nit).filter(
-                AsignacionNitResponsable.responsable_id == resp.id,
-                AsignacionNitResponsable.activo == True
-            ).all()
-
-            nits_asignados = [nit for (nit,) in asignaciones if nit]
-
-            if not nits_asignados:
-                detalles.append({
-                    "responsable": resp.nombre,
-                    "actualizadas": 0,
-                    "ignoradas": 0,
-                    "nota": "Sin NITs asignados"
-                })
-                continue
-
-            # Obtener proveedores con esos NITs
-            proveedor_ids = db.query(Proveedor.id).filter(
-                Proveedor.nit.in_(nits_asignados)
-            ).all()
-            proveedor_ids = [pid for (pid,) in proveedor_ids]
-
-            if not proveedor_ids:
-                detalles.append({
-                    "responsable": resp.nombre,
-                    "actualizadas": 0,
-                    "ignoradas": 0,
-                    "nota": f"{len(nits_asignados)} NITs pero sin proveedores en BD"
-                })
-                continue
-
-            # Obtener facturas de esos proveedores
-            facturas = db.query(Factura).filter(
-                Factura.proveedor_id.in_(proveedor_ids)
-            ).all()
-
-            # Actualizar asignaciones
-            actualizadas = 0
-            ignoradas = 0
-
-            for factura in facturas:
-                if factura.responsable_id != resp.id:
-                    factura.responsable_id = resp.id
-                    actualizadas += 1
-                else:
-                    ignoradas += 1
-
-            if actualizadas > 0:
-                db.flush()
-
-            detalles.append({
-                "responsable": resp.nombre,
-                "nits_asignados": len(nits_asignados),
-                "proveedores": len(proveedor_ids),
-                "facturas_totales": len(facturas),
-                "actualizadas": actualizadas,
-                "ignoradas": ignoradas
-            })
-
-            total_actualizadas += actualizadas
-            total_ignoradas += ignoradas
-
-        # Commit
-        db.commit()
-
-        logger.info(f"Sincronización completada por {current_user.usuario}: {total_actualizadas} actualizadas, {total_ignoradas} ignoradas")
+        servicio = SincronizacionResponsablesService(db)
+        resultado = servicio.sincronizar(simular=dry_run, tamano_lote=tamano_lote)
+        detalles = servicio.detalles(resultado)
+
+        logger.info(
+            f"Sincronización {'simulada' if dry_run else 'completada'} por {current_user.usuario}: "
+            f"{resultado.total_actualizadas} actualizadas, {resultado.total_ignoradas} ignoradas "
+            f"({resultado.lotes} lotes, {resultado.segundos}s)"
+        )
 
-        return {
+        respuesta = {
             "exito": True,
-            "total_actualizadas": total_actualizadas,
-            "total_ignoradas": total_ignoradas,
+            "dry_run": dry_run,
+            "total_actualizadas": resultado.total_actualizadas,
+            "total_ignoradas": resultado.total_ignoradas,
+            "lotes": resultado.lotes,
+            "segundos": resultado.segundos,
             "detalles": detalles
         }
+        if dry_run:
+            respuesta["muestra"] = resultado.muestra
+        return respuesta
 
     except Exception as e:
         db.rollback()
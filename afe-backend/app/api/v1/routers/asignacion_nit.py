@@ -16,6 +16,7 @@ from app.models.factura import Factura
 from app.models.email_config import NitConfiguracion
 from app.models.grupo import ResponsableGrupo
 from app.services.audit_service import AuditService
+from app.services.asignacion_nit_bulk import AsignacionNitBulkService
 from pydantic import BaseModel
 
 
@@ -507,10 +508,16 @@ def eliminar_asignacion_nit(
 @router.post("/bulk", status_code=status.HTTP_201_CREATED)
 def crear_asignaciones_bulk(
     payload: AsignacionBulkCreate,
+    dry_run: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(require_role(["admin", "superadmin"]))
 ):
-    """Asigna múltiples NITs a un usuario de una sola vez."""
+    """
+    Asigna múltiples NITs a un usuario de una sola vez.
+
+    Set-based: una consulta para asignaciones existentes, un INSERT multi-fila
+    y un UPDATE de facturas. Con dry_run=true solo retorna el diff.
+    """
     responsable = db.query(Usuario).filter(Usuario.id == payload.responsable_id).first()
     if not responsable:
         raise HTTPException(
@@ -518,53 +525,40 @@ def crear_asignaciones_bulk(
             detail=f"Usuario con ID {payload.responsable_id} no encontrado"
         )
 
-    creadas = 0
-    omitidas = 0
+    servicio = AsignacionNitBulkService(db)
     errores = []
+    nits_normalizados = []
+    areas = {}
 
     for nit_item in payload.nits:
-        try:
-            es_valido, nit_normalizado_o_error = NitValidator.validar_nit(nit_item.nit)
-            if not es_valido:
-                errores.append(f"NIT {nit_item.nit}: {nit_normalizado_o_error}")
-                logger.error(f"Error normalizando NIT {nit_item.nit}: {nit_normalizado_o_error}")
-                continue
-
-            nit_normalizado = nit_normalizado_o_error
-
-            proveedor = db.query(Proveedor).filter(
-                Proveedor.nit == nit_normalizado
-            ).first()
-
-            nombre_proveedor_final = proveedor.razon_social if proveedor else nit_item.nombre_proveedor
-
-            existente = db.query(AsignacionNitResponsable).filter(
-                AsignacionNitResponsable.nit == nit_normalizado,
-                AsignacionNitResponsable.responsable_id == payload.responsable_id
-            ).first()
-
-            if existente:
-                omitidas += 1
-                logger.debug(f"Asignación ya existe, omitida: NIT {nit_normalizado} -> Usuario {payload.responsable_id}")
-                continue
-
-            nueva = AsignacionNitResponsable(
-                nit=nit_normalizado,
-                responsable_id=payload.responsable_id,
-                area=nit_item.area or responsable.area,
-                permitir_aprobacion_automatica=payload.permitir_aprobacion_automatica,
-                requiere_revision_siempre=False,
-                creado_por=current_user.usuario
-            )
-            db.add(nueva)
-            sincronizar_facturas_por_nit(db, nit_normalizado, payload.responsable_id)
-            creadas += 1
-            logger.debug(f"Nueva asignación creada: NIT {nit_normalizado} ({nombre_proveedor_final}) -> Usuario {payload.responsable_id}")
-
-        except Exception as e:
-            errores.append(f"NIT {nit_item.nit}: {str(e)}")
-            logger.error(f"Error procesando NIT {nit_item.nit}: {str(e)}")
+        es_valido, nit_normalizado_o_error = NitValidator.validar_nit(nit_item.nit)
+        if not es_valido:
+            errores.append(f"NIT {nit_item.nit}: {nit_normalizado_o_error}")
+            logger.error(f"Error normalizando NIT {nit_item.nit}: {nit_normalizado_o_error}")
+            continue
+        nits_normalizados.append(nit_normalizado_o_error)
+        areas.setdefault(nit_normalizado_o_error, nit_item.area)
+
+    plan = servicio.planificar(payload.responsable_id, nits_normalizados, areas=areas)
+    errores.extend(plan.errores)
+    creadas = len(plan.crear)
+    omitidas = len(plan.omitir)
+
+    if dry_run:
+        return {
+            "success": len(errores) == 0,
+            "dry_run": True,
+            "total_procesados": len(payload.nits),
+            "creadas": creadas,
+            "omitidas": omitidas,
+            "errores": errores,
+            "diff": plan.diff()
+        }
 
+    servicio.aplicar(
+        plan, responsable, current_user.usuario,
+        permitir_aprobacion_automatica=payload.permitir_aprobacion_automatica
+    )
     db.commit()
 
     if creadas > 0 or omitidas > 0:
@@ -599,10 +593,17 @@ def crear_asignaciones_bulk(
 @router.post("/bulk-simple", status_code=status.HTTP_201_CREATED)
 def crear_asignaciones_bulk_simple(
     payload: AsignacionBulkSimple,
+    dry_run: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(require_role(["admin", "superadmin"]))
 ):
-    """Asignación bulk simplificada con validación de proveedores."""
+    """
+    Asignación bulk simplificada con validación de proveedores.
+
+    Set-based: una consulta IN para proveedores, una para asignaciones
+    existentes, un INSERT multi-fila y un UPDATE de facturas.
+    Con dry_run=true solo retorna el diff.
+    """
     responsable = db.query(Usuario).filter(
         Usuario.id == payload.responsable_id
     ).first()
@@ -612,9 +613,8 @@ def crear_asignaciones_bulk_simple(
             detail=f"Usuario con ID {payload.responsable_id} no encontrado"
         )
 
-    import re
-    nits_raw = re.split(r'[,\n\t\r;]', payload.nits)
-    nits_procesados_raw = [nit.strip() for nit in nits_raw if nit.strip()]
+    servicio = AsignacionNitBulkService(db)
+    nits_procesados_raw = servicio.parsear_nits(payload.nits)
 
     if not nits_procesados_raw:
         raise HTTPException(
@@ -622,15 +622,7 @@ def crear_asignaciones_bulk_simple(
             detail="No se encontraron NITs válidos en el texto proporcionado"
         )
 
-    nits_procesados = []
-    nits_normalizacion_errores = []
-
-    for nit_raw in nits_procesados_raw:
-        es_valido, nit_normalizado_o_error = NitValidator.validar_nit(nit_raw)
-        if es_valido:
-            nits_procesados.append(nit_normalizado_o_error)
-        else:
-            nits_normalizacion_errores.append((nit_raw, nit_normalizado_o_error))
+    nits_procesados, nits_normalizacion_errores = servicio.normalizar_nits(nits_procesados_raw)
 
     if nits_normalizacion_errores:
         errores_str = "; ".join([f"{nit} ({err})" for nit, err in nits_normalizacion_errores])
@@ -639,17 +631,13 @@ def crear_asignaciones_bulk_simple(
             detail=f"Algunos NITs no pudieron ser normalizados: {errores_str}"
         )
 
-    nits_invalidos = []
-    for nit_normalizado in nits_procesados:
-        proveedor = db.query(Proveedor).filter(
-            Proveedor.nit == nit_normalizado
-        ).first()
-
-        if not proveedor:
-            nits_invalidos.append(nit_normalizado)
+    plan = servicio.planificar(
+        payload.responsable_id, nits_procesados,
+        nits_validos=servicio.nits_en_proveedores(nits_procesados)
+    )
 
-    if nits_invalidos:
-        nits_invalidos_str = ", ".join(nits_invalidos)
+    if plan.no_registrados and not dry_run:
+        nits_invalidos_str = ", ".join(plan.no_registrados)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=(
@@ -659,56 +647,25 @@ def crear_asignaciones_bulk_simple(
             )
         )
 
-    creadas = 0
-    omitidas = 0
-    errores = []
-
-    for nit_normalizado in nits_procesados:
-        try:
-            proveedor = db.query(Proveedor).filter(
-                Proveedor.nit == nit_normalizado
-            ).first()
-            nombre_proveedor = (
-                proveedor.razon_social if proveedor else f"Proveedor {nit_normalizado}"
-            )
-
-            existente = db.query(
-                AsignacionNitResponsable
-            ).filter(
-                AsignacionNitResponsable.nit == nit_normalizado,
-                AsignacionNitResponsable.responsable_id == (
-                    payload.responsable_id
-                )
-            ).first()
-
-            if existente:
-                omitidas += 1
-                logger.debug(
-                    f"Asignación ya existe: NIT {nit_normalizado}"
-                )
-                continue
-
-            nueva = AsignacionNitResponsable(
-                nit=nit_normalizado,
-                responsable_id=payload.responsable_id,
-                area=responsable.area,
-                permitir_aprobacion_automatica=(
-                    payload.permitir_aprobacion_automatica
-                ),
-                requiere_revision_siempre=False,
-                creado_por=current_user.usuario
-            )
-            db.add(nueva)
-            sincronizar_facturas_por_nit(
-                db, nit_normalizado, payload.responsable_id
-            )
-            creadas += 1
-            logger.debug(f"Nueva asignación creada: NIT {nit_normalizado}")
+    creadas = len(plan.crear)
+    omitidas = len(plan.omitir)
+    errores = plan.errores
 
-        except Exception as e:
-            errores.append(f"NIT {nit_normalizado}: {str(e)}")
-            logger.error(f"Error procesando NIT {nit_normalizado}: {str(e)}")
+    if dry_run:
+        return {
+            "success": not plan.no_registrados,
+            "dry_run": True,
+            "total_procesados": len(nits_procesados),
+            "creadas": creadas,
+            "omitidas": omitidas,
+            "errores": errores,
+            "diff": plan.diff()
+        }
 
+    servicio.aplicar(
+        plan, responsable, current_user.usuario,
+        permitir_aprobacion_automatica=payload.permitir_aprobacion_automatica
+    )
     db.commit()
 
     if creadas > 0 or omitidas > 0:
@@ -831,10 +788,17 @@ def diagnostico_nits(
 @router.post("/bulk-nit-config", status_code=status.HTTP_201_CREATED)
 def crear_asignaciones_desde_nit_config(
     payload: AsignacionBulkSimple,
+    dry_run: bool = False,
     db: Session = Depends(get_db),
     current_user=Depends(require_role(["admin", "superadmin"]))
 ):
-    """Asigna NITs directamente desde la tabla nit_configuracion."""
+    """
+    Asigna NITs directamente desde la tabla nit_configuracion.
+
+    Set-based: una consulta IN a nit_configuracion, una para asignaciones
+    existentes, un INSERT multi-fila y un UPDATE para reactivar inactivas.
+    Con dry_run=true solo retorna el diff.
+    """
     responsable = db.query(Usuario).filter(
         Usuario.id == payload.responsable_id
     ).first()
@@ -844,9 +808,8 @@ def crear_asignaciones_desde_nit_config(
             detail=f"Usuario con ID {payload.responsable_id} no encontrado"
         )
 
-    import re
-    nits_raw = re.split(r'[,\n\t\r;]', payload.nits)
-    nits_procesados_raw = [nit.strip() for nit in nits_raw if nit.strip()]
+    servicio = AsignacionNitBulkService(db)
+    nits_procesados_raw = servicio.parsear_nits(payload.nits)
 
     if not nits_procesados_raw:
         raise HTTPException(
@@ -854,15 +817,7 @@ def crear_asignaciones_desde_nit_config(
             detail="No se encontraron NITs válidos en el texto proporcionado"
         )
 
-    nits_procesados = []
-    nits_normalizacion_errores = []
-
-    for nit_raw in nits_procesados_raw:
-        es_valido, nit_normalizado_o_error = NitValidator.validar_nit(nit_raw)
-        if es_valido:
-            nits_procesados.append(nit_normalizado_o_error)
-        else:
-            nits_normalizacion_errores.append((nit_raw, nit_normalizado_o_error))
+    nits_procesados, nits_normalizacion_errores = servicio.normalizar_nits(nits_procesados_raw)
 
     if nits_normalizacion_errores:
         errores_str = "; ".join([f"{nit} ({err})" for nit, err in nits_normalizacion_errores])
@@ -871,18 +826,15 @@ def crear_asignaciones_desde_nit_config(
             detail=f"Algunos NITs no pudieron ser normalizados: {errores_str}"
         )
 
-    nits_invalidos = []
-    for nit_normalizado in nits_procesados:
-        nit_config = db.query(NitConfiguracion).filter(
-            NitConfiguracion.nit == nit_normalizado,
-            NitConfiguracion.activo == True
-        ).first()
-
-        if not nit_config:
-            nits_invalidos.append(nit_normalizado)
+    plan = servicio.planificar(
+        payload.responsable_id, nits_procesados,
+        nits_validos=servicio.nits_en_configuracion(nits_procesados),
+        reactivar_inactivas=True,
+        motivo_no_registrado="no configurado en nit_configuracion"
+    )
 
-    if nits_invalidos:
-        nits_invalidos_str = ", ".join(nits_invalidos)
+    if plan.no_registrados and not dry_run:
+        nits_invalidos_str = ", ".join(plan.no_registrados)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=(
@@ -892,69 +844,32 @@ def crear_asignaciones_desde_nit_config(
             )
         )
 
-    creadas = 0
-    reactivadas = 0
-    omitidas = 0
-    nits_omitidos = []
-    errores = []
+    creadas = len(plan.crear)
+    reactivadas = len(plan.reactivar)
+    omitidas = len(plan.omitir)
+    errores = plan.errores
 
-    for nit_normalizado in nits_procesados:
-        try:
-            # Verificar si ya existe la asignación ACTIVA
-            asignacion_activa = db.query(AsignacionNitResponsable).filter(
-                AsignacionNitResponsable.nit == nit_normalizado,
-                AsignacionNitResponsable.responsable_id == payload.responsable_id,
-                AsignacionNitResponsable.activo == True
-            ).first()
-
-            if asignacion_activa:
-                omitidas += 1
-                nits_omitidos.append(nit_normalizado)  # Registrar cuál fue omitido
-                continue
-
-            # Verificar si existe una asignación INACTIVA (para reactivar)
-            asignacion_inactiva = db.query(AsignacionNitResponsable).filter(
-                AsignacionNitResponsable.nit == nit_normalizado,
-                AsignacionNitResponsable.responsable_id == payload.responsable_id,
-                AsignacionNitResponsable.activo == False
-            ).first()
-
-            if asignacion_inactiva:
-                # REACTIVAR la asignación existente
-                asignacion_inactiva.activo = True
-                asignacion_inactiva.actualizado_por = "BULK_NIT_CONFIG"
-                asignacion_inactiva.actualizado_en = datetime.utcnow()
-                reactivadas += 1
-                continue
-
-            # Obtener nombre del NIT desde nit_configuracion si existe
-            nit_config = db.query(NitConfiguracion).filter(
-                NitConfiguracion.nit == nit_normalizado
-            ).first()
-            nombre_proveedor = nit_config.nombre_proveedor if nit_config else None
-
-            # Crear nueva asignación
-            nueva_asignacion = AsignacionNitResponsable(
-                nit=nit_normalizado,
-                responsable_id=payload.responsable_id,
-                nombre_proveedor=nombre_proveedor,
-                permitir_aprobacion_automatica=payload.permitir_aprobacion_automatica,
-                activo=True,
-                creado_por="BULK_NIT_CONFIG",
-                creado_en=datetime.utcnow()
-            )
-            db.add(nueva_asignacion)
-            creadas += 1
-
-        except Exception as e:
-            logger.error(f"Error asignando NIT {nit_normalizado}: {str(e)}", exc_info=True)
-            errores.append({
-                "nit": nit_normalizado,
-                "error": str(e)
-            })
+    if dry_run:
+        return {
+            "success": not plan.no_registrados,
+            "dry_run": True,
+            "total_procesados": len(nits_procesados),
+            "creadas": creadas,
+            "reactivadas": reactivadas,
+            "omitidas": omitidas,
+            "nits_omitidos": plan.omitir,
+            "errores": errores,
+            "responsable_id": payload.responsable_id,
+            "diff": plan.diff()
+        }
 
     # Commit con manejo de errores mejorado
     try:
+        servicio.aplicar(
+            plan, responsable, "BULK_NIT_CONFIG",
+            permitir_aprobacion_automatica=payload.permitir_aprobacion_automatica,
+            sincronizar_facturas=False
+        )
         db.commit()
     except Exception as e:
         logger.error(f"Error en COMMIT de asignaciones: {str(e)}", exc_info=True)
@@ -990,7 +905,7 @@ def crear_asignaciones_desde_nit_config(
         "creadas": creadas,
         "reactivadas": reactivadas,
         "omitidas": omitidas,
-        "nits_omitidos": nits_omitidos,  # Lista de NITs que ya estaban asignados
+        "nits_omitidos": plan.omitir,  # Lista de NITs que ya estaban asignados
         "errores": errores,
         "responsable_id": payload.responsable_id,
         "mensaje": mensaje
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 import logging
 
 from app.db.session import get_db
+from app.core.cache_http import respuesta_cacheable
 from app.services.automation.automation_service import AutomationService
 from app.services.automation.notification_service import NotificationService, ConfiguracionNotificacion
 from app.services.audit_service import AuditService
@@ -14,6 +15,7 @@ from app.crud import factura as crud_factura
 from app.models.factura import Factura, EstadoFactura
 from app.models.workflow_aprobacion import TipoAprobacion, WorkflowAprobacionFactura
 from app.schemas.common import ResponseBase
+from app.utils.date_helpers import DateHelper
 from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
@@ -243,7 +245,7 @@ async def procesar_workflows_pendientes(
 
                 if incluir_no_aprobadas:
                     from dateutil.relativedelta import relativedelta
-                    from sqlalchemy import extract, and_
+                    from sqlalchemy import and_
 
                     fecha_mes_anterior = factura.fecha_emision - relativedelta(months=1)
 
@@ -251,8 +253,9 @@ async def procesar_workflows_pendientes(
                         and_(
                             Factura.proveedor_id == factura.proveedor_id,
                             Factura.concepto_hash == factura.concepto_hash,
-                            extract('year', Factura.fecha_emision) == fecha_mes_anterior.year,
-                            extract('month', Factura.fecha_emision) == fecha_mes_anterior.month,
+                            DateHelper.create_mes_filter(
+                                Factura.fecha_emision, fecha_mes_anterior.year, fecha_mes_anterior.month
+                            ),
                             Factura.id != factura.id
                         )
                     ).order_by(Factura.fecha_emision.desc()).first()
@@ -527,6 +530,30 @@ async def obtener_estadisticas_automatizacion(
         )
 
 
+@router.get("/scheduler/estado", summary="Estado de Trabajos Programados")
+def obtener_estado_scheduler():
+    """
+    Trabajos programados (API e invoice_extractor) con su lease en BD:
+    titular, última ejecución, duración, estado y próxima ejecución.
+    """
+    from app.services.scheduler_cluster import estado_trabajos, obtener_scheduler_cluster
+
+    scheduler = obtener_scheduler_cluster()
+    try:
+        trabajos = scheduler.estado_trabajos() if scheduler else estado_trabajos()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error obteniendo estado del scheduler: {str(e)}"
+        )
+
+    return {
+        "scheduler_activo": scheduler is not None,
+        "titular_local": scheduler.lease.titular if scheduler else None,
+        "trabajos": trabajos,
+    }
+
+
 @router.get("/facturas-procesadas", response_model=List[ResultadoFacturaAutomatizada])
 async def obtener_facturas_procesadas(
     dias_atras: int = Query(default=7, ge=1, le=90),
@@ -719,30 +746,32 @@ async def analizar_patrones_proveedor(
                 patrones_detectados[concepto] = []
             patrones_detectados[concepto].append(factura)
         
-        # Analizar cada grupo de facturas
-        analisis_patrones = []
+        # Analizar todos los grupos de facturas en un solo lote
         pattern_detector = automation_service.pattern_detector
+        conceptos, casos = [], []
         
         for concepto, grupo_facturas in patrones_detectados.items():
             if len(grupo_facturas) >= 2:  # Mínimo 2 facturas para detectar patrón
                 # Tomar la última factura como referencia
                 factura_referencia = max(grupo_facturas, key=lambda x: x.fecha_emision)
                 facturas_historicas = [f for f in grupo_facturas if f.id != factura_referencia.id]
-                
-                resultado_patron = pattern_detector.analizar_patron_recurrencia(
-                    factura_referencia, facturas_historicas
-                )
-                
-                analisis_patrones.append({
-                    'concepto': concepto,
-                    'total_facturas': len(grupo_facturas),
-                    'es_recurrente': resultado_patron.es_recurrente,
-                    'patron_temporal': resultado_patron.patron_temporal.tipo,
-                    'confianza_patron': float(resultado_patron.confianza_global),
-                    'promedio_dias': resultado_patron.patron_temporal.promedio_dias,
-                    'monto_estable': resultado_patron.patron_monto.estable,
-                    'variacion_monto_pct': float(resultado_patron.patron_monto.variacion_porcentaje)
-                })
+                conceptos.append((concepto, grupo_facturas))
+                casos.append((factura_referencia, facturas_historicas))
+        
+        analisis_patrones = []
+        resultados = pattern_detector.analizar_patrones_lote(casos)
+        
+        for (concepto, grupo_facturas), resultado_patron in zip(conceptos, resultados):
+            analisis_patrones.append({
+                'concepto': concepto,
+                'total_facturas': len(grupo_facturas),
+                'es_recurrente': resultado_patron.es_recurrente,
+                'patron_temporal': resultado_patron.patron_temporal.tipo,
+                'confianza_patron': float(resultado_patron.confianza_global),
+                'promedio_dias': resultado_patron.patron_temporal.promedio_dias,
+                'monto_estable': resultado_patron.patron_monto.estable,
+                'variacion_monto_pct': float(resultado_patron.patron_monto.variacion_porcentaje)
+            })
         
         return ResponseBase(
             success=True,
@@ -819,6 +848,7 @@ async def enviar_notificacion_resumen_manual(
 
 
 @router.get("/dashboard/metricas", summary="Métricas del Dashboard en Tiempo Real")
+@respuesta_cacheable("automation_metricas", por_usuario=False)
 async def obtener_metricas_dashboard(
     db: Session = Depends(get_db)
 ):
@@ -848,14 +878,14 @@ async def obtener_metricas_dashboard(
         facturas_aprobadas_hoy = db.query(func.count(Factura.id)).filter(
             and_(
                 Factura.estado == EstadoFactura.aprobada_auto,
-                func.date(Factura.fecha_procesamiento_auto) == hoy
+                DateHelper.create_rango_filter(Factura.fecha_procesamiento_auto, hoy, hoy + timedelta(days=1))
             )
         ).scalar() or 0
 
         facturas_revision_hoy = db.query(func.count(Factura.id)).filter(
             and_(
                 Factura.estado == EstadoFactura.en_revision,
-                func.date(Factura.fecha_procesamiento_auto) == hoy
+                DateHelper.create_rango_filter(Factura.fecha_procesamiento_auto, hoy, hoy + timedelta(days=1))
             )
         ).scalar() or 0
 
@@ -1226,7 +1256,7 @@ async def procesar_facturas_nuevas(
 
         # PASO 1: Buscar facturas sin responsable (sin workflows)
         logger.info("  [PASO 1] Buscando facturas sin workflow...")
-        facturas_sin_workflow = db.query(Factura).outerjoin(
+        facturas_sin_workflow = db.query(Factura.id).outerjoin(
             WorkflowAprobacionFactura,
             Factura.id == WorkflowAprobacionFactura.factura_id
         ).filter(
@@ -1249,43 +1279,13 @@ async def procesar_facturas_nuevas(
 
         logger.info(f"  Encontradas {len(facturas_sin_workflow)} facturas sin workflow")
 
-        # PASO 2: Procesar cada factura
+        # PASO 2: Procesar facturas por lotes (un commit por lote)
         logger.info("  [PASO 2] Procesando facturas...")
-        workflows_creados = 0
-        aprobadas_auto = 0
-        en_revision = 0
-        errores = 0
-
-        for factura in facturas_sin_workflow:
-            try:
-                resultado = service.procesar_factura_nueva(factura.id)
-
-                if "error" in resultado:
-                    errores += 1
-                    logger.error(f"  Error en factura {factura.id}: {resultado['error']}")
-                    continue
-
-                workflows_creados += resultado.get('workflows_creados', 0)
-
-                # Verificar estado final
-                workflow = db.query(WorkflowAprobacionFactura).filter(
-                    WorkflowAprobacionFactura.factura_id == factura.id
-                ).first()
-
-                if workflow:
-                    from app.models.workflow_aprobacion import EstadoFacturaWorkflow
-                    if workflow.estado == EstadoFacturaWorkflow.APROBADA_AUTO:
-                        aprobadas_auto += 1
-                    elif workflow.estado == EstadoFacturaWorkflow.PENDIENTE_REVISION:
-                        en_revision += 1
-
-                logger.info(f"  Procesada factura {factura.numero_factura} (ID: {factura.id})")
-
-            except Exception as e:
-                errores += 1
-                logger.error(f"  Error procesando factura {factura.id}: {str(e)}")
+        resultado = service.procesar_facturas_nuevas_lote(
+            [fila.id for fila in facturas_sin_workflow]
+        )
 
-        db.commit()
+        errores = resultado['errores'] + resultado['sin_grupo'] + resultado['en_cuarentena']
 
         logger.info(f"  Completado: {len(facturas_sin_workflow)} facturas procesadas")
 
@@ -1293,10 +1293,10 @@ async def procesar_facturas_nuevas(
             "success": True,
             "message": f"Procesadas {len(facturas_sin_workflow)} facturas nuevas",
             "data": {
-                "workflows_creados": workflows_creados,
+                "workflows_creados": resultado['workflows_creados'],
                 "facturas_procesadas": len(facturas_sin_workflow),
-                "aprobadas_automaticamente": aprobadas_auto,
-                "enviadas_revision": en_revision,
+                "aprobadas_automaticamente": resultado['aprobadas_automaticamente'],
+                "enviadas_revision": resultado['enviadas_revision'],
                 "errores": errores
             }
         }
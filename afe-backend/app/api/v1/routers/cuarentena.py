@@ -1,6 +1,6 @@
 """API Router para Gestión de Cuarentena de Facturas."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import Dict, Any
 import logging
@@ -24,6 +24,7 @@ router = APIRouter(
     description="Obtiene resumen completo de facturas en cuarentena agrupadas por grupo/NIT con métricas de impacto"
 )
 def obtener_resumen_cuarentena(
+    incluir_ids: bool = Query(True, description="Incluir IDs de facturas por problema y grupo"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(require_role(["superadmin", "admin"]))
 ) -> Dict[str, Any]:
@@ -31,7 +32,7 @@ def obtener_resumen_cuarentena(
     try:
 
         service = CuarentenaService(db)
-        resumen = service.obtener_resumen_cuarentena()
+        resumen = service.obtener_resumen_cuarentena(incluir_ids=incluir_ids)
 
         logger.info(
             f"Resumen de cuarentena solicitado",
@@ -10,12 +10,13 @@ Endpoints para vista principal del dashboard con filtrado dinámico:
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Header
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, extract, and_, or_
+from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 from calendar import monthrange
 
 from app.db.session import get_db
+from app.core.cache_http import respuesta_cacheable
 from app.core.security import get_current_usuario, require_role
 from app.models.factura import Factura, EstadoFactura
 from app.models.proveedor import Proveedor
@@ -25,6 +26,7 @@ from app.models.grupo import Grupo, ResponsableGrupo
 from app.schemas.factura import FacturaRead
 from pydantic import BaseModel, Field
 from app.utils.logger import logger
+from app.utils.date_helpers import DateHelper
 from app.core.grupos_utils import (
     get_grupos_usuario,
     usuario_es_admin
@@ -207,6 +209,7 @@ def get_dias_restantes_mes() -> int:
     - Admin puede filtrar por grupo específico con parámetro grupo_id
     """
 )
+@respuesta_cacheable("dashboard_mes_actual")
 def get_dashboard_mes_actual(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_usuario),
@@ -240,8 +243,7 @@ def get_dashboard_mes_actual(
             joinedload(Factura.proveedor),
             joinedload(Factura.usuario)
         ).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual,
+            DateHelper.create_mes_filter(Factura.creado_en, año_actual, mes_actual),
             Factura.estado.in_(estados_activos)
         )
 
@@ -296,8 +298,7 @@ def get_dashboard_mes_actual(
 
         # Contar facturas en cuarentena (del mes actual)
         en_cuarentena_count = db.query(func.count(Factura.id)).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual,
+            DateHelper.create_mes_filter(Factura.creado_en, año_actual, mes_actual),
             Factura.estado == EstadoFactura.en_cuarentena.value
         ).scalar() or 0
 
@@ -316,7 +317,7 @@ def get_dashboard_mes_actual(
             try:
                 from app.services.cuarentena_service import CuarentenaService
                 cuarentena_service = CuarentenaService(db)
-                resumen_cuarentena = cuarentena_service.obtener_resumen_cuarentena()
+                resumen_cuarentena = cuarentena_service.obtener_resumen_cuarentena(incluir_ids=False)
 
                 # Transformar formato del servicio a formato del dashboard
                 grupos_cuarentena = []
@@ -415,8 +416,7 @@ def get_alerta_mes(
         ]
 
         query_pendientes = db.query(func.count(Factura.id)).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual,
+            DateHelper.create_mes_filter(Factura.creado_en, año_actual, mes_actual),
             Factura.estado.in_(estados_pendientes)
         )
 
@@ -512,6 +512,7 @@ def get_alerta_mes(
     - Admin puede filtrar por grupo específico con parámetro grupo_id
     """
 )
+@respuesta_cacheable("dashboard_historico")
 def get_historico(
     mes: int = Query(..., ge=1, le=12, description="Mes a consultar (1-12)"),
     anio: int = Query(..., ge=2020, le=2100, description="Año a consultar"),
@@ -534,8 +535,7 @@ def get_historico(
             joinedload(Factura.proveedor),
             joinedload(Factura.usuario)
         ).filter(
-            extract('month', Factura.creado_en) == mes,
-            extract('year', Factura.creado_en) == anio
+            DateHelper.create_mes_filter(Factura.creado_en, anio, mes)
         )
 
         # ========================================================================
@@ -942,8 +942,7 @@ def get_superadmin_dashboard(
 
         # Facturas del mes actual
         facturas_mes_actual = db.query(func.count(Factura.id)).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual
+            DateHelper.create_mes_filter(Factura.creado_en, año_actual, mes_actual)
         ).scalar()
 
         # MULTI-TENANT 2025-12-14: Facturas en cuarentena
@@ -965,8 +964,7 @@ def get_superadmin_dashboard(
             Factura,
             and_(
                 Factura.grupo_id == Grupo.id,
-                extract('month', Factura.creado_en) == mes_actual,
-                extract('year', Factura.creado_en) == año_actual
+                DateHelper.create_mes_filter(Factura.creado_en, año_actual, mes_actual)
             )
         ).filter(
             Grupo.eliminado == False
@@ -8,7 +8,9 @@ from app.utils.logger import logger
 
 from app.db.session import get_db
 from app.core.config import settings
-from app.schemas.factura import FacturaCreate, FacturaRead, AprobacionRequest, RechazoRequest
+from app.core.cache_http import respuesta_cacheable
+from app.core.respuestas_http import JSONRapidoResponse
+from app.schemas.factura import FacturaCreate, FacturaRead, AprobacionRequest, RechazoRequest, serializar_factura_read
 from fastapi.responses import Response
 from app.schemas.common import (
     ErrorResponse,
@@ -150,7 +152,7 @@ def list_with_cursor(
             first_factura = facturas[0]
             prev_cursor = build_cursor_from_factura(first_factura)
 
-    # Construir respuesta
+    # Construir respuesta (serialización directa: sin validar cada FacturaRead)
     cursor_metadata = CursorPaginationMetadata(
         has_more=has_more,
         next_cursor=next_cursor,
@@ -158,10 +160,10 @@ def list_with_cursor(
         count=len(facturas)
     )
 
-    return CursorPaginatedResponse(
-        data=facturas,
-        cursor=cursor_metadata
-    )
+    return JSONRapidoResponse({
+        "data": [serializar_factura_read(f) for f in facturas],
+        "cursor": cursor_metadata.model_dump(mode="json")
+    })
 
 
 #  ENDPOINT COMPLETO PARA DASHBOARD ADMINISTRATIVO 
@@ -236,7 +238,7 @@ def list_all_for_dashboard(
         f"[DASHBOARD COMPLETO] Retornando {len(facturas)} facturas a {current_user.usuario}"
     )
 
-    return facturas
+    return JSONRapidoResponse([serializar_factura_read(f) for f in facturas])
 
 
 # Listar todas las facturas (con paginación empresarial)
@@ -968,6 +970,7 @@ def count_periodo(
     summary="Años con facturas",
     description="Retorna lista de años que tienen facturas registradas"
 )
+@respuesta_cacheable("facturas_años", por_usuario=False)
 def get_años(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
@@ -984,6 +987,7 @@ def get_años(
     summary="Vista jerárquica año→mes→facturas",
     description="Retorna facturas organizadas jerárquicamente por año y mes. Ideal para dashboards con drill-down."
 )
+@respuesta_cacheable("facturas_jerarquia", por_usuario=False)
 def get_jerarquia(
     año: Optional[int] = None,
     mes: Optional[int] = None,
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.db.session import get_db
+from app.core.cache_http import respuesta_cacheable
 from app.schemas.grupo import (
     GrupoCreate,
     GrupoUpdate,
@@ -143,6 +144,7 @@ def get_mis_grupos(
     summary="Obtener árbol jerárquico",
     description="Obtiene el árbol jerárquico completo o desde un grupo específico."
 )
+@respuesta_cacheable("grupos_arbol", por_usuario=False)
 def get_arbol(
     grupo_id: Optional[int] = Query(None, description="ID del grupo raíz (None = todo el árbol)"),
     db: Session = Depends(get_db),
@@ -0,0 +1,27 @@
+"""
+Métricas de proceso en formato Prometheus.
+
+Router propio (sin los checks de integridad de health.py): solo expone
+contadores en memoria, sin consultas a la BD.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(tags=["Health Check"])
+
+
+@router.get("/health/metrics", summary="Métricas SQL y de caché HTTP (formato Prometheus)",
+            response_class=PlainTextResponse)
+def sql_metrics() -> PlainTextResponse:
+    """
+    Consultas por request, tiempo en BD y requests con N+1 por ruta, más
+    aciertos/memoria de la caché HTTP, acumulados desde el inicio del
+    proceso (cada worker expone los suyos).
+    """
+    from app.core.cache_http import registro_cache
+    from app.core.instrumentacion_sql import registro_metricas
+
+    return PlainTextResponse(
+        registro_metricas.formato_prometheus() + registro_cache.formato_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
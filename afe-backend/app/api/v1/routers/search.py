@@ -0,0 +1,80 @@
+# app/api/v1/routers/search.py
+"""
+Búsqueda global de proveedores y facturas.
+
+GET /search?q= consulta el índice embebido de términos + trigramas
+(app/services/busqueda.py): ranking por relevancia, tolerancia a errores de
+digitación, búsqueda por prefijo de CUFE / NIT y filtro multi-tenant por
+grupos del usuario.
+"""
+
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.core.grupos_utils import get_grupos_usuario, usuario_es_admin
+from app.core.security import get_current_usuario
+from app.db.session import get_db
+from app.models.usuario import Usuario
+from app.services.busqueda import BusquedaService
+
+
+router = APIRouter(tags=["Búsqueda"])
+
+
+class ResultadoBusquedaRead(BaseModel):
+    """Resultado de búsqueda (proveedor o factura)"""
+    tipo: str = Field(description="proveedor | factura")
+    id: int
+    titulo: Optional[str] = Field(None, description="Número de factura o razón social")
+    subtitulo: Optional[str] = Field(None, description="Proveedor de la factura o NIT")
+    puntaje: float = Field(description="Relevancia (mayor es mejor)")
+    detalle: dict = Field(default_factory=dict)
+
+
+class RespuestaBusqueda(BaseModel):
+    q: str
+    total: int
+    resultados: List[ResultadoBusquedaRead]
+
+
+def _grupos_visibles(usuario: Usuario, db: Session, x_grupo_id: Optional[int]) -> Optional[List[int]]:
+    """None = sin restricción (superadmin sin grupo seleccionado)."""
+    if usuario_es_admin(usuario):
+        return [x_grupo_id] if x_grupo_id is not None else None
+
+    grupos_usuario = get_grupos_usuario(usuario.id, db)
+    if x_grupo_id is not None:
+        if x_grupo_id not in grupos_usuario:
+            raise HTTPException(status_code=403, detail=f"Usuario no tiene acceso al grupo {x_grupo_id}")
+        return [x_grupo_id]
+    # Sin grupos asignados solo ve el catálogo de proveedores
+    return grupos_usuario
+
+
+@router.get("", response_model=RespuestaBusqueda, summary="Buscar proveedores y facturas")
+def buscar(
+    q: str = Query(..., min_length=2, max_length=200, description="Texto, número de factura, CUFE o NIT"),
+    tipo: Optional[Literal["proveedor", "factura"]] = Query(None, description="Restringir a un tipo de entidad"),
+    limit: int = Query(20, ge=1, le=100),
+    x_grupo_id: Optional[int] = Header(None, alias="X-Grupo-Id", description="ID del grupo seleccionado (multi-tenant)"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_usuario),
+):
+    """
+    Búsqueda con ranking por relevancia.
+
+    - Palabras: todas deben aparecer (prefijos y errores de digitación incluidos);
+      si ninguna entidad las contiene todas, se ordena por palabras coincidentes
+    - CUFE / NIT: coincidencia por prefijo, primero en los resultados
+    - Facturas filtradas por los grupos del usuario; proveedores visibles para todos
+    """
+    grupos = _grupos_visibles(current_user, db, x_grupo_id)
+    resultados = BusquedaService(db).buscar(q, grupos=grupos, tipo=tipo, limit=limit)
+    return RespuestaBusqueda(
+        q=q,
+        total=len(resultados),
+        resultados=[ResultadoBusquedaRead(**vars(r)) for r in resultados],
+    )
@@ -0,0 +1,454 @@
+"""
+Caché de respuestas HTTP con ETag para endpoints de lectura frecuente.
+
+Dashboards, árbol de grupos, años/jerarquía de períodos y métricas de
+automatización se consultan desde cada pestaña abierta, pero sus datos solo
+cambian cuando se escriben facturas, workflows o grupos.
+
+Componentes:
+- VersionDatos: contador de versión de los datos. Se incrementa al confirmar
+  (after_commit) una transacción que escribió en TABLAS_VERSIONADAS, ya sea
+  por flush del ORM o por INSERT/UPDATE/DELETE masivo (do_orm_execute).
+    * backend "memoria": contador del proceso
+    * backend "bd": fila de versiones_cache compartida por todos los workers
+- CacheRespuestas: LRU en proceso (máximo de entradas y de bytes) con
+  cuerpo JSON + ETag por clave. Al cambiar la versión se vacía; cada entrada
+  vence además a los http_cache_ttl_segundos (escrituras fuera del ORM,
+  p.ej. el invoice_extractor).
+- @respuesta_cacheable: decorador de endpoints. La clave es
+  (endpoint, query params, X-Grupo-Id, usuario si `por_usuario`, fecha).
+  Las dependencias (autenticación) se resuelven siempre; con acierto se
+  responde el cuerpo guardado o 304 si If-None-Match coincide.
+- CacheHTTPMiddleware (ASGI): en un fallo captura el cuerpo ya serializado
+  por FastAPI (response_model incluido), calcula el ETag, lo guarda y
+  responde 304 si el cliente ya tenía ese contenido.
+- Exposición: afe_http_cache_* en GET /api/v1/health/metrics.
+
+El ETag es un hash del cuerpo: distintos workers producen el mismo ETag para
+el mismo contenido, así el 304 funciona aunque responda otro worker.
+"""
+
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+# Escrituras en estas tablas invalidan las respuestas cacheadas
+TABLAS_VERSIONADAS = frozenset({
+    "facturas",
+    "workflow_aprobacion_facturas",
+    "grupos",
+    "responsable_grupo",
+    "asignacion_nit_responsable",
+})
+
+TABLA_VERSIONES = "versiones_cache"
+NOMBRE_VERSION = "datos"
+
+_MARCA_SESION = "_cache_http_escritura"
+
+
+# ==================== VERSIÓN DE LOS DATOS ====================
+
+class VersionDatos:
+    """Contador de versión; en backend "bd" vive en versiones_cache."""
+
+    def __init__(self):
+        self._local = 0
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def configurar(self, engine) -> None:
+        """Usa la tabla versiones_cache (backend "bd")."""
+        self._engine = engine
+
+    def actual(self) -> int:
+        if self._engine is None:
+            return self._local
+        try:
+            with self._engine.connect() as conn:
+                return int(conn.execute(
+                    text(f"SELECT version FROM {TABLA_VERSIONES} WHERE nombre = :n"), {"n": NOMBRE_VERSION}
+                ).scalar() or 0)
+        except Exception as e:
+            # Sin versión compartida no se puede validar la caché: versión nueva = fallo
+            logger.warning(f"Caché HTTP: no se pudo leer la versión compartida: {str(e)}")
+            with self._lock:
+                self._local -= 1
+                return self._local
+
+    def incrementar(self) -> None:
+        with self._lock:
+            self._local += 1
+        if self._engine is not None:
+            try:
+                with self._engine.begin() as conn:
+                    conn.execute(
+                        text(f"UPDATE {TABLA_VERSIONES} SET version = version + 1 WHERE nombre = :n"),
+                        {"n": NOMBRE_VERSION}
+                    )
+            except Exception as e:
+                logger.warning(f"Caché HTTP: no se pudo incrementar la versión compartida: {str(e)}")
+        registro_cache.invalidaciones += 1
+
+
+version_datos = VersionDatos()
+
+
+def _tablas_de(objetos) -> bool:
+    return any(getattr(obj, "__tablename__", None) in TABLAS_VERSIONADAS for obj in objetos)
+
+
+def _despues_de_flush(session, flush_context) -> None:
+    if _tablas_de(session.new) or _tablas_de(session.dirty) or _tablas_de(session.deleted):
+        session.info[_MARCA_SESION] = True
+
+
+def _en_ejecucion_orm(estado) -> None:
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return
+    tabla = getattr(estado.statement, "table", None)
+    if getattr(tabla, "name", None) in TABLAS_VERSIONADAS:
+        estado.session.info[_MARCA_SESION] = True
+
+
+def _despues_de_commit(session) -> None:
+    if session.info.pop(_MARCA_SESION, False):
+        version_datos.incrementar()
+
+
+def _despues_de_rollback(session) -> None:
+    session.info.pop(_MARCA_SESION, None)
+
+
+def instalar_listeners_version() -> None:
+    """Listeners de Session que marcan escrituras e incrementan la versión (idempotente)."""
+    if event.contains(Session, "after_commit", _despues_de_commit):
+        return
+    event.listen(Session, "after_flush", _despues_de_flush)
+    event.listen(Session, "do_orm_execute", _en_ejecucion_orm)
+    event.listen(Session, "after_commit", _despues_de_commit)
+    event.listen(Session, "after_rollback", _despues_de_rollback)
+
+
+# ==================== LRU DE RESPUESTAS ====================
+
+@dataclass
+class EntradaCache:
+    cuerpo: bytes
+    etag: str
+    media_type: str
+    creada: float
+
+
+@dataclass
+class _MetricasEndpoint:
+    aciertos: int = 0
+    fallos: int = 0
+    no_modificados: int = 0
+
+
+class CacheRespuestas:
+    """LRU de respuestas por clave, acotado por entradas y bytes."""
+
+    def __init__(self, max_entradas: int, max_bytes: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[Tuple, EntradaCache]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Tuple, version: int) -> Optional[EntradaCache]:
+        with self._lock:
+            self._sincronizar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if time.monotonic() - entrada.creada > self.ttl_segundos:
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave: Tuple, version: int, entrada: EntradaCache) -> None:
+        tamano = len(entrada.cuerpo)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            self._sincronizar_version(version)
+            if self._version != version:
+                # Los datos cambiaron mientras se generaba la respuesta
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = entrada
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                registro_cache.desalojos += 1
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def _sincronizar_version(self, version: int) -> None:
+        if self._version is None or version > self._version or version < 0:
+            if self._entradas:
+                self._entradas.clear()
+                self._bytes = 0
+            self._version = version
+
+    def _quitar(self, clave: Tuple) -> None:
+        entrada = self._entradas.pop(clave)
+        self._bytes -= len(entrada.cuerpo)
+
+    @property
+    def entradas(self) -> int:
+        return len(self._entradas)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+
+class RegistroCacheHTTP:
+    """Contadores por endpoint desde el inicio del proceso."""
+
+    def __init__(self):
+        self._endpoints: Dict[str, _MetricasEndpoint] = {}
+        self._lock = threading.Lock()
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def observar(self, endpoint: str, resultado: str) -> None:
+        with self._lock:
+            metricas = self._endpoints.setdefault(endpoint, _MetricasEndpoint())
+            setattr(metricas, resultado, getattr(metricas, resultado) + 1)
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            aciertos = sum(m.aciertos for m in self._endpoints.values())
+            fallos = sum(m.fallos for m in self._endpoints.values())
+            return {
+                "aciertos": aciertos,
+                "fallos": fallos,
+                "no_modificados": sum(m.no_modificados for m in self._endpoints.values()),
+                "tasa_aciertos": round(aciertos / (aciertos + fallos), 4) if aciertos + fallos else 0.0,
+                "entradas": cache_respuestas.entradas,
+                "bytes": cache_respuestas.bytes,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+            }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self.desalojos = 0
+            self.invalidaciones = 0
+
+    def formato_prometheus(self) -> str:
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lineas = []
+            for nombre, ayuda, campo in (
+                ("afe_http_cache_hits_total", "Respuestas servidas desde la caché HTTP", "aciertos"),
+                ("afe_http_cache_misses_total", "Respuestas generadas por el endpoint", "fallos"),
+                ("afe_http_cache_not_modified_total", "Respuestas 304 (If-None-Match)", "no_modificados"),
+            ):
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+                lineas += [f'{nombre}{{endpoint="{e}"}} {getattr(m, campo)}' for e, m in endpoints]
+            lineas += [
+                "# HELP afe_http_cache_entries Entradas en la caché HTTP",
+                "# TYPE afe_http_cache_entries gauge",
+                f"afe_http_cache_entries {cache_respuestas.entradas}",
+                "# HELP afe_http_cache_bytes Bytes de cuerpos en la caché HTTP",
+                "# TYPE afe_http_cache_bytes gauge",
+                f"afe_http_cache_bytes {cache_respuestas.bytes}",
+                "# HELP afe_http_cache_evictions_total Entradas desalojadas por límite de tamaño",
+                "# TYPE afe_http_cache_evictions_total counter",
+                f"afe_http_cache_evictions_total {self.desalojos}",
+                "# HELP afe_http_cache_invalidations_total Incrementos de versión de datos",
+                "# TYPE afe_http_cache_invalidations_total counter",
+                f"afe_http_cache_invalidations_total {self.invalidaciones}",
+            ]
+        return "\n".join(lineas) + "\n"
+
+
+registro_cache = RegistroCacheHTTP()
+cache_respuestas = CacheRespuestas(
+    max_entradas=settings.http_cache_max_entradas,
+    max_bytes=settings.http_cache_max_mb * 1024 * 1024,
+    ttl_segundos=settings.http_cache_ttl_segundos
+)
+
+
+# ==================== DECORADOR DE ENDPOINTS ====================
+
+_ESTADO_REQUEST = "cache_http"
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110): W/"x" coincide con "x"; la compresión debilita el ETag."""
+    if not if_none_match:
+        return False
+    candidatos = [v.strip() for v in if_none_match.split(",")]
+    return "*" in candidatos or etag in (c[2:] if c.startswith("W/") else c for c in candidatos)
+
+
+def _headers(etag: str) -> Dict[str, str]:
+    # private: contiene datos del usuario; no-cache: revalidar siempre con If-None-Match
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "X-Cache": "HIT"}
+
+
+def _clave(nombre: str, request: Request, usuario: Any, por_usuario: bool) -> Tuple:
+    return (
+        nombre,
+        tuple(sorted(request.query_params.multi_items())),
+        request.headers.get("x-grupo-id"),
+        getattr(usuario, "id", None) if por_usuario else None,
+        date.today().isoformat(),
+    )
+
+
+def respuesta_cacheable(nombre: str, por_usuario: bool = True) -> Callable:
+    """
+    Cachea la respuesta JSON del endpoint por (params, grupo, usuario, fecha).
+
+    Args:
+        nombre: Identificador del endpoint en la clave y en las métricas
+        por_usuario: Incluir el usuario autenticado (`current_user`) en la
+                     clave; False si la respuesta no depende del usuario.
+    """
+    def decorador(funcion: Callable) -> Callable:
+        firma = inspect.signature(funcion)
+        agrega_request = "request" not in firma.parameters
+        if agrega_request:
+            parametros = list(firma.parameters.values()) + [
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ]
+            firma = firma.replace(parameters=parametros)
+
+        def desde_cache(kwargs) -> Optional[Response]:
+            request = kwargs.pop("request") if agrega_request else kwargs["request"]
+            if not settings.http_cache_enabled:
+                return None
+            clave = _clave(nombre, request, kwargs.get("current_user"), por_usuario)
+            version = version_datos.actual()
+            entrada = cache_respuestas.obtener(clave, version)
+            if entrada is not None:
+                registro_cache.observar(nombre, "aciertos")
+                if _etag_coincide(request.headers.get("if-none-match"), entrada.etag):
+                    registro_cache.observar(nombre, "no_modificados")
+                    return Response(status_code=304, headers=_headers(entrada.etag))
+                return Response(content=entrada.cuerpo, media_type=entrada.media_type, headers=_headers(entrada.etag))
+            registro_cache.observar(nombre, "fallos")
+            # El middleware guarda el cuerpo serializado al terminar el request
+            setattr(request.state, _ESTADO_REQUEST, (clave, version))
+            return None
+
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura(*args, **kwargs):
+                respuesta = desde_cache(kwargs)
+                if respuesta is not None:
+                    return respuesta
+                return await funcion(*args, **kwargs)
+        else:
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                respuesta = desde_cache(kwargs)
+                if respuesta is not None:
+                    return respuesta
+                return funcion(*args, **kwargs)
+
+        envoltura.__signature__ = firma
+        return envoltura
+
+    return decorador
+
+
+# ==================== MIDDLEWARE ====================
+
+class CacheHTTPMiddleware:
+    """Middleware ASGI: guarda las respuestas 200 marcadas por @respuesta_cacheable."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Dict[str, Any] = {}
+        partes: List[bytes] = []
+
+        async def send_con_cache(mensaje):
+            # El endpoint fija la marca antes de que empiece la respuesta
+            marca = (scope.get("state") or {}).get(_ESTADO_REQUEST)
+            if marca is None:
+                await send(mensaje)
+                return
+
+            if mensaje["type"] == "http.response.start":
+                if mensaje["status"] != 200:
+                    scope["state"].pop(_ESTADO_REQUEST, None)
+                    await send(mensaje)
+                    return
+                inicio["mensaje"] = mensaje
+                return
+
+            partes.append(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                return
+            await self._responder(scope, marca, inicio["mensaje"], b"".join(partes), send)
+
+        await self.app(scope, receive, send_con_cache)
+
+    async def _responder(self, scope, marca, inicio, cuerpo: bytes, send) -> None:
+        clave, version = marca
+        etag = f'"{hashlib.sha256(cuerpo).hexdigest()[:32]}"'
+        headers = [(k, v) for k, v in inicio.get("headers", []) if k.lower() not in (b"content-length", b"etag")]
+        media_type = next(
+            (v.decode("latin-1") for k, v in headers if k.lower() == b"content-type"), "application/json"
+        )
+        cache_respuestas.guardar(clave, version, EntradaCache(cuerpo, etag, media_type, time.monotonic()))
+
+        headers += [(b"etag", etag.encode()), (b"cache-control", b"private, no-cache"), (b"x-cache", b"MISS")]
+        if_none_match = dict(scope.get("headers") or []).get(b"if-none-match", b"").decode("latin-1")
+        if _etag_coincide(if_none_match, etag):
+            registro_cache.observar(clave[0], "no_modificados")
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers.append((b"content-length", str(len(cuerpo)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+
+def instalar_cache_http(app, engine) -> None:
+    """Registra listeners de versión y middleware según configuración (en create_app)."""
+    if not settings.http_cache_enabled:
+        return
+    if settings.http_cache_backend == "bd":
+        version_datos.configurar(engine)
+    instalar_listeners_version()
+    app.add_middleware(CacheHTTPMiddleware)
@@ -1,7 +1,7 @@
 # app/core/config.py
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Optional
 
 
 # Roles del sistema
@@ -47,6 +47,10 @@ class Settings(BaseSettings):
     graph_client_secret: str = Field("", env="GRAPH_CLIENT_SECRET")
     graph_from_email: str = Field("", env="GRAPH_FROM_EMAIL")
     graph_from_name: str = Field("", env="GRAPH_FROM_NAME")
+    # Token compartido entre workers y con invoice_extractor (None = solo en memoria)
+    graph_token_cache_dir: Optional[str] = Field(None, env="GRAPH_TOKEN_CACHE_DIR")
+    # Renovar el token cuando le queden menos de N segundos
+    graph_token_margen_refresco: int = Field(300, env="GRAPH_TOKEN_MARGEN_REFRESCO")
 
     # --- Microsoft OAuth (para autenticación de usuarios) ---
     # Usar el mismo tenant y client_id si se usa la misma app registration
@@ -105,6 +109,144 @@ class Settings(BaseSettings):
         description="Email del admin para notificaciones de auto-creación"
     )
 
+    # ============================================================================
+    # SCHEDULER EN PROCESO (lease en BD: cada trabajo corre en un solo worker)
+    # ============================================================================
+
+    scheduler_enabled: bool = Field(
+        True,
+        env="SCHEDULER_ENABLED",
+        description="Ejecutar el scheduler cluster en este proceso (False = solo API)"
+    )
+
+    # ============================================================================
+    # INSTRUMENTACIÓN SQL POR REQUEST (app/core/instrumentacion_sql.py)
+    # ============================================================================
+
+    sql_instrumentation_enabled: bool = Field(
+        True,
+        env="SQL_INSTRUMENTATION_ENABLED",
+        description="Contar consultas/tiempo de BD por request y exponer /health/metrics"
+    )
+
+    sql_instrumentation_headers: Optional[bool] = Field(
+        None,
+        env="SQL_INSTRUMENTATION_HEADERS",
+        description="Headers X-SQL-* en las respuestas (por defecto solo en development)"
+    )
+
+    sql_n_plus_one_umbral: int = Field(
+        5,
+        env="SQL_N_PLUS_ONE_UMBRAL",
+        description="Repeticiones de la misma sentencia en un request para marcarlo como N+1"
+    )
+
+    sql_slow_query_ms: float = Field(
+        200.0,
+        env="SQL_SLOW_QUERY_MS",
+        description="Sentencias más lentas que este umbral se registran en el log"
+    )
+
+    # ============================================================================
+    # CACHÉ HTTP CON ETAG (app/core/cache_http.py)
+    # ============================================================================
+
+    http_cache_enabled: bool = Field(
+        True,
+        env="HTTP_CACHE_ENABLED",
+        description="Cachear dashboards/árbol/períodos y responder 304 con If-None-Match"
+    )
+
+    http_cache_max_entradas: int = Field(
+        2000,
+        env="HTTP_CACHE_MAX_ENTRADAS",
+        description="Máximo de respuestas en la LRU de cada proceso"
+    )
+
+    http_cache_max_mb: int = Field(
+        64,
+        env="HTTP_CACHE_MAX_MB",
+        description="Máximo de MB de cuerpos en la LRU de cada proceso"
+    )
+
+    http_cache_ttl_segundos: int = Field(
+        300,
+        env="HTTP_CACHE_TTL_SEGUNDOS",
+        description="Vigencia máxima de una entrada (cubre escrituras fuera del backend)"
+    )
+
+    http_cache_backend: str = Field(
+        "memoria",
+        env="HTTP_CACHE_BACKEND",
+        description="Versión de datos: 'memoria' (por proceso) o 'bd' (tabla versiones_cache, compartida)"
+    )
+
+    # ============================================================================
+    # COMPRESIÓN DE RESPUESTAS (app/core/respuestas_http.py)
+    # ============================================================================
+
+    http_compresion_enabled: bool = Field(
+        True,
+        env="HTTP_COMPRESION_ENABLED",
+        description="Comprimir respuestas con brotli (si está instalado) o gzip según Accept-Encoding"
+    )
+
+    http_compresion_minimo_bytes: int = Field(
+        1024,
+        env="HTTP_COMPRESION_MINIMO_BYTES",
+        description="Respuestas más pequeñas se envían sin comprimir"
+    )
+
+    http_compresion_nivel_gzip: int = Field(
+        6,
+        env="HTTP_COMPRESION_NIVEL_GZIP",
+        description="Nivel de gzip (1 = rápido, 9 = máxima compresión)"
+    )
+
+    http_compresion_calidad_brotli: int = Field(
+        4,
+        env="HTTP_COMPRESION_CALIDAD_BROTLI",
+        description="Calidad de brotli (0-11); 4-5 equilibra CPU y tamaño para respuestas dinámicas"
+    )
+
+    # ============================================================================
+    # PARTICIONES DE FACTURAS (app/services/particiones_facturas.py)
+    # ============================================================================
+
+    particiones_mantenimiento_enabled: bool = Field(
+        False,
+        env="PARTICIONES_MANTENIMIENTO_ENABLED",
+        description="Mantenimiento diario de particiones (solo si facturas está particionada por RANGE)"
+    )
+
+    particiones_granularidad: str = Field(
+        "anual",
+        env="PARTICIONES_GRANULARIDAD",
+        description="Granularidad de las particiones nuevas: anual | mensual"
+    )
+
+    particiones_periodos_adelante: int = Field(
+        2,
+        env="PARTICIONES_PERIODOS_ADELANTE",
+        description="Períodos futuros a tener creados además del actual"
+    )
+
+    particiones_retencion_meses: int = Field(
+        0,
+        env="PARTICIONES_RETENCION_MESES",
+        description="Particiones más antiguas se mueven a tablas de archivo comprimidas (0 = no archivar)"
+    )
+
+    # ============================================================================
+    # PLANTILLAS DE EMAIL (app/services/email_template_service.py)
+    # ============================================================================
+
+    email_templates_cache_dir: Optional[str] = Field(
+        None,
+        env="EMAIL_TEMPLATES_CACHE_DIR",
+        description="Directorio de la caché de bytecode Jinja2, propio del usuario y 0700 (None = directorio por defecto de Jinja)"
+    )
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
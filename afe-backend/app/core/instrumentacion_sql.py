@@ -0,0 +1,297 @@
+"""
+Instrumentación SQL por request y detector de N+1.
+
+Componentes:
+- Listeners de SQLAlchemy (before/after_cursor_execute) sobre el engine de
+  la app: miden cada sentencia y la registran en el ContextoSQL activo.
+- InstrumentacionSQLMiddleware (ASGI): abre un ContextoSQL por request y al
+  terminar agrega las métricas por ruta (plantilla, no URL concreta).
+- Huellas (fingerprints): la sentencia con literales y listas IN colapsadas.
+  La misma huella repetida >= sql_n_plus_one_umbral veces en un request es
+  un N+1 (p.ej. `factura.items` dentro de un loop).
+- Exposición:
+    * Headers X-SQL-* en la respuesta (desarrollo / SQL_INSTRUMENTATION_HEADERS)
+    * Formato Prometheus en GET /api/v1/health/metrics
+- `medir_consultas()`: context manager para scripts, benchmarks y tests.
+
+El ContextoSQL viaja en un ContextVar: Starlette copia el contexto al
+threadpool de los endpoints síncronos y el objeto se comparte por referencia.
+"""
+
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+# Límites de buckets del histograma de consultas por request
+BUCKETS_CONSULTAS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+# Sentencias más lentas que se conservan por request
+MAX_LENTAS = 5
+
+_PATRON_ESPACIOS = re.compile(r"\s+")
+_PATRON_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_PATRON_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PATRON_LISTA_IN = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)")
+
+
+def huella_sql(sentencia: str) -> str:
+    """Normaliza una sentencia: literales → ?, listas IN → (?...), espacios colapsados."""
+    huella = _PATRON_CADENAS.sub("?", sentencia)
+    huella = _PATRON_NUMEROS.sub("?", huella)
+    huella = _PATRON_LISTA_IN.sub("(?...)", huella)
+    return _PATRON_ESPACIOS.sub(" ", huella).strip()
+
+
+@dataclass
+class ContextoSQL:
+    """Consultas de un request (o de un bloque medido con medir_consultas)."""
+    metodo: str = ""
+    ruta: str = ""
+    consultas: int = 0
+    tiempo_total_ms: float = 0.0
+    huellas: Counter = field(default_factory=Counter)
+    # min-heap de (duración_ms, sentencia) con las MAX_LENTAS más lentas
+    _lentas: List[Tuple[float, str]] = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def registrar(self, sentencia: str, duracion_ms: float) -> None:
+        huella = huella_sql(sentencia)
+        with self._lock:
+            self.consultas += 1
+            self.tiempo_total_ms += duracion_ms
+            self.huellas[huella] += 1
+            if len(self._lentas) < MAX_LENTAS:
+                heapq.heappush(self._lentas, (duracion_ms, huella))
+            elif duracion_ms > self._lentas[0][0]:
+                heapq.heapreplace(self._lentas, (duracion_ms, huella))
+
+    @property
+    def lentas(self) -> List[Tuple[float, str]]:
+        """Sentencias más lentas, de mayor a menor duración."""
+        return sorted(self._lentas, reverse=True)
+
+    def repetidas(self, umbral: Optional[int] = None) -> Dict[str, int]:
+        """Huellas ejecutadas >= umbral veces (candidatas a N+1)."""
+        umbral = umbral or settings.sql_n_plus_one_umbral
+        return {huella: n for huella, n in self.huellas.most_common() if n >= umbral}
+
+
+_contexto_actual: ContextVar[Optional[ContextoSQL]] = ContextVar("contexto_sql", default=None)
+
+
+def contexto_actual() -> Optional[ContextoSQL]:
+    return _contexto_actual.get()
+
+
+@contextmanager
+def medir_consultas(metodo: str = "", ruta: str = "") -> Iterator[ContextoSQL]:
+    """
+    Cuenta las consultas ejecutadas dentro del bloque.
+
+    Ejemplo:
+        with medir_consultas() as sql:
+            servicio.obtener_dashboard(...)
+        assert sql.consultas <= 10
+    """
+    contexto = ContextoSQL(metodo=metodo, ruta=ruta)
+    token = _contexto_actual.set(contexto)
+    try:
+        yield contexto
+    finally:
+        _contexto_actual.reset(token)
+
+
+# ==================== LISTENERS DEL ENGINE ====================
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _contexto_actual.get() is not None:
+        conn.info.setdefault("_instrumentacion_inicio", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    contexto = _contexto_actual.get()
+    inicios = conn.info.get("_instrumentacion_inicio")
+    if contexto is None or not inicios:
+        return
+    contexto.registrar(statement, (time.perf_counter() - inicios.pop()) * 1000)
+
+
+def instalar_listeners(engine: Engine) -> None:
+    """Registra los listeners de medición en el engine (idempotente)."""
+    if not event.contains(engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+# ==================== MÉTRICAS AGREGADAS (PROMETHEUS) ====================
+
+@dataclass
+class _MetricasRuta:
+    requests: int = 0
+    consultas: int = 0
+    segundos_db: float = 0.0
+    requests_n_plus_one: int = 0
+    max_consultas: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * len(BUCKETS_CONSULTAS))
+
+
+class RegistroMetricasSQL:
+    """Agregados por (método, ruta) desde que inició el proceso."""
+
+    def __init__(self):
+        self._rutas: Dict[Tuple[str, str], _MetricasRuta] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, contexto: ContextoSQL, n_plus_one: bool) -> None:
+        with self._lock:
+            metricas = self._rutas.setdefault((contexto.metodo, contexto.ruta), _MetricasRuta())
+            metricas.requests += 1
+            metricas.consultas += contexto.consultas
+            metricas.segundos_db += contexto.tiempo_total_ms / 1000
+            metricas.max_consultas = max(metricas.max_consultas, contexto.consultas)
+            if n_plus_one:
+                metricas.requests_n_plus_one += 1
+            for i, limite in enumerate(BUCKETS_CONSULTAS):
+                if contexto.consultas <= limite:
+                    metricas.buckets[i] += 1
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._rutas.clear()
+
+    def formato_prometheus(self) -> str:
+        """Exposición en formato texto de Prometheus (version 0.0.4)."""
+        with self._lock:
+            rutas = sorted(self._rutas.items())
+            lineas = [
+                "# HELP afe_http_requests_total Requests HTTP instrumentados",
+                "# TYPE afe_http_requests_total counter",
+            ]
+            lineas += [f"afe_http_requests_total{_etiquetas(k)} {m.requests}" for k, m in rutas]
+            lineas += [
+                "# HELP afe_sql_queries_total Sentencias SQL ejecutadas",
+                "# TYPE afe_sql_queries_total counter",
+            ]
+            lineas += [f"afe_sql_queries_total{_etiquetas(k)} {m.consultas}" for k, m in rutas]
+            lineas += [
+                "# HELP afe_sql_duration_seconds_total Tiempo total en base de datos",
+                "# TYPE afe_sql_duration_seconds_total counter",
+            ]
+            lineas += [f"afe_sql_duration_seconds_total{_etiquetas(k)} {m.segundos_db:.6f}" for k, m in rutas]
+            lineas += [
+                "# HELP afe_sql_n_plus_one_requests_total Requests con sentencias repetidas (N+1)",
+                "# TYPE afe_sql_n_plus_one_requests_total counter",
+            ]
+            lineas += [f"afe_sql_n_plus_one_requests_total{_etiquetas(k)} {m.requests_n_plus_one}" for k, m in rutas]
+            lineas += [
+                "# HELP afe_sql_queries_per_request_max Máximo de sentencias en un request",
+                "# TYPE afe_sql_queries_per_request_max gauge",
+            ]
+            lineas += [f"afe_sql_queries_per_request_max{_etiquetas(k)} {m.max_consultas}" for k, m in rutas]
+            lineas += [
+                "# HELP afe_sql_queries_per_request Sentencias SQL por request",
+                "# TYPE afe_sql_queries_per_request histogram",
+            ]
+            for clave, m in rutas:
+                for limite, total in zip(BUCKETS_CONSULTAS, m.buckets):
+                    lineas.append(f"afe_sql_queries_per_request_bucket{_etiquetas(clave, le=str(limite))} {total}")
+                lineas.append(f"afe_sql_queries_per_request_bucket{_etiquetas(clave, le='+Inf')} {m.requests}")
+                lineas.append(f"afe_sql_queries_per_request_sum{_etiquetas(clave)} {m.consultas}")
+                lineas.append(f"afe_sql_queries_per_request_count{_etiquetas(clave)} {m.requests}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(clave: Tuple[str, str], **extra: str) -> str:
+    metodo, ruta = clave
+    pares = {"method": metodo, "route": ruta, **extra}
+    contenido = ",".join(
+        f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in pares.items()
+    )
+    return "{" + contenido + "}"
+
+
+registro_metricas = RegistroMetricasSQL()
+
+# Callbacks con el ContextoSQL de cada request terminado (plugin de pytest)
+observadores: List[Callable[[ContextoSQL], None]] = []
+
+
+# ==================== MIDDLEWARE ====================
+
+class InstrumentacionSQLMiddleware:
+    """Middleware ASGI: un ContextoSQL por request HTTP."""
+
+    def __init__(self, app, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        contexto = ContextoSQL(metodo=scope.get("method", ""))
+        token = _contexto_actual.set(contexto)
+
+        async def send_con_headers(mensaje):
+            if mensaje["type"] == "http.response.start" and self.headers:
+                lentas = contexto.lentas
+                repetidas = contexto.repetidas()
+                mensaje.setdefault("headers", [])
+                mensaje["headers"] = list(mensaje["headers"]) + [
+                    (b"x-sql-queries", str(contexto.consultas).encode()),
+                    (b"x-sql-time-ms", f"{contexto.tiempo_total_ms:.1f}".encode()),
+                    (b"x-sql-slowest-ms", f"{lentas[0][0]:.1f}".encode() if lentas else b"0"),
+                    (b"x-sql-repeated", str(sum(repetidas.values())).encode()),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_headers)
+        finally:
+            _contexto_actual.reset(token)
+            ruta = scope.get("route")
+            contexto.ruta = getattr(ruta, "path", None) or "sin_ruta"
+            self._finalizar(contexto)
+
+    def _finalizar(self, contexto: ContextoSQL) -> None:
+        repetidas = contexto.repetidas()
+        registro_metricas.observar(contexto, n_plus_one=bool(repetidas))
+
+        if repetidas:
+            huella, veces = next(iter(repetidas.items()))
+            logger.warning(
+                f" N+1 en {contexto.metodo} {contexto.ruta}: {contexto.consultas} consultas, "
+                f"sentencia repetida {veces} veces: {huella[:200]}"
+            )
+        lentas = [(ms, h) for ms, h in contexto.lentas if ms >= settings.sql_slow_query_ms]
+        for ms, huella in lentas:
+            logger.warning(f" SQL lenta ({ms:.0f} ms) en {contexto.metodo} {contexto.ruta}: {huella[:200]}")
+
+        for observador in list(observadores):
+            observador(contexto)
+
+
+def instalar_instrumentacion_sql(app, engine: Engine) -> None:
+    """Registra listeners y middleware según configuración (en create_app)."""
+    if not settings.sql_instrumentation_enabled:
+        return
+    instalar_listeners(engine)
+    headers = settings.sql_instrumentation_headers
+    if headers is None:
+        headers = settings.environment == "development"
+    app.add_middleware(InstrumentacionSQLMiddleware, headers=headers)
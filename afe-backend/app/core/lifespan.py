@@ -2,7 +2,6 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from sqlalchemy.orm import Session
 import asyncio
-from threading import Thread
 
 from app.db.base import Base
 from app.db.session import engine, SessionLocal
@@ -11,11 +10,6 @@ from app.utils.logger import logger
 from app.core.config import settings
 
 
-# Background scheduler para tareas automáticas
-_scheduler_thread = None
-_scheduler_running = False
-
-
 def run_automation_task():
     """
     Ejecuta la automatización de facturas en background.
@@ -41,27 +35,26 @@ def run_automation_task():
             workflow_service = WorkflowAutomaticoService(db)
 
             # Obtener facturas SIN workflows
-            facturas_sin_workflow = db.query(Factura).filter(
+            facturas_sin_workflow = db.query(Factura.id).filter(
                 ~Factura.id.in_(
                     db.query(WorkflowAprobacionFactura.factura_id)
                 )
             ).limit(100).all()
 
-            workflows_creados = 0
-            for factura in facturas_sin_workflow:
-                try:
-                    resultado = workflow_service.procesar_factura_nueva(factura.id)
-                    if resultado.get('exito'):
-                        workflows_creados += 1
-                        logger.info(f"   Workflow creado para factura {factura.id}")
-                    else:
-                        logger.warning(f"   Workflow no se creó para factura {factura.id}: {resultado.get('error')}")
-                except Exception as e:
-                    logger.error(f"   Error creando workflow para factura {factura.id}: {str(e)}")
+            # Creación por lotes: consultas por conjunto y un commit por lote
+            resultado_lote = workflow_service.procesar_facturas_nuevas_lote(
+                [fila.id for fila in facturas_sin_workflow]
+            )
+            workflows_creados = resultado_lote['workflows_creados']
+
+            if resultado_lote['errores']:
+                logger.warning(f"   {resultado_lote['errores']} facturas con error creando workflow")
 
             if workflows_creados > 0:
-                logger.info(f" [PASO 1]  {workflows_creados} workflows creados")
-                db.commit()
+                logger.info(
+                    f" [PASO 1]  {workflows_creados} workflows creados para "
+                    f"{resultado_lote['facturas_procesadas']} facturas"
+                )
 
             # PASO 2: Procesar facturas pendientes con automatización
             logger.info(" [PASO 2] Procesando automatización de facturas pendientes...")
@@ -88,31 +81,136 @@ def run_automation_task():
         logger.error(f" Error crítico en task de automatización: {str(e)}", exc_info=True)
 
 
-def schedule_automation_tasks():
-    """
-    Programa tareas de automatización periódicas.
-    """
-    import schedule
-    import time
+def run_initial_automation():
+    """Automatización al iniciar (una sola vez por despliegue, no por worker)."""
+    db = SessionLocal()
+    try:
+        from app.services.automation.automation_service import AutomationService
+        automation = AutomationService()
+        resultado = automation.procesar_facturas_pendientes(
+            db=db,
+            limite_facturas=50,
+            modo_debug=False
+        )
+        logger.info(
+            f" Automatización inicial: {resultado['aprobadas_automaticamente']} aprobadas, "
+            f"{resultado['enviadas_revision']} a revisión"
+        )
+    except Exception as e:
+        logger.error(f" Error en automatización inicial: {str(e)}")
+    finally:
+        db.close()
+
 
-    global _scheduler_running
+def run_search_index_task():
+    """Actualiza el índice de búsqueda con lo cambiado desde la última ejecución."""
+    db = SessionLocal()
+    try:
+        from app.services.busqueda import IndiceBusquedaService
+        resultado = IndiceBusquedaService(db).actualizar_incremental()
+        logger.info(
+            f" Índice de búsqueda ({resultado['modo']}): "
+            f"{resultado['documentos_actualizados']} documentos actualizados"
+        )
+    except Exception as e:
+        logger.error(f" Error actualizando índice de búsqueda: {str(e)}", exc_info=True)
+    finally:
+        db.close()
 
-    # Configurar horarios de ejecución automática
-    # Ejecutar cada hora durante horario laboral
-    schedule.every().hour.at(":00").do(run_automation_task)
 
-    # Ejecución especial: Lunes a las 8:00 AM (inicio de semana)
-    schedule.every().monday.at("08:00").do(run_automation_task)
+def run_partition_maintenance_task():
+    """Crea particiones futuras de facturas y archiva las antiguas."""
+    db = SessionLocal()
+    try:
+        from app.services.particiones_facturas import GestorParticionesFacturas
+        resultado = GestorParticionesFacturas(db).mantener(
+            granularidad=settings.particiones_granularidad,
+            periodos_adelante=settings.particiones_periodos_adelante,
+            retencion_meses=settings.particiones_retencion_meses,
+        )
+        if not resultado['particionada']:
+            logger.info(" Mantenimiento de particiones: facturas no está particionada")
+        else:
+            logger.info(
+                f" Particiones: creadas {resultado['creadas'] or '-'}, "
+                f"archivadas {resultado['archivadas'] or '-'}"
+            )
+    except Exception as e:
+        logger.error(f" Error en mantenimiento de particiones: {str(e)}", exc_info=True)
+    finally:
+        db.close()
+
 
-    logger.info(" Scheduler de automatización configurado")
-    logger.info("   - Cada hora en punto durante el día")
-    logger.info("   - Lunes a las 8:00 AM")
+def run_provider_reclassification_task():
+    """Reclasifica proveedores (tipo de servicio, nivel de confianza) en lote."""
+    db = SessionLocal()
+    try:
+        from app.services.clasificacion_proveedores import ClasificacionProveedoresService
+        resultado = ClasificacionProveedoresService(db).reclasificar_lote()
+        logger.info(
+            f" Reclasificación de proveedores: {resultado['actualizados']} cambios de "
+            f"{resultado['total_procesados']} asignaciones ({resultado['tiempos']['total']}s)"
+        )
+    except Exception as e:
+        logger.error(f" Error en reclasificación de proveedores: {str(e)}", exc_info=True)
+    finally:
+        db.close()
 
-    _scheduler_running = True
 
-    while _scheduler_running:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+def trabajos_programados():
+    """
+    Trabajos del scheduler cluster.
+
+    - Automatización cada hora en punto (incluye lunes 8:00 AM)
+    - Automatización inicial al arrancar
+    - Notificaciones: resumen semanal y alertas urgentes
+    - Índice de búsqueda incremental cada minuto
+    - Reclasificación de proveedores el día 1 de cada mes 03:00
+    - Particiones de facturas a diario 02:30 (si PARTICIONES_MANTENIMIENTO_ENABLED)
+    """
+    from apscheduler.triggers.cron import CronTrigger
+    from app.services.scheduler_cluster import TrabajoProgramado
+    from app.services.scheduler_notificaciones import trabajos_notificaciones
+
+    trabajos = [
+        TrabajoProgramado(
+            nombre='automatizacion_facturas',
+            descripcion='Automatización de facturas (cada hora en punto)',
+            funcion=run_automation_task,
+            trigger=CronTrigger(minute=0),
+        ),
+        TrabajoProgramado(
+            nombre='automatizacion_inicial',
+            descripcion='Automatización inicial al desplegar',
+            funcion=run_initial_automation,
+            jitter_segundos=10,
+        ),
+        TrabajoProgramado(
+            nombre='indice_busqueda',
+            descripcion='Índice de búsqueda de proveedores y facturas (incremental)',
+            funcion=run_search_index_task,
+            trigger=CronTrigger(minute='*'),
+            jitter_segundos=5,
+            recuperar_perdidas=False,
+        ),
+        TrabajoProgramado(
+            nombre='reclasificacion_proveedores',
+            descripcion='Reclasificación mensual de proveedores (en lote)',
+            funcion=run_provider_reclassification_task,
+            trigger=CronTrigger(day=1, hour=3, minute=0),
+            lease_segundos=1800,
+        ),
+        *trabajos_notificaciones(),
+    ]
+    if settings.particiones_mantenimiento_enabled:
+        trabajos.append(TrabajoProgramado(
+            nombre='mantenimiento_particiones',
+            descripcion='Particiones de facturas: crear futuras y archivar antiguas',
+            funcion=run_partition_maintenance_task,
+            trigger=CronTrigger(hour=2, minute=30),
+            lease_segundos=3600,
+        ))
+    return trabajos
 
 
 @asynccontextmanager
@@ -121,8 +219,6 @@ async def lifespan(app: FastAPI):
     Maneja startup/shutdown de la app.
     Ideal para inicializar y cerrar recursos empresariales.
     """
-    global _scheduler_thread, _scheduler_running
-
     try:
         # --- Startup ---
         logger.info(" Iniciando aplicación AFE Backend...")
@@ -136,52 +232,17 @@ async def lifespan(app: FastAPI):
         finally:
             session.close()
 
-        # --- Automatización Inicial ---
-        # Ejecutar automatización al iniciar (modo asíncrono para no bloquear startup)
-        logger.info(" Ejecutando automatización inicial de facturas...")
-
-        def run_initial_automation():
-            db = SessionLocal()
+        # --- Scheduler de Tareas Periódicas ---
+        # Todos los workers arrancan el scheduler; cada ejecución la toma un
+        # solo worker (lease en leases_tareas_programadas)
+        if settings.scheduler_enabled:
             try:
-                from app.services.automation.automation_service import AutomationService
-                automation = AutomationService()
-                resultado = automation.procesar_facturas_pendientes(
-                    db=db,
-                    limite_facturas=50,
-                    modo_debug=False
-                )
-                logger.info(
-                    f" Automatización inicial: {resultado['aprobadas_automaticamente']} aprobadas, "
-                    f"{resultado['enviadas_revision']} a revisión"
-                )
+                from app.services.scheduler_cluster import iniciar_scheduler_cluster
+                iniciar_scheduler_cluster(trabajos_programados())
             except Exception as e:
-                logger.error(f" Error en automatización inicial: {str(e)}")
-            finally:
-                db.close()
-
-        # Ejecutar en background thread para no bloquear
-        initial_thread = Thread(target=run_initial_automation, daemon=True)
-        initial_thread.start()
-
-        # --- Scheduler de Tareas Periódicas ---
-        # Iniciar scheduler en thread separado
-        try:
-            import schedule
-            _scheduler_thread = Thread(target=schedule_automation_tasks, daemon=True)
-            _scheduler_thread.start()
-            logger.info(" Scheduler de automatización iniciado")
-        except ImportError:
-            logger.warning("  Módulo 'schedule' no disponible. Instalar con: pip install schedule")
-            logger.info("   Automatización programada deshabilitada (solo manual)")
-
-        # --- Scheduler de Notificaciones ---
-        # Iniciar scheduler de notificaciones (resumen semanal, alertas urgentes)
-        try:
-            from app.services.scheduler_notificaciones import iniciar_scheduler_notificaciones
-            iniciar_scheduler_notificaciones()
-            logger.info(" Scheduler de notificaciones iniciado")
-        except Exception as e:
-            logger.warning(f"  Error iniciando scheduler de notificaciones: {str(e)}")
+                logger.warning(f"  Error iniciando scheduler: {str(e)}")
+        else:
+            logger.info("   Scheduler deshabilitado en este proceso (SCHEDULER_ENABLED=false)")
 
         logger.info(" Startup completado correctamente")
 
@@ -194,17 +255,11 @@ async def lifespan(app: FastAPI):
     # --- Shutdown ---
     logger.info(" Aplicación apagándose...")
 
-    # Detener scheduler de automatización
-    _scheduler_running = False
-    if _scheduler_thread:
-        logger.info("   Deteniendo scheduler de automatización...")
-        # El thread es daemon, se cerrará automáticamente
-
-    # Detener scheduler de notificaciones
+    # Detener scheduler
     try:
-        from app.services.scheduler_notificaciones import detener_scheduler_notificaciones
-        detener_scheduler_notificaciones()
+        from app.services.scheduler_cluster import detener_scheduler_cluster
+        detener_scheduler_cluster()
     except Exception as e:
-        logger.warning(f"  Error deteniendo scheduler de notificaciones: {str(e)}")
+        logger.warning(f"  Error deteniendo scheduler: {str(e)}")
 
     logger.info(" Aplicación cerrada correctamente")
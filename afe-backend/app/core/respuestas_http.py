@@ -0,0 +1,199 @@
+"""
+Respuestas JSON rápidas y compresión negociada.
+
+- JSONRapidoResponse: default_response_class de la app. Serializa con orjson
+  si está instalado (varias veces más rápido que json.dumps) y, si no, con
+  json estándar en el mismo formato compacto de JSONResponse. Decimal se
+  emite como texto, igual que los schemas (json_encoders).
+- CompresionMiddleware: brotli si el cliente lo acepta y el paquete
+  `brotli` está instalado; si no, gzip (GZipMiddleware de Starlette).
+  Solo respuestas de al menos http_compresion_minimo_bytes. Una respuesta
+  comprimida lleva el ETag débil (W/"...") del cuerpo sin comprimir: cada
+  codificación es una representación distinta y no comparte ETag fuerte.
+
+Los listados grandes (/facturas/cursor, /facturas/all) además evitan la
+validación por objeto con serializar_factura_read (app/schemas/factura.py)
+y retornan JSONRapidoResponse directamente.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+
+def _por_defecto(valor: Any) -> Any:
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    raise TypeError(f"Tipo no serializable a JSON: {type(valor).__name__}")
+
+
+def dumps_json(contenido: Any) -> bytes:
+    """JSON compacto UTF-8 (orjson si está disponible)."""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        contenido,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_por_defecto,
+    ).encode("utf-8")
+
+
+class JSONRapidoResponse(JSONResponse):
+    """JSONResponse serializada con orjson cuando está instalado."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+# ==================== COMPRESIÓN ====================
+
+def _acepta_brotli(accept_encoding: str) -> bool:
+    for parte in accept_encoding.split(","):
+        codificacion, _, parametros = parte.strip().partition(";")
+        if codificacion.strip().lower() == "br":
+            return parametros.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class _RespuestaBrotli:
+    """Comprime con brotli el cuerpo de una respuesta (también en streaming)."""
+
+    def __init__(self, app, minimo_bytes: int, calidad: int):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.calidad = calidad
+        self.send = None
+        self.inicio = None
+        self.compresor = None
+        self.omitir = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.enviar)
+
+    async def enviar(self, mensaje):
+        if mensaje["type"] == "http.response.start":
+            self.inicio = mensaje
+            headers = Headers(raw=mensaje["headers"])
+            # Ya codificada o un flujo de eventos que no debe acumularse
+            self.omitir = "content-encoding" in headers or headers.get("content-type", "").startswith(
+                "text/event-stream"
+            )
+            return
+
+        if mensaje["type"] != "http.response.body":
+            await self.send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        mas = mensaje.get("more_body", False)
+
+        if self.compresor is None:
+            if self.omitir or (not mas and len(cuerpo) < self.minimo_bytes):
+                await self.send(self.inicio)
+                self.inicio = None
+                self.compresor = False
+                await self.send(mensaje)
+                return
+            self.compresor = brotli.Compressor(quality=self.calidad)
+            headers = MutableHeaders(raw=self.inicio["headers"])
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            if mas:
+                del headers["Content-Length"]
+            else:
+                comprimido = self.compresor.process(cuerpo) + self.compresor.finish()
+                headers["Content-Length"] = str(len(comprimido))
+                await self.send(self.inicio)
+                await self.send({"type": "http.response.body", "body": comprimido})
+                return
+            await self.send(self.inicio)
+            self.inicio = None
+
+        if self.compresor is False:
+            await self.send(mensaje)
+            return
+
+        salida = self.compresor.process(cuerpo)
+        if not mas:
+            salida += self.compresor.finish()
+        await self.send({"type": "http.response.body", "body": salida, "more_body": mas})
+
+
+class CompresionMiddleware:
+    """Negocia brotli (si está disponible) o gzip según Accept-Encoding."""
+
+    def __init__(self, app, minimo_bytes: int = 1024, nivel_gzip: int = 6, calidad_brotli: int = 4):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.calidad_brotli = calidad_brotli
+        self.gzip = GZipMiddleware(app, minimum_size=minimo_bytes, compresslevel=nivel_gzip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers_request = Headers(scope=scope)
+        send = _etag_debil(send, headers_request.get("if-none-match", ""))
+        if brotli is not None and _acepta_brotli(headers_request.get("accept-encoding", "")):
+            await _RespuestaBrotli(self.app, self.minimo_bytes, self.calidad_brotli)(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+
+def _etag_debil(send, if_none_match: str):
+    """
+    Debilita el ETag fuerte de las respuestas comprimidas.
+
+    En un 304 se responde en la misma forma (débil) en que el cliente envió
+    el ETag en If-None-Match, que es la de la representación comprimida que
+    tiene guardada.
+    """
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.start":
+            headers = MutableHeaders(raw=mensaje["headers"])
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                comprimida = "content-encoding" in headers
+                if comprimida or (mensaje["status"] == 304 and f"W/{etag}" in if_none_match):
+                    headers["ETag"] = f"W/{etag}"
+        await send(mensaje)
+
+    return enviar
+
+
+def instalar_compresion(app) -> None:
+    """Registra la compresión según configuración (en create_app, después de la caché HTTP)."""
+    if not settings.http_compresion_enabled:
+        return
+    app.add_middleware(
+        CompresionMiddleware,
+        minimo_bytes=settings.http_compresion_minimo_bytes,
+        nivel_gzip=settings.http_compresion_nivel_gzip,
+        calidad_brotli=settings.http_compresion_calidad_brotli,
+    )
@@ -8,6 +8,7 @@ from app.models.factura import Factura, EstadoFactura
 from app.models.proveedor import Proveedor
 from app.models.workflow_aprobacion import AsignacionNitResponsable
 from app.utils.nit_validator import NitValidator
+from app.utils.date_helpers import DateHelper
 
 
 # ==================== ENTERPRISE HELPERS ====================
@@ -210,8 +211,6 @@ def count_facturas(
     - Filtra directamente por responsable_id en la factura (responsable asignado)
     - Una factura es "asignada" si tiene responsable_id = current_user.id
     """
-    from sqlalchemy import extract
-
     # Filtrar por facturas asignadas al usuario
     # Filtrar directamente por responsable_id en la factura
     query = db.query(func.count(Factura.id))
@@ -225,12 +224,9 @@ def count_facturas(
     if numero_factura:
         query = query.filter(Factura.numero_factura == numero_factura)
 
-    # Filtrar por mes y año actual si se especifica
+    # Filtrar por mes y año si se especifica (rango semiabierto: usa índices)
     if mes is not None and año is not None:
-        query = query.filter(
-            extract('month', Factura.creado_en) == mes,
-            extract('year', Factura.creado_en) == año
-        )
+        query = query.filter(DateHelper.create_mes_filter(Factura.creado_en, año, mes))
 
     return query.scalar()
 
@@ -261,7 +257,6 @@ def list_facturas(
     incluso cuando un NIT está compartido entre múltiples usuarios.
     """
     from sqlalchemy.orm import joinedload, selectinload
-    from sqlalchemy import extract
 
     query = db.query(Factura).options(
         joinedload(Factura.proveedor),
@@ -280,12 +275,9 @@ def list_facturas(
     if numero_factura:
         query = query.filter(Factura.numero_factura == numero_factura)
 
-    # Filtrar por mes y año actual si se especifica
+    # Filtrar por mes y año si se especifica (rango semiabierto: usa índices)
     if mes is not None and año is not None:
-        query = query.filter(
-            extract('month', Factura.creado_en) == mes,
-            extract('year', Factura.creado_en) == año
-        )
+        query = query.filter(DateHelper.create_mes_filter(Factura.creado_en, año, mes))
 
     # Orden cronológico empresarial: más recientes primero
     return query.order_by(
@@ -682,7 +674,7 @@ def get_facturas_resumen_por_mes(
     ).filter(Factura.fecha_emision.isnot(None))
 
     if año:
-        query = query.filter(extract('year', Factura.fecha_emision) == año)
+        query = query.filter(DateHelper.create_mes_filter(Factura.fecha_emision, año))
 
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
@@ -743,82 +735,69 @@ def get_facturas_resumen_por_mes_detallado(
     """
     from sqlalchemy import extract
 
-    # Obtener todos los períodos (año/mes) - CORREGIDO: usar creado_en para coincidir con dashboard
-    periodos_query = db.query(
-        extract('year', Factura.creado_en).label('año'),
-        extract('month', Factura.creado_en).label('mes'),
+    # Una sola consulta agregada por (año, mes, estado) - CORREGIDO: usar
+    # creado_en para coincidir con dashboard. Antes eran 7 consultas por período.
+    año_expr = extract('year', Factura.creado_en)
+    mes_expr = extract('month', Factura.creado_en)
+    query = db.query(
+        año_expr.label('año'),
+        mes_expr.label('mes'),
+        Factura.estado,
+        func.count(Factura.id).label('cantidad'),
+        func.sum(Factura.total_a_pagar).label('monto_total'),
+        func.sum(Factura.subtotal).label('subtotal_total'),
+        func.sum(Factura.iva).label('iva_total')
     ).filter(Factura.creado_en.isnot(None))
 
-    # Aplicar filtro de grupo para períodos
+    # Aplicar filtro de grupo
     if grupo_id_filter is not None:
         if isinstance(grupo_id_filter, list):
-            periodos_query = periodos_query.filter(Factura.grupo_id.in_(grupo_id_filter))
+            query = query.filter(Factura.grupo_id.in_(grupo_id_filter))
         else:
-            periodos_query = periodos_query.filter(Factura.grupo_id == grupo_id_filter)
+            query = query.filter(Factura.grupo_id == grupo_id_filter)
 
-    # Aplicar filtro de responsable para períodos
+    # Aplicar filtro de responsable
     if responsable_id_filter is not None:
-        periodos_query = periodos_query.filter(Factura.accion_por == str(responsable_id_filter))
+        query = query.filter(Factura.accion_por == str(responsable_id_filter))
 
-    periodos_query = periodos_query.distinct()
+    if proveedor_id:
+        query = query.filter(Factura.proveedor_id == proveedor_id)
 
+    # Año como rango semiabierto (usa índices / partition pruning)
     if año:
-        periodos_query = periodos_query.filter(extract('year', Factura.creado_en) == año)
-
-    periodos = periodos_query.order_by(desc('año'), desc('mes')).all()
-
-    result_detallado = []
-
-    for período_año, período_mes in periodos:
-        # Query base para este período - CORREGIDO: usar creado_en para coincidir con dashboard
-        base_query = db.query(Factura).filter(
-            extract('year', Factura.creado_en) == período_año,
-            extract('month', Factura.creado_en) == período_mes
-        )
-
-        # Aplicar filtro de grupo
-        if grupo_id_filter is not None:
-            if isinstance(grupo_id_filter, list):
-                base_query = base_query.filter(Factura.grupo_id.in_(grupo_id_filter))
-            else:
-                base_query = base_query.filter(Factura.grupo_id == grupo_id_filter)
-
-        # Aplicar filtro de responsable
-        if responsable_id_filter is not None:
-            base_query = base_query.filter(Factura.accion_por == str(responsable_id_filter))
-
-        if proveedor_id:
-            base_query = base_query.filter(Factura.proveedor_id == proveedor_id)
-
-        # Contar por estado
-        en_revision = base_query.filter(Factura.estado == EstadoFactura.en_revision).count()
-        aprobada = base_query.filter(Factura.estado == EstadoFactura.aprobada).count()
-        aprobada_auto = base_query.filter(Factura.estado == EstadoFactura.aprobada_auto).count()
-        rechazada = base_query.filter(Factura.estado == EstadoFactura.rechazada).count()
-
-        # Totales globales
-        total_facturas = base_query.count()
-
-        if total_facturas > 0:  # Solo incluir períodos con datos
-            monto_total = base_query.with_entities(func.sum(Factura.total_a_pagar)).scalar() or 0.0
-            subtotal_total = base_query.with_entities(func.sum(Factura.subtotal)).scalar() or 0.0
-            iva_total = base_query.with_entities(func.sum(Factura.iva)).scalar() or 0.0
-
-            result_detallado.append({
-                "periodo": f"{int(período_año)}-{int(período_mes):02d}",
-                "año": int(período_año),
-                "mes": int(período_mes),
-                "total_facturas": total_facturas,
-                "monto_total": float(monto_total),
-                "subtotal_total": float(subtotal_total),
-                "iva_total": float(iva_total),
+        query = query.filter(DateHelper.create_mes_filter(Factura.creado_en, año))
+
+    filas = query.group_by(año_expr, mes_expr, Factura.estado).all()
+
+    periodos: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for fila in filas:
+        clave = (int(fila.año), int(fila.mes))
+        periodo = periodos.get(clave)
+        if periodo is None:
+            periodo = periodos[clave] = {
+                "periodo": f"{clave[0]}-{clave[1]:02d}",
+                "año": clave[0],
+                "mes": clave[1],
+                "total_facturas": 0,
+                "monto_total": 0.0,
+                "subtotal_total": 0.0,
+                "iva_total": 0.0,
                 "facturas_por_estado": {
-                    "en_revision": en_revision,
-                    "aprobada": aprobada,
-                    "aprobada_auto": aprobada_auto,
-                    "rechazada": rechazada
+                    "en_revision": 0,
+                    "aprobada": 0,
+                    "aprobada_auto": 0,
+                    "rechazada": 0
                 }
-            })
+            }
+        estado = fila.estado.value if hasattr(fila.estado, 'value') else fila.estado
+        periodo["total_facturas"] += fila.cantidad
+        periodo["monto_total"] += float(fila.monto_total or 0)
+        periodo["subtotal_total"] += float(fila.subtotal_total or 0)
+        periodo["iva_total"] += float(fila.iva_total or 0)
+        if estado in periodo["facturas_por_estado"]:
+            periodo["facturas_por_estado"][estado] += fila.cantidad
+
+    result_detallado = [periodos[clave] for clave in sorted(periodos, reverse=True)]
 
     return result_detallado
 
@@ -841,14 +820,8 @@ def get_facturas_por_periodo(
     Args:
         periodo: Período en formato "YYYY-MM" (ej: "2025-07")
     """
-    from sqlalchemy import extract
-
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
-
     query = db.query(Factura).filter(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
+        DateHelper.create_periodo_filter(Factura.fecha_emision, periodo)
     )
 
     if proveedor_id:
@@ -873,14 +846,8 @@ def count_facturas_por_periodo(
     Cuenta facturas de un período específico.
     Ahora usa fecha_emision (periodo_factura eliminado de BD).
     """
-    from sqlalchemy import extract
-
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
-
     query = db.query(func.count(Factura.id)).filter(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
+        DateHelper.create_periodo_filter(Factura.fecha_emision, periodo)
     )
 
     if proveedor_id:
@@ -904,16 +871,8 @@ def get_estadisticas_periodo(
     Obtiene estadísticas detalladas de un período específico.
     Ahora usa fecha_emision (periodo_factura eliminado de BD).
     """
-    from sqlalchemy import extract
-
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
-
-    # Filtros base
-    periodo_filter = and_(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
-    )
+    # Filtro base (rango semiabierto sobre fecha_emision)
+    periodo_filter = DateHelper.create_periodo_filter(Factura.fecha_emision, periodo)
 
     query = db.query(Factura).filter(periodo_filter)
 
@@ -1017,11 +976,11 @@ def get_jerarquia_facturas(
 
     query = db.query(Factura).filter(Factura.fecha_emision.isnot(None))
 
-    # Filtros opcionales
+    # Filtros opcionales: año (y mes) como rango semiabierto; mes sin año
+    # abarca varios años y no se puede expresar como un solo rango
     if año:
-        query = query.filter(extract('year', Factura.fecha_emision) == año)
-
-    if mes:
+        query = query.filter(DateHelper.create_mes_filter(Factura.fecha_emision, año, mes or None))
+    elif mes:
         query = query.filter(extract('month', Factura.fecha_emision) == mes)
 
     if proveedor_id:
@@ -1104,7 +1063,6 @@ def find_facturas_mes_anterior(
         Lista de facturas del mes anterior del mismo proveedor
     """
     from dateutil.relativedelta import relativedelta
-    from sqlalchemy import extract
 
     # Calcular fecha del mes anterior
     fecha_mes_anterior = fecha_actual - relativedelta(months=1)
@@ -1113,8 +1071,9 @@ def find_facturas_mes_anterior(
     query = db.query(Factura).filter(
         and_(
             Factura.proveedor_id == proveedor_id,
-            extract('year', Factura.fecha_emision) == fecha_mes_anterior.year,
-            extract('month', Factura.fecha_emision) == fecha_mes_anterior.month,
+            DateHelper.create_mes_filter(
+                Factura.fecha_emision, fecha_mes_anterior.year, fecha_mes_anterior.month
+            ),
             # Solo considerar facturas aprobadas
             or_(
                 Factura.estado == EstadoFactura.aprobada,
@@ -1131,7 +1090,7 @@ def find_facturas_mes_anterior(
     if numero_factura:
         query = query.filter(Factura.numero_factura != numero_factura)
 
-    facturas = query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    facturas = query.order_by(desc(Factura.fecha_emision), desc(Factura.id)).limit(limit).all()
 
     return facturas
 
@@ -1202,7 +1161,7 @@ def find_facturas_by_orden_compra(
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
 
-    return query.order_by(desc(Factura.fecha_emision)).all()
+    return query.order_by(desc(Factura.fecha_emision), desc(Factura.id)).all()
 
 
 # -----------------------------------------------------
@@ -1235,7 +1194,7 @@ def find_facturas_by_concepto_hash(
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
 
-    return query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    return query.order_by(desc(Factura.fecha_emision), desc(Factura.id)).limit(limit).all()
 
 
 # -----------------------------------------------------
@@ -1268,4 +1227,4 @@ def find_facturas_by_concepto_proveedor(
         )
     )
 
-    return query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    return query.order_by(desc(Factura.fecha_emision), desc(Factura.id)).limit(limit).all()
@@ -2,6 +2,10 @@ from fastapi import FastAPI
 from app.api.v1 import api_router
 from app.core.config import settings
 from app.core.lifespan import lifespan
+from app.core.cache_http import instalar_cache_http
+from app.core.instrumentacion_sql import instalar_instrumentacion_sql
+from app.core.respuestas_http import JSONRapidoResponse, instalar_compresion
+from app.db.session import engine
 from app.utils.cors import setup_cors
 
 
@@ -19,6 +23,7 @@ def create_app() -> FastAPI:
         version="1.0.0",
         description="Backend empresarial para gestión de facturas y proveedores",
         lifespan=lifespan,  # Startup/shutdown moderno
+        default_response_class=JSONRapidoResponse,
         contact={
             "name": "Equipo Backend",
             "email": "soporte@empresa.com",  # TODO: Parametrizar o actualizar según entorno
@@ -31,6 +36,15 @@ def create_app() -> FastAPI:
     # --- Configuración CORS ---
     setup_cors(app)
 
+    # --- Instrumentación SQL por request (métricas y detección N+1) ---
+    instalar_instrumentacion_sql(app, engine)
+
+    # --- Caché HTTP con ETag para endpoints de lectura frecuente ---
+    instalar_cache_http(app, engine)
+
+    # --- Compresión brotli/gzip (fuera de la caché: se cachea el cuerpo sin comprimir) ---
+    instalar_compresion(app)
+
     # --- Rutas centralizadas ---
     app.include_router(api_router)
 
@@ -16,6 +16,10 @@ from .workflow_aprobacion import (
 from .patrones_facturas import PatronesFacturas, TipoPatron
 from .email_config import CuentaCorreo, NitConfiguracion, HistorialExtraccion
 from .grupo import Grupo, ResponsableGrupo
+from .estado_tarea import EstadoTareaProgramada, LeaseTareaProgramada
+from .busqueda import BusquedaDocumento, BusquedaTermino, BusquedaTrigrama, BusquedaPosting
+from .registro_ingesta import RegistroIngestaFactura
+from .version_cache import VersionCache
 
 # IMPORTANTE: Importar listeners para que se registren automáticamente
 from . import factura_listeners  # noqa: F401
@@ -38,5 +42,13 @@ __all__ = [
     "HistorialExtraccion",
     "Grupo",
     "ResponsableGrupo",
+    "EstadoTareaProgramada",
+    "LeaseTareaProgramada",
+    "BusquedaDocumento",
+    "BusquedaTermino",
+    "BusquedaTrigrama",
+    "BusquedaPosting",
+    "RegistroIngestaFactura",
+    "VersionCache",
     "Base",
 ]
@@ -0,0 +1,66 @@
+# app/models/busqueda.py
+"""
+Índice de búsqueda embebido (términos + trigramas) sobre proveedores y facturas.
+
+- BusquedaDocumento: una fila por entidad indexada (proveedor o factura) con
+  los datos necesarios para filtrar por grupo y mostrar el resultado sin
+  volver a leer la entidad.
+- BusquedaTermino: vocabulario normalizado (minúsculas, sin tildes) con su
+  frecuencia de documento (para el idf del ranking).
+- BusquedaTrigrama: trigramas de cada término alfabético; permiten encontrar
+  términos parecidos cuando la palabra buscada tiene errores de digitación.
+- BusquedaPosting: término → documento con el peso del término en el documento.
+
+Lo mantiene app/services/busqueda.py (IndiceBusquedaService) de forma
+incremental a partir de la marca de agua de facturas.actualizado_en.
+"""
+from sqlalchemy import Column, BigInteger, String, Integer, SmallInteger, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class BusquedaDocumento(Base):
+    __tablename__ = "busqueda_documentos"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    tipo = Column(String(20), nullable=False, comment="proveedor | factura")
+    entidad_id = Column(BigInteger, nullable=False, comment="ID en proveedores / facturas")
+    grupo_id = Column(BigInteger, nullable=True, comment="Grupo de la factura (NULL en proveedores: catálogo global)")
+    proveedor_id = Column(BigInteger, nullable=True)
+    titulo = Column(String(255), nullable=True, comment="Número de factura o razón social")
+    subtitulo = Column(String(255), nullable=True, comment="Razón social del proveedor o NIT")
+    huella = Column(String(32), nullable=False, comment="MD5 del contenido indexado (omite reindexar sin cambios)")
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('tipo', 'entidad_id', name='uq_busqueda_documento_entidad'),
+        Index('idx_busqueda_documento_grupo', 'grupo_id'),
+    )
+
+
+class BusquedaTermino(Base):
+    __tablename__ = "busqueda_terminos"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    termino = Column(String(64), nullable=False, unique=True, comment="Término normalizado (minúsculas, sin tildes)")
+    documentos = Column(Integer, nullable=False, default=0, server_default='0',
+                        comment="Frecuencia de documento (para idf)")
+
+
+class BusquedaTrigrama(Base):
+    __tablename__ = "busqueda_trigramas"
+
+    trigrama = Column(String(3), primary_key=True)
+    termino_id = Column(BigInteger, ForeignKey("busqueda_terminos.id", ondelete="CASCADE"), primary_key=True)
+
+
+class BusquedaPosting(Base):
+    __tablename__ = "busqueda_postings"
+
+    termino_id = Column(BigInteger, ForeignKey("busqueda_terminos.id", ondelete="CASCADE"), primary_key=True)
+    documento_id = Column(BigInteger, ForeignKey("busqueda_documentos.id", ondelete="CASCADE"), primary_key=True)
+    peso = Column(SmallInteger, nullable=False, default=1, comment="Peso del término en el documento (campo × frecuencia)")
+
+    __table_args__ = (
+        Index('idx_busqueda_posting_documento', 'documento_id'),
+    )
@@ -0,0 +1,47 @@
+# app/models/estado_tarea.py
+"""
+Estado persistente de tareas programadas incrementales.
+
+Cada tarea (identificada por `nombre`) guarda su marca de agua: hasta qué
+`actualizado_en` de la tabla fuente ya procesó, y cuándo hizo su última
+reconciliación completa.
+
+`LeaseTareaProgramada` es el lock distribuido de los schedulers en proceso:
+con varios workers (uvicorn/gunicorn) o varias instancias del extractor,
+solo quien reclama el lease de un trabajo para una ejecución programada
+(`ultimo_slot`) la ejecuta.
+"""
+from sqlalchemy import Column, String, DateTime, JSON, Float
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class EstadoTareaProgramada(Base):
+    __tablename__ = "estado_tareas_programadas"
+
+    nombre = Column(String(100), primary_key=True, comment="Identificador de la tarea (p.ej. 'analisis_patrones')")
+    marca_agua = Column(DateTime(timezone=True), nullable=True,
+                        comment="Máximo actualizado_en ya procesado de la tabla fuente")
+    ultima_reconciliacion = Column(DateTime(timezone=True), nullable=True,
+                                   comment="Última regeneración completa (reconciliación)")
+    detalle = Column(JSON, nullable=True, comment="Resumen de la última ejecución")
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class LeaseTareaProgramada(Base):
+    __tablename__ = "leases_tareas_programadas"
+
+    nombre = Column(String(100), primary_key=True, comment="Identificador del trabajo programado")
+    origen = Column(String(50), nullable=True, comment="Proceso que lo programa: afe-backend | invoice_extractor")
+    titular = Column(String(150), nullable=True, comment="host:pid:token del último worker que reclamó el lease")
+    lease_expira_en = Column(DateTime(timezone=True), nullable=True,
+                             comment="Vencimiento del lease (UTC); NULL = libre")
+    ultimo_slot = Column(DateTime(timezone=True), nullable=True,
+                         comment="Última ejecución programada reclamada (UTC, sin jitter)")
+    ultimo_inicio = Column(DateTime(timezone=True), nullable=True)
+    ultimo_fin = Column(DateTime(timezone=True), nullable=True)
+    ultima_duracion_seg = Column(Float, nullable=True)
+    ultimo_estado = Column(String(20), nullable=True, comment="en_ejecucion | exitoso | error")
+    ultimo_error = Column(String(500), nullable=True)
+    proxima_ejecucion = Column(DateTime(timezone=True), nullable=True, comment="Próximo slot programado (UTC)")
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
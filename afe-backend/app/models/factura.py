@@ -78,6 +78,11 @@ class Factura(Base):
         comment="Grupo empresarial al que pertenece la factura"
     )
 
+    # Motivo de cuarentena (tipo_error), fijado al entrar en cuarentena.
+    # El resumen de cuarentena agrupa por esta columna (índice estado/motivo/grupo)
+    motivo_cuarentena = Column(String(50), nullable=True,
+                               comment="Tipo de problema de cuarentena (p.ej. GRUPO_SIN_RESPONSABLES)")
+
     # ACCION_POR: Single source of truth for "who changed the status"
     # Automatically synchronized from workflow_aprobacion_facturas.aprobada_por/rechazada_por
     # This is the ONLY place this information should be read from in the dashboard
@@ -130,6 +130,27 @@ class PatronesFacturas(Base):
         comment="CV = (desv_std / promedio) * 100, métrica de estabilidad"
     )
 
+    # ============================================================================
+    # AGREGADOS ACUMULADOS (mantenimiento incremental)
+    # ============================================================================
+    suma_montos = Column(
+        Numeric(20, 2),
+        nullable=True,
+        comment="Suma de montos de las facturas del patrón (NULL = sin agregados)"
+    )
+
+    suma_cuadrados_montos = Column(
+        Numeric(40, 4),
+        nullable=True,
+        comment="Suma de cuadrados de montos (varianza incremental exacta)"
+    )
+
+    primer_pago_fecha = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Fecha de la primera factura dentro de la ventana"
+    )
+
     # ============================================================================
     # RANGO ESPERADO (Para TIPO_B)
     # ============================================================================
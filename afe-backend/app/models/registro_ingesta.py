@@ -0,0 +1,20 @@
+# app/models/registro_ingesta.py
+"""
+Registro de ingesta de invoice_extractor (detección de cambios).
+
+Una fila por CUFE con la huella (MD5) del JSON consolidado que se ingirió
+por última vez. La ingesta consulta las huellas por lote y solo escribe en
+facturas / factura_items las facturas nuevas o con contenido distinto.
+La escribe invoice_extractor en la misma transacción que la factura.
+"""
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class RegistroIngestaFactura(Base):
+    __tablename__ = "registro_ingesta_facturas"
+
+    cufe = Column(String(100), primary_key=True, comment="CUFE de la factura ingerida")
+    huella = Column(String(32), nullable=False, comment="MD5 del JSON consolidado ingerido")
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,21 @@
+# app/models/version_cache.py
+"""
+Versión de los datos para la caché HTTP (app/core/cache_http.py).
+
+Con HTTP_CACHE_BACKEND=bd todos los workers comparten la versión: quien
+confirma una escritura en facturas/workflows/grupos incrementa la fila
+'datos' y los demás descartan sus respuestas cacheadas en el siguiente
+request.
+"""
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class VersionCache(Base):
+    __tablename__ = "versiones_cache"
+
+    nombre = Column(String(50), primary_key=True, comment="Conjunto de datos versionado (p.ej. 'datos')")
+    version = Column(BigInteger, nullable=False, default=0, server_default="0",
+                     comment="Se incrementa en cada commit que escribe en las tablas versionadas")
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -191,3 +191,93 @@ class FacturaRead(FacturaBase):
                 self.fecha_accion = self.fecha_rechazo_workflow
 
         return self
+
+
+# =====================================================
+# SERIALIZACIÓN DIRECTA (listados grandes)
+# =====================================================
+# Produce el mismo JSON que FacturaRead.model_validate(f).model_dump(mode="json")
+# sin validar cada objeto: los listados (/facturas/cursor, /facturas/all)
+# vienen de consultas propias con relaciones ya cargadas, así que la
+# validación por objeto solo cuesta tiempo. Si se agrega un campo a
+# FacturaRead hay que agregarlo aquí (tests/test_serializacion_rapida.py
+# compara ambos caminos campo a campo).
+
+def _fecha_json(valor):
+    if valor is None:
+        return None
+    texto = valor.isoformat()
+    # Pydantic serializa UTC como "Z"
+    return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+
+
+def _decimal_json(valor):
+    return None if valor is None else str(valor)
+
+
+def _simple_json(objeto, campos):
+    return None if objeto is None else {campo: getattr(objeto, campo) for campo in campos}
+
+
+def serializar_factura_read(factura) -> Dict[str, Any]:
+    """Factura (ORM con proveedor, usuario y workflow_history cargados) → dict JSON de FacturaRead."""
+    aprobado_por = fecha_aprobacion = rechazado_por = fecha_rechazo = motivo_rechazo = tipo_aprobacion = None
+    # Un solo recorrido del historial: primer valor no vacío de cada campo,
+    # igual que las propiedades *_workflow del modelo
+    for wf in factura.workflow_history or ():
+        aprobado_por = aprobado_por or wf.aprobada_por
+        fecha_aprobacion = fecha_aprobacion or wf.fecha_aprobacion
+        rechazado_por = rechazado_por or wf.rechazada_por
+        fecha_rechazo = fecha_rechazo or wf.fecha_rechazo
+        motivo_rechazo = motivo_rechazo or wf.detalle_rechazo
+        if tipo_aprobacion is None and wf.tipo_aprobacion:
+            tipo_aprobacion = wf.tipo_aprobacion.value
+
+    proveedor = factura.proveedor
+    usuario = _simple_json(factura.usuario, ("id", "nombre", "usuario"))
+
+    fecha_accion = None
+    accion_por = factura.accion_por
+    if accion_por:
+        if accion_por == "Sistema Automático" or aprobado_por == accion_por:
+            fecha_accion = fecha_aprobacion
+        elif rechazado_por == accion_por:
+            fecha_accion = fecha_rechazo
+
+    estado = factura.estado
+    return {
+        "numero_factura": factura.numero_factura,
+        "fecha_emision": _fecha_json(factura.fecha_emision),
+        "proveedor_id": factura.proveedor_id,
+        "subtotal": _decimal_json(factura.subtotal),
+        "iva": _decimal_json(factura.iva),
+        "total": None,
+        "fecha_vencimiento": _fecha_json(factura.fecha_vencimiento),
+        "cufe": factura.cufe,
+        "total_a_pagar": _decimal_json(factura.total_a_pagar),
+        "grupo_id": factura.grupo_id,
+        "id": factura.id,
+        "estado": getattr(estado, "value", estado),
+        "responsable_id": factura.responsable_id,
+        "creado_en": _fecha_json(factura.creado_en),
+        "actualizado_en": _fecha_json(factura.actualizado_en),
+        "proveedor": _simple_json(proveedor, ("id", "nit", "razon_social")),
+        "responsable": usuario,
+        "usuario": usuario,
+        "nit_emisor": proveedor.nit if proveedor else None,
+        "nombre_emisor": proveedor.razon_social if proveedor else None,
+        "monto_total": _decimal_json(factura.total_a_pagar),
+        "confianza_automatica": _decimal_json(factura.confianza_automatica),
+        "factura_referencia_id": factura.factura_referencia_id,
+        "motivo_decision": factura.motivo_decision,
+        "fecha_procesamiento_auto": _fecha_json(factura.fecha_procesamiento_auto),
+        "aprobado_por_workflow": aprobado_por,
+        "fecha_aprobacion_workflow": _fecha_json(fecha_aprobacion),
+        "rechazado_por_workflow": rechazado_por,
+        "fecha_rechazo_workflow": _fecha_json(fecha_rechazo),
+        "motivo_rechazo_workflow": motivo_rechazo,
+        "tipo_aprobacion_workflow": tipo_aprobacion,
+        "nombre_responsable": usuario["nombre"] if usuario else None,
+        "accion_por": accion_por,
+        "fecha_accion": _fecha_json(fecha_accion),
+    }
@@ -5,6 +5,10 @@ Funciones:
 1. Agregar particiones para años futuros automáticamente
 2. Verificar particiones existentes
 3. Eliminar particiones de años antiguos (opcional)
+4. Mantenimiento completo (crear futuras + archivar antiguas), el mismo que
+   ejecuta el scheduler a diario con PARTICIONES_MANTENIMIENTO_ENABLED=true
+
+La lógica vive en app/services/particiones_facturas.py.
 
 Uso:
     # Verificar particiones actuales
@@ -18,13 +22,18 @@ Uso:
 
     # Eliminar partición antigua (CUIDADO: elimina datos)
     python -m app.scripts.manage_partitions --drop-year 2020
+
+    # Mantenimiento según configuración (--simular muestra el plan sin aplicarlo)
+    python -m app.scripts.manage_partitions --mantener --simular
+    python -m app.scripts.manage_partitions --mantener --granularidad mensual --retencion-meses 36
 """
 
 import argparse
-from datetime import datetime
+from datetime import date, datetime
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.services.particiones_facturas import GestorParticionesFacturas
 
 
 def get_db():
@@ -40,30 +49,18 @@ def check_partitions(db, engine):
     print("PARTICIONES ACTUALES - TABLA FACTURAS")
     print("="*90)
 
-    result = engine.connect().execute(text("""
-        SELECT
-            PARTITION_NAME,
-            PARTITION_DESCRIPTION,
-            TABLE_ROWS,
-            PARTITION_COMMENT
-        FROM INFORMATION_SCHEMA.PARTITIONS
-        WHERE TABLE_NAME = 'facturas'
-        AND TABLE_SCHEMA = DATABASE()
-        ORDER BY PARTITION_ORDINAL_POSITION
-    """))
+    particiones = GestorParticionesFacturas(db).particiones()
+    if not particiones:
+        print("La tabla facturas no está particionada.")
 
     print(f"{'Partición':<15} {'Rango (<)':<15} {'Filas':<15} {'Comentario':<40}")
     print("-"*90)
 
     total_rows = 0
-    for row in result:
-        partition_name = row[0]
-        partition_desc = row[1] or 'N/A'
-        table_rows = row[2] or 0
-        comment = row[3] or ''
-
-        print(f"{partition_name:<15} {partition_desc:<15} {table_rows:<15} {comment:<40}")
-        total_rows += table_rows
+    for particion in particiones:
+        limite = particion.limite.isoformat() if particion.limite else 'MAXVALUE'
+        print(f"{particion.nombre:<15} {limite:<15} {particion.filas:<15} {particion.comentario:<40}")
+        total_rows += particion.filas
 
     print("-"*90)
     print(f"{'TOTAL':<15} {'':<15} {total_rows:<15}")
@@ -80,26 +77,17 @@ def add_partition_for_year(db, engine, year):
     print(f"\nAgregando partición para año {year}...")
 
     try:
-        # Reorganizar partición p_future para incluir el nuevo año
-        engine.connect().execute(text(f"""
-            ALTER TABLE facturas
-            REORGANIZE PARTITION p_future INTO (
-                PARTITION p{year} VALUES LESS THAN ({year + 1})
-                    COMMENT = 'Facturas del año {year}',
-                PARTITION p_future VALUES LESS THAN MAXVALUE
-                    COMMENT = 'Facturas de años futuros ({year + 1}+)'
-            )
-        """))
+        GestorParticionesFacturas(db).crear([(f"p{year}", date(year, 1, 1), date(year + 1, 1, 1))])
 
         print(f"Partición p{year} creada exitosamente!")
-        print(f"Rango: Facturas con año_factura < {year + 1}")
+        print(f"Rango: Facturas con fecha_emision < {year + 1}-01-01")
 
     except Exception as e:
         print(f"Error al crear partición: {str(e)}")
         print("\nNOTA: Verifica que:")
         print(f"  1. No exista ya una partición para {year}")
         print(f"  2. El año {year} sea mayor que las particiones actuales")
-        print(f"  3. La partición p_future existe")
+        print(f"  3. La tabla facturas esté particionada por RANGE")
 
 
 def add_next_year_partition(db, engine):
@@ -109,6 +97,24 @@ def add_next_year_partition(db, engine):
     add_partition_for_year(db, engine, next_year)
 
 
+def run_maintenance(db, granularidad, periodos_adelante, retencion_meses, simular):
+    """Crea períodos futuros y archiva los anteriores a la retención."""
+    resultado = GestorParticionesFacturas(db).mantener(
+        granularidad=granularidad,
+        periodos_adelante=periodos_adelante,
+        retencion_meses=retencion_meses,
+        simular=simular
+    )
+    if not resultado["particionada"]:
+        print("\nLa tabla facturas no está particionada: nada que mantener.")
+        return
+    prefijo = "[SIMULACIÓN] " if simular else ""
+    print(f"\n{prefijo}Particiones a crear: {', '.join(resultado['creadas']) or 'ninguna'}")
+    print(f"{prefijo}Particiones a archivar: {', '.join(resultado['archivadas']) or 'ninguna'}")
+    for tabla in resultado.get("tablas_archivo", []):
+        print(f"  Archivada en {tabla} (ROW_FORMAT=COMPRESSED)")
+
+
 def drop_partition(db, engine, year):
     """
     Elimina una partición y TODOS sus datos.
@@ -171,10 +177,43 @@ def main():
         help='ELIMINAR partición de año específico (DESTRUCTIVO)'
     )
 
+    parser.add_argument(
+        '--mantener',
+        action='store_true',
+        help='Crear períodos futuros y archivar los antiguos'
+    )
+
+    parser.add_argument(
+        '--granularidad',
+        choices=['anual', 'mensual'],
+        default=settings.particiones_granularidad,
+        help='Granularidad de las particiones nuevas (con --mantener)'
+    )
+
+    parser.add_argument(
+        '--periodos-adelante',
+        type=int,
+        default=settings.particiones_periodos_adelante,
+        help='Períodos futuros a crear además del actual (con --mantener)'
+    )
+
+    parser.add_argument(
+        '--retencion-meses',
+        type=int,
+        default=settings.particiones_retencion_meses,
+        help='Archivar particiones anteriores a N meses (0 = no archivar)'
+    )
+
+    parser.add_argument(
+        '--simular',
+        action='store_true',
+        help='Mostrar el plan de --mantener sin aplicarlo'
+    )
+
     args = parser.parse_args()
 
     # Si no se pasa ningún argumento, mostrar ayuda
-    if not any(vars(args).values()):
+    if not any([args.check, args.add_next, args.add_year, args.drop_year, args.mantener]):
         parser.print_help()
         return
 
@@ -192,6 +231,10 @@ def main():
             add_partition_for_year(db, engine, args.add_year)
             check_partitions(db, engine)
 
+        if args.mantener:
+            run_maintenance(db, args.granularidad, args.periodos_adelante, args.retencion_meses, args.simular)
+            check_partitions(db, engine)
+
         if args.drop_year:
             drop_partition(db, engine, args.drop_year)
             check_partitions(db, engine)
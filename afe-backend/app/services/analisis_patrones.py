@@ -271,6 +271,9 @@ class AnalizadorPatrones:
             historial_existente.rango_superior = stats["rango_superior"]
             historial_existente.puede_aprobar_auto = puede_aprobar
             historial_existente.pagos_detalle = pagos_detalle
+            # pagos_detalle truncado: invalida los agregados del modo incremental
+            historial_existente.suma_montos = None
+            historial_existente.suma_cuadrados_montos = None
             historial_existente.ultimo_pago_fecha = ultimo.fecha_emision if ultimo else None
             historial_existente.ultimo_pago_monto = ultimo.total if ultimo else None
             historial_existente.fecha_analisis = datetime.now()
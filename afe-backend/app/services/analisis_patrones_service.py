@@ -3,22 +3,35 @@ Servicio de análisis continuo de patrones de facturas.
 
 Analiza facturas de BD, agrupa por proveedor + concepto normalizado,
 calcula estadísticas y clasifica en TIPO_A, TIPO_B, TIPO_C.
+
+Dos modos de mantenimiento:
+- Completo (analizar_patrones_desde_bd): recalcula todos los patrones de la
+  ventana. Se usa como reconciliación periódica.
+- Incremental (actualizar_patrones_incremental): solo procesa las facturas
+  aprobadas desde la última marca de agua y actualiza los agregados
+  acumulados (cantidad, suma, suma de cuadrados, fechas) de cada patrón.
 """
 
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from decimal import Decimal
+from typing import List, Dict, Any, Optional, Set, Tuple
+from decimal import ROUND_HALF_UP, Decimal, localcontext
 from collections import defaultdict
-import statistics
 
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy.orm import Session, lazyload
 from sqlalchemy import and_, or_, func
 
+from app.models.estado_tarea import EstadoTareaProgramada
 from app.models.factura import Factura, EstadoFactura
 from app.models.patrones_facturas import PatronesFacturas, TipoPatron
 from app.models.proveedor import Proveedor
+from app.services.automation.estadisticas_recurrencia import (
+    clasificar_por_rangos,
+    intervalos_por_grupo,
+    periodos_distintos_por_grupo,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -35,6 +48,24 @@ class AnalizadorPatronesService:
     MIN_FACTURAS_PATRON = 3
     MIN_MESES_DIFERENTES = 2
 
+    # Frecuencia según el promedio de días entre facturas (primer rango que aplica)
+    RANGOS_FRECUENCIA = [
+        (float('-inf'), 10, "semanal"),
+        (float('-inf'), 20, "quincenal"),
+        (float('-inf'), 35, "mensual"),
+        (float('-inf'), 65, "bimestral"),
+        (float('-inf'), 100, "trimestral"),
+        (float('-inf'), 200, "semestral"),
+    ]
+
+    # Mantenimiento incremental
+    NOMBRE_TAREA = "analisis_patrones"
+    DIAS_RECONCILIACION = 7
+    # Solape al leer desde la marca de agua (transacciones confirmadas tarde);
+    # las facturas repetidas se descartan por factura_id en pagos_detalle
+    MARGEN_MARCA_AGUA = timedelta(minutes=10)
+    TAMANO_BLOQUE = 500
+
     def __init__(self, db: Session):
         self.db = db
         self.stats = {
@@ -63,6 +94,10 @@ class AnalizadorPatronesService:
             if estados_facturas is None:
                 estados_facturas = [EstadoFactura.aprobada, EstadoFactura.aprobada_auto]
 
+            # Marca de agua tomada ANTES de leer: lo que cambie durante el
+            # análisis se procesa en la siguiente ejecución incremental
+            marca_agua = self.db.query(func.max(Factura.actualizado_en)).scalar()
+
             facturas = self._obtener_facturas_para_analisis(
                 fecha_desde=fecha_desde,
                 solo_proveedores=solo_proveedores,
@@ -91,6 +126,10 @@ class AnalizadorPatronesService:
 
             cambios_detectados = self._detectar_cambios_patrones(patrones_calculados)
 
+            # Solo un análisis completo (sin filtro de proveedores) reconcilia
+            if not solo_proveedores:
+                self._registrar_estado_tarea(marca_agua, reconciliacion=True)
+
             return self._generar_resultado(
                 exito=True,
                 mensaje="Análisis completado exitosamente",
@@ -104,41 +143,290 @@ class AnalizadorPatronesService:
                 mensaje=f"Error: {str(e)}"
             )
 
+    def actualizar_patrones_incremental(
+        self,
+        ventana_meses: int = 12,
+        estados_facturas: Optional[List[EstadoFactura]] = None,
+        dias_reconciliacion: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Actualiza patrones solo con las facturas aprobadas desde la última marca de agua.
+
+        - Patrones con agregados: se suman las facturas nuevas (y se descuentan
+          las que salieron de la ventana) sin releer el historial.
+        - Grupos sin patrón o sin agregados: se recalculan a partir del
+          historial de sus proveedores (solo esos proveedores).
+        - Sin marca de agua, o si la última reconciliación tiene más de
+          `dias_reconciliacion` días: análisis completo (reconciliación).
+        """
+        if dias_reconciliacion is None:
+            dias_reconciliacion = self.DIAS_RECONCILIACION
+        if estados_facturas is None:
+            estados_facturas = [EstadoFactura.aprobada, EstadoFactura.aprobada_auto]
+
+        estado = self._obtener_estado_tarea()
+        if self._requiere_reconciliacion(estado, dias_reconciliacion):
+            logger.info("Análisis de patrones: reconciliación completa")
+            resultado = self.analizar_patrones_desde_bd(
+                ventana_meses=ventana_meses,
+                estados_facturas=estados_facturas,
+                forzar_recalculo=True
+            )
+            resultado['modo'] = 'reconciliacion'
+            return resultado
+
+        logger.info(f"Análisis incremental de patrones desde marca de agua {estado.marca_agua}")
+
+        try:
+            fecha_desde = datetime.now() - timedelta(days=ventana_meses * 30)
+            marca_agua = self.db.query(func.max(Factura.actualizado_en)).scalar()
+
+            facturas_nuevas = self._consulta_facturas_analisis(fecha_desde, estados_facturas).filter(
+                Factura.actualizado_en >= estado.marca_agua - self.MARGEN_MARCA_AGUA
+            ).all()
+            self.stats['facturas_analizadas'] = len(facturas_nuevas)
+            logger.info(f"     {len(facturas_nuevas)} facturas aprobadas desde la última ejecución")
+
+            grupos = defaultdict(list)
+            for factura in facturas_nuevas:
+                grupos[self._clave_patron(factura)].append(factura)
+
+            claves = {
+                key: (int(key.split('|', 1)[0]), hashlib.md5(key.split('|', 1)[1].encode('utf-8')).hexdigest())
+                for key in grupos
+            }
+            existentes = self._cargar_patrones_existentes(set(claves.values()))
+
+            grupos_a_recalcular = set()
+            patrones_incrementados = []
+            for key, facturas_grupo in grupos.items():
+                patron_existente = existentes.get(claves[key])
+                if patron_existente is None or patron_existente.suma_montos is None:
+                    grupos_a_recalcular.add(key)
+                    continue
+
+                try:
+                    patron = self._aplicar_incremento(
+                        patron_existente, key, facturas_grupo, fecha_desde, ventana_meses
+                    )
+                    if patron:
+                        patrones_incrementados.append(patron)
+                except Exception as e:
+                    logger.error(f"Error actualizando patrón {key}: {str(e)}")
+                    self.stats['errores'] += 1
+
+            self.db.commit()
+
+            patrones_recalculados = []
+            if grupos_a_recalcular:
+                patrones_recalculados = self._recalcular_grupos(
+                    grupos_a_recalcular, fecha_desde, estados_facturas, ventana_meses
+                )
+
+            self._registrar_estado_tarea(marca_agua or estado.marca_agua, reconciliacion=False)
+
+            logger.info(
+                "Patrones incrementales: %d actualizados, %d grupos recalculados, %d nuevos",
+                len(patrones_incrementados),
+                len(grupos_a_recalcular),
+                self.stats['patrones_nuevos']
+            )
+
+            resultado = self._generar_resultado(
+                exito=True,
+                mensaje="Análisis incremental completado",
+                cambios_detectados=self._detectar_cambios_patrones(
+                    patrones_incrementados + patrones_recalculados
+                )
+            )
+            resultado['modo'] = 'incremental'
+            return resultado
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error en análisis incremental de patrones: {str(e)}")
+            return self._generar_resultado(exito=False, mensaje=f"Error: {str(e)}")
+
+    def _aplicar_incremento(
+        self,
+        patron_existente: PatronesFacturas,
+        key: str,
+        facturas_nuevas: List[Any],
+        fecha_desde: datetime,
+        ventana_meses: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Suma facturas nuevas a los agregados de un patrón y recalcula sus estadísticas.
+
+        pagos_detalle evita contar dos veces una factura y permite descontar
+        las que salieron de la ventana. Retorna el patrón recalculado, o None
+        si no hubo cambios o si el grupo ya no cumple los mínimos (en ese caso
+        solo se actualizan los agregados, igual que el análisis completo deja
+        intacto un patrón que deja de calificar).
+        """
+        detalle = list(patron_existente.pagos_detalle or [])
+        ids_existentes = {d["factura_id"] for d in detalle}
+        nuevas = [f for f in facturas_nuevas if f.id not in ids_existentes]
+
+        limite = fecha_desde.date().isoformat()
+        vencidas = [d for d in detalle if d["fecha"] < limite]
+
+        if not nuevas and not vencidas:
+            return None
+
+        with localcontext() as ctx:
+            ctx.prec = 60
+            suma = Decimal(patron_existente.suma_montos)
+            suma_cuadrados = Decimal(patron_existente.suma_cuadrados_montos or 0)
+
+            for f in nuevas:
+                suma += f.total_a_pagar
+                suma_cuadrados += f.total_a_pagar * f.total_a_pagar
+            for d in vencidas:
+                monto = Decimal(str(d["monto"]))
+                suma -= monto
+                suma_cuadrados -= monto * monto
+
+        detalle = [d for d in detalle if d["fecha"] >= limite] + self._detalle_pagos(nuevas)
+        detalle.sort(key=lambda d: (d["fecha"], -d["factura_id"]), reverse=True)
+
+        agregados = {
+            'suma_montos': suma,
+            'suma_cuadrados_montos': suma_cuadrados,
+            'primer_pago_fecha': datetime.fromisoformat(detalle[-1]["fecha"]).date() if detalle else None,
+            'pagos_detalle': detalle
+        }
+
+        n = len(detalle)
+        meses_con_pagos = len({d["periodo"] for d in detalle})
+        if n < self.MIN_FACTURAS_PATRON or meses_con_pagos < self.MIN_MESES_DIFERENTES:
+            self._actualizar_agregados(patron_existente, agregados)
+            return None
+
+        promedio, desviacion, cv = self._estadisticas_montos(suma, suma_cuadrados, n)
+
+        montos = [Decimal(str(d["monto"])) for d in detalle]
+        ultimo = detalle[0]
+        proveedor_id, concepto_normalizado = key.split('|', 1)
+
+        patron = self._completar_patron({
+            'proveedor_id': int(proveedor_id),
+            'concepto_normalizado': concepto_normalizado,
+            'pagos_analizados': n,
+            'meses_con_pagos': meses_con_pagos,
+            'monto_promedio': promedio,
+            'monto_minimo': min(montos),
+            'monto_maximo': max(montos),
+            'desviacion_estandar': desviacion,
+            'coeficiente_variacion': cv,
+            'frecuencia_detectada': self._detectar_frecuencia_temporal(
+                [datetime.fromisoformat(d["fecha"]).date() for d in detalle]
+            ),
+            'ultimo_pago_fecha': datetime.fromisoformat(ultimo["fecha"]).date(),
+            'ultimo_pago_monto': Decimal(str(ultimo["monto"])),
+            'facturas_ids': [d["factura_id"] for d in detalle],
+            'ventana_meses': ventana_meses,
+            **agregados
+        })
+
+        self._registrar_actualizacion(patron_existente, patron)
+        self.stats['patrones_detectados'] += 1
+        return patron
+
+    def _recalcular_grupos(
+        self,
+        claves: Set[str],
+        fecha_desde: datetime,
+        estados: List[EstadoFactura],
+        ventana_meses: int
+    ) -> List[Dict[str, Any]]:
+        """Recalcula desde el historial solo los grupos indicados (sin agregados previos)."""
+        proveedor_ids = sorted({int(key.split('|', 1)[0]) for key in claves})
+
+        grupos: Dict[str, List[Any]] = {}
+        for inicio in range(0, len(proveedor_ids), self.TAMANO_BLOQUE):
+            bloque = proveedor_ids[inicio:inicio + self.TAMANO_BLOQUE]
+            facturas = self._obtener_facturas_para_analisis(fecha_desde, bloque, estados)
+            for key, facturas_grupo in self._agrupar_facturas_por_patron(facturas).items():
+                if key in claves:
+                    grupos[key] = facturas_grupo
+
+        patrones = self._calcular_estadisticas_grupos(grupos, ventana_meses)
+        self._persistir_patrones(patrones, forzar_recalculo=True)
+        return patrones
+
+    # ------------------------------------------------------------------
+    # Estado de la tarea (marca de agua / reconciliación)
+    # ------------------------------------------------------------------
+
+    def _obtener_estado_tarea(self) -> EstadoTareaProgramada:
+        estado = self.db.get(EstadoTareaProgramada, self.NOMBRE_TAREA)
+        if estado is None:
+            estado = EstadoTareaProgramada(nombre=self.NOMBRE_TAREA)
+        return estado
+
+    def _requiere_reconciliacion(self, estado: EstadoTareaProgramada, dias_reconciliacion: int) -> bool:
+        if estado.marca_agua is None or estado.ultima_reconciliacion is None:
+            return True
+        ultima = estado.ultima_reconciliacion.replace(tzinfo=None)
+        return datetime.utcnow() - ultima >= timedelta(days=dias_reconciliacion)
+
+    def _registrar_estado_tarea(self, marca_agua: Optional[datetime], reconciliacion: bool) -> None:
+        """Guarda la marca de agua (y la fecha de reconciliación si aplica)."""
+        try:
+            estado = self.db.merge(self._obtener_estado_tarea())
+            if marca_agua is not None:
+                estado.marca_agua = marca_agua
+            if reconciliacion:
+                estado.ultima_reconciliacion = datetime.utcnow()
+            estado.detalle = {k: v for k, v in self.stats.items()}
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error registrando marca de agua de patrones: {str(e)}")
+
     def _obtener_facturas_para_analisis(
         self,
         fecha_desde: datetime,
         solo_proveedores: Optional[List[int]],
         estados: List[EstadoFactura]
-    ) -> List[Factura]:
+    ) -> List[Any]:
         """Obtiene facturas de BD que cumplen criterios para análisis."""
-        query = self.db.query(Factura).filter(
+        query = self._consulta_facturas_analisis(fecha_desde, estados)
+
+        if solo_proveedores:
+            query = query.filter(Factura.proveedor_id.in_(solo_proveedores))
+
+        return query.all()
+
+    def _consulta_facturas_analisis(self, fecha_desde: datetime, estados: List[EstadoFactura]):
+        """
+        Consulta base de facturas analizables.
+
+        Solo carga las columnas que usa el análisis (no entidades completas con
+        sus relaciones). Orden determinista: fecha de emisión, luego id.
+        """
+        return self.db.query(
+            Factura.id,
+            Factura.proveedor_id,
+            Factura.fecha_emision,
+            Factura.total_a_pagar,
+            Factura.concepto_normalizado,
+            Factura.concepto_principal
+        ).filter(
             Factura.fecha_emision >= fecha_desde.date(),
             Factura.estado.in_(estados),
             Factura.total_a_pagar.isnot(None),
             Factura.total_a_pagar > 0,
             Factura.proveedor_id.isnot(None)
-        )
-
-        if solo_proveedores:
-            query = query.filter(Factura.proveedor_id.in_(solo_proveedores))
-
-        facturas = query.order_by(Factura.fecha_emision.asc()).all()
-
-        return facturas
+        ).order_by(Factura.fecha_emision.asc(), Factura.id.asc())
 
     def _agrupar_facturas_por_patron(self, facturas: List[Factura]) -> Dict[str, List[Factura]]:
         """Agrupa facturas por proveedor + concepto normalizado."""
         grupos = defaultdict(list)
 
         for factura in facturas:
-            concepto_normalizado = self._obtener_concepto_normalizado(factura)
-
-            if not concepto_normalizado:
-                concepto_normalizado = "servicio_general"
-
-            # Generar clave única: proveedor_id|concepto_normalizado
-            key = f"{factura.proveedor_id}|{concepto_normalizado}"
-            grupos[key].append(factura)
+            grupos[self._clave_patron(factura)].append(factura)
 
         # Filtrar grupos que no cumplan mínimos
         grupos_validos = {
@@ -149,6 +437,15 @@ class AnalizadorPatronesService:
 
         return grupos_validos
 
+    def _clave_patron(self, factura: Factura) -> str:
+        """Clave única del patrón: proveedor_id|concepto_normalizado."""
+        concepto_normalizado = self._obtener_concepto_normalizado(factura)
+
+        if not concepto_normalizado:
+            concepto_normalizado = "servicio_general"
+
+        return f"{factura.proveedor_id}|{concepto_normalizado}"
+
     def _obtener_concepto_normalizado(self, factura: Factura) -> Optional[str]:
         """Obtiene o genera el concepto normalizado de una factura."""
         if factura.concepto_normalizado:
@@ -167,86 +464,99 @@ class AnalizadorPatronesService:
         grupos: Dict[str, List[Factura]],
         ventana_meses: int
     ) -> List[Dict[str, Any]]:
-        """Calcula estadísticas detalladas para cada grupo de facturas."""
-        patrones_calculados = []
+        """
+        Calcula estadísticas detalladas para cada grupo de facturas.
+
+        Meses distintos y frecuencia se calculan para todos los grupos a la vez
+        sobre arreglos columnares; promedio, desviación y CV en Decimal desde
+        las sumas exactas (_estadisticas_montos), como el modo incremental.
+        """
+        claves: List[str] = []
+        montos: List[List[Decimal]] = []
+        codigos_fechas, dias, periodos = [], [], []
 
         for key, facturas_grupo in grupos.items():
             try:
-                proveedor_id_str, concepto_normalizado = key.split('|', 1)
-                proveedor_id = int(proveedor_id_str)
+                montos_grupo = [f.total_a_pagar for f in facturas_grupo if f.total_a_pagar]
+                fechas_grupo = [f.fecha_emision for f in facturas_grupo]
+                dias_grupo = [fecha.toordinal() for fecha in fechas_grupo]
+                periodos_grupo = [fecha.year * 12 + fecha.month for fecha in fechas_grupo]
+            except Exception as e:
+                logger.error(f"Error calculando estadísticas para grupo {key}: {str(e)}")
+                self.stats['errores'] += 1
+                continue
 
-                montos = [float(f.total_a_pagar) for f in facturas_grupo if f.total_a_pagar]
-                fechas = [f.fecha_emision for f in facturas_grupo]
+            codigo = len(claves)
+            claves.append(key)
+            montos.append(montos_grupo)
+            codigos_fechas.extend([codigo] * len(dias_grupo))
+            dias.extend(dias_grupo)
+            periodos.extend(periodos_grupo)
 
-                if len(montos) < self.MIN_FACTURAS_PATRON:
-                    continue
+        num_grupos = len(claves)
+        if num_grupos == 0:
+            return []
 
-                meses_unicos = set((f.year, f.month) for f in fechas)
+        meses_distintos = periodos_distintos_por_grupo(
+            np.asarray(codigos_fechas, dtype=np.int64), np.asarray(periodos, dtype=np.int64), num_grupos
+        )
+        intervalos = intervalos_por_grupo(
+            np.asarray(codigos_fechas, dtype=np.int64), np.asarray(dias, dtype=np.int64), num_grupos
+        )
+        frecuencias = clasificar_por_rangos(intervalos.media, self.RANGOS_FRECUENCIA, "anual")
 
-                if len(meses_unicos) < self.MIN_MESES_DIFERENTES:
-                    continue
+        patrones_calculados = []
 
-                # Estadísticas básicas
-                monto_promedio = Decimal(str(statistics.mean(montos)))
-                monto_minimo = Decimal(str(min(montos)))
-                monto_maximo = Decimal(str(max(montos)))
-                desviacion_std = Decimal(str(statistics.stdev(montos))) if len(montos) > 1 else Decimal('0')
+        for codigo, key in enumerate(claves):
+            try:
+                facturas_grupo = grupos[key]
+                proveedor_id_str, concepto_normalizado = key.split('|', 1)
+                proveedor_id = int(proveedor_id_str)
 
-                # Coeficiente de variación (CV%)
-                cv = (desviacion_std / monto_promedio * 100) if monto_promedio > 0 else Decimal('0')
+                montos_grupo = montos[codigo]
+                if len(montos_grupo) < self.MIN_FACTURAS_PATRON:
+                    continue
 
-                # Clasificar tipo de patrón
-                if cv < self.UMBRAL_TIPO_A:
-                    tipo_patron = TipoPatron.TIPO_A
-                elif cv < self.UMBRAL_TIPO_B:
-                    tipo_patron = TipoPatron.TIPO_B
-                else:
-                    tipo_patron = TipoPatron.TIPO_C
+                meses_con_pagos = int(meses_distintos[codigo])
 
-                frecuencia_detectada = self._detectar_frecuencia_temporal(fechas)
+                if meses_con_pagos < self.MIN_MESES_DIFERENTES:
+                    continue
 
-                puede_aprobar_auto = self._puede_aprobar_automaticamente(
-                    tipo_patron=tipo_patron,
-                    cantidad_facturas=len(facturas_grupo),
-                    meses_diferentes=len(meses_unicos),
-                    cv=cv
+                # Estadísticas de montos en Decimal, igual que _aplicar_incremento
+                suma_montos, suma_cuadrados = self._sumas_montos(montos_grupo)
+                monto_promedio, desviacion_std, cv = self._estadisticas_montos(
+                    suma_montos, suma_cuadrados, len(montos_grupo)
                 )
+                monto_minimo = min(montos_grupo)
+                monto_maximo = max(montos_grupo)
 
-                # Calcular rangos para TIPO_B
-                rango_inferior = None
-                rango_superior = None
-                if tipo_patron == TipoPatron.TIPO_B:
-                    rango_inferior = max(Decimal('0'), monto_promedio - (2 * desviacion_std))
-                    rango_superior = monto_promedio + (2 * desviacion_std)
-
-                umbral_alerta = self._calcular_umbral_alerta(tipo_patron, cv)
-
-                concepto_hash = hashlib.md5(concepto_normalizado.encode('utf-8')).hexdigest()
+                frecuencia_detectada = (
+                    str(frecuencias[codigo]) if intervalos.n[codigo] > 0 else "unica"
+                )
 
                 ultima_factura = max(facturas_grupo, key=lambda f: f.fecha_emision)
 
-                patron = {
+                patron = self._completar_patron({
                     'proveedor_id': proveedor_id,
                     'concepto_normalizado': concepto_normalizado,
-                    'concepto_hash': concepto_hash,
-                    'tipo_patron': tipo_patron,
                     'pagos_analizados': len(facturas_grupo),
-                    'meses_con_pagos': len(meses_unicos),
+                    'meses_con_pagos': meses_con_pagos,
                     'monto_promedio': monto_promedio,
                     'monto_minimo': monto_minimo,
                     'monto_maximo': monto_maximo,
                     'desviacion_estandar': desviacion_std,
                     'coeficiente_variacion': cv,
-                    'rango_inferior': rango_inferior,
-                    'rango_superior': rango_superior,
                     'frecuencia_detectada': frecuencia_detectada,
                     'ultimo_pago_fecha': ultima_factura.fecha_emision,
                     'ultimo_pago_monto': ultima_factura.total_a_pagar,
-                    'puede_aprobar_auto': 1 if puede_aprobar_auto else 0,
-                    'umbral_alerta': umbral_alerta,
                     'facturas_ids': [f.id for f in facturas_grupo],
-                    'ventana_meses': ventana_meses
-                }
+                    'ventana_meses': ventana_meses,
+                    # Agregados para mantenimiento incremental
+                    'suma_montos': suma_montos,
+                    'suma_cuadrados_montos': suma_cuadrados,
+                    'primer_pago_fecha': min(f.fecha_emision for f in facturas_grupo),
+                    'pagos_detalle': self._detalle_pagos(facturas_grupo)
+                })
 
                 patrones_calculados.append(patron)
                 self.stats['patrones_detectados'] += 1
@@ -262,31 +572,12 @@ class AnalizadorPatronesService:
         if len(fechas) < 2:
             return "unica"
 
-        fechas_ordenadas = sorted(fechas)
-        diferencias_dias = [
-            (fechas_ordenadas[i+1] - fechas_ordenadas[i]).days
-            for i in range(len(fechas_ordenadas) - 1)
-        ]
-
-        if not diferencias_dias:
-            return "unica"
-
-        promedio_dias = statistics.mean(diferencias_dias)
-
-        if promedio_dias <= 10:
-            return "semanal"
-        elif promedio_dias <= 20:
-            return "quincenal"
-        elif promedio_dias <= 35:
-            return "mensual"
-        elif promedio_dias <= 65:
-            return "bimestral"
-        elif promedio_dias <= 100:
-            return "trimestral"
-        elif promedio_dias <= 200:
-            return "semestral"
-        else:
-            return "anual"
+        intervalos = intervalos_por_grupo(
+            np.zeros(len(fechas), dtype=np.int64),
+            np.asarray([fecha.toordinal() for fecha in fechas], dtype=np.int64),
+            1
+        )
+        return str(clasificar_por_rangos(intervalos.media, self.RANGOS_FRECUENCIA, "anual")[0])
 
     def _puede_aprobar_automaticamente(
         self,
@@ -314,29 +605,113 @@ class AnalizadorPatronesService:
         else:  # TIPO_C
             return Decimal('50.0')
 
+    def _completar_patron(self, patron: Dict[str, Any]) -> Dict[str, Any]:
+        """Agrega clasificación, rangos, umbral y hash a un patrón con estadísticas."""
+        cv = patron['coeficiente_variacion']
+        monto_promedio = patron['monto_promedio']
+        desviacion_std = patron['desviacion_estandar']
+
+        # Clasificar tipo de patrón
+        if cv < self.UMBRAL_TIPO_A:
+            tipo_patron = TipoPatron.TIPO_A
+        elif cv < self.UMBRAL_TIPO_B:
+            tipo_patron = TipoPatron.TIPO_B
+        else:
+            tipo_patron = TipoPatron.TIPO_C
+
+        puede_aprobar_auto = self._puede_aprobar_automaticamente(
+            tipo_patron=tipo_patron,
+            cantidad_facturas=patron['pagos_analizados'],
+            meses_diferentes=patron['meses_con_pagos'],
+            cv=cv
+        )
+
+        # Calcular rangos para TIPO_B
+        rango_inferior = None
+        rango_superior = None
+        if tipo_patron == TipoPatron.TIPO_B:
+            rango_inferior = max(Decimal('0'), monto_promedio - (2 * desviacion_std))
+            rango_superior = monto_promedio + (2 * desviacion_std)
+
+        patron.update({
+            'concepto_hash': hashlib.md5(patron['concepto_normalizado'].encode('utf-8')).hexdigest(),
+            'tipo_patron': tipo_patron,
+            'rango_inferior': rango_inferior,
+            'rango_superior': rango_superior,
+            'puede_aprobar_auto': 1 if puede_aprobar_auto else 0,
+            'umbral_alerta': self._calcular_umbral_alerta(tipo_patron, cv)
+        })
+        return patron
+
+    @staticmethod
+    def _sumas_montos(montos: List[Decimal]) -> Tuple[Decimal, Decimal]:
+        """Suma y suma de cuadrados exactas (Decimal) de una lista de montos."""
+        with localcontext() as ctx:
+            ctx.prec = 60
+            suma = sum(montos, Decimal('0'))
+            suma_cuadrados = sum((m * m for m in montos), Decimal('0'))
+        return suma, suma_cuadrados
+
+    @staticmethod
+    def _estadisticas_montos(
+        suma: Decimal,
+        suma_cuadrados: Decimal,
+        n: int
+    ) -> Tuple[Decimal, Decimal, Decimal]:
+        """
+        Promedio, desviación estándar muestral y CV% exactos desde las sumas.
+
+        Redondeados a la escala de las columnas (2 decimales), para que el
+        recálculo completo y el incremental guarden el mismo valor.
+        """
+        centavo = Decimal('0.01')
+        with localcontext() as ctx:
+            ctx.prec = 60
+            promedio = suma / n
+            varianza = (suma_cuadrados - suma * suma / n) / (n - 1) if n > 1 else Decimal('0')
+            desviacion = varianza.sqrt() if varianza > 0 else Decimal('0')
+            cv = desviacion / promedio * 100 if promedio > 0 else Decimal('0')
+            return (
+                promedio.quantize(centavo, rounding=ROUND_HALF_UP),
+                desviacion.quantize(centavo, rounding=ROUND_HALF_UP),
+                cv.quantize(centavo, rounding=ROUND_HALF_UP)
+            )
+
+    @staticmethod
+    def _detalle_pagos(facturas: List[Factura]) -> List[Dict[str, Any]]:
+        """pagos_detalle: una entrada por factura, la más reciente primero."""
+        detalle = [
+            {
+                "periodo": f"{f.fecha_emision.year:04d}-{f.fecha_emision.month:02d}",
+                "monto": float(f.total_a_pagar),
+                "factura_id": f.id,
+                "fecha": f.fecha_emision.isoformat(),
+            }
+            for f in facturas
+        ]
+        detalle.sort(key=lambda d: (d["fecha"], -d["factura_id"]), reverse=True)
+        return detalle
+
     def _persistir_patrones(
         self,
         patrones: List[Dict[str, Any]],
         forzar_recalculo: bool
     ) -> None:
         """Persiste o actualiza patrones en patrones_facturas."""
+        existentes = self._cargar_patrones_existentes(
+            {(p['proveedor_id'], p['concepto_hash']) for p in patrones}
+        )
+
         for patron in patrones:
             try:
-                patron_existente = self.db.query(PatronesFacturas).filter(
-                    PatronesFacturas.proveedor_id == patron['proveedor_id'],
-                    PatronesFacturas.concepto_hash == patron['concepto_hash']
-                ).first()
+                patron_existente = existentes.get((patron['proveedor_id'], patron['concepto_hash']))
 
                 if patron_existente:
                     if forzar_recalculo or self._hay_cambios_significativos(patron_existente, patron):
-                        self._actualizar_patron(patron_existente, patron)
-                        self.stats['patrones_actualizados'] += 1
-
-                        if patron_existente.tipo_patron != patron['tipo_patron']:
-                            if self._es_mejora_patron(patron_existente.tipo_patron, patron['tipo_patron']):
-                                self.stats['patrones_mejorados'] += 1
-                            else:
-                                self.stats['patrones_degradados'] += 1
+                        self._registrar_actualizacion(patron_existente, patron)
+                    else:
+                        # Los agregados siempre quedan al día para el modo incremental
+                        self._actualizar_agregados(patron_existente, patron)
                 else:
                     self._crear_patron(patron)
                     self.stats['patrones_nuevos'] += 1
@@ -356,6 +731,42 @@ class AnalizadorPatronesService:
             self.db.rollback()
             logger.error(f"Error en commit final: {str(e)}")
 
+    def _cargar_patrones_existentes(
+        self,
+        claves: Set[Tuple[int, str]]
+    ) -> Dict[Tuple[int, str], PatronesFacturas]:
+        """Patrones existentes para (proveedor_id, concepto_hash), en bloques de proveedores."""
+        existentes: Dict[Tuple[int, str], PatronesFacturas] = {}
+        proveedor_ids = sorted({proveedor_id for proveedor_id, _ in claves})
+        hashes = {concepto_hash for _, concepto_hash in claves}
+
+        for inicio in range(0, len(proveedor_ids), self.TAMANO_BLOQUE):
+            bloque = proveedor_ids[inicio:inicio + self.TAMANO_BLOQUE]
+            patrones = self.db.query(PatronesFacturas).options(
+                lazyload(PatronesFacturas.proveedor)
+            ).filter(
+                PatronesFacturas.proveedor_id.in_(bloque)
+            ).all()
+
+            for patron in patrones:
+                clave = (patron.proveedor_id, patron.concepto_hash)
+                if patron.concepto_hash in hashes and clave in claves:
+                    existentes[clave] = patron
+
+        return existentes
+
+    def _registrar_actualizacion(self, patron_existente: PatronesFacturas, patron: Dict[str, Any]) -> None:
+        """Actualiza un patrón existente y contabiliza mejoras/degradaciones."""
+        tipo_anterior = patron_existente.tipo_patron
+        self._actualizar_patron(patron_existente, patron)
+        self.stats['patrones_actualizados'] += 1
+
+        if tipo_anterior != patron['tipo_patron']:
+            if self._es_mejora_patron(tipo_anterior, patron['tipo_patron']):
+                self.stats['patrones_mejorados'] += 1
+            else:
+                self.stats['patrones_degradados'] += 1
+
     def _hay_cambios_significativos(
         self,
         patron_existente: PatronesFacturas,
@@ -409,6 +820,10 @@ class AnalizadorPatronesService:
             ultimo_pago_monto=patron['ultimo_pago_monto'],
             puede_aprobar_auto=patron['puede_aprobar_auto'],
             umbral_alerta=patron['umbral_alerta'],
+            suma_montos=patron['suma_montos'],
+            suma_cuadrados_montos=patron['suma_cuadrados_montos'],
+            primer_pago_fecha=patron['primer_pago_fecha'],
+            pagos_detalle=patron['pagos_detalle'],
             fecha_analisis=datetime.utcnow(),
             version_algoritmo="2.0"
         )
@@ -434,6 +849,14 @@ class AnalizadorPatronesService:
         patron_existente.umbral_alerta = patron_nuevo['umbral_alerta']
         patron_existente.fecha_analisis = datetime.utcnow()
         patron_existente.version_algoritmo = "2.0"
+        self._actualizar_agregados(patron_existente, patron_nuevo)
+
+    def _actualizar_agregados(self, patron_existente: PatronesFacturas, patron_nuevo: Dict[str, Any]) -> None:
+        """Actualiza solo los agregados acumulados de un patrón."""
+        patron_existente.suma_montos = patron_nuevo['suma_montos']
+        patron_existente.suma_cuadrados_montos = patron_nuevo['suma_cuadrados_montos']
+        patron_existente.primer_pago_fecha = patron_nuevo['primer_pago_fecha']
+        patron_existente.pagos_detalle = patron_nuevo['pagos_detalle']
 
     def _detectar_cambios_patrones(self, patrones: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Detecta y reporta cambios significativos en los patrones."""
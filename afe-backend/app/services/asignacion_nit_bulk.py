@@ -0,0 +1,287 @@
+"""
+Servicio de asignación masiva NIT -> Responsable (set-based).
+
+Los endpoints /bulk, /bulk-simple y /bulk-nit-config consultaban el
+proveedor y la asignación existente NIT por NIT (3+ queries por NIT) y
+sincronizaban facturas fila a fila. Este servicio resuelve un lote completo
+con un número fijo de sentencias:
+
+1. Una consulta IN para validar NITs (proveedores o nit_configuracion)
+2. Una consulta IN para las asignaciones existentes del responsable
+3. Un INSERT multi-fila con las asignaciones nuevas
+4. Un UPDATE ... WHERE id IN para reactivar asignaciones inactivas
+5. Un UPDATE de facturas sin responsable de los proveedores afectados
+
+`planificar` solo lee y retorna el diff (modo dry-run); `aplicar` lo ejecuta.
+El plan también trae un error por NIT rechazado u omitido sin cambios
+(repetido, no registrado, asignación inactiva sin reactivar) para el campo
+`errores` de los endpoints.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, func, insert, literal, null, select, update
+from sqlalchemy.orm import Session
+
+from app.models.email_config import NitConfiguracion
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.utils.logger import logger
+from app.utils.nit_validator import NitValidator
+
+
+# Tamaño máximo de las listas IN (por sentencia)
+TAMANO_BLOQUE_IN = 1000
+
+
+def _bloques(valores: List[str], tamano: int = TAMANO_BLOQUE_IN) -> Iterable[List[str]]:
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
+
+
+@dataclass
+class PlanAsignacionBulk:
+    """Diff de una asignación masiva (lo que se crearía, reactivaría u omitiría)."""
+    responsable_id: int
+    total_procesados: int
+    crear: List[str] = field(default_factory=list)
+    reactivar: List[str] = field(default_factory=list)
+    omitir: List[str] = field(default_factory=list)
+    no_registrados: List[str] = field(default_factory=list)
+    # "NIT <nit>: <motivo>" por cada NIT repetido, no registrado o inactivo
+    errores: List[str] = field(default_factory=list)
+    # Datos internos para aplicar el plan
+    ids_reactivar: List[int] = field(default_factory=list, repr=False)
+    areas: Dict[str, Optional[str]] = field(default_factory=dict, repr=False)
+
+    def diff(self) -> dict:
+        return {
+            "crear": self.crear,
+            "reactivar": self.reactivar,
+            "omitir": self.omitir,
+            "no_registrados": self.no_registrados,
+        }
+
+
+class AsignacionNitBulkService:
+    """Asignación masiva de NITs a un responsable con consultas por conjuntos."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== PARSEO ====================
+
+    @staticmethod
+    def parsear_nits(texto: str) -> List[str]:
+        """Separa NITs pegados por coma, salto de línea, tabulación o punto y coma."""
+        return [nit.strip() for nit in re.split(r'[,\n\t\r;]', texto) if nit.strip()]
+
+    @staticmethod
+    def normalizar_nits(nits_raw: Iterable[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        Normaliza NITs con NitValidator.
+
+        Returns:
+            (nits normalizados en orden de entrada, [(nit_original, error)])
+        """
+        normalizados = []
+        errores = []
+        for nit_raw in nits_raw:
+            es_valido, nit_normalizado_o_error = NitValidator.validar_nit(nit_raw)
+            if es_valido:
+                normalizados.append(nit_normalizado_o_error)
+            else:
+                errores.append((nit_raw, nit_normalizado_o_error))
+        return normalizados, errores
+
+    # ==================== CONSULTAS POR CONJUNTO ====================
+
+    def nits_en_proveedores(self, nits: Iterable[str]) -> Set[str]:
+        """NITs (de la lista) registrados en proveedores — una consulta IN por bloque."""
+        encontrados: Set[str] = set()
+        for bloque in _bloques(sorted(set(nits))):
+            encontrados.update(
+                self.db.execute(select(Proveedor.nit).where(Proveedor.nit.in_(bloque))).scalars()
+            )
+        return encontrados
+
+    def nits_en_configuracion(self, nits: Iterable[str]) -> Set[str]:
+        """NITs (de la lista) activos en nit_configuracion."""
+        encontrados: Set[str] = set()
+        for bloque in _bloques(sorted(set(nits))):
+            encontrados.update(
+                self.db.execute(
+                    select(NitConfiguracion.nit).where(
+                        NitConfiguracion.nit.in_(bloque),
+                        NitConfiguracion.activo == True
+                    )
+                ).scalars()
+            )
+        return encontrados
+
+    def _asignaciones_existentes(self, responsable_id: int, nits: List[str]) -> Dict[str, List[Tuple[int, bool]]]:
+        """{nit: [(id, activo), ...]} de las asignaciones del responsable para esos NITs."""
+        existentes: Dict[str, List[Tuple[int, bool]]] = {}
+        for bloque in _bloques(sorted(set(nits))):
+            filas = self.db.execute(
+                select(
+                    AsignacionNitResponsable.nit,
+                    AsignacionNitResponsable.id,
+                    AsignacionNitResponsable.activo
+                ).where(
+                    AsignacionNitResponsable.responsable_id == responsable_id,
+                    AsignacionNitResponsable.nit.in_(bloque)
+                )
+            ).all()
+            for nit, asignacion_id, activo in filas:
+                existentes.setdefault(nit, []).append((asignacion_id, bool(activo)))
+        return existentes
+
+    # ==================== PLAN (DRY-RUN) ====================
+
+    def planificar(
+        self,
+        responsable_id: int,
+        nits: List[str],
+        nits_validos: Optional[Set[str]] = None,
+        reactivar_inactivas: bool = False,
+        areas: Optional[Dict[str, Optional[str]]] = None,
+        motivo_no_registrado: str = "no registrado como proveedor"
+    ) -> PlanAsignacionBulk:
+        """
+        Calcula el diff sin escribir.
+
+        Args:
+            responsable_id: Usuario destino
+            nits: NITs normalizados (puede tener repetidos; se omiten)
+            nits_validos: Si se indica, NITs fuera del conjunto van a `no_registrados`
+            reactivar_inactivas: True → asignaciones inactivas se reactivan;
+                False → cualquier asignación existente se omite
+            areas: Área por NIT (para /bulk con área por ítem)
+            motivo_no_registrado: Texto del error para NITs fuera de nits_validos
+        """
+        plan = PlanAsignacionBulk(responsable_id=responsable_id, total_procesados=len(nits))
+        existentes = self._asignaciones_existentes(responsable_id, nits)
+        vistos: Set[str] = set()
+
+        for nit in nits:
+            if nit in vistos:
+                plan.omitir.append(nit)
+                plan.errores.append(f"NIT {nit}: repetido en la solicitud")
+                continue
+            vistos.add(nit)
+
+            if nits_validos is not None and nit not in nits_validos:
+                plan.no_registrados.append(nit)
+                plan.errores.append(f"NIT {nit}: {motivo_no_registrado}")
+                continue
+
+            asignaciones = existentes.get(nit)
+            if not asignaciones:
+                plan.crear.append(nit)
+                plan.areas[nit] = (areas or {}).get(nit)
+            elif any(activo for _, activo in asignaciones):
+                plan.omitir.append(nit)
+            elif reactivar_inactivas:
+                plan.reactivar.append(nit)
+                plan.ids_reactivar.append(min(asignacion_id for asignacion_id, _ in asignaciones))
+            else:
+                plan.omitir.append(nit)
+                plan.errores.append(
+                    f"NIT {nit}: asignación inactiva para el responsable (no se reactiva)"
+                )
+
+        return plan
+
+    # ==================== APLICAR ====================
+
+    def aplicar(
+        self,
+        plan: PlanAsignacionBulk,
+        responsable: Usuario,
+        creado_por: str,
+        permitir_aprobacion_automatica: bool = True,
+        sincronizar_facturas: bool = True
+    ) -> int:
+        """
+        Ejecuta el plan en la transacción actual (sin commit).
+
+        Returns:
+            Número de facturas sin responsable asignadas al responsable.
+        """
+        ahora = datetime.utcnow()
+
+        if plan.crear:
+            self.db.execute(
+                insert(AsignacionNitResponsable),
+                [
+                    {
+                        "nit": nit,
+                        "responsable_id": responsable.id,
+                        "area": plan.areas.get(nit) or responsable.area,
+                        "permitir_aprobacion_automatica": permitir_aprobacion_automatica,
+                        "requiere_revision_siempre": False,
+                        "activo": True,
+                        "creado_por": creado_por,
+                        "creado_en": ahora,
+                        "actualizado_en": ahora,
+                    }
+                    for nit in plan.crear
+                ]
+            )
+
+        if plan.ids_reactivar:
+            self.db.execute(
+                update(AsignacionNitResponsable)
+                .where(AsignacionNitResponsable.id.in_(plan.ids_reactivar))
+                .values(activo=True, actualizado_por=creado_por, actualizado_en=ahora)
+                .execution_options(synchronize_session=False)
+            )
+
+        total_facturas = 0
+        if sincronizar_facturas and plan.crear:
+            total_facturas = self.sincronizar_facturas(plan.crear, responsable.id)
+
+        logger.info(
+            f"Asignación bulk aplicada: responsable={responsable.id}, "
+            f"{len(plan.crear)} creadas, {len(plan.reactivar)} reactivadas, "
+            f"{len(plan.omitir)} omitidas, {total_facturas} facturas sincronizadas"
+        )
+        return total_facturas
+
+    def sincronizar_facturas(self, nits: List[str], responsable_id: int) -> int:
+        """
+        Asigna al responsable las facturas SIN responsable de esos NITs.
+
+        Equivale a sincronizar_facturas_por_nit(..., responsable_anterior_id=None)
+        para todos los NITs en una sentencia por bloque. Como el UPDATE masivo
+        no dispara los listeners de Factura, accion_por se sincroniza en la
+        misma sentencia con las reglas de factura_listeners.
+        """
+        nombre_responsable = self.db.execute(
+            select(Usuario.nombre).where(Usuario.id == responsable_id)
+        ).scalar()
+        accion_por = case(
+            (Factura.estado == EstadoFactura.aprobada_auto, literal('Sistema Automático')),
+            (Factura.estado.in_([EstadoFactura.aprobada, EstadoFactura.rechazada]),
+             func.coalesce(literal(nombre_responsable), Factura.accion_por)),
+            (Factura.estado == EstadoFactura.en_revision, null()),
+            else_=Factura.accion_por
+        )
+
+        total = 0
+        for bloque in _bloques(sorted(set(nits))):
+            proveedores = select(Proveedor.id).where(Proveedor.nit.in_(bloque)).scalar_subquery()
+            resultado = self.db.execute(
+                update(Factura)
+                .where(Factura.proveedor_id.in_(proveedores), Factura.responsable_id.is_(None))
+                .values(responsable_id=responsable_id, accion_por=accion_por)
+                .execution_options(synchronize_session=False)
+            )
+            total += resultado.rowcount or 0
+        return total
@@ -13,10 +13,12 @@ from .automation_service import AutomationService
 from .pattern_detector import PatternDetector
 from .fingerprint_generator import FingerprintGenerator
 from .decision_engine import DecisionEngine
+from .historial_cache import HistorialProveedorCache
 
 __all__ = [
     "AutomationService",
     "PatternDetector", 
     "FingerprintGenerator",
-    "DecisionEngine"
+    "DecisionEngine",
+    "HistorialProveedorCache"
 ]
\ No newline at end of file
@@ -15,6 +15,7 @@ from app.crud import audit as crud_audit
 from .fingerprint_generator import FingerprintGenerator
 from .pattern_detector import PatternDetector, ResultadoAnalisisPatron
 from .decision_engine import DecisionEngine, ResultadoDecision, TipoDecision
+from .historial_cache import HistorialProveedorCache
 
 
 # Configurar logging
@@ -55,12 +56,18 @@ class AutomationService:
             )
             
             logger.info(f"Iniciando procesamiento de {len(facturas_pendientes)} facturas pendientes")
-            
+
+            # Historial de todos los proveedores del lote en una sola carga
+            historial_cache = HistorialProveedorCache(db)
+            historial_cache.precargar(facturas_pendientes)
+
             resultados = []
             
             for factura in facturas_pendientes:
                 try:
-                    resultado = self.procesar_factura_individual(db, factura, modo_debug)
+                    resultado = self.procesar_factura_individual(
+                        db, factura, modo_debug, historial_cache=historial_cache
+                    )
                     resultados.append(resultado)
                     self.stats['facturas_procesadas'] += 1
                     
@@ -90,9 +97,15 @@ class AutomationService:
         self,
         db: Session,
         factura: Factura,
-        modo_debug: bool = False
+        modo_debug: bool = False,
+        historial_cache: Optional[HistorialProveedorCache] = None
     ) -> Dict[str, Any]:
-        """Procesa una factura individual para determinar si debe ser aprobada automáticamente."""
+        """
+        Procesa una factura individual para determinar si debe ser aprobada automáticamente.
+
+        Si se recibe `historial_cache` (procesamiento por lotes) las búsquedas
+        de historial se resuelven en memoria en lugar de consultar la BD.
+        """
         logger.info(f"Procesando factura {factura.numero_factura} (ID: {factura.id})")
         
         try:
@@ -106,7 +119,7 @@ class AutomationService:
             self._enriquecer_datos_factura(db, factura)
             
             # 3. Buscar facturas históricas similares
-            facturas_historicas = self._buscar_facturas_historicas(db, factura)
+            facturas_historicas = self._buscar_facturas_historicas(db, factura, historial_cache)
 
             # 3.5. 🔑 NUEVA LÓGICA: Comparar con mes anterior (prioridad máxima)
             factura_mes_anterior = facturas_historicas[0] if facturas_historicas else None
@@ -129,6 +142,8 @@ class AutomationService:
             
             # 6. Aplicar la decisión a la base de datos
             self._aplicar_decision(db, factura, resultado_decision, resultado_patron)
+            if historial_cache is not None:
+                historial_cache.actualizar(factura)
             
             # 7. Registrar en auditoría
             self._registrar_auditoria(db, factura, resultado_decision, resultado_patron)
@@ -180,8 +195,16 @@ class AutomationService:
         else:
             return "factura_estandar"
 
-    def _buscar_facturas_historicas(self, db: Session, factura: Factura) -> List[Factura]:
+    def _buscar_facturas_historicas(
+        self,
+        db: Session,
+        factura: Factura,
+        historial_cache: Optional[HistorialProveedorCache] = None
+    ) -> List[Factura]:
         """Busca facturas históricas similares para análisis de patrones."""
+        if historial_cache is not None:
+            return self._buscar_facturas_historicas_en_cache(factura, historial_cache)
+
         facturas_historicas = []
 
         # PRIORIDAD 1: Buscar factura del mes anterior (lógica principal de aprobación)
@@ -236,6 +259,56 @@ class AutomationService:
         facturas_filtradas.sort(key=lambda x: x.fecha_emision, reverse=True)
         return facturas_filtradas[:10]  # Máximo 10 facturas históricas
 
+    def _buscar_facturas_historicas_en_cache(
+        self,
+        factura: Factura,
+        historial_cache: HistorialProveedorCache
+    ) -> List[Factura]:
+        """Mismas prioridades que _buscar_facturas_historicas, servidas desde la caché."""
+        facturas_historicas = []
+        ids_existentes = set()
+
+        def agregar(candidatas):
+            for f in candidatas:
+                if f.id not in ids_existentes:
+                    ids_existentes.add(f.id)
+                    facturas_historicas.append(f)
+
+        # PRIORIDAD 1: Factura del mes anterior
+        factura_mes_anterior = historial_cache.buscar_mes_anterior(
+            proveedor_id=factura.proveedor_id,
+            fecha_actual=factura.fecha_emision,
+            concepto_hash=factura.concepto_hash,
+            numero_factura=factura.numero_factura
+        )
+        if factura_mes_anterior:
+            agregar([factura_mes_anterior])
+
+        if factura.concepto_normalizado:
+            # La consulta original no deduplica contra el mes anterior
+            facturas_historicas.extend(historial_cache.buscar_por_concepto(
+                factura.proveedor_id, factura.concepto_normalizado, limit=12
+            ))
+            ids_existentes.update(f.id for f in facturas_historicas)
+
+        if factura.concepto_hash:
+            agregar(historial_cache.buscar_por_hash(
+                factura.proveedor_id, factura.concepto_hash, limit=8
+            ))
+
+        if factura.orden_compra_numero:
+            agregar(historial_cache.buscar_por_orden_compra(
+                factura.proveedor_id, factura.orden_compra_numero
+            ))
+
+        facturas_filtradas = [
+            f for f in facturas_historicas
+            if f.fecha_emision < factura.fecha_emision and f.id != factura.id
+        ]
+
+        facturas_filtradas.sort(key=lambda x: x.fecha_emision, reverse=True)
+        return facturas_filtradas[:10]
+
     def _aplicar_decision(
         self,
         db: Session,
@@ -0,0 +1,166 @@
+# app/services/automation/estadisticas_recurrencia.py
+"""
+Motor vectorizado de estadísticas de recurrencia (NumPy).
+
+PatternDetector y AnalizadorPatronesService calculaban intervalos entre
+facturas, variación de montos y clasificación de frecuencia grupo por grupo
+con `statistics`. Este módulo calcula esas métricas para TODOS los grupos a
+la vez a partir de arreglos columnares:
+
+    grupos  = [0, 0, 0, 1, 1, ...]   # código de grupo de cada observación
+    valores = [..., ...]             # día ordinal, monto, etc.
+
+Cada función retorna arreglos indexados por código de grupo (posición i =
+grupo i), de modo que el llamador solo recorre los grupos para construir sus
+resultados (PatronTemporal, PatronMonto, tipo de patrón y meses con pagos).
+
+Las estadísticas de montos que se reportan o se persisten (promedio de
+PatronMonto; promedio, desviación, mínimo y máximo de patrones_facturas) no
+pasan por aquí: se calculan en Decimal para que sean exactas a la escala de
+la columna. Solo la variación porcentual usa float.
+
+Convenciones (idénticas a `statistics`):
+- media: suma / n
+- desviación: muestral (n - 1); 0.0 cuando n <= 1
+- grupos sin observaciones: n = 0 y métricas en 0.0
+"""
+
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class EstadisticasGrupos:
+    """Estadísticas descriptivas por grupo, en formato columnar."""
+    n: np.ndarray
+    media: np.ndarray
+    desviacion: np.ndarray
+    minimo: np.ndarray
+    maximo: np.ndarray
+
+
+def estadisticas_por_grupo(
+    grupos: np.ndarray,
+    valores: np.ndarray,
+    num_grupos: int,
+    extremos: bool = True
+) -> EstadisticasGrupos:
+    """
+    Media, desviación muestral, mínimo y máximo de `valores` por grupo.
+
+    Con `extremos=False` se omite el cálculo de mínimo/máximo (quedan en 0.0).
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+
+    n = np.bincount(grupos, minlength=num_grupos)
+    suma = np.bincount(grupos, weights=valores, minlength=num_grupos)
+
+    media = np.zeros(num_grupos, dtype=np.float64)
+    con_datos = n > 0
+    media[con_datos] = suma[con_datos] / n[con_datos]
+
+    # Dos pasadas (como statistics): evita la cancelación de sum(x²) - n·media²
+    desvios = valores - media[grupos]
+    suma_cuadrados = np.bincount(grupos, weights=desvios * desvios, minlength=num_grupos)
+    desviacion = np.zeros(num_grupos, dtype=np.float64)
+    muestral = n > 1
+    desviacion[muestral] = np.sqrt(suma_cuadrados[muestral] / (n[muestral] - 1))
+
+    minimo = np.zeros(num_grupos, dtype=np.float64)
+    maximo = np.zeros(num_grupos, dtype=np.float64)
+    if extremos and grupos.size:
+        minimo[con_datos] = np.inf
+        maximo[con_datos] = -np.inf
+        np.minimum.at(minimo, grupos, valores)
+        np.maximum.at(maximo, grupos, valores)
+
+    return EstadisticasGrupos(n=n, media=media, desviacion=desviacion, minimo=minimo, maximo=maximo)
+
+
+def intervalos_por_grupo(
+    grupos: np.ndarray,
+    dias: np.ndarray,
+    num_grupos: int
+) -> EstadisticasGrupos:
+    """
+    Estadísticas de los intervalos (en días) entre fechas consecutivas de cada grupo.
+
+    `dias` son fechas como enteros ordinales (date.toordinal()); no necesitan
+    venir ordenadas. `n` es el número de intervalos (observaciones - 1);
+    mínimo/máximo no se calculan.
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    dias = np.asarray(dias, dtype=np.int64)
+
+    orden = np.lexsort((dias, grupos))
+    grupos_ordenados = grupos[orden]
+    dias_ordenados = dias[orden]
+
+    mismo_grupo = grupos_ordenados[1:] == grupos_ordenados[:-1]
+    intervalos = np.diff(dias_ordenados)[mismo_grupo]
+
+    return estadisticas_por_grupo(
+        grupos_ordenados[1:][mismo_grupo], intervalos, num_grupos, extremos=False
+    )
+
+
+def periodos_distintos_por_grupo(
+    grupos: np.ndarray,
+    periodos: np.ndarray,
+    num_grupos: int
+) -> np.ndarray:
+    """Cantidad de periodos distintos (p.ej. año*12 + mes) por grupo."""
+    grupos = np.asarray(grupos, dtype=np.int64)
+    periodos = np.asarray(periodos, dtype=np.int64)
+    if grupos.size == 0:
+        return np.zeros(num_grupos, dtype=np.int64)
+
+    base = int(periodos.max()) + 1
+    pares = np.unique(grupos * base + periodos)
+    return np.bincount(pares // base, minlength=num_grupos)
+
+
+def variacion_maxima_porcentual(
+    grupos: np.ndarray,
+    valores: np.ndarray,
+    referencia: np.ndarray,
+    num_grupos: int
+) -> np.ndarray:
+    """
+    max(|valor - referencia| / referencia * 100) por grupo.
+
+    Grupos con referencia no positiva retornan 100.0; grupos sin valores, 0.0.
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    referencia = np.asarray(referencia, dtype=np.float64)
+
+    ref_obs = referencia[grupos]
+    variaciones = np.zeros_like(valores)
+    positivos = ref_obs > 0
+    variaciones[positivos] = np.abs(valores[positivos] - ref_obs[positivos]) / ref_obs[positivos] * 100
+
+    resultado = np.zeros(num_grupos, dtype=np.float64)
+    np.maximum.at(resultado, grupos, variaciones)
+    resultado[referencia <= 0] = 100.0
+    return resultado
+
+
+def clasificar_por_rangos(
+    valores: np.ndarray,
+    rangos: Sequence[Tuple[float, float, str]],
+    defecto: str
+) -> np.ndarray:
+    """
+    Etiqueta cada valor con el primer rango (mínimo, máximo, etiqueta) que lo
+    contiene (ambos extremos inclusivos); `defecto` si ninguno aplica.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    etiquetas = np.full(valores.shape, defecto, dtype=object)
+    # En orden inverso: los rangos prioritarios sobrescriben a los posteriores
+    for minimo, maximo, etiqueta in reversed(rangos):
+        etiquetas[(valores >= minimo) & (valores <= maximo)] = etiqueta
+    return etiquetas
@@ -0,0 +1,277 @@
+# app/services/automation/historial_cache.py
+"""
+Caché de historial por proveedor para un ciclo de automatización.
+
+AutomationService._buscar_facturas_historicas hacía hasta cuatro consultas por
+factura (mes anterior, concepto, hash y orden de compra). Esta caché precarga
+en una sola consulta el historial reciente de todos los proveedores del lote y
+resuelve las cuatro búsquedas en memoria con índices por
+(proveedor, concepto_hash), (proveedor, concepto_normalizado) y
+(proveedor, orden_compra_numero).
+
+Las búsquedas replican los criterios de las funciones equivalentes de
+app.crud.factura (find_factura_mes_anterior, find_facturas_by_concepto_*,
+find_facturas_by_orden_compra), restringidas a la ventana de `meses_historico`.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura, EstadoFactura
+
+
+logger = logging.getLogger(__name__)
+
+
+ESTADOS_APROBADOS = (EstadoFactura.aprobada, EstadoFactura.aprobada_auto)
+
+
+@dataclass
+class FacturaHistorica:
+    """
+    Vista de solo lectura de una factura histórica.
+
+    Expone los mismos atributos escalares de Factura que usan PatternDetector
+    y DecisionEngine, sin quedar ligada a la sesión (no se recarga tras cada
+    commit del ciclo).
+    """
+    id: int
+    proveedor_id: Optional[int]
+    numero_factura: str
+    fecha_emision: Optional[date]
+    estado: Optional[EstadoFactura]
+    total_a_pagar: Optional[Decimal]
+    concepto_hash: Optional[str]
+    concepto_normalizado: Optional[str]
+    orden_compra_numero: Optional[str]
+
+
+_COLUMNAS = (
+    Factura.id,
+    Factura.proveedor_id,
+    Factura.numero_factura,
+    Factura.fecha_emision,
+    Factura.estado,
+    Factura.total_a_pagar,
+    Factura.concepto_hash,
+    Factura.concepto_normalizado,
+    Factura.orden_compra_numero,
+)
+
+
+def _orden_reciente(f: FacturaHistorica) -> Tuple[date, int]:
+    """Clave de orden: fecha de emisión descendente, luego id descendente."""
+    return (f.fecha_emision or date.min, f.id)
+
+
+class HistorialProveedorCache:
+    """
+    Historial de facturas por proveedor, precargado una vez por ciclo.
+
+    Uso:
+        cache = HistorialProveedorCache(db)
+        cache.precargar(facturas_pendientes)
+        historicas = cache.buscar_por_concepto(proveedor_id, concepto)
+    """
+
+    TAMANO_BLOQUE_PROVEEDORES = 500
+
+    def __init__(self, db: Session, meses_historico: int = 24):
+        self.db = db
+        self.meses_historico = meses_historico
+        self._por_proveedor: Dict[int, List[FacturaHistorica]] = {}
+        self._por_hash: Dict[Tuple[int, str], List[FacturaHistorica]] = defaultdict(list)
+        self._por_concepto: Dict[Tuple[int, str], List[FacturaHistorica]] = defaultdict(list)
+        self._por_oc: Dict[Tuple[int, str], List[FacturaHistorica]] = defaultdict(list)
+        self._por_id: Dict[int, FacturaHistorica] = {}
+        self._fecha_desde: Optional[date] = None
+        self.consultas = 0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def precargar(self, facturas: Iterable[Factura]) -> None:
+        """Carga el historial de todos los proveedores de `facturas`."""
+        facturas = list(facturas)
+        fechas = [f.fecha_emision for f in facturas if f.fecha_emision]
+        if fechas:
+            desde = min(fechas) - relativedelta(months=self.meses_historico)
+            if self._fecha_desde is None or desde < self._fecha_desde:
+                self._fecha_desde = desde
+
+        proveedor_ids = {f.proveedor_id for f in facturas if f.proveedor_id}
+        self._cargar_proveedores(proveedor_ids - set(self._por_proveedor))
+
+    def _cargar_proveedores(self, proveedor_ids: Iterable[int]) -> None:
+        """Una consulta por bloque de proveedores (no por factura)."""
+        proveedor_ids = sorted(proveedor_ids)
+        if not proveedor_ids:
+            return
+
+        if self._fecha_desde is None:
+            self._fecha_desde = date.today() - relativedelta(months=self.meses_historico)
+
+        for inicio in range(0, len(proveedor_ids), self.TAMANO_BLOQUE_PROVEEDORES):
+            bloque = proveedor_ids[inicio:inicio + self.TAMANO_BLOQUE_PROVEEDORES]
+            for proveedor_id in bloque:
+                self._por_proveedor[proveedor_id] = []
+
+            filas = self.db.query(*_COLUMNAS).filter(
+                Factura.proveedor_id.in_(bloque),
+                Factura.fecha_emision >= self._fecha_desde
+            ).all()
+            self.consultas += 1
+
+            for fila in filas:
+                self._indexar(FacturaHistorica(**fila._asdict()))
+
+        for lista in self._todas_las_listas():
+            lista.sort(key=_orden_reciente, reverse=True)
+
+        logger.debug(
+            "Historial precargado para %d proveedores (%d facturas)",
+            len(proveedor_ids), len(self._por_id)
+        )
+
+    def _indexar(self, f: FacturaHistorica) -> None:
+        self._por_id[f.id] = f
+        self._por_proveedor.setdefault(f.proveedor_id, []).append(f)
+        if f.concepto_hash:
+            self._por_hash[(f.proveedor_id, f.concepto_hash)].append(f)
+        if f.concepto_normalizado:
+            self._por_concepto[(f.proveedor_id, f.concepto_normalizado)].append(f)
+        if f.orden_compra_numero:
+            self._por_oc[(f.proveedor_id, f.orden_compra_numero)].append(f)
+
+    def _todas_las_listas(self):
+        yield from self._por_proveedor.values()
+        yield from self._por_hash.values()
+        yield from self._por_concepto.values()
+        yield from self._por_oc.values()
+
+    def _asegurar_proveedor(self, proveedor_id: int) -> None:
+        """Carga perezosa para proveedores que no estaban en el lote inicial."""
+        if proveedor_id not in self._por_proveedor:
+            self._cargar_proveedores([proveedor_id])
+
+    # ------------------------------------------------------------------
+    # Mantenimiento durante el ciclo
+    # ------------------------------------------------------------------
+
+    def actualizar(self, factura: Factura) -> None:
+        """
+        Refleja en la caché los cambios aplicados a una factura del ciclo.
+
+        Así una factura aprobada automáticamente cuenta como "mes anterior"
+        para las siguientes del mismo ciclo, igual que con consultas directas.
+        """
+        if not factura.proveedor_id or factura.proveedor_id not in self._por_proveedor:
+            return
+
+        previa = self._por_id.get(factura.id)
+        if previa is not None:
+            cambio_indices = (
+                previa.concepto_hash != factura.concepto_hash
+                or previa.concepto_normalizado != factura.concepto_normalizado
+                or previa.orden_compra_numero != factura.orden_compra_numero
+                or previa.fecha_emision != factura.fecha_emision
+            )
+            previa.estado = factura.estado
+            previa.total_a_pagar = factura.total_a_pagar
+            if not cambio_indices:
+                return
+            self._quitar(previa)
+        elif self._fecha_desde and factura.fecha_emision and factura.fecha_emision < self._fecha_desde:
+            return
+
+        nueva = FacturaHistorica(**{c.key: getattr(factura, c.key) for c in _COLUMNAS})
+        self._indexar(nueva)
+        for clave, indice in (
+            (nueva.concepto_hash, self._por_hash),
+            (nueva.concepto_normalizado, self._por_concepto),
+            (nueva.orden_compra_numero, self._por_oc),
+        ):
+            if clave:
+                indice[(nueva.proveedor_id, clave)].sort(key=_orden_reciente, reverse=True)
+        self._por_proveedor[nueva.proveedor_id].sort(key=_orden_reciente, reverse=True)
+
+    def _quitar(self, f: FacturaHistorica) -> None:
+        self._por_id.pop(f.id, None)
+        listas = [self._por_proveedor.get(f.proveedor_id, [])]
+        if f.concepto_hash:
+            listas.append(self._por_hash.get((f.proveedor_id, f.concepto_hash), []))
+        if f.concepto_normalizado:
+            listas.append(self._por_concepto.get((f.proveedor_id, f.concepto_normalizado), []))
+        if f.orden_compra_numero:
+            listas.append(self._por_oc.get((f.proveedor_id, f.orden_compra_numero), []))
+        for lista in listas:
+            if f in lista:
+                lista.remove(f)
+
+    # ------------------------------------------------------------------
+    # Búsquedas (equivalentes a app.crud.factura)
+    # ------------------------------------------------------------------
+
+    def buscar_mes_anterior(
+        self,
+        proveedor_id: int,
+        fecha_actual: date,
+        concepto_hash: Optional[str] = None,
+        numero_factura: Optional[str] = None
+    ) -> Optional[FacturaHistorica]:
+        """Factura aprobada más reciente del mes anterior (find_factura_mes_anterior)."""
+        self._asegurar_proveedor(proveedor_id)
+
+        mes_anterior = fecha_actual - relativedelta(months=1)
+        candidatas = (
+            self._por_hash.get((proveedor_id, concepto_hash), [])
+            if concepto_hash else self._por_proveedor.get(proveedor_id, [])
+        )
+
+        for f in candidatas:
+            if (
+                f.fecha_emision
+                and f.fecha_emision.year == mes_anterior.year
+                and f.fecha_emision.month == mes_anterior.month
+                and f.estado in ESTADOS_APROBADOS
+                and (not numero_factura or f.numero_factura != numero_factura)
+            ):
+                return f
+        return None
+
+    def buscar_por_concepto(
+        self,
+        proveedor_id: int,
+        concepto_normalizado: str,
+        limit: int = 12
+    ) -> List[FacturaHistorica]:
+        """Equivalente a find_facturas_by_concepto_proveedor."""
+        self._asegurar_proveedor(proveedor_id)
+        return self._por_concepto.get((proveedor_id, concepto_normalizado), [])[:limit]
+
+    def buscar_por_hash(
+        self,
+        proveedor_id: int,
+        concepto_hash: str,
+        limit: int = 8
+    ) -> List[FacturaHistorica]:
+        """Equivalente a find_facturas_by_concepto_hash filtrado por proveedor."""
+        self._asegurar_proveedor(proveedor_id)
+        return self._por_hash.get((proveedor_id, concepto_hash), [])[:limit]
+
+    def buscar_por_orden_compra(
+        self,
+        proveedor_id: int,
+        orden_compra_numero: str
+    ) -> List[FacturaHistorica]:
+        """Equivalente a find_facturas_by_orden_compra filtrado por proveedor."""
+        self._asegurar_proveedor(proveedor_id)
+        return list(self._por_oc.get((proveedor_id, orden_compra_numero), []))
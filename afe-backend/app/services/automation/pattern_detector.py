@@ -2,13 +2,19 @@
 """Detector de patrones de recurrencia en facturas."""
 
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from decimal import Decimal
-import statistics
 from dataclasses import dataclass
 
+import numpy as np
+
 from app.models.factura import Factura
 from .fingerprint_generator import FingerprintGenerator
+from .estadisticas_recurrencia import (
+    clasificar_por_rangos,
+    intervalos_por_grupo,
+    variacion_maxima_porcentual,
+)
 
 
 @dataclass
@@ -68,17 +74,46 @@ class PatternDetector:
         facturas_historicas: List[Factura]
     ) -> ResultadoAnalisisPatron:
         """Analiza si una nueva factura sigue un patrón de recurrencia."""
-        if len(facturas_historicas) < self.umbrales['min_facturas_patron']:
-            return self._crear_resultado_sin_patron(
-                "Insuficiente historial para detectar patrones"
-            )
-        
-        # Analizar patrón temporal
-        patron_temporal = self._analizar_patron_temporal(facturas_historicas, factura_nueva)
-        
-        # Analizar patrón de montos
-        patron_monto = self._analizar_patron_montos(facturas_historicas, factura_nueva)
-        
+        return self.analizar_patrones_lote([(factura_nueva, facturas_historicas)])[0]
+
+    def analizar_patrones_lote(
+        self,
+        casos: Sequence[Tuple[Factura, List[Factura]]]
+    ) -> List[ResultadoAnalisisPatron]:
+        """
+        Analiza varios casos (factura nueva, facturas históricas) a la vez.
+
+        Las estadísticas temporales y de montos de todos los casos se calculan
+        en una sola pasada vectorizada; el resultado de cada caso es idéntico
+        al de analizar_patron_recurrencia.
+        """
+        resultados: List[Optional[ResultadoAnalisisPatron]] = [None] * len(casos)
+        analizables = []
+
+        for i, (factura_nueva, facturas_historicas) in enumerate(casos):
+            if len(facturas_historicas) < self.umbrales['min_facturas_patron']:
+                resultados[i] = self._crear_resultado_sin_patron(
+                    "Insuficiente historial para detectar patrones"
+                )
+            else:
+                analizables.append(i)
+
+        pares = [(casos[i][1], casos[i][0]) for i in analizables]
+        patrones_temporales = self._patrones_temporales_lote(pares)
+        patrones_monto = self._patrones_monto_lote(pares)
+
+        for i, patron_temporal, patron_monto in zip(analizables, patrones_temporales, patrones_monto):
+            resultados[i] = self._construir_resultado(casos[i][1], patron_temporal, patron_monto)
+
+        return resultados
+
+    def _construir_resultado(
+        self,
+        facturas_historicas: List[Factura],
+        patron_temporal: PatronTemporal,
+        patron_monto: PatronMonto
+    ) -> ResultadoAnalisisPatron:
+        """Combina los patrones temporal y de monto en el resultado final."""
         # Calcular confianza global
         confianza_global = self._calcular_confianza_global(patron_temporal, patron_monto)
         
@@ -105,60 +140,60 @@ class PatternDetector:
         factura_nueva: Factura
     ) -> PatronTemporal:
         """Analiza el patrón temporal de las facturas históricas."""
-        fechas = [f.fecha_emision for f in facturas_historicas] + [factura_nueva.fecha_emision]
-        fechas.sort()
-        
-        if len(fechas) < 2:
-            return PatronTemporal("insuficiente", 0.0, 0.0, False, 0.0)
-        
-        # Calcular diferencias entre fechas consecutivas
-        diferencias_dias = []
-        for i in range(1, len(fechas)):
-            diff = (fechas[i] - fechas[i-1]).days
-            diferencias_dias.append(diff)
-        
-        if not diferencias_dias:
-            return PatronTemporal("insuficiente", 0.0, 0.0, False, 0.0)
-        
-        # Estadísticas básicas
-        promedio_dias = statistics.mean(diferencias_dias)
-        desviacion = statistics.stdev(diferencias_dias) if len(diferencias_dias) > 1 else 0.0
-        
-        # Clasificar tipo de patrón
-        tipo_patron = self._clasificar_patron_temporal(promedio_dias)
-        
-        # Determinar si es consistente
-        consistente = desviacion <= self.umbrales['desviacion_max_consistente']
-        
-        # Calcular confianza temporal
-        confianza = self._calcular_confianza_temporal(
-            promedio_dias, desviacion, len(diferencias_dias), consistente
-        )
-        
-        return PatronTemporal(
-            tipo=tipo_patron,
-            promedio_dias=promedio_dias,
-            desviacion_estandar=desviacion,
-            consistente=consistente,
-            confianza=confianza
-        )
+        return self._patrones_temporales_lote([(facturas_historicas, factura_nueva)])[0]
+
+    def _patrones_temporales_lote(
+        self,
+        casos: Sequence[Tuple[List[Factura], Factura]]
+    ) -> List[PatronTemporal]:
+        """Patrón temporal de cada caso (historial + factura nueva), vectorizado."""
+        if not casos:
+            return []
+
+        grupos, dias = [], []
+        for i, (facturas_historicas, factura_nueva) in enumerate(casos):
+            fechas = [f.fecha_emision for f in facturas_historicas] + [factura_nueva.fecha_emision]
+            grupos.extend([i] * len(fechas))
+            dias.extend(fecha.toordinal() for fecha in fechas)
+
+        # Diferencias entre fechas consecutivas de cada caso
+        intervalos = intervalos_por_grupo(np.asarray(grupos), np.asarray(dias), len(casos))
+        tipos = clasificar_por_rangos(intervalos.media, self._rangos_patron_temporal(), 'irregular')
+        consistentes = intervalos.desviacion <= self.umbrales['desviacion_max_consistente']
+
+        patrones = []
+        for i in range(len(casos)):
+            num_intervalos = int(intervalos.n[i])
+            if num_intervalos == 0:
+                patrones.append(PatronTemporal("insuficiente", 0.0, 0.0, False, 0.0))
+                continue
+
+            promedio_dias = float(intervalos.media[i])
+            desviacion = float(intervalos.desviacion[i])
+            consistente = bool(consistentes[i])
+
+            patrones.append(PatronTemporal(
+                tipo=str(tipos[i]),
+                promedio_dias=promedio_dias,
+                desviacion_estandar=desviacion,
+                consistente=consistente,
+                confianza=self._calcular_confianza_temporal(
+                    promedio_dias, desviacion, num_intervalos, consistente
+                )
+            ))
+
+        return patrones
 
-    def _clasificar_patron_temporal(self, promedio_dias: float) -> str:
-        """Clasifica el tipo de patrón temporal basado en el promedio de días."""
+    def _rangos_patron_temporal(self) -> List[Tuple[float, float, str]]:
+        """Rangos (mín, máx, tipo) en orden de prioridad; fuera de todos → irregular."""
         umbrales = self.umbrales
-        
-        if umbrales['dias_semanal_min'] <= promedio_dias <= umbrales['dias_semanal_max']:
-            return 'semanal'
-        elif umbrales['dias_quincenal_min'] <= promedio_dias <= umbrales['dias_quincenal_max']:
-            return 'quincenal'
-        elif umbrales['dias_mensual_min'] <= promedio_dias <= umbrales['dias_mensual_max']:
-            return 'mensual'
-        elif 60 <= promedio_dias <= 95:
-            return 'bimestral'
-        elif 85 <= promedio_dias <= 105:
-            return 'trimestral'
-        else:
-            return 'irregular'
+        return [
+            (umbrales['dias_semanal_min'], umbrales['dias_semanal_max'], 'semanal'),
+            (umbrales['dias_quincenal_min'], umbrales['dias_quincenal_max'], 'quincenal'),
+            (umbrales['dias_mensual_min'], umbrales['dias_mensual_max'], 'mensual'),
+            (60, 95, 'bimestral'),
+            (85, 105, 'trimestral'),
+        ]
 
     def _calcular_confianza_temporal(
         self,
@@ -197,41 +232,63 @@ class PatternDetector:
         factura_nueva: Factura
     ) -> PatronMonto:
         """Analiza el patrón de montos de las facturas."""
-        montos = [f.total_a_pagar for f in facturas_historicas if f.total_a_pagar]
-        
-        if not montos:
-            return PatronMonto(Decimal('0'), 100.0, [], False, 0.0)
-        
-        monto_nuevo = factura_nueva.total_a_pagar or Decimal('0')
-        montos_todos = montos + [monto_nuevo]
-        
-        # Calcular estadísticas
-        monto_promedio = sum(montos) / len(montos)
-        
-        # Calcular variación porcentual
-        if monto_promedio > 0:
-            variaciones = [
-                abs(float(monto - monto_promedio)) / float(monto_promedio) * 100
-                for monto in montos_todos
-            ]
-            variacion_maxima = max(variaciones) if variaciones else 0.0
-        else:
-            variacion_maxima = 100.0
-        
-        # Determinar estabilidad
-        estable = variacion_maxima <= self.umbrales['variacion_monto_max_estable']
-        
-        # Calcular confianza de monto
-        confianza = self._calcular_confianza_monto(variacion_maxima, len(montos), estable)
-        
-        return PatronMonto(
-            monto_promedio=monto_promedio,
-            variacion_porcentaje=variacion_maxima,
-            montos_historicos=montos,
-            estable=estable,
-            confianza=confianza
+        return self._patrones_monto_lote([(facturas_historicas, factura_nueva)])[0]
+
+    def _patrones_monto_lote(
+        self,
+        casos: Sequence[Tuple[List[Factura], Factura]]
+    ) -> List[PatronMonto]:
+        """Patrón de montos de cada caso (historial + factura nueva), vectorizado."""
+        if not casos:
+            return []
+
+        montos_por_caso: List[List[Decimal]] = []
+        promedios: List[Decimal] = []
+        grupos, valores = [], []
+
+        for i, (facturas_historicas, factura_nueva) in enumerate(casos):
+            montos = [f.total_a_pagar for f in facturas_historicas if f.total_a_pagar]
+            montos_por_caso.append(montos)
+
+            if not montos:
+                promedios.append(Decimal('0'))
+                continue
+
+            # Promedio exacto en Decimal (se reporta y lo usa DecisionEngine)
+            promedios.append(sum(montos) / len(montos))
+
+            montos_todos = montos + [factura_nueva.total_a_pagar or Decimal('0')]
+            grupos.extend([i] * len(montos_todos))
+            valores.extend(float(monto) for monto in montos_todos)
+
+        variaciones = variacion_maxima_porcentual(
+            np.asarray(grupos, dtype=np.int64),
+            np.asarray(valores, dtype=np.float64),
+            np.asarray([float(p) for p in promedios], dtype=np.float64),
+            len(casos)
         )
 
+        patrones = []
+        for i, montos in enumerate(montos_por_caso):
+            if not montos:
+                patrones.append(PatronMonto(Decimal('0'), 100.0, [], False, 0.0))
+                continue
+
+            variacion_maxima = float(variaciones[i])
+            
+            # Determinar estabilidad
+            estable = variacion_maxima <= self.umbrales['variacion_monto_max_estable']
+
+            patrones.append(PatronMonto(
+                monto_promedio=promedios[i],
+                variacion_porcentaje=variacion_maxima,
+                montos_historicos=montos,
+                estable=estable,
+                confianza=self._calcular_confianza_monto(variacion_maxima, len(montos), estable)
+            ))
+
+        return patrones
+
     def _calcular_confianza_monto(
         self,
         variacion_maxima: float,
@@ -0,0 +1,724 @@
+"""
+Búsqueda de proveedores y facturas (índice embebido de términos + trigramas).
+
+Las búsquedas por texto usaban LIKE '%texto%' sobre razon_social /
+numero_factura: escaneo completo de la tabla, sin ranking y sin tolerancia a
+errores de digitación. Este módulo mantiene un índice invertido propio en
+tablas de la BD (app/models/busqueda.py), portable entre MySQL y SQLite:
+
+Indexación (IndiceBusquedaService)
+- Documento de factura: número, razón social del proveedor, concepto
+  normalizado y descripciones de ítems; de proveedor: razón social y área.
+- Incremental por marca de agua sobre facturas.actualizado_en: las facturas
+  las inserta invoice_extractor con SQL directo, así que no hay listeners ORM
+  que avisen; cada ejecución lee lo cambiado desde la última marca.
+- Cada documento guarda una huella (MD5 del contenido): si no cambió no se
+  tocan sus postings.
+- Reconciliación periódica: reindexa todo y elimina documentos huérfanos.
+
+Consulta (BusquedaService)
+1. CUFE / NIT: búsqueda por prefijo sobre sus índices únicos
+2. Cada palabra se expande a términos del vocabulario: exacto, prefijo y,
+   si no existe exacto, términos parecidos por similitud de trigramas
+3. Candidatos: postings de la palabra más selectiva (menor frecuencia),
+   filtrados por grupo, acotados a MAX_CANDIDATOS
+4. Ranking: Σ idf × similitud × log(1 + peso); se exigen todas las palabras
+   y, si ninguna entidad las tiene todas, se ordena por palabras coincidentes
+"""
+
+import hashlib
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, case, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.busqueda import BusquedaDocumento, BusquedaPosting, BusquedaTermino, BusquedaTrigrama
+from app.models.estado_tarea import EstadoTareaProgramada
+from app.models.factura import Factura
+from app.models.factura_item import FacturaItem
+from app.models.proveedor import Proveedor
+
+logger = logging.getLogger(__name__)
+
+
+TIPO_PROVEEDOR = "proveedor"
+TIPO_FACTURA = "factura"
+
+LONGITUD_MAXIMA_TERMINO = 64
+PESO_MAXIMO = 255
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+PALABRAS_VACIAS = frozenset({
+    "de", "del", "la", "las", "el", "los", "y", "e", "o", "u", "en", "con", "por",
+    "para", "al", "a", "un", "una", "que", "se", "su", "sus", "the", "of", "and",
+})
+
+
+# ----------------------------------------------------------------------
+# Normalización de texto
+# ----------------------------------------------------------------------
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin tildes ('Compañía Eléctrica' → 'compania electrica')."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """Términos indexables del texto (sin palabras vacías ni de una letra)."""
+    return [
+        token[:LONGITUD_MAXIMA_TERMINO]
+        for token in _NO_ALFANUMERICO.split(normalizar(texto))
+        if len(token) >= 2 and token not in PALABRAS_VACIAS
+    ]
+
+
+def trigramas(termino: str) -> Set[str]:
+    """Trigramas del término con bordes marcados ('$ab', 'abc', 'bc$')."""
+    marcado = f"${termino}$"
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+
+def admite_difuso(termino: str) -> bool:
+    """Solo términos alfabéticos de 4+ letras: números y códigos se buscan exactos."""
+    return len(termino) >= 4 and termino.isalpha()
+
+
+def similitud(a: Set[str], b: Set[str]) -> float:
+    """Jaccard entre conjuntos de trigramas."""
+    if not a or not b:
+        return 0.0
+    comunes = len(a & b)
+    return comunes / (len(a) + len(b) - comunes)
+
+
+def _escapar_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _bloques(valores: Sequence, tamano: int) -> Iterable[Sequence]:
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+# ----------------------------------------------------------------------
+# Indexación
+# ----------------------------------------------------------------------
+
+@dataclass
+class DocumentoIndexable:
+    """Contenido a indexar de una entidad."""
+    tipo: str
+    entidad_id: int
+    titulo: Optional[str]
+    subtitulo: Optional[str]
+    grupo_id: Optional[int] = None
+    proveedor_id: Optional[int] = None
+    pesos: Dict[str, int] = field(default_factory=dict)
+
+    def agregar(self, texto: Optional[str], peso: int) -> None:
+        for termino in tokenizar(texto):
+            self.pesos[termino] = min(self.pesos.get(termino, 0) + peso, PESO_MAXIMO)
+
+    @property
+    def huella(self) -> str:
+        contenido = "|".join([
+            str(self.titulo or ""), str(self.subtitulo or ""),
+            str(self.grupo_id or ""), str(self.proveedor_id or ""),
+            ",".join(f"{t}:{p}" for t, p in sorted(self.pesos.items())),
+        ])
+        return hashlib.md5(contenido.encode("utf-8")).hexdigest()
+
+
+class IndiceBusquedaService:
+    """Mantiene busqueda_documentos / terminos / trigramas / postings."""
+
+    NOMBRE_TAREA = "indice_busqueda"
+    DIAS_RECONCILIACION = 7
+    # Solape al leer desde la marca de agua (transacciones confirmadas tarde);
+    # las facturas sin cambios se omiten por huella
+    MARGEN_MARCA_AGUA = timedelta(minutes=10)
+    TAMANO_BLOQUE = 500
+    MAX_ITEMS_FACTURA = 30
+
+    # Peso por campo
+    PESO_TITULO = 3
+    PESO_PROVEEDOR = 2
+    PESO_CONCEPTO = 2
+    PESO_ITEM = 1
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.stats = {
+            'documentos_actualizados': 0,
+            'documentos_sin_cambios': 0,
+            'documentos_eliminados': 0,
+            'terminos_nuevos': 0,
+        }
+
+    # -- Construcción de documentos ------------------------------------
+
+    def _documentos_facturas(self, factura_ids: Sequence[int]) -> Dict[int, DocumentoIndexable]:
+        filas = self.db.query(
+            Factura.id, Factura.numero_factura, Factura.grupo_id, Factura.proveedor_id,
+            Factura.concepto_normalizado, Factura.concepto_principal, Proveedor.razon_social
+        ).outerjoin(Proveedor, Proveedor.id == Factura.proveedor_id).filter(
+            Factura.id.in_(factura_ids)
+        ).all()
+
+        items: Dict[int, List[str]] = defaultdict(list)
+        for factura_id, descripcion in self.db.query(FacturaItem.factura_id, FacturaItem.descripcion).filter(
+            FacturaItem.factura_id.in_(factura_ids)
+        ).order_by(FacturaItem.factura_id, FacturaItem.numero_linea):
+            descripciones = items[factura_id]
+            if descripcion and descripcion not in descripciones and len(descripciones) < self.MAX_ITEMS_FACTURA:
+                descripciones.append(descripcion)
+
+        documentos = {}
+        for fila in filas:
+            documento = DocumentoIndexable(
+                tipo=TIPO_FACTURA, entidad_id=fila.id,
+                titulo=fila.numero_factura, subtitulo=fila.razon_social,
+                grupo_id=fila.grupo_id, proveedor_id=fila.proveedor_id,
+            )
+            documento.agregar(fila.numero_factura, self.PESO_TITULO)
+            documento.agregar(fila.razon_social, self.PESO_PROVEEDOR)
+            documento.agregar(fila.concepto_normalizado or fila.concepto_principal, self.PESO_CONCEPTO)
+            for descripcion in items.get(fila.id, ()):
+                documento.agregar(descripcion, self.PESO_ITEM)
+            documentos[fila.id] = documento
+        return documentos
+
+    def _documentos_proveedores(self, proveedor_ids: Optional[Sequence[int]] = None) -> Dict[int, DocumentoIndexable]:
+        query = self.db.query(Proveedor.id, Proveedor.nit, Proveedor.razon_social, Proveedor.area)
+        if proveedor_ids is not None:
+            query = query.filter(Proveedor.id.in_(proveedor_ids))
+
+        documentos = {}
+        for fila in query:
+            documento = DocumentoIndexable(
+                tipo=TIPO_PROVEEDOR, entidad_id=fila.id,
+                titulo=fila.razon_social, subtitulo=fila.nit, proveedor_id=fila.id,
+            )
+            documento.agregar(fila.razon_social, self.PESO_TITULO)
+            documento.agregar(fila.area, self.PESO_ITEM)
+            documentos[fila.id] = documento
+        return documentos
+
+    # -- Escritura del índice ------------------------------------------
+
+    def indexar_facturas(self, factura_ids: Sequence[int]) -> None:
+        """Indexa (o reindexa) las facturas indicadas; un commit por bloque."""
+        for bloque in _bloques(list(factura_ids), self.TAMANO_BLOQUE):
+            self._sincronizar(TIPO_FACTURA, self._documentos_facturas(bloque))
+
+    def indexar_proveedores(self, proveedor_ids: Optional[Sequence[int]] = None) -> None:
+        """Indexa los proveedores indicados (todos si no se indican)."""
+        documentos = self._documentos_proveedores(proveedor_ids)
+        ids = sorted(documentos)
+        for bloque in _bloques(ids, self.TAMANO_BLOQUE):
+            self._sincronizar(TIPO_PROVEEDOR, {i: documentos[i] for i in bloque})
+
+    def eliminar(self, tipo: str, entidad_ids: Sequence[int]) -> None:
+        """Quita entidades del índice (p.ej. facturas eliminadas)."""
+        for bloque in _bloques(list(entidad_ids), self.TAMANO_BLOQUE):
+            existentes = self.db.query(BusquedaDocumento.id).filter(
+                BusquedaDocumento.tipo == tipo,
+                BusquedaDocumento.entidad_id.in_(bloque)
+            ).all()
+            documento_ids = [fila.id for fila in existentes]
+            if not documento_ids:
+                continue
+            self._quitar_postings(documento_ids)
+            self.db.query(BusquedaDocumento).filter(
+                BusquedaDocumento.id.in_(documento_ids)
+            ).delete(synchronize_session=False)
+            self.stats['documentos_eliminados'] += len(documento_ids)
+            self.db.commit()
+
+    def _sincronizar(self, tipo: str, documentos: Dict[int, DocumentoIndexable]) -> None:
+        """Reemplaza postings de los documentos cuya huella cambió."""
+        if not documentos:
+            return
+
+        existentes = {
+            doc.entidad_id: doc
+            for doc in self.db.query(BusquedaDocumento).filter(
+                BusquedaDocumento.tipo == tipo,
+                BusquedaDocumento.entidad_id.in_(list(documentos))
+            )
+        }
+
+        cambiados = []
+        for entidad_id, documento in documentos.items():
+            existente = existentes.get(entidad_id)
+            if existente is not None and existente.huella == documento.huella:
+                self.stats['documentos_sin_cambios'] += 1
+                continue
+            cambiados.append(documento)
+        if not cambiados:
+            return
+
+        # Postings anteriores de los documentos que cambian
+        self._quitar_postings([
+            existentes[d.entidad_id].id for d in cambiados if d.entidad_id in existentes
+        ])
+
+        filas_documento = []
+        for documento in cambiados:
+            fila = existentes.get(documento.entidad_id)
+            if fila is None:
+                fila = BusquedaDocumento(tipo=tipo, entidad_id=documento.entidad_id)
+                self.db.add(fila)
+            fila.titulo = (documento.titulo or "")[:255] or None
+            fila.subtitulo = (documento.subtitulo or "")[:255] or None
+            fila.grupo_id = documento.grupo_id
+            fila.proveedor_id = documento.proveedor_id
+            fila.huella = documento.huella
+            filas_documento.append((fila, documento))
+        self.db.flush()
+
+        termino_ids = self._obtener_terminos({t for d in cambiados for t in d.pesos})
+
+        postings = []
+        frecuencias: Counter = Counter()
+        for fila, documento in filas_documento:
+            for termino, peso in documento.pesos.items():
+                postings.append({'termino_id': termino_ids[termino], 'documento_id': fila.id, 'peso': peso})
+                frecuencias[termino_ids[termino]] += 1
+        if postings:
+            self.db.execute(BusquedaPosting.__table__.insert(), postings)
+        self._ajustar_frecuencias(frecuencias, signo=1)
+
+        self.stats['documentos_actualizados'] += len(cambiados)
+        self.db.commit()
+
+    def _quitar_postings(self, documento_ids: List[int]) -> None:
+        if not documento_ids:
+            return
+        frecuencias = Counter(
+            fila.termino_id for fila in self.db.query(BusquedaPosting.termino_id).filter(
+                BusquedaPosting.documento_id.in_(documento_ids)
+            )
+        )
+        self.db.query(BusquedaPosting).filter(
+            BusquedaPosting.documento_id.in_(documento_ids)
+        ).delete(synchronize_session=False)
+        self._ajustar_frecuencias(frecuencias, signo=-1)
+
+    def _ajustar_frecuencias(self, frecuencias: Counter, signo: int) -> None:
+        """documentos = documentos ± n, en un executemany."""
+        if not frecuencias:
+            return
+        tabla = BusquedaTermino.__table__
+        sentencia = tabla.update().where(tabla.c.id == bindparam('b_id')).values(
+            documentos=tabla.c.documentos + bindparam('b_delta')
+        )
+        self.db.execute(sentencia, [
+            {'b_id': termino_id, 'b_delta': signo * n} for termino_id, n in frecuencias.items()
+        ])
+
+    def _obtener_terminos(self, terminos: Set[str]) -> Dict[str, int]:
+        """termino → id, creando los que no existen (con sus trigramas)."""
+        ids: Dict[str, int] = {}
+        pendientes = sorted(terminos)
+        for bloque in _bloques(pendientes, self.TAMANO_BLOQUE):
+            ids.update(self.db.query(BusquedaTermino.termino, BusquedaTermino.id).filter(
+                BusquedaTermino.termino.in_(bloque)
+            ).all())
+
+        nuevos = [t for t in pendientes if t not in ids]
+        if not nuevos:
+            return ids
+
+        self.db.execute(BusquedaTermino.__table__.insert(), [{'termino': t, 'documentos': 0} for t in nuevos])
+        for bloque in _bloques(nuevos, self.TAMANO_BLOQUE):
+            ids.update(self.db.query(BusquedaTermino.termino, BusquedaTermino.id).filter(
+                BusquedaTermino.termino.in_(bloque)
+            ).all())
+
+        filas_trigramas = [
+            {'trigrama': trigrama, 'termino_id': ids[termino]}
+            for termino in nuevos if admite_difuso(termino)
+            for trigrama in trigramas(termino)
+        ]
+        if filas_trigramas:
+            self.db.execute(BusquedaTrigrama.__table__.insert(), filas_trigramas)
+        self.stats['terminos_nuevos'] += len(nuevos)
+        return ids
+
+    # -- Mantenimiento programado --------------------------------------
+
+    def actualizar_incremental(self, dias_reconciliacion: Optional[int] = None) -> dict:
+        """
+        Indexa facturas cambiadas desde la marca de agua y proveedores cambiados.
+
+        Sin marca de agua, o con la última reconciliación vencida, reindexa todo.
+        """
+        if dias_reconciliacion is None:
+            dias_reconciliacion = self.DIAS_RECONCILIACION
+
+        estado = self._obtener_estado_tarea()
+        if self._requiere_reconciliacion(estado, dias_reconciliacion):
+            return self.reindexar_todo()
+
+        # Marca de agua tomada ANTES de leer
+        marca_agua = self.db.query(func.max(Factura.actualizado_en)).scalar()
+        desde = estado.marca_agua - self.MARGEN_MARCA_AGUA
+        factura_ids = [
+            fila.id for fila in self.db.query(Factura.id).filter(Factura.actualizado_en >= desde)
+        ]
+        self.indexar_facturas(factura_ids)
+        # Proveedores: catálogo pequeño sin actualizado_en; la huella descarta los que no cambian
+        self.indexar_proveedores()
+
+        self._registrar_estado_tarea(marca_agua or estado.marca_agua, reconciliacion=False)
+        return {'modo': 'incremental', 'facturas_revisadas': len(factura_ids), **self.stats}
+
+    def reindexar_todo(self) -> dict:
+        """Reconciliación: indexa todas las entidades y elimina documentos huérfanos."""
+        marca_agua = self.db.query(func.max(Factura.actualizado_en)).scalar()
+
+        ultimo_id = 0
+        while True:
+            ids = [fila.id for fila in self.db.query(Factura.id).filter(
+                Factura.id > ultimo_id
+            ).order_by(Factura.id).limit(self.TAMANO_BLOQUE)]
+            if not ids:
+                break
+            self.indexar_facturas(ids)
+            ultimo_id = ids[-1]
+        self.indexar_proveedores()
+
+        for tipo, modelo in ((TIPO_FACTURA, Factura), (TIPO_PROVEEDOR, Proveedor)):
+            huerfanos = [fila.entidad_id for fila in self.db.query(BusquedaDocumento.entidad_id).outerjoin(
+                modelo, modelo.id == BusquedaDocumento.entidad_id
+            ).filter(BusquedaDocumento.tipo == tipo, modelo.id.is_(None))]
+            self.eliminar(tipo, huerfanos)
+
+        self._registrar_estado_tarea(marca_agua, reconciliacion=True)
+        return {'modo': 'reconciliacion', **self.stats}
+
+    def _obtener_estado_tarea(self) -> EstadoTareaProgramada:
+        estado = self.db.get(EstadoTareaProgramada, self.NOMBRE_TAREA)
+        if estado is None:
+            estado = EstadoTareaProgramada(nombre=self.NOMBRE_TAREA)
+        return estado
+
+    def _requiere_reconciliacion(self, estado: EstadoTareaProgramada, dias_reconciliacion: int) -> bool:
+        if estado.marca_agua is None or estado.ultima_reconciliacion is None:
+            return True
+        ultima = estado.ultima_reconciliacion.replace(tzinfo=None)
+        return datetime.utcnow() - ultima >= timedelta(days=dias_reconciliacion)
+
+    def _registrar_estado_tarea(self, marca_agua: Optional[datetime], reconciliacion: bool) -> None:
+        try:
+            estado = self.db.merge(self._obtener_estado_tarea())
+            if marca_agua is not None:
+                estado.marca_agua = marca_agua
+            if reconciliacion:
+                estado.ultima_reconciliacion = datetime.utcnow()
+            estado.detalle = dict(self.stats)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error registrando marca de agua del índice de búsqueda: {str(e)}")
+
+
+# ----------------------------------------------------------------------
+# Consulta
+# ----------------------------------------------------------------------
+
+@dataclass
+class ResultadoBusqueda:
+    tipo: str
+    id: int
+    titulo: Optional[str]
+    subtitulo: Optional[str]
+    puntaje: float
+    detalle: dict = field(default_factory=dict)
+
+
+class BusquedaService:
+    """Consulta el índice con ranking, filtro por grupos y tolerancia a errores."""
+
+    MAX_PALABRAS = 8
+    MAX_EXPANSIONES_PREFIJO = 20
+    MAX_EXPANSIONES_DIFUSAS = 10
+    MAX_CANDIDATOS = 2000
+    UMBRAL_SIMILITUD = 0.4
+    SIMILITUD_PREFIJO = 0.9
+    FACTOR_DIFUSO = 0.8
+    # Tamaño de referencia para el idf: evita un COUNT(*) por consulta
+    DOCUMENTOS_REFERENCIA = 1_000_000
+    PUNTAJE_EXACTO = 1000.0
+    LONGITUD_MINIMA_IDENTIFICADOR = 5
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def buscar(
+        self,
+        q: str,
+        grupos: Optional[List[int]] = None,
+        tipo: Optional[str] = None,
+        limit: int = 20
+    ) -> List[ResultadoBusqueda]:
+        """
+        Busca proveedores y facturas.
+
+        Args:
+            q: Texto libre, número de factura, CUFE o NIT
+            grupos: Grupos visibles (None = sin restricción). Los proveedores
+                    son catálogo global y se muestran siempre.
+            tipo: 'proveedor' | 'factura' | None (ambos)
+            limit: Máximo de resultados
+        """
+        resultados: Dict[Tuple[str, int], ResultadoBusqueda] = {}
+        for resultado in self._buscar_identificador(q, grupos, tipo, limit):
+            resultados[(resultado.tipo, resultado.id)] = resultado
+
+        palabras = list(dict.fromkeys(tokenizar(q)))[:self.MAX_PALABRAS]
+        if palabras:
+            for resultado in self._buscar_texto(palabras, grupos, tipo, limit):
+                resultados.setdefault((resultado.tipo, resultado.id), resultado)
+
+        ordenados = sorted(resultados.values(), key=lambda r: r.puntaje, reverse=True)[:limit]
+        return self._completar_detalle(ordenados)
+
+    # -- CUFE / NIT ----------------------------------------------------
+
+    def _buscar_identificador(self, q, grupos, tipo, limit) -> List[ResultadoBusqueda]:
+        compacto = re.sub(r"\s+", "", q or "")
+        # CUFE (hexadecimal) y NIT siempre tienen dígitos
+        if (len(compacto) < self.LONGITUD_MINIMA_IDENTIFICADOR or not compacto.isascii()
+                or not any(c.isdigit() for c in compacto)):
+            return []
+        prefijo = _escapar_like(compacto) + "%"
+        resultados = []
+
+        if tipo in (None, TIPO_FACTURA):
+            query = self.db.query(Factura.id, Factura.numero_factura).filter(
+                Factura.cufe.like(prefijo, escape="\\")
+            )
+            if grupos is not None:
+                query = query.filter(Factura.grupo_id.in_(grupos or [-1]))
+            resultados += [
+                ResultadoBusqueda(TIPO_FACTURA, fila.id, fila.numero_factura, None, self.PUNTAJE_EXACTO)
+                for fila in query.limit(limit)
+            ]
+
+        if tipo in (None, TIPO_PROVEEDOR):
+            resultados += [
+                ResultadoBusqueda(TIPO_PROVEEDOR, fila.id, fila.razon_social, fila.nit, self.PUNTAJE_EXACTO)
+                for fila in self.db.query(Proveedor.id, Proveedor.razon_social, Proveedor.nit).filter(
+                    Proveedor.nit.like(prefijo, escape="\\")
+                ).limit(limit)
+            ]
+        return resultados
+
+    # -- Texto ---------------------------------------------------------
+
+    def _expandir(self, palabra: str) -> Dict[int, Tuple[float, int]]:
+        """termino_id → (similitud, frecuencia de documento)."""
+        expansiones: Dict[int, Tuple[float, int]] = {}
+        exacto = False
+
+        query = self.db.query(BusquedaTermino.id, BusquedaTermino.termino, BusquedaTermino.documentos)
+        if len(palabra) >= 3:
+            query = query.filter(
+                BusquedaTermino.termino.like(_escapar_like(palabra) + "%", escape="\\")
+            ).order_by(
+                case((BusquedaTermino.termino == palabra, 0), else_=1),
+                BusquedaTermino.documentos.desc()
+            ).limit(self.MAX_EXPANSIONES_PREFIJO)
+        else:
+            query = query.filter(BusquedaTermino.termino == palabra)
+
+        for fila in query:
+            if fila.documentos <= 0:
+                continue
+            if fila.termino == palabra:
+                exacto = True
+                expansiones[fila.id] = (1.0, fila.documentos)
+            else:
+                expansiones[fila.id] = (self.SIMILITUD_PREFIJO, fila.documentos)
+
+        if not exacto and admite_difuso(palabra):
+            expansiones.update({
+                termino_id: valor for termino_id, valor in self._expandir_difuso(palabra).items()
+                if termino_id not in expansiones
+            })
+        return expansiones
+
+    def _expandir_difuso(self, palabra: str) -> Dict[int, Tuple[float, int]]:
+        """Términos con similitud de trigramas >= UMBRAL_SIMILITUD."""
+        propios = trigramas(palabra)
+        # Jaccard >= t implica al menos t × |propios| trigramas en común
+        minimo = max(1, math.ceil(self.UMBRAL_SIMILITUD * len(propios)))
+        comunes = func.count(BusquedaTrigrama.trigrama)
+        candidatos = self.db.query(BusquedaTrigrama.termino_id).filter(
+            BusquedaTrigrama.trigrama.in_(propios)
+        ).group_by(BusquedaTrigrama.termino_id).having(comunes >= minimo).order_by(
+            comunes.desc()
+        ).limit(self.MAX_EXPANSIONES_DIFUSAS * 5).subquery()
+
+        puntuados = []
+        for fila in self.db.query(BusquedaTermino.id, BusquedaTermino.termino, BusquedaTermino.documentos).join(
+            candidatos, candidatos.c.termino_id == BusquedaTermino.id
+        ):
+            if fila.documentos <= 0:
+                continue
+            valor = similitud(propios, trigramas(fila.termino))
+            if valor >= self.UMBRAL_SIMILITUD:
+                puntuados.append((valor, fila.id, fila.documentos))
+
+        puntuados.sort(reverse=True)
+        return {
+            termino_id: (valor * self.FACTOR_DIFUSO, documentos)
+            for valor, termino_id, documentos in puntuados[:self.MAX_EXPANSIONES_DIFUSAS]
+        }
+
+    def _postings(self, termino_ids, grupos, tipo, documento_ids=None, limite=None):
+        query = self.db.query(
+            BusquedaPosting.documento_id, BusquedaPosting.termino_id, BusquedaPosting.peso
+        ).filter(BusquedaPosting.termino_id.in_(list(termino_ids)))
+
+        if grupos is not None or tipo is not None:
+            query = query.join(BusquedaDocumento, BusquedaDocumento.id == BusquedaPosting.documento_id)
+            if tipo is not None:
+                query = query.filter(BusquedaDocumento.tipo == tipo)
+            if grupos is not None:
+                query = query.filter(or_(
+                    BusquedaDocumento.tipo == TIPO_PROVEEDOR,
+                    BusquedaDocumento.grupo_id.in_(grupos or [-1])
+                ))
+        if documento_ids is not None:
+            query = query.filter(BusquedaPosting.documento_id.in_(documento_ids))
+        if limite is not None:
+            # Más recientes primero cuando hay que acotar
+            query = query.order_by(BusquedaPosting.documento_id.desc()).limit(limite)
+        return query.all()
+
+    def _buscar_texto(self, palabras, grupos, tipo, limit) -> List[ResultadoBusqueda]:
+        expansiones = {palabra: self._expandir(palabra) for palabra in palabras}
+        expansiones = {p: e for p, e in expansiones.items() if e}
+        if not expansiones:
+            return []
+
+        def idf(documentos: int) -> float:
+            return math.log(1 + self.DOCUMENTOS_REFERENCIA / max(documentos, 1))
+
+        # termino_id → [(palabra, ponderación)]
+        por_termino: Dict[int, List[Tuple[str, float]]] = defaultdict(list)
+        for palabra, terminos in expansiones.items():
+            for termino_id, (valor, documentos) in terminos.items():
+                por_termino[termino_id].append((palabra, valor * idf(documentos)))
+
+        def puntuar(postings, acumulado):
+            for documento_id, termino_id, peso in postings:
+                for palabra, ponderacion in por_termino.get(termino_id, ()):
+                    puntaje = ponderacion * math.log(1 + peso)
+                    por_palabra = acumulado[documento_id]
+                    por_palabra[palabra] = max(por_palabra.get(palabra, 0.0), puntaje)
+
+        # Candidatos: la palabra más selectiva
+        selectiva = min(expansiones, key=lambda p: sum(d for _, d in expansiones[p].values()))
+        acumulado: Dict[int, Dict[str, float]] = defaultdict(dict)
+        puntuar(self._postings(expansiones[selectiva], grupos, tipo, limite=self.MAX_CANDIDATOS), acumulado)
+
+        candidatos = list(acumulado)
+        for palabra, terminos in expansiones.items():
+            if palabra == selectiva:
+                continue
+            for bloque in _bloques(candidatos, 1000):
+                puntuar(self._postings(terminos, grupos, tipo, documento_ids=bloque), acumulado)
+
+        completos = {d: s for d, s in acumulado.items() if len(s) == len(expansiones)}
+        if not completos and len(expansiones) > 1:
+            # Ninguna entidad tiene todas las palabras: unión acotada por palabra
+            por_palabra = self.MAX_CANDIDATOS // len(expansiones)
+            for palabra, terminos in expansiones.items():
+                if palabra != selectiva:
+                    puntuar(self._postings(terminos, grupos, tipo, limite=por_palabra), acumulado)
+            completos = acumulado
+
+        mejores = sorted(
+            completos.items(),
+            key=lambda par: (len(par[1]), sum(par[1].values()), par[0]),
+            reverse=True
+        )[:limit]
+        if not mejores:
+            return []
+
+        documentos = {
+            doc.id: doc for doc in self.db.query(BusquedaDocumento).filter(
+                BusquedaDocumento.id.in_([documento_id for documento_id, _ in mejores])
+            )
+        }
+        return [
+            ResultadoBusqueda(
+                tipo=documentos[documento_id].tipo,
+                id=documentos[documento_id].entidad_id,
+                titulo=documentos[documento_id].titulo,
+                subtitulo=documentos[documento_id].subtitulo,
+                puntaje=round(sum(puntajes.values()), 4),
+            )
+            for documento_id, puntajes in mejores if documento_id in documentos
+        ]
+
+    # -- Detalle -------------------------------------------------------
+
+    def _completar_detalle(self, resultados: List[ResultadoBusqueda]) -> List[ResultadoBusqueda]:
+        """Agrega datos vigentes de la entidad; descarta entidades ya eliminadas."""
+        factura_ids = [r.id for r in resultados if r.tipo == TIPO_FACTURA]
+        proveedor_ids = [r.id for r in resultados if r.tipo == TIPO_PROVEEDOR]
+
+        facturas = {}
+        if factura_ids:
+            for fila in self.db.query(
+                Factura.id, Factura.numero_factura, Factura.estado, Factura.total_a_pagar,
+                Factura.fecha_emision, Factura.grupo_id, Proveedor.razon_social
+            ).outerjoin(Proveedor, Proveedor.id == Factura.proveedor_id).filter(Factura.id.in_(factura_ids)):
+                facturas[fila.id] = fila
+
+        proveedores = {}
+        if proveedor_ids:
+            for fila in self.db.query(Proveedor.id, Proveedor.nit, Proveedor.razon_social).filter(
+                Proveedor.id.in_(proveedor_ids)
+            ):
+                proveedores[fila.id] = fila
+
+        completos = []
+        for resultado in resultados:
+            if resultado.tipo == TIPO_FACTURA:
+                fila = facturas.get(resultado.id)
+                if fila is None:
+                    continue
+                resultado.titulo = fila.numero_factura
+                resultado.subtitulo = fila.razon_social
+                resultado.detalle = {
+                    'estado': fila.estado.value if hasattr(fila.estado, 'value') else fila.estado,
+                    'total_a_pagar': float(fila.total_a_pagar) if fila.total_a_pagar is not None else None,
+                    'fecha_emision': fila.fecha_emision.isoformat() if fila.fecha_emision else None,
+                    'grupo_id': fila.grupo_id,
+                }
+            else:
+                fila = proveedores.get(resultado.id)
+                if fila is None:
+                    continue
+                resultado.titulo = fila.razon_social
+                resultado.subtitulo = fila.nit
+                resultado.detalle = {'nit': fila.nit}
+            completos.append(resultado)
+        return completos
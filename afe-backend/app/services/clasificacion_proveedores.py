@@ -3,15 +3,23 @@ Servicio de clasificación automática de proveedores.
 
 Clasifica y reclasifica proveedores basándose en patrones
 de facturación y antigüedad.
+
+La reclasificación periódica usa un motor por lotes
+(`reclasificar_lote`): una consulta agrupada con las estadísticas de monto
+de todos los proveedores, clasificación vectorizada (NumPy) con las mismas
+reglas que `clasificar_proveedor_automatico` y un UPDATE masivo por llave
+primaria solo de las asignaciones que cambian.
 """
 
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
-from decimal import Decimal
+from decimal import Decimal, localcontext
 from statistics import mean, stdev
 
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, extract, func, select, update
 
 from app.models.factura import Factura, EstadoFactura
 from app.models.proveedor import Proveedor
@@ -20,6 +28,31 @@ from app.models.workflow_aprobacion import (
     TipoServicioProveedor,
     NivelConfianzaProveedor
 )
+from app.utils.logger import logger
+
+
+# Estados incluidos en el análisis estadístico (mismos que _obtener_facturas_para_analisis)
+ESTADOS_ANALISIS = [
+    EstadoFactura.aprobada,
+    EstadoFactura.aprobada_auto,
+    EstadoFactura.validada_contabilidad,
+    EstadoFactura.en_revision,
+]
+
+# Orden de los códigos usados en la clasificación vectorizada
+TIPOS = [
+    TipoServicioProveedor.SERVICIO_FIJO_MENSUAL,
+    TipoServicioProveedor.SERVICIO_VARIABLE_PREDECIBLE,
+    TipoServicioProveedor.SERVICIO_POR_CONSUMO,
+    TipoServicioProveedor.SERVICIO_EVENTUAL,
+]
+NIVELES = [
+    NivelConfianzaProveedor.NIVEL_1_CRITICO,
+    NivelConfianzaProveedor.NIVEL_2_ALTO,
+    NivelConfianzaProveedor.NIVEL_3_MEDIO,
+    NivelConfianzaProveedor.NIVEL_4_BAJO,
+    NivelConfianzaProveedor.NIVEL_5_NUEVO,
+]
 
 
 class ClasificacionProveedoresService:
@@ -205,64 +238,162 @@ class ClasificacionProveedoresService:
         """
         Reclasifica todos los proveedores (tarea mensual programada).
 
+        Delegado a `reclasificar_lote` (consulta agrupada + UPDATE masivo).
+
         Args:
             solo_cambios: Si True, solo actualiza si hubo cambio en clasificación
 
         Returns:
             Resumen de reclasificación
         """
-        asignaciones = self.db.query(AsignacionNitResponsable).filter(
-            AsignacionNitResponsable.activo == True
-        ).all()
+        return self.reclasificar_lote(solo_cambios=solo_cambios)
+
+    def reclasificar_lote(
+        self,
+        solo_cambios: bool = True,
+        simular: bool = False,
+        nits: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Reclasifica todas las asignaciones activas en lote.
+
+        1. Una consulta agrupada por proveedor: facturas, montos, suma y suma
+           de cuadrados de montos, primera fecha y meses con facturas
+        2. Media/desviación exactas (Decimal) y clasificación vectorizada con
+           las reglas de _determinar_tipo_servicio / _determinar_nivel_confianza
+           / _requiere_orden_compra
+        3. UPDATE masivo por llave primaria de las asignaciones que cambian
 
+        La clasificación es del proveedor (NIT): se escribe en todas las
+        asignaciones activas de ese NIT.
+
+        Args:
+            solo_cambios: True → solo escribe asignaciones cuyo tipo, nivel, CV,
+                OC obligatoria o fecha de inicio cambian; False → reescribe todas
+                (refresca metadata_riesgos)
+            simular: True → calcula y retorna los cambios sin escribir
+            nits: Limitar a estos NITs (None = todas las asignaciones activas)
+
+        Returns:
+            Resumen con total_procesados, actualizados (tipo o nivel cambió),
+            sin_cambios, escritos, cambios y tiempos (segundos por etapa)
+        """
+        tiempos = {}
+        inicio = time.perf_counter()
+
+        consulta = (
+            select(
+                AsignacionNitResponsable.id,
+                AsignacionNitResponsable.nit,
+                AsignacionNitResponsable.tipo_servicio_proveedor,
+                AsignacionNitResponsable.nivel_confianza_proveedor,
+                AsignacionNitResponsable.coeficiente_variacion_historico,
+                AsignacionNitResponsable.requiere_orden_compra_obligatoria,
+                AsignacionNitResponsable.fecha_inicio_relacion,
+                Proveedor.id,
+                Proveedor.razon_social,
+            )
+            .outerjoin(Proveedor, Proveedor.nit == AsignacionNitResponsable.nit)
+            .where(AsignacionNitResponsable.activo == True)
+            .order_by(AsignacionNitResponsable.id)
+        )
+        if nits is not None:
+            consulta = consulta.where(AsignacionNitResponsable.nit.in_(nits))
+        asignaciones = self.db.execute(consulta).all()
+        estadisticas = self._estadisticas_lote({fila[7] for fila in asignaciones if fila[7] is not None})
+        tiempos['consulta'] = time.perf_counter() - inicio
+
+        marca = time.perf_counter()
+        clasificacion = self._clasificar_lote(estadisticas)
+        tiempos['clasificacion'] = time.perf_counter() - marca
+
+        marca = time.perf_counter()
+        ahora = datetime.now()
         resultados = {
             'total_procesados': 0,
             'actualizados': 0,
             'sin_cambios': 0,
+            'escritos': 0,
             'errores': 0,
-            'cambios': []
+            'cambios': [],
+            'simulado': simular,
         }
-
-        for asignacion in asignaciones:
-            try:
-                # Guardar clasificación anterior
-                tipo_anterior = asignacion.tipo_servicio_proveedor
-                nivel_anterior = asignacion.nivel_confianza_proveedor
-
-                # Reclasificar
-                resultado = self.clasificar_proveedor_automatico(
-                    asignacion.nit,
-                    forzar_reclasificacion=True
-                )
-
-                if resultado['clasificado']:
-                    resultados['total_procesados'] += 1
-
-                    # Verificar si hubo cambio
-                    if (resultado['tipo_servicio'] != tipo_anterior or
-                        resultado['nivel_confianza'] != nivel_anterior):
-
-                        resultados['actualizados'] += 1
-
-                        # Manejar tanto enums como strings de BD
-                        tipo_ant_val = tipo_anterior.value if hasattr(tipo_anterior, 'value') else tipo_anterior
-                        nivel_ant_val = nivel_anterior.value if hasattr(nivel_anterior, 'value') else nivel_anterior
-
-                        resultados['cambios'].append({
-                            'nit': asignacion.nit,
-                            'nombre': asignacion.proveedor.razon_social if asignacion.proveedor else None,
-                            'tipo_anterior': tipo_ant_val,
-                            'tipo_nuevo': resultado['tipo_servicio'].value,
-                            'nivel_anterior': nivel_ant_val,
-                            'nivel_nuevo': resultado['nivel_confianza'].value
-                        })
-                    else:
-                        resultados['sin_cambios'] += 1
-
-            except Exception as e:
-                resultados['errores'] += 1
-                print(f"Error reclasificando {asignacion.nit}: {e}")
-
+        filas = []
+        for (asignacion_id, nit, tipo_anterior, nivel_anterior, cv_anterior, oc_anterior,
+             fecha_anterior, proveedor_id, razon_social) in asignaciones:
+            nuevo = clasificacion.get(proveedor_id)
+            if nuevo is None:
+                # Sin proveedor o con menos de facturas_minimas: clasificación conservadora
+                nuevo = {
+                    'tipo': TipoServicioProveedor.SERVICIO_EVENTUAL,
+                    'nivel': NivelConfianzaProveedor.NIVEL_5_NUEVO,
+                    'cv': None,
+                    'requiere_oc': True,
+                    'fecha_primera_factura': fecha_anterior or ahora,
+                    'metadata': {
+                        'clasificacion_inicial': True,
+                        'sin_historial': True,
+                        'razon': 'Proveedor nuevo sin facturas históricas',
+                        'nota': 'Se reclasificará automáticamente después de 3 meses con 3+ facturas'
+                    },
+                }
+            resultados['total_procesados'] += 1
+
+            tipo_nuevo, nivel_nuevo = nuevo['tipo'].value, nuevo['nivel'].value
+            clasificacion_cambio = tipo_nuevo != tipo_anterior or nivel_nuevo != nivel_anterior
+            fecha_nueva = nuevo['fecha_primera_factura']
+            if fecha_nueva is not None and not isinstance(fecha_nueva, datetime):
+                fecha_nueva = datetime.combine(fecha_nueva, datetime.min.time())
+            cambio = (
+                clasificacion_cambio
+                or nuevo['cv'] != (cv_anterior if cv_anterior is None else Decimal(cv_anterior))
+                or bool(nuevo['requiere_oc']) != bool(oc_anterior)
+                or (fecha_nueva.date() if fecha_nueva else None) != (fecha_anterior.date() if fecha_anterior else None)
+            )
+
+            if clasificacion_cambio:
+                resultados['actualizados'] += 1
+                resultados['cambios'].append({
+                    'nit': nit,
+                    'nombre': razon_social,
+                    'tipo_anterior': tipo_anterior,
+                    'tipo_nuevo': tipo_nuevo,
+                    'nivel_anterior': nivel_anterior,
+                    'nivel_nuevo': nivel_nuevo
+                })
+            else:
+                resultados['sin_cambios'] += 1
+
+            if cambio or not solo_cambios:
+                filas.append({
+                    'id': asignacion_id,
+                    'tipo_servicio_proveedor': tipo_nuevo,
+                    'nivel_confianza_proveedor': nivel_nuevo,
+                    'coeficiente_variacion_historico': nuevo['cv'],
+                    'fecha_inicio_relacion': fecha_nueva,
+                    'requiere_orden_compra_obligatoria': bool(nuevo['requiere_oc']),
+                    'metadata_riesgos': {
+                        'fecha_clasificacion': ahora.isoformat(),
+                        **nuevo['metadata'],
+                        'clasificacion_lote': True,
+                    },
+                    'actualizado_en': ahora,
+                })
+
+        if filas and not simular:
+            self.db.execute(update(AsignacionNitResponsable), filas)
+            self.db.commit()
+        resultados['escritos'] = 0 if simular else len(filas)
+        tiempos['escritura'] = time.perf_counter() - marca
+        tiempos['total'] = time.perf_counter() - inicio
+        resultados['tiempos'] = {etapa: round(segundos, 4) for etapa, segundos in tiempos.items()}
+
+        logger.info(
+            f"[RECLASIFICACION] {resultados['total_procesados']} asignaciones, "
+            f"{len(estadisticas)} proveedores con facturas: {resultados['actualizados']} cambios de clasificación, "
+            f"{resultados['escritos']} escritas{' (simulado)' if simular else ''} | "
+            + ", ".join(f"{etapa} {segundos:.3f}s" for etapa, segundos in resultados['tiempos'].items())
+        )
         return resultados
 
     def detectar_cambios_patron_proveedor(
@@ -472,6 +603,132 @@ class ClasificacionProveedoresService:
             'fecha_primera_factura': fecha_primera_date
         }
 
+    def _estadisticas_lote(self, proveedor_ids: set, dias: int = 365) -> Dict[int, Dict[str, Any]]:
+        """
+        Estadísticas de monto por proveedor en UNA consulta agrupada.
+
+        Mismas reglas que _obtener_facturas_para_analisis + _calcular_estadisticas:
+        montos nulos o en cero no cuentan para media/desviación, pero sí para
+        el número de facturas, la primera fecha y los meses con facturas.
+        """
+        if not proveedor_ids:
+            return {}
+
+        fecha_limite = datetime.now() - timedelta(days=dias)
+        monto = case((Factura.total_a_pagar != 0, Factura.total_a_pagar), else_=None)
+        mes = extract('year', Factura.fecha_emision) * 100 + extract('month', Factura.fecha_emision)
+
+        estadisticas = {}
+        ids = sorted(proveedor_ids)
+        for desde in range(0, len(ids), 1000):
+            filas = self.db.execute(
+                select(
+                    Factura.proveedor_id,
+                    func.count(Factura.id),
+                    func.count(monto),
+                    func.sum(monto),
+                    func.sum(monto * monto),
+                    func.min(Factura.fecha_emision),
+                    func.count(func.distinct(mes)),
+                )
+                .where(
+                    Factura.proveedor_id.in_(ids[desde:desde + 1000]),
+                    Factura.fecha_emision >= fecha_limite,
+                    Factura.estado.in_(ESTADOS_ANALISIS)
+                )
+                .group_by(Factura.proveedor_id)
+            ).all()
+            for proveedor_id, facturas, n, suma, suma_cuadrados, primera, meses in filas:
+                estadisticas[proveedor_id] = {
+                    'facturas': facturas,
+                    'n': n,
+                    'suma': suma,
+                    'suma_cuadrados': suma_cuadrados,
+                    'fecha_primera_factura': primera,
+                    'meses_con_facturas': meses,
+                }
+        return estadisticas
+
+    def _clasificar_lote(self, estadisticas: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Clasificación vectorizada de los proveedores con historial suficiente.
+
+        Media y desviación muestral se calculan exactas en Decimal desde la
+        suma y la suma de cuadrados (MySQL las retorna exactas para DECIMAL);
+        las reglas de tipo, nivel y OC se aplican a todos a la vez con NumPy.
+        """
+        ids = [pid for pid, e in estadisticas.items() if e['facturas'] >= self.CONFIG['facturas_minimas']]
+        if not ids:
+            return {}
+
+        ahora = datetime.now()
+        cv = np.zeros(len(ids))
+        media = np.zeros(len(ids))
+        antiguedad = np.zeros(len(ids))
+        fechas = []
+        with localcontext() as contexto:
+            contexto.prec = 50
+            for i, pid in enumerate(ids):
+                e = estadisticas[pid]
+                n = e['n']
+                if not n:
+                    # Sin montos: mismos valores que _calcular_estadisticas
+                    cv[i] = 999.0
+                    fechas.append(None)
+                    continue
+                suma = Decimal(str(e['suma']))
+                promedio = suma / n
+                varianza = (Decimal(str(e['suma_cuadrados'])) - suma * suma / n) / (n - 1) if n > 1 else Decimal(0)
+                desviacion = max(varianza, Decimal(0)).sqrt()
+                media[i] = float(promedio)
+                cv[i] = float(desviacion / promedio * 100) if promedio > 0 else 0.0
+
+                primera = e['fecha_primera_factura']
+                if isinstance(primera, str):
+                    primera = datetime.fromisoformat(primera)
+                if not isinstance(primera, datetime):
+                    primera = datetime.combine(primera, datetime.min.time())
+                antiguedad[i] = (ahora - primera).days
+                fechas.append(primera.date())
+
+        config = self.CONFIG
+        tipo = np.select([cv < config['cv_fijo'], cv < config['cv_variable']], [0, 1], default=2)
+        fijo = tipo == 0
+        nivel = np.select(
+            [
+                antiguedad < config['dias_bajo'],
+                antiguedad < config['dias_medio'],
+                antiguedad < config['dias_alto'],
+                antiguedad < config['dias_critico'],
+                fijo & (cv < 5),
+            ],
+            [4, 3, 2, np.where(fijo & (cv < 10), 1, 2), 0],
+            default=1
+        )
+        requiere_oc = (tipo >= 2) | (media > config['monto_requiere_oc'])
+
+        clasificacion = {}
+        for i, pid in enumerate(ids):
+            e = estadisticas[pid]
+            cv_i = round(float(cv[i]), 2)
+            clasificacion[pid] = {
+                'tipo': TIPOS[tipo[i]],
+                'nivel': NIVELES[nivel[i]],
+                'cv': Decimal(str(cv_i)),
+                'requiere_oc': bool(requiere_oc[i]),
+                'fecha_primera_factura': fechas[i],
+                'metadata': {
+                    'facturas_analizadas': e['facturas'],
+                    'cv_calculado': cv_i,
+                    'antiguedad_dias': int(antiguedad[i]),
+                    'monto_promedio': float(media[i]),
+                    'meses_con_facturas': e['meses_con_facturas'] if e['n'] else 0,
+                    'clasificacion_automatica': True,
+                    'version_algoritmo': '1.0'
+                },
+            }
+        return clasificacion
+
     def _determinar_tipo_servicio(self, cv: float) -> TipoServicioProveedor:
         """Determina tipo de servicio según CV."""
         if cv < self.CONFIG['cv_fijo']:
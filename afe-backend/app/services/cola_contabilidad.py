@@ -0,0 +1,119 @@
+"""
+Cola de revisión de Contabilidad (facturas aprobadas pendientes de validar).
+
+GET /accounting/facturas/por-revisar paginaba con OFFSET + count() sobre un
+joinedload de workflow_history (colección: multiplica filas), filtraba con
+extract(month/year) sobre creado_en (no usa índices) y calculaba el monto
+pendiente solo sobre la página actual. Con miles de facturas pendientes cada
+página costaba más que la anterior.
+
+Este servicio:
+
+1. Filtra por rango del mes actual: creado_en >= inicio AND < inicio_siguiente
+   (sargable, usa idx_facturas_estado_creado (estado, creado_en, id))
+2. Pagina por keyset sobre (creado_en DESC, id DESC): el cursor es el último
+   (creado_en, id) de la página; el costo por página es constante
+3. Carga proveedor/usuario con joinedload (muchos-a-uno) y workflow_history
+   con selectinload (una consulta IN por página, sin multiplicar filas)
+4. Calcula total y monto pendiente de TODA la cola en una sola consulta
+   agregada (COUNT + SUM)
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.models.factura import EstadoFactura, Factura
+from app.utils.cursor_pagination import decode_cursor, encode_cursor
+
+
+ESTADOS_POR_REVISAR = (EstadoFactura.aprobada, EstadoFactura.aprobada_auto)
+
+
+def rango_mes(referencia: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """[inicio del mes, inicio del mes siguiente) de la fecha de referencia."""
+    referencia = referencia or datetime.now()
+    inicio = referencia.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if inicio.month == 12:
+        return inicio, inicio.replace(year=inicio.year + 1, month=1)
+    return inicio, inicio.replace(month=inicio.month + 1)
+
+
+@dataclass
+class PaginaCola:
+    """Página de la cola y cursor para la siguiente."""
+    facturas: List[Factura]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+class ColaContabilidadService:
+    """Consultas de la cola de revisión de Contabilidad."""
+
+    def __init__(self, db: Session, referencia: Optional[datetime] = None):
+        self.db = db
+        self.desde, self.hasta = rango_mes(referencia)
+
+    def _filtros(self):
+        return (
+            Factura.estado.in_(ESTADOS_POR_REVISAR),
+            Factura.creado_en >= self.desde,
+            Factura.creado_en < self.hasta,
+        )
+
+    def obtener_pagina(self, limit: int, cursor: Optional[str] = None) -> PaginaCola:
+        """
+        Página de hasta `limit` facturas, más recientes primero.
+
+        Raises:
+            ValueError: si el cursor no es válido
+        """
+        query = self.db.query(Factura).options(
+            joinedload(Factura.proveedor),
+            joinedload(Factura.usuario),
+            selectinload(Factura.workflow_history),
+        ).filter(*self._filtros())
+
+        if cursor:
+            decodificado = decode_cursor(cursor)
+            if not decodificado:
+                raise ValueError("Cursor inválido")
+            cursor_creado, cursor_id = decodificado
+            query = query.filter(or_(
+                Factura.creado_en < cursor_creado,
+                and_(Factura.creado_en == cursor_creado, Factura.id < cursor_id),
+            ))
+
+        # Se pide una fila extra para saber si hay más páginas
+        facturas = query.order_by(Factura.creado_en.desc(), Factura.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(facturas) > limit:
+            facturas = facturas[:limit]
+            next_cursor = encode_cursor(facturas[-1].creado_en, facturas[-1].id)
+        return PaginaCola(facturas=facturas, next_cursor=next_cursor)
+
+    def estadisticas(self) -> dict:
+        """Total y monto pendiente de la cola completa + validadas hoy."""
+        total, monto = self.db.query(
+            func.count(Factura.id),
+            func.coalesce(func.sum(Factura.total_a_pagar), 0),
+        ).filter(*self._filtros()).one()
+
+        inicio_dia = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        validadas_hoy = self.db.query(func.count(Factura.id)).filter(
+            Factura.estado == EstadoFactura.validada_contabilidad,
+            Factura.actualizado_en >= inicio_dia,
+        ).scalar()
+
+        return {
+            "total_pendiente": int(total or 0),
+            "monto_pendiente": float(Decimal(monto or 0)),
+            "validadas_hoy": int(validadas_hoy or 0),
+        }
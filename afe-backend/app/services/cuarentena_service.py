@@ -3,22 +3,37 @@ Servicio de gestión de facturas en cuarentena.
 
 Gestiona facturas que no pudieron procesarse automáticamente,
 clasificadas por tipo de problema.
+
+El tipo de problema se guarda en facturas.motivo_cuarentena al entrar en
+cuarentena (WorkflowAutomaticoService), así el resumen es un agregado SQL
+(GROUP BY motivo, grupo sobre el índice estado/motivo/grupo) y no recorre
+facturas ni workflows en Python. La liberación de un grupo es un UPDATE
+masivo más inserciones de workflows por lotes.
 """
 
 import logging
+from decimal import Decimal
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, insert, update
 from datetime import datetime
 from collections import defaultdict
 
 from app.models.factura import Factura, EstadoFactura
-from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+from app.models.workflow_aprobacion import WorkflowAprobacionFactura, EstadoFacturaWorkflow
 from app.models.grupo import Grupo, ResponsableGrupo
 from app.models.proveedor import Proveedor
 
 logger = logging.getLogger(__name__)
 
+SIN_CLASIFICAR = 'SIN_CLASIFICAR'
+
+# Clasificación por motivo (la misma que registra la metadata del workflow)
+PROBLEMAS_CUARENTENA = {
+    'GRUPO_SIN_RESPONSABLES': {'categoria': 'CONFIGURACION_GRUPOS', 'severidad': 'CRITICA'},
+    SIN_CLASIFICAR: {'categoria': 'DESCONOCIDA', 'severidad': 'MEDIA'},
+}
+
 
 class CuarentenaService:
     """Servicio para gestión de facturas en cuarentena."""
@@ -26,13 +41,25 @@ class CuarentenaService:
     def __init__(self, db: Session):
         self.db = db
 
-    def obtener_resumen_cuarentena(self) -> Dict[str, Any]:
-        """Obtiene resumen de facturas en cuarentena clasificado por tipo de error."""
-        facturas_cuarentena = self.db.query(Factura).filter(
+    def obtener_resumen_cuarentena(self, incluir_ids: bool = True) -> Dict[str, Any]:
+        """
+        Obtiene resumen de facturas en cuarentena clasificado por tipo de error.
+
+        Args:
+            incluir_ids: Incluir facturas_ids por problema/grupo (una consulta
+                         adicional de solo IDs); el dashboard no los necesita.
+        """
+        motivo = func.coalesce(Factura.motivo_cuarentena, SIN_CLASIFICAR)
+        filas = self.db.query(
+            motivo.label('motivo'),
+            Factura.grupo_id,
+            func.count(Factura.id).label('total'),
+            func.coalesce(func.sum(Factura.total_a_pagar), 0).label('monto')
+        ).filter(
             Factura.estado == EstadoFactura.en_cuarentena
-        ).all()
+        ).group_by(motivo, Factura.grupo_id).all()
 
-        if not facturas_cuarentena:
+        if not filas:
             return {
                 "total": 0,
                 "problemas": [],
@@ -41,73 +68,65 @@ class CuarentenaService:
                 "mensaje": "No hay facturas en cuarentena"
             }
 
-        problemas_clasificados = self._clasificar_problemas(facturas_cuarentena)
-        impacto_total = sum(float(f.total_a_pagar or 0) for f in facturas_cuarentena)
+        ids = self._ids_por_motivo_y_grupo() if incluir_ids else None
+        problemas_clasificados = self._clasificar_problemas(filas, ids)
+        total = sum(fila.total for fila in filas)
+        impacto_total = sum(Decimal(fila.monto) for fila in filas)
         acciones = self._generar_acciones_recomendadas(problemas_clasificados)
 
         return {
-            "total": len(facturas_cuarentena),
+            "total": total,
             "problemas": problemas_clasificados,
-            "impacto_financiero": round(impacto_total, 2),
+            "impacto_financiero": round(float(impacto_total), 2),
             "acciones_recomendadas": acciones,
-            "mensaje": f"{len(facturas_cuarentena)} facturas requieren configuración"
+            "mensaje": f"{total} facturas requieren configuración"
         }
 
-    def _clasificar_problemas(self, facturas: List[Factura]) -> List[Dict[str, Any]]:
-        """Clasifica facturas por tipo de problema usando metadata de workflows."""
-        grupos_error = defaultdict(list)
-
-        for factura in facturas:
-            workflow = self.db.query(WorkflowAprobacionFactura).filter(
-                WorkflowAprobacionFactura.factura_id == factura.id
-            ).first()
-
-            if workflow and workflow.metadata_workflow:
-                tipo_error = workflow.metadata_workflow.get('tipo_error', 'SIN_CLASIFICAR')
-                categoria = workflow.metadata_workflow.get('categoria', 'DESCONOCIDA')
-                severidad = workflow.metadata_workflow.get('severidad', 'MEDIA')
-                accion_dirigida = workflow.metadata_workflow.get('accion_dirigida', {})
-
-                grupos_error[tipo_error].append({
-                    'factura': factura,
-                    'workflow': workflow,
-                    'categoria': categoria,
-                    'severidad': severidad,
-                    'accion_dirigida': accion_dirigida
-                })
-            else:
-                grupos_error['SIN_CLASIFICAR'].append({
-                    'factura': factura,
-                    'workflow': workflow,
-                    'categoria': 'DESCONOCIDA',
-                    'severidad': 'MEDIA',
-                    'accion_dirigida': {}
-                })
+    def _ids_por_motivo_y_grupo(self) -> Dict[tuple, List[int]]:
+        """IDs de facturas en cuarentena por (motivo, grupo_id): solo columnas."""
+        motivo = func.coalesce(Factura.motivo_cuarentena, SIN_CLASIFICAR)
+        ids = defaultdict(list)
+        for factura_id, motivo_fila, grupo_id in self.db.query(
+            Factura.id, motivo, Factura.grupo_id
+        ).filter(
+            Factura.estado == EstadoFactura.en_cuarentena
+        ).order_by(Factura.id):
+            ids[(motivo_fila, grupo_id)].append(factura_id)
+        return ids
+
+    def _clasificar_problemas(
+        self,
+        filas: List[Any],
+        ids: Optional[Dict[tuple, List[int]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Arma los problemas a partir del agregado (motivo, grupo_id) → conteo, monto."""
+        por_motivo = defaultdict(list)
+        for fila in filas:
+            por_motivo[fila.motivo].append(fila)
 
         problemas = []
-        for tipo_error, items in grupos_error.items():
-            total_facturas = len(items)
-            impacto_financiero = sum(float(item['factura'].total_a_pagar or 0) for item in items)
-            primer_item = items[0]
-            categoria = primer_item['categoria']
-            severidad = primer_item['severidad']
-            accion_dirigida = primer_item['accion_dirigida']
+        for tipo_error, grupo_filas in por_motivo.items():
+            clasificacion = PROBLEMAS_CUARENTENA.get(tipo_error, PROBLEMAS_CUARENTENA[SIN_CLASIFICAR])
 
             if tipo_error == 'GRUPO_SIN_RESPONSABLES':
-                subproblemas = self._agrupar_por_grupo(items)
+                subproblemas = self._agrupar_por_grupo(grupo_filas, ids)
             else:
                 subproblemas = []
 
-            problemas.append({
+            problema = {
                 'tipo_error': tipo_error,
-                'categoria': categoria,
-                'severidad': severidad,
-                'total_facturas': total_facturas,
-                'impacto_financiero': round(impacto_financiero, 2),
-                'accion_dirigida': accion_dirigida,
-                'subproblemas': subproblemas,
-                'facturas_ids': [item['factura'].id for item in items]
-            })
+                'categoria': clasificacion['categoria'],
+                'severidad': clasificacion['severidad'],
+                'total_facturas': sum(fila.total for fila in grupo_filas),
+                'impacto_financiero': round(float(sum(Decimal(fila.monto) for fila in grupo_filas)), 2),
+                'accion_dirigida': subproblemas[0]['accion_dirigida'] if subproblemas else {},
+                'subproblemas': subproblemas
+            }
+            if ids is not None:
+                problema['facturas_ids'] = sorted(
+                    factura_id for fila in grupo_filas for factura_id in ids.get((tipo_error, fila.grupo_id), [])
+                )
+            problemas.append(problema)
 
         prioridad_severidad = {'CRITICA': 0, 'ALTA': 1, 'MEDIA': 2, 'BAJA': 3}
         problemas.sort(
@@ -119,30 +138,32 @@ class CuarentenaService:
 
         return problemas
 
-    def _agrupar_por_grupo(self, items: List[Dict]) -> List[Dict[str, Any]]:
-        """Agrupa facturas por grupo_id para corrección masiva."""
-        grupos = defaultdict(list)
-
-        for item in items:
-            grupo_id = item['factura'].grupo_id
-            if grupo_id:
-                grupos[grupo_id].append(item)
+    def _agrupar_por_grupo(
+        self,
+        filas: List[Any],
+        ids: Optional[Dict[tuple, List[int]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Un subproblema por grupo_id para corrección masiva (nombres en una consulta)."""
+        filas = [fila for fila in filas if fila.grupo_id]
+        grupos = {
+            g.id: g for g in self.db.query(Grupo).filter(
+                Grupo.id.in_([fila.grupo_id for fila in filas])
+            )
+        } if filas else {}
 
         subproblemas = []
-        for grupo_id, grupo_items in grupos.items():
-            grupo = self.db.query(Grupo).filter(Grupo.id == grupo_id).first()
+        for fila in filas:
+            grupo_id = fila.grupo_id
+            grupo = grupos.get(grupo_id)
             nombre_grupo = grupo.nombre if grupo else f"Grupo ID {grupo_id}"
-            codigo_grupo = grupo.codigo if grupo else "N/A"
-
-            total_facturas = len(grupo_items)
-            impacto = sum(float(item['factura'].total_a_pagar or 0) for item in grupo_items)
+            codigo_grupo = grupo.codigo_corto if grupo and grupo.codigo_corto else "N/A"
 
-            subproblemas.append({
+            subproblema = {
                 'grupo_id': grupo_id,
                 'nombre_grupo': nombre_grupo,
                 'codigo_grupo': codigo_grupo,
-                'total_facturas': total_facturas,
-                'impacto_financiero': round(impacto, 2),
+                'total_facturas': fila.total,
+                'impacto_financiero': round(float(fila.monto), 2),
                 'accion_dirigida': {
                     'tipo': 'ASIGNAR_RESPONSABLES_GRUPO',
                     'url': f'/admin/grupos/{grupo_id}/responsables',
@@ -152,9 +173,11 @@ class CuarentenaService:
                         'nombre_grupo': nombre_grupo,
                         'codigo_grupo': codigo_grupo
                     }
-                },
-                'facturas_ids': [item['factura'].id for item in grupo_items]
-            })
+                }
+            }
+            if ids is not None:
+                subproblema['facturas_ids'] = ids.get((fila.motivo, grupo_id), [])
+            subproblemas.append(subproblema)
 
         subproblemas.sort(key=lambda x: -x['impacto_financiero'])
 
@@ -242,29 +265,32 @@ class CuarentenaService:
         if grupo_id:
             query = query.filter(Factura.grupo_id == grupo_id)
 
-        if tipo_error:
-            query = query.join(
-                WorkflowAprobacionFactura,
-                Factura.id == WorkflowAprobacionFactura.factura_id
-            ).filter(
-                WorkflowAprobacionFactura.metadata_workflow['tipo_error'].astext == tipo_error
-            )
+        if tipo_error == SIN_CLASIFICAR:
+            query = query.filter(Factura.motivo_cuarentena.is_(None) | (Factura.motivo_cuarentena == SIN_CLASIFICAR))
+        elif tipo_error:
+            query = query.filter(Factura.motivo_cuarentena == tipo_error)
 
         return query.limit(limite).all()
 
-    def liberar_facturas_grupo(self, grupo_id: int) -> Dict[str, Any]:
+    def liberar_facturas_grupo(self, grupo_id: int, tamano_lote: int = 1000) -> Dict[str, Any]:
         """
         Libera facturas de un grupo en cuarentena.
 
         Crea workflows para visibilidad en dashboard sin enviar notificaciones
         (son facturas históricas de ciclos anteriores).
+
+        Un UPDATE por lote de `tamano_lote` facturas, un UPDATE por lote de la
+        metadata de los workflows de cuarentena y un INSERT multi-fila de los
+        workflows nuevos; un solo commit al final.
         """
-        responsables_grupo = self.db.query(ResponsableGrupo).filter(
+        responsables_grupo = self.db.query(ResponsableGrupo).options(
+            joinedload(ResponsableGrupo.usuario)
+        ).filter(
             and_(
                 ResponsableGrupo.grupo_id == grupo_id,
                 ResponsableGrupo.activo == True
             )
-        ).all()
+        ).order_by(ResponsableGrupo.id.asc()).all()
 
         if not responsables_grupo:
             return {
@@ -272,12 +298,14 @@ class CuarentenaService:
                 'error': f'Grupo {grupo_id} aún no tiene responsables asignados'
             }
 
-        facturas_grupo = self.db.query(Factura).filter(
+        facturas_grupo = self.db.query(Factura.id, Proveedor.nit).outerjoin(
+            Proveedor, Factura.proveedor_id == Proveedor.id
+        ).filter(
             and_(
                 Factura.grupo_id == grupo_id,
                 Factura.estado == EstadoFactura.en_cuarentena
             )
-        ).all()
+        ).order_by(Factura.id).all()
 
         if not facturas_grupo:
             return {
@@ -287,59 +315,93 @@ class CuarentenaService:
                 'mensaje': f'No hay facturas en cuarentena para grupo {grupo_id}'
             }
 
+        ahora = datetime.now()
+        responsable_principal = responsables_grupo[0].responsable_id
+        marca_liberacion = {
+            'liberada_de_cuarentena': True,
+            'fecha_liberacion': ahora.isoformat(),
+            'liberada_por': 'SISTEMA_AUTO',
+            'sin_notificacion': True,
+            'razon_sin_notificacion': 'Factura histórica - ciclo mensual anterior'
+        }
+        metadata_nuevo = {
+            "liberada_de_cuarentena": True,
+            "fecha_liberacion": ahora.isoformat(),
+            "grupo_id": grupo_id,
+            "asignacion_automatica": True,
+            "sin_notificacion_email": True,
+            "razon": "Factura histórica - visible en dashboard sin notificación",
+            "ciclo": "ANTERIOR"
+        }
+
         facturas_liberadas = []
-        workflows_creados = []
-
-        for factura in facturas_grupo:
-            factura.estado = EstadoFactura.en_revision
-
-            workflow_anterior = self.db.query(WorkflowAprobacionFactura).filter(
-                WorkflowAprobacionFactura.factura_id == factura.id
-            ).first()
-
-            if workflow_anterior and workflow_anterior.metadata_workflow:
-                workflow_anterior.metadata_workflow['liberada_de_cuarentena'] = True
-                workflow_anterior.metadata_workflow['fecha_liberacion'] = datetime.now().isoformat()
-                workflow_anterior.metadata_workflow['liberada_por'] = 'SISTEMA_AUTO'
-                workflow_anterior.metadata_workflow['sin_notificacion'] = True
-                workflow_anterior.metadata_workflow['razon_sin_notificacion'] = 'Factura histórica - ciclo mensual anterior'
-
-            for responsable in responsables_grupo:
-                workflow_nuevo = WorkflowAprobacionFactura(
-                    factura_id=factura.id,
-                    estado=EstadoFacturaWorkflow.RECIBIDA,
-                    nit_proveedor=factura.proveedor.nit if factura.proveedor else None,
-                    responsable_id=responsable.responsable_id,
-                    area_responsable=responsable.responsable.area if hasattr(responsable.responsable, 'area') else None,
-                    fecha_asignacion=datetime.now(),
-                    creado_en=datetime.now(),
-                    creado_por="SISTEMA_AUTO_LIBERACION_CUARENTENA",
-                    metadata_workflow={
-                        "liberada_de_cuarentena": True,
-                        "fecha_liberacion": datetime.now().isoformat(),
-                        "grupo_id": grupo_id,
-                        "asignacion_automatica": True,
-                        "sin_notificacion_email": True,
-                        "razon": "Factura histórica - visible en dashboard sin notificación",
-                        "ciclo": "ANTERIOR"
-                    }
-                )
+        workflows_creados = 0
+
+        for inicio in range(0, len(facturas_grupo), tamano_lote):
+            lote = facturas_grupo[inicio:inicio + tamano_lote]
+            ids = [factura_id for factura_id, _ in lote]
+
+            # 1. Facturas: en_revision + responsable principal (accion_por = NULL
+            #    como en factura_listeners; el UPDATE masivo no dispara eventos)
+            self.db.execute(
+                update(Factura).where(
+                    Factura.id.in_(ids),
+                    Factura.estado == EstadoFactura.en_cuarentena
+                ).values(
+                    estado=EstadoFactura.en_revision,
+                    responsable_id=responsable_principal,
+                    accion_por=None
+                ).execution_options(synchronize_session=False)
+            )
 
-                self.db.add(workflow_nuevo)
-                workflows_creados.append(workflow_nuevo)
+            # 2. Workflows de cuarentena: marcar liberación (UPDATE por PK en lote)
+            anteriores = self.db.query(
+                WorkflowAprobacionFactura.id, WorkflowAprobacionFactura.metadata_workflow
+            ).filter(
+                WorkflowAprobacionFactura.factura_id.in_(ids),
+                WorkflowAprobacionFactura.metadata_workflow.isnot(None)
+            ).all()
+            if anteriores:
+                self.db.execute(
+                    update(WorkflowAprobacionFactura),
+                    [
+                        {"id": workflow_id, "metadata_workflow": {**(metadata or {}), **marca_liberacion}}
+                        for workflow_id, metadata in anteriores
+                    ]
+                )
 
-            factura.responsable_id = responsables_grupo[0].responsable_id
-            facturas_liberadas.append(factura.id)
+            # 3. Workflows nuevos: uno por factura y responsable, INSERT multi-fila
+            filas_workflow = [
+                {
+                    "factura_id": factura_id,
+                    "estado": EstadoFacturaWorkflow.RECIBIDA,
+                    "nit_proveedor": nit,
+                    "responsable_id": responsable.responsable_id,
+                    "area_responsable": responsable.usuario.area if responsable.usuario else None,
+                    "fecha_asignacion": ahora,
+                    "fecha_cambio_estado": ahora,
+                    "creado_en": ahora,
+                    "creado_por": "SISTEMA_AUTO_LIBERACION_CUARENTENA",
+                    "metadata_workflow": metadata_nuevo
+                }
+                for factura_id, nit in lote
+                for responsable in responsables_grupo
+            ]
+            self.db.execute(insert(WorkflowAprobacionFactura), filas_workflow)
+
+            workflows_creados += len(filas_workflow)
+            facturas_liberadas.extend(ids)
 
         self.db.commit()
+        self.db.expire_all()
 
         logger.info(
             f"Liberación completa SIN notificaciones: {len(facturas_liberadas)} facturas históricas, "
-            f"{len(workflows_creados)} workflows creados",
+            f"{workflows_creados} workflows creados",
             extra={
                 'grupo_id': grupo_id,
                 'facturas_liberadas': facturas_liberadas,
-                'workflows_creados': len(workflows_creados),
+                'workflows_creados': workflows_creados,
                 'responsables_asignados': [r.responsable_id for r in responsables_grupo],
                 'notificaciones_enviadas': 0,
                 'razon': 'Facturas históricas - ciclo mensual anterior'
@@ -350,12 +412,12 @@ class CuarentenaService:
             'exito': True,
             'facturas_liberadas': len(facturas_liberadas),
             'facturas_ids': facturas_liberadas,
-            'workflows_creados': len(workflows_creados),
+            'workflows_creados': workflows_creados,
             'responsables_asignados': [r.responsable_id for r in responsables_grupo],
             'notificaciones_enviadas': 0,
             'mensaje': (
                 f'{len(facturas_liberadas)} facturas históricas liberadas y visibles en dashboard. '
-                f'{len(workflows_creados)} workflows creados. '
+                f'{workflows_creados} workflows creados. '
                 f'Sin notificaciones (facturas de ciclo anterior). '
                 f'Facturas nuevas SÍ generarán notificaciones.'
             )
@@ -3,30 +3,18 @@
 
 import logging
 from typing import Dict, Any, Optional
-from pathlib import Path
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from app.services.email_template_service import get_jinja_env
 from app.services.unified_email_service import get_unified_email_service
 
 logger = logging.getLogger(__name__)
 
-# Directorio de plantillas (app/templates/emails/)
-TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "emails"
-
-# Configurar Jinja2 Environment
-_jinja_env = Environment(
-    loader=FileSystemLoader(str(TEMPLATES_DIR)),
-    autoescape=select_autoescape(['html', 'xml']),
-    trim_blocks=True,
-    lstrip_blocks=True
-)
-
 
 def _load_template(template_name: str):
-    """Carga una plantilla Jinja2 desde el sistema de archivos."""
+    """Carga una plantilla Jinja2 (Environment compartido, compilada una vez)."""
     try:
-        return _jinja_env.get_template(template_name)
+        return get_jinja_env().get_template(template_name)
     except Exception as e:
         logger.error(f"Error cargando plantilla {template_name}: {str(e)}")
         raise
@@ -1,47 +1,139 @@
 # app/services/email_template_service.py
-"""Servicio de renderizado de templates de email con Jinja2."""
+"""
+Servicio de renderizado de templates de email con Jinja2.
+
+Todas las instancias comparten un único Environment (get_jinja_env):
+- Las plantillas se compilan una vez por proceso (caché de Jinja en memoria)
+- El bytecode compilado se guarda en disco (FileSystemBytecodeCache), así
+  los demás workers y los reinicios no vuelven a compilar
+- En producción no se revisa la fecha de los archivos en cada render
+
+Para envíos masivos: render_lote (una plantilla, lista de contextos) y
+CacheFragmentos (macros renderizadas una vez y reutilizadas entre
+destinatarios).
+"""
 
 import logging
+import os
+import stat
+import threading
 from pathlib import Path
-from typing import Dict, Any
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from typing import Dict, Any, Hashable, List, Optional
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Directorio de templates (app/templates/emails/)
+TEMPLATE_DIR = Path(__file__).parent.parent / 'templates' / 'emails'
+
+_entorno: Optional[Environment] = None
+_entorno_lock = threading.Lock()
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """
+    Caché de bytecode en disco; None si el directorio no es seguro o no es escribible.
+
+    Jinja ejecuta el bytecode que lee, así que el directorio debe pertenecer
+    al usuario del proceso y no ser accesible por otros (0700). Sin
+    EMAIL_TEMPLATES_CACHE_DIR se usa el directorio por defecto de Jinja
+    (<tmp>/_jinja2-cache-<uid>), que aplica esas mismas verificaciones.
+    """
+    from app.core.config import settings
+
+    if not settings.email_templates_cache_dir:
+        try:
+            return FileSystemBytecodeCache(pattern='%s.jinja.cache')
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Caché de bytecode de plantillas deshabilitada: {str(e)}")
+            return None
+
+    directorio = Path(settings.email_templates_cache_dir)
+    try:
+        directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+        estado = directorio.stat()
+        if hasattr(os, "getuid") and (estado.st_uid != os.getuid() or stat.S_IMODE(estado.st_mode) & 0o077):
+            logger.warning(
+                f"Caché de bytecode de plantillas deshabilitada: {directorio} debe pertenecer al "
+                f"usuario del proceso y tener permisos 0700"
+            )
+            return None
+        return FileSystemBytecodeCache(str(directorio), '%s.jinja.cache')
+    except OSError as e:
+        logger.warning(f"Caché de bytecode de plantillas deshabilitada ({directorio}): {str(e)}")
+        return None
+
+
+def get_jinja_env() -> Environment:
+    """Environment Jinja2 compartido por todo el proceso."""
+    global _entorno
+    if _entorno is None:
+        with _entorno_lock:
+            if _entorno is None:
+                from app.core.config import settings
+
+                TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
+                entorno = Environment(
+                    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+                    autoescape=select_autoescape(['html', 'xml']),
+                    trim_blocks=True,
+                    lstrip_blocks=True,
+                    bytecode_cache=_bytecode_cache(),
+                    auto_reload=settings.environment != "production"
+                )
+
+                # Registrar filtros personalizados
+                entorno.filters['currency'] = EmailTemplateService._format_currency
+                entorno.filters['percentage'] = EmailTemplateService._format_percentage
+                entorno.filters['date_es'] = EmailTemplateService._format_date_es
+                _entorno = entorno
+    return _entorno
+
+
+class CacheFragmentos:
+    """
+    Fragmentos HTML (macros de una plantilla) renderizados una vez por clave.
+
+    Ejemplo: la fila de una factura se renderiza una sola vez aunque aparezca
+    en los emails de varios destinatarios del mismo envío.
+    """
+
+    def __init__(self, plantilla: str):
+        self.modulo = get_jinja_env().get_template(plantilla).module
+        self._cache: Dict[Hashable, Markup] = {}
+
+    def render(self, macro: str, clave: Hashable, **kwargs) -> Markup:
+        """Renderiza la macro (o la retorna de la caché si la clave ya se usó)."""
+        clave = (macro, clave)
+        if clave not in self._cache:
+            self._cache[clave] = Markup(getattr(self.modulo, macro)(**kwargs))
+        return self._cache[clave]
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
 
 class EmailTemplateService:
     """Servicio de renderizado de templates de email."""
 
     def __init__(self):
-        # Directorio de templates (app/templates/emails/)
-        self.template_dir = Path(__file__).parent.parent / 'templates' / 'emails'
-
-        # Crear directorio si no existe
-        self.template_dir.mkdir(parents=True, exist_ok=True)
-
-        # Configurar Jinja2
-        self.env = Environment(
-            loader=FileSystemLoader(str(self.template_dir)),
-            autoescape=select_autoescape(['html', 'xml']),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
-
-        # Registrar filtros personalizados
-        self.env.filters['currency'] = self._format_currency
-        self.env.filters['percentage'] = self._format_percentage
-        self.env.filters['date_es'] = self._format_date_es
-
-    def _format_currency(self, value: float) -> str:
+        self.template_dir = TEMPLATE_DIR
+        self.env = get_jinja_env()
+
+    @staticmethod
+    def _format_currency(value: float) -> str:
         """Formatea un número como moneda colombiana."""
         return f"${value:,.2f}".replace(',', '.')
 
-    def _format_percentage(self, value: float) -> str:
+    @staticmethod
+    def _format_percentage(value: float) -> str:
         """Formatea un número como porcentaje."""
         return f"{value:.1f}%"
 
-    def _format_date_es(self, value: datetime | str) -> str:
+    @staticmethod
+    def _format_date_es(value: datetime | str) -> str:
         """Formatea una fecha en español."""
         if isinstance(value, str):
             value = datetime.fromisoformat(value.replace('Z', '+00:00'))
@@ -118,6 +210,37 @@ class EmailTemplateService:
             </html>
             """
 
+    def render_lote(
+        self,
+        template_name: str,
+        contextos: List[Dict[str, Any]],
+        comunes: Optional[Dict[str, Any]] = None
+    ) -> List[Optional[str]]:
+        """
+        Renderiza una plantilla para muchos destinatarios.
+
+        La plantilla se resuelve una sola vez; `comunes` se combina con cada
+        contexto (el contexto del destinatario tiene prioridad).
+
+        Returns:
+            HTML por contexto, en el mismo orden; None si ese render falló
+        """
+        try:
+            template = self.env.get_template(template_name)
+        except Exception as e:
+            logger.error(f"Error cargando template {template_name}: {str(e)}")
+            return [None] * len(contextos)
+
+        comunes = comunes or {}
+        resultados = []
+        for contexto in contextos:
+            try:
+                resultados.append(template.render({**comunes, **contexto}))
+            except Exception as e:
+                logger.error(f"Error renderizando template {template_name}: {str(e)}")
+                resultados.append(None)
+        return resultados
+
     def render_resumen_diario(self, data: Dict[str, Any]) -> tuple[str, str]:
         """Renderiza email de resumen diario."""
         try:
@@ -60,11 +60,16 @@ class FlujoAutomatizacionFacturas:
 
         # PASO 1: Analizar patrones históricos
         logger.info("\nPASO 1: Analisis de patrones historicos")
-        resultado_patrones = self.analizador_patrones.analizar_patrones_desde_bd(
-            ventana_meses=12,
-            solo_proveedores=solo_proveedores,
-            forzar_recalculo=False
-        )
+        if solo_proveedores:
+            resultado_patrones = self.analizador_patrones.analizar_patrones_desde_bd(
+                ventana_meses=12,
+                solo_proveedores=solo_proveedores,
+                forzar_recalculo=False
+            )
+        else:
+            resultado_patrones = self.analizador_patrones.actualizar_patrones_incremental(
+                ventana_meses=12
+            )
         resultado_final['pasos_completados'].append({
             'paso': 'analisis_patrones',
             'resultado': resultado_patrones
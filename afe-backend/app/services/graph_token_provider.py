@@ -0,0 +1,246 @@
+# app/services/graph_token_provider.py
+"""
+Proveedor compartido de tokens de Microsoft Graph (client credentials).
+
+Un solo token por aplicación (tenant + client_id + scope) para todo el proceso
+y, opcionalmente, para todos los procesos de la máquina:
+
+- Singleton en proceso: get_graph_token_provider retorna la misma instancia
+  para las mismas credenciales, así UnifiedEmailService.reinitialize o crear
+  varios MicrosoftGraphEmailService no vuelve a pedir token.
+- Caché en archivo (GRAPH_TOKEN_CACHE_DIR): los workers de uvicorn y el
+  invoice_extractor leen el token que otro proceso ya obtuvo. El archivo se
+  protege con un lock exclusivo mientras se renueva.
+- Renovación anticipada: el token se renueva cuando le quedan menos de
+  `margen_refresco` segundos, no cuando ya venció. Si la renovación falla y el
+  token actual sigue vigente, se sigue usando.
+- Single-flight: si varios hilos necesitan renovar a la vez, solo uno hace la
+  petición; los demás esperan y usan el resultado.
+
+Formato del archivo (compartido con invoice_extractor/src/modules/auth.py):
+
+    <dir>/<sha256(tenant|client_id|scope)[:32]>.json   {"access_token", "expires_at"}
+    <dir>/<...>.lock                                    lock exclusivo (fcntl/msvcrt)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Renovar cuando queden menos de 5 minutos (los tokens duran ~60-90 min)
+MARGEN_REFRESCO_SEGUNDOS = 300
+
+
+@contextmanager
+def _bloqueo_archivo(ruta: Path) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre `ruta` (bloqueante)."""
+    with open(ruta, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK reintenta 10 s y luego falla; seguir esperando
+                    continue
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class GraphTokenProvider:
+    """Token de aplicación de Microsoft Graph compartido y renovado anticipadamente."""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        scope: str = GRAPH_SCOPE,
+        cache_dir: Optional[str] = None,
+        margen_refresco: int = MARGEN_REFRESCO_SEGUNDOS,
+        timeout: int = 30
+    ):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.margen_refresco = margen_refresco
+        self.timeout = timeout
+
+        self._token: Optional[str] = None
+        self._expira_en: float = 0.0
+        self._lock = threading.Lock()
+
+        # Peticiones reales al endpoint de tokens (métrica y tests)
+        self.solicitudes = 0
+
+        self._archivo: Optional[Path] = None
+        if cache_dir:
+            directorio = Path(cache_dir)
+            try:
+                directorio.mkdir(parents=True, exist_ok=True)
+                llave = hashlib.sha256(f"{tenant_id}|{client_id}|{scope}".encode("utf-8")).hexdigest()[:32]
+                self._archivo = directorio / f"{llave}.json"
+            except OSError as e:
+                logger.warning(f"Caché de tokens en archivo deshabilitada ({directorio}): {str(e)}")
+
+    def _vigente(self, token: Optional[str], expira_en: float, margen: float) -> bool:
+        return bool(token) and time.time() < expira_en - margen
+
+    def get_token(self) -> str:
+        """Retorna un token con al menos `margen_refresco` segundos de vigencia."""
+        if self._vigente(self._token, self._expira_en, self.margen_refresco):
+            return self._token
+
+        with self._lock:
+            # Otro hilo pudo renovarlo mientras esperábamos el lock
+            if self._vigente(self._token, self._expira_en, self.margen_refresco):
+                return self._token
+
+            if self._archivo is None:
+                self._renovar()
+            else:
+                with _bloqueo_archivo(self._archivo.with_suffix(".lock")):
+                    token, expira_en = self._leer_archivo()
+                    if self._vigente(token, expira_en, self.margen_refresco):
+                        # Otro proceso ya lo renovó
+                        self._token, self._expira_en = token, expira_en
+                    else:
+                        if self._vigente(token, expira_en, 0) and expira_en > self._expira_en:
+                            self._token, self._expira_en = token, expira_en
+                        if self._renovar():
+                            self._escribir_archivo()
+            return self._token
+
+    def invalidar(self) -> None:
+        """Descarta el token actual (p.ej. tras un 401); la próxima llamada renueva."""
+        with self._lock:
+            descartado, self._token, self._expira_en = self._token, None, 0.0
+            if self._archivo is not None and descartado:
+                with _bloqueo_archivo(self._archivo.with_suffix(".lock")):
+                    # Solo si otro proceso no lo reemplazó ya por uno nuevo
+                    if self._leer_archivo()[0] == descartado:
+                        try:
+                            self._archivo.unlink()
+                        except OSError:
+                            pass
+
+    def _renovar(self) -> bool:
+        """
+        Pide un token nuevo.
+
+        Returns:
+            True si se obtuvo; False si falló pero el token actual sigue vigente
+
+        Raises:
+            Exception: Si falló y no hay token vigente que usar
+        """
+        try:
+            resultado = self._solicitar_token()
+            self._token = resultado["access_token"]
+            self._expira_en = time.time() + int(resultado["expires_in"])
+            logger.info(f"  Token de Microsoft Graph obtenido (expira en {resultado['expires_in']}s)")
+            return True
+        except Exception as e:
+            if self._vigente(self._token, self._expira_en, 0):
+                logger.warning(
+                    f"  Renovación anticipada del token de Graph falló, se usa el actual "
+                    f"({int(self._expira_en - time.time())}s restantes): {str(e)}"
+                )
+                return False
+            logger.error(f" Error obteniendo token de Graph: {str(e)}")
+            raise
+
+    def _solicitar_token(self) -> Dict[str, object]:
+        self.solicitudes += 1
+        response = requests.post(
+            f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token",
+            data={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": self.scope,
+                "grant_type": "client_credentials"
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _leer_archivo(self) -> Tuple[Optional[str], float]:
+        try:
+            datos = json.loads(self._archivo.read_text(encoding="utf-8"))
+            return datos["access_token"], float(datos["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0.0
+
+    def _escribir_archivo(self) -> None:
+        """Escritura atómica (archivo temporal + replace) legible solo por el usuario."""
+        try:
+            fd, temporal = tempfile.mkstemp(dir=str(self._archivo.parent), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"access_token": self._token, "expires_at": self._expira_en}, fh)
+            os.chmod(temporal, 0o600)
+            os.replace(temporal, self._archivo)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el token de Graph en {self._archivo}: {str(e)}")
+
+
+_proveedores: Dict[Tuple[str, str, str, str], GraphTokenProvider] = {}
+_proveedores_lock = threading.Lock()
+
+
+def get_graph_token_provider(
+    tenant_id: str,
+    client_id: str,
+    client_secret: str,
+    scope: str = GRAPH_SCOPE
+) -> GraphTokenProvider:
+    """
+    Proveedor único por credenciales para todo el proceso.
+
+    Si cambia el client_secret (rotación) se crea un proveedor nuevo.
+    """
+    from app.core.config import settings
+
+    huella = hashlib.sha256(client_secret.encode("utf-8")).hexdigest()
+    llave = (tenant_id, client_id, scope, huella)
+    with _proveedores_lock:
+        proveedor = _proveedores.get(llave)
+        if proveedor is None:
+            proveedor = GraphTokenProvider(
+                tenant_id,
+                client_id,
+                client_secret,
+                scope=scope,
+                cache_dir=settings.graph_token_cache_dir,
+                margen_refresco=settings.graph_token_margen_refresco
+            )
+            _proveedores[llave] = proveedor
+        return proveedor
@@ -0,0 +1,350 @@
+"""
+Índices invertidos de líneas presupuestales para la vinculación automática.
+
+AutoVinculador calculaba _calcular_score_compatibilidad de CADA línea activa
+del año contra CADA factura (O(facturas × líneas)). Este módulo construye una
+sola vez por ejecución índices invertidos sobre las líneas:
+
+- proveedor:   NIT base (sin dígito de verificación), nombre normalizado
+               completo y palabras del nombre del proveedor preferido
+               (candidata con 2+ palabras en común)
+- concepto:    texto normalizado completo y palabras de 4+ caracteres de
+               categoría, nombre y descripción, por separado (la misma
+               regla de _comparar_textos)
+
+Por factura se reúnen las líneas que comparten llaves y, con las llaves de
+cada una, una cota superior del score (cota_score). Solo se calcula el
+score completo de las líneas cuya cota llega al umbral; las que lo alcanzan
+sin compartir llaves (puntos base de criterios no definidos) se agregan
+siempre. El resultado con umbral es el mismo que el recorrido completo,
+salvo coincidencias por subcadena que no comparten ninguna palabra (p.ej.
+"ele" dentro de "electricidad").
+
+No depende de la BD: opera sobre cualquier objeto con los atributos de
+LineaPresupuesto y sobre DatosFactura.
+
+AutoVinculador (auto_vinculacion.py) todavía no lo usa: depende de
+app.models.presupuesto, cuyos modelos y tablas se eliminaron en la migración
+959d4f1f1475. Cuando se restauren, el servicio debe construir el índice una
+vez por ejecución y evaluar cada factura con IndiceLineasPresupuesto.evaluar.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+MESES = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+
+
+@dataclass
+class DatosFactura:
+    """Campos de la factura usados en el matching (extraídos una vez)."""
+    id: int
+    numero_factura: Optional[str]
+    proveedor: Optional[str]
+    nit: Optional[str]
+    concepto: Optional[str]
+    total: Optional[Decimal]
+    fecha_emision: Optional[date]
+
+    @classmethod
+    def desde_factura(cls, factura) -> "DatosFactura":
+        proveedor = factura.proveedor
+        return cls(
+            id=factura.id,
+            numero_factura=factura.numero_factura,
+            proveedor=proveedor.razon_social if proveedor else None,
+            nit=proveedor.nit if proveedor else None,
+            concepto=factura.concepto_principal,
+            total=factura.total_a_pagar,
+            fecha_emision=factura.fecha_emision,
+        )
+
+
+# ==================== NORMALIZACIÓN ====================
+
+def normalizar(texto: Optional[str]) -> str:
+    return (texto or "").lower().strip()
+
+
+def nit_base(valor: Optional[str]) -> Optional[str]:
+    """'900.123.456-7' → '900123456'; None si no parece un NIT."""
+    base = (valor or "").split("-")[0]
+    digitos = "".join(c for c in base if c.isdigit())
+    if len(digitos) < 6 or any(c.isalpha() for c in base):
+        return None
+    return digitos
+
+
+def palabras_concepto(texto: Optional[str]) -> Set[str]:
+    """Palabras de 4+ caracteres (regla de _comparar_textos)."""
+    return {p for p in normalizar(texto).split() if len(p) >= 4}
+
+
+def comparar_proveedores(proveedor1: str, proveedor2: str) -> bool:
+    """Compara dos nombres de proveedor con normalización."""
+    p1 = normalizar(proveedor1)
+    p2 = normalizar(proveedor2)
+
+    # Coincidencia exacta o parcial (uno contiene al otro)
+    if p1 == p2 or p1 in p2 or p2 in p1:
+        return True
+
+    # Coincidencia de palabras clave (al menos 2 palabras en común)
+    return len(set(p1.split()) & set(p2.split())) >= 2
+
+
+def comparar_textos(texto1: str, texto2: str) -> bool:
+    """Compara dos textos con normalización."""
+    t1 = normalizar(texto1)
+    t2 = normalizar(texto2)
+
+    # Coincidencia exacta o parcial
+    if t1 == t2 or t1 in t2 or t2 in t1:
+        return True
+
+    # Coincidencia de palabras (al menos 1 palabra en común de 4+ caracteres)
+    return bool(palabras_concepto(t1) & palabras_concepto(t2))
+
+
+# ==================== SCORE ====================
+
+def calcular_score(datos: DatosFactura, linea) -> Tuple[int, Dict[str, Any]]:
+    """
+    Score de compatibilidad (0-100) entre una factura y una línea presupuestal.
+
+    Criterios y pesos:
+    - Proveedor coincide (NIT o nombre): 35 puntos
+    - Monto dentro del rango presupuestal: 25 puntos
+    - Categoría coincide: 20 puntos
+    - Período correcto: 10 puntos
+    - Nombre/descripción similar: 10 puntos
+    """
+    score = 0
+    criterios = {}
+
+    # 1. Coincidencia de proveedor (35 puntos)
+    if linea.proveedor_preferido and (datos.proveedor or datos.nit):
+        nit_linea = nit_base(linea.proveedor_preferido)
+        if (nit_linea and nit_linea == nit_base(datos.nit)) or (
+            datos.proveedor and comparar_proveedores(datos.proveedor, linea.proveedor_preferido)
+        ):
+            score += 35
+            criterios["proveedor"] = {
+                "match": True,
+                "puntos": 35,
+                "factura_proveedor": datos.proveedor,
+                "linea_proveedor": linea.proveedor_preferido
+            }
+        else:
+            criterios["proveedor"] = {"match": False, "puntos": 0}
+    else:
+        # Si no hay proveedor preferido, dar puntos parciales
+        score += 15
+        criterios["proveedor"] = {
+            "match": "parcial",
+            "puntos": 15,
+            "nota": "No hay proveedor preferido definido"
+        }
+
+    # 2. Monto dentro del rango presupuestal (25 puntos)
+    if datos.total and datos.fecha_emision:
+        presupuesto_mes = getattr(linea, f"presupuesto_{MESES[datos.fecha_emision.month - 1]}") or Decimal("0.00")
+
+        if presupuesto_mes > 0:
+            desviacion_pct = abs((datos.total - presupuesto_mes) / presupuesto_mes * 100)
+
+            if desviacion_pct <= 10:
+                score += 25
+                criterios["monto"] = {"match": "excelente", "puntos": 25, "desviacion_pct": float(desviacion_pct)}
+            elif desviacion_pct <= 25:
+                score += 18
+                criterios["monto"] = {"match": "bueno", "puntos": 18, "desviacion_pct": float(desviacion_pct)}
+            elif desviacion_pct <= 50:
+                score += 10
+                criterios["monto"] = {"match": "aceptable", "puntos": 10, "desviacion_pct": float(desviacion_pct)}
+            else:
+                criterios["monto"] = {"match": False, "puntos": 0, "desviacion_pct": float(desviacion_pct)}
+        else:
+            criterios["monto"] = {"match": "no_evaluable", "puntos": 0, "nota": "Presupuesto mes = 0"}
+    else:
+        criterios["monto"] = {"match": "no_evaluable", "puntos": 0}
+
+    # 3. Categoría coincide (20 puntos)
+    if linea.categoria and datos.concepto:
+        if comparar_textos(datos.concepto, linea.categoria):
+            score += 20
+            criterios["categoria"] = {"match": True, "puntos": 20}
+        elif linea.nombre and comparar_textos(datos.concepto, linea.nombre):
+            score += 15
+            criterios["categoria"] = {"match": "parcial", "puntos": 15}
+        else:
+            criterios["categoria"] = {"match": False, "puntos": 0}
+    else:
+        score += 10
+        criterios["categoria"] = {"match": "no_definido", "puntos": 10}
+
+    # 4. Período correcto (10 puntos)
+    if datos.fecha_emision and datos.fecha_emision.year == linea.año_fiscal:
+        score += 10
+        criterios["periodo"] = {"match": True, "puntos": 10}
+    else:
+        criterios["periodo"] = {"match": False, "puntos": 0}
+
+    # 5. Descripción similar (10 puntos)
+    if linea.descripcion and datos.concepto:
+        if comparar_textos(datos.concepto, linea.descripcion):
+            score += 10
+            criterios["descripcion"] = {"match": True, "puntos": 10}
+        else:
+            criterios["descripcion"] = {"match": False, "puntos": 0}
+    else:
+        score += 5
+        criterios["descripcion"] = {"match": "no_evaluable", "puntos": 5}
+
+    return score, criterios
+
+
+# Llaves compartidas (bits) → criterios que pueden puntuar
+PROVEEDOR, CATEGORIA, NOMBRE, DESCRIPCION = 1, 2, 4, 8
+
+
+def cota_score(linea, llaves: int, factura_con_proveedor: bool, factura_con_concepto: bool) -> int:
+    """
+    Score máximo posible de una línea dadas las llaves que comparte con la factura.
+
+    Cota superior de calcular_score: monto y período se asumen al máximo; un
+    criterio de texto solo puede puntuar si comparte llave (o si da puntos
+    base por no estar definido).
+    """
+    cota = 25 + 10  # monto + período
+
+    if linea.proveedor_preferido and factura_con_proveedor:
+        cota += 35 if llaves & PROVEEDOR else 0
+    else:
+        cota += 15
+
+    if linea.categoria and factura_con_concepto:
+        if llaves & CATEGORIA:
+            cota += 20
+        elif llaves & NOMBRE and linea.nombre:
+            cota += 15
+    else:
+        cota += 10
+
+    if linea.descripcion and factura_con_concepto:
+        cota += 10 if llaves & DESCRIPCION else 0
+    else:
+        cota += 5
+    return cota
+
+
+# ==================== ÍNDICE ====================
+
+class IndiceLineasPresupuesto:
+    """Índices invertidos (llave → posiciones de línea) construidos una vez."""
+
+    def __init__(self, lineas: Iterable):
+        self.lineas = list(lineas)
+        self._proveedor: Dict[str, Set[int]] = defaultdict(set)
+        self._textos: Dict[int, Dict[str, Set[int]]] = {
+            CATEGORIA: defaultdict(set), NOMBRE: defaultdict(set), DESCRIPCION: defaultdict(set)
+        }
+        self._comodines: Dict[Tuple[bool, bool, int], List[int]] = {}
+        self.evaluaciones = 0  # scores calculados (para métricas)
+
+        for posicion, linea in enumerate(self.lineas):
+            if linea.proveedor_preferido:
+                nit = nit_base(linea.proveedor_preferido)
+                if nit:
+                    self._proveedor[f"nit:{nit}"].add(posicion)
+                nombre = normalizar(linea.proveedor_preferido)
+                self._proveedor[f"nombre:{nombre}"].add(posicion)
+                for palabra in set(nombre.split()):
+                    self._proveedor[f"palabra:{palabra}"].add(posicion)
+            for campo, texto in ((CATEGORIA, linea.categoria), (NOMBRE, linea.nombre), (DESCRIPCION, linea.descripcion)):
+                if texto:
+                    self._textos[campo][f"texto:{normalizar(texto)}"].add(posicion)
+                    for palabra in palabras_concepto(texto):
+                        self._textos[campo][palabra].add(posicion)
+
+    def __len__(self) -> int:
+        return len(self.lineas)
+
+    def _comodines_para(self, con_proveedor: bool, con_concepto: bool, umbral: int) -> List[int]:
+        """Líneas que alcanzan el umbral sin compartir ninguna llave (puntos base)."""
+        clave = (con_proveedor, con_concepto, umbral)
+        if clave not in self._comodines:
+            self._comodines[clave] = [
+                posicion for posicion, linea in enumerate(self.lineas)
+                if cota_score(linea, 0, con_proveedor, con_concepto) >= umbral
+            ]
+        return self._comodines[clave]
+
+    def llaves_compartidas(self, datos: DatosFactura) -> Dict[int, int]:
+        """{posición de línea: bits de llaves compartidas con la factura}."""
+        llaves: Dict[int, int] = defaultdict(int)
+
+        nit = nit_base(datos.nit)
+        proveedor = set(self._proveedor.get(f"nit:{nit}", ())) if nit else set()
+        if datos.proveedor:
+            nombre = normalizar(datos.proveedor)
+            proveedor |= self._proveedor.get(f"nombre:{nombre}", set())
+            # comparar_proveedores exige 2+ palabras en común: "s.a.s" sola no basta
+            coincidencias: Dict[int, int] = defaultdict(int)
+            for palabra in set(nombre.split()):
+                for posicion in self._proveedor.get(f"palabra:{palabra}", ()):
+                    coincidencias[posicion] += 1
+            proveedor.update(p for p, veces in coincidencias.items() if veces >= 2)
+        for posicion in proveedor:
+            llaves[posicion] |= PROVEEDOR
+
+        if datos.concepto:
+            claves = [f"texto:{normalizar(datos.concepto)}", *palabras_concepto(datos.concepto)]
+            for campo, indice in self._textos.items():
+                for clave in claves:
+                    for posicion in indice.get(clave, ()):
+                        llaves[posicion] |= campo
+        return llaves
+
+    def candidatos(self, datos: DatosFactura, umbral: int = 0) -> List:
+        """
+        Líneas que pueden alcanzar el umbral, en el orden original.
+
+        Comparten alguna llave y su cota_score llega al umbral, o llegan al
+        umbral solo con puntos base (comodines).
+        """
+        con_proveedor = bool(datos.proveedor or datos.nit)
+        con_concepto = bool(datos.concepto)
+        posiciones = {
+            posicion for posicion, llaves in self.llaves_compartidas(datos).items()
+            if cota_score(self.lineas[posicion], llaves, con_proveedor, con_concepto) >= umbral
+        }
+        posiciones.update(self._comodines_para(con_proveedor, con_concepto, umbral))
+        return [self.lineas[posicion] for posicion in sorted(posiciones)]
+
+    def evaluar(
+        self,
+        datos: DatosFactura,
+        umbral: int,
+        top: int = 3
+    ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Mejor línea con score >= umbral y top de candidatos evaluados.
+
+        Empates: gana la primera línea en el orden original (igual que el
+        sort estable del recorrido completo).
+        """
+        evaluados = []
+        candidatos = self.candidatos(datos, umbral)
+        self.evaluaciones += len(candidatos)
+        for linea in candidatos:
+            score, criterios = calcular_score(datos, linea)
+            evaluados.append({"linea": linea, "score": score, "criterios": criterios})
+        evaluados.sort(key=lambda x: x["score"], reverse=True)
+
+        mejor = evaluados[0] if evaluados and evaluados[0]["score"] >= umbral else None
+        return mejor, evaluados[:top]
@@ -2,12 +2,16 @@
 """Servicio para acceder a PDFs y XMLs almacenados por invoice_extractor."""
 
 import os
+import sqlite3
 from pathlib import Path
 from typing import Optional, Dict, Tuple
 import xml.etree.ElementTree as ET
 from app.models.factura import Factura
 from app.utils.logger import logger
 
+# Índice del almacén de adjuntos (invoice_extractor/src/modules/attachments.py)
+ATTACHMENTS_INDEX_FILENAME = ".attachments.db"
+
 
 class InvoicePDFService:
     """Servicio para acceder a PDFs y XMLs de facturas desde invoice_extractor."""
@@ -41,6 +45,21 @@ class InvoicePDFService:
             logger.error(f"Intento de path traversal detectado en NIT: {nit}")
             return None
 
+        # ESTRATEGIA 0: Índice del almacén de adjuntos por CUFE (O(1))
+        if factura.cufe:
+            pdf_path = self._buscar_en_indice(factura.cufe, ".pdf")
+            if pdf_path:
+                logger.info(
+                    f"PDF encontrado vía índice de adjuntos",
+                    extra={
+                        "factura_id": factura.id,
+                        "numero_factura": factura.numero_factura,
+                        "pdf_filename": pdf_path.name,
+                        "estrategia": "indice_adjuntos"
+                    }
+                )
+                return pdf_path
+
         nit_dir = self.base_path / nit
 
         if not nit_dir.exists():
@@ -50,7 +69,7 @@ class InvoicePDFService:
             )
             return None
 
-        # ESTRATEGIA 0: Lookup directo con pdf_filename (O(1))
+        # ESTRATEGIA 0b: Lookup directo con pdf_filename (O(1))
         if factura.pdf_filename:
             pdf_path = nit_dir / factura.pdf_filename
 
@@ -192,6 +211,45 @@ class InvoicePDFService:
         )
         return None
 
+    def _buscar_en_indice(self, cufe: str, extension: str) -> Optional[Path]:
+        """
+        Busca un adjunto por CUFE en el índice SQLite de invoice_extractor.
+
+        Retorna la vista {CUFE}{ext} si existe; si no, el blob direccionado por
+        contenido. None si no hay índice o no hay registro.
+        """
+        index_path = self.base_path / ATTACHMENTS_INDEX_FILENAME
+        if not index_path.exists():
+            return None
+
+        try:
+            conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True, timeout=5)
+            try:
+                row = conn.execute(
+                    "SELECT vista, sha256 FROM adjuntos WHERE cufe = ? AND extension = ? "
+                    "ORDER BY creado_en LIMIT 1",
+                    (cufe.lower().strip(), extension)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Error consultando índice de adjuntos: {e}")
+            return None
+
+        if not row:
+            return None
+
+        vista, sha256 = row
+        candidatos = []
+        if vista:
+            candidatos.append(self.base_path / vista)
+        candidatos.append(self.base_path / ".objects" / sha256[:2] / sha256[2:4] / f"{sha256}{extension}")
+
+        for path in candidatos:
+            if path.exists() and self._is_safe_path(path):
+                return path
+        return None
+
     def _find_pdf_by_xml_matching(self, nit_dir: Path, cufe_buscado: str) -> Optional[Path]:
         """Encuentra PDF parseando XMLs y comparando UUIDs."""
         cufe_lower = cufe_buscado.lower().strip()
@@ -314,17 +372,25 @@ class InvoicePDFService:
             logger.error(f"Intento de path traversal detectado en NIT: {nit}")
             return None
 
-        xml_path = self.base_path / nit / f"ad{cufe_lower}.xml"
+        xml_indice = self._buscar_en_indice(cufe_lower, ".xml")
+        if xml_indice:
+            return xml_indice
 
-        try:
-            xml_path = xml_path.resolve()
-            if not str(xml_path).startswith(str(self.base_path.resolve())):
-                logger.error(f"Path traversal detectado: {xml_path}")
+        for nombre in (f"{cufe_lower}.xml", f"ad{cufe_lower}.xml"):
+            xml_path = self.base_path / nit / nombre
+
+            try:
+                xml_path = xml_path.resolve()
+                if not str(xml_path).startswith(str(self.base_path.resolve())):
+                    logger.error(f"Path traversal detectado: {xml_path}")
+                    return None
+            except Exception:
                 return None
-        except Exception:
-            return None
 
-        return xml_path if xml_path.exists() else None
+            if xml_path.exists():
+                return xml_path
+
+        return None
 
     def get_xml_content(self, factura: Factura) -> Optional[bytes]:
         """Lee el contenido del XML de una factura electrónica."""
@@ -4,7 +4,7 @@ Servicio de envío de emails usando Microsoft Graph API.
 
 Características:
 - Envío desde buzón compartido (notificacionrpa.auto@zentria.com.co)
-- Autenticación OAuth2 segura
+- Autenticación OAuth2 segura (token compartido vía graph_token_provider)
 - Soporte para HTML, CC, BCC, adjuntos
 - Retry automático con backoff
 - Logging detallado
@@ -13,12 +13,14 @@ Características:
 import requests
 import logging
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass
 import time
 import base64
 from pathlib import Path
 
+from app.services.graph_token_provider import get_graph_token_provider
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,47 +49,24 @@ class MicrosoftGraphEmailService:
             config: Configuración de Graph API
         """
         self.config = config
-        self.token = None
-        self.token_expires = None
+        self.token_provider = get_graph_token_provider(
+            config.tenant_id, config.client_id, config.client_secret
+        )
         self.max_retries = 3
         self.retry_delay = 2  # segundos
         self.graph_base_url = "https://graph.microsoft.com/v1.0"
 
     def _get_token(self) -> str:
         """
-        Obtiene token OAuth2 con cache automático.
+        Obtiene token OAuth2 del proveedor compartido.
+
+        El token se comparte entre instancias del servicio (y entre procesos
+        si GRAPH_TOKEN_CACHE_DIR está configurado) y se renueva antes de vencer.
 
         Returns:
             str: Bearer token válido
         """
-        # Si tenemos token válido en cache, usarlo
-        if self.token and self.token_expires and datetime.now() < self.token_expires:
-            return self.token
-
-        # Solicitar nuevo token
-        url = f"https://login.microsoftonline.com/{self.config.tenant_id}/oauth2/v2.0/token"
-        data = {
-            "client_id": self.config.client_id,
-            "client_secret": self.config.client_secret,
-            "scope": "https://graph.microsoft.com/.default",
-            "grant_type": "client_credentials"
-        }
-
-        try:
-            response = requests.post(url, data=data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-
-            self.token = result["access_token"]
-            # Guardar expiración con 1 minuto de margen
-            self.token_expires = datetime.now() + timedelta(seconds=result["expires_in"] - 60)
-
-            logger.info("  Token de Microsoft Graph obtenido exitosamente")
-            return self.token
-
-        except Exception as e:
-            logger.error(f" Error obteniendo token de Graph: {str(e)}")
-            raise
+        return self.token_provider.get_token()
 
     def send_email(
         self,
@@ -214,6 +193,10 @@ class MicrosoftGraphEmailService:
 
         response = requests.post(url, json=message, headers=headers, timeout=30)
 
+        # Token revocado o rotado: descartarlo para que el reintento pida otro
+        if response.status_code == 401:
+            self.token_provider.invalidar()
+
         # Graph API retorna 202 Accepted para envío exitoso
         if response.status_code == 202:
             return {
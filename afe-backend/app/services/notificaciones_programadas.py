@@ -8,13 +8,18 @@ Sistema profesional de notificaciones que sigue mejores prácticas:
 - Alertas críticas para facturas urgentes (> 10 días)
 - No spam, balanceado y efectivo
 
+Los emails programados se renderizan con plantillas Jinja2 compiladas una vez
+(resumen_semanal.html, alerta_urgente.html) y en lote: las filas de factura
+(fragmentos_notificaciones.html) se renderizan una vez por factura y se
+reutilizan, y cada envío renderiza todos los destinatarios con render_lote.
 """
 
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from decimal import Decimal
+from sqlalchemy.orm import Session, joinedload, lazyload
+from sqlalchemy import and_, case, func, or_
 
 from app.core.config import settings
 from app.models.factura import Factura, EstadoFactura
@@ -22,6 +27,7 @@ from app.models.usuario import Usuario
 from app.services.email_notifications import (
     enviar_notificacion_factura_pendiente
 )
+from app.services.email_template_service import CacheFragmentos, get_template_service
 from app.services.url_builder_service import URLBuilderService
 
 logger = logging.getLogger(__name__)
@@ -37,8 +43,29 @@ class NotificacionesProgramadasService:
     3. Urgente → Facturas críticas (> 10 días)
     """
 
+    # Umbrales de antigüedad (días desde fecha de emisión)
+    DIAS_URGENTE = 10
+    DIAS_PENDIENTE = 3
+
+    # Máximo de facturas listadas por email (los conteos siempre son completos)
+    MAX_FACTURAS_POR_EMAIL = 20
+
+    COLORES = {
+        "red": "#dc3545",
+        "orange": "#ff9800",
+        "green": "#28a745"
+    }
+
     def __init__(self, db: Session):
         self.db = db
+        self._fragmentos: Optional[CacheFragmentos] = None
+
+    @property
+    def fragmentos(self) -> CacheFragmentos:
+        """Filas y listas de facturas renderizadas una vez por envío."""
+        if self._fragmentos is None:
+            self._fragmentos = CacheFragmentos('fragmentos_notificaciones.html')
+        return self._fragmentos
 
     # ========================================================================
     # 1. NOTIFICACIÓN INMEDIATA - Nueva Factura Asignada
@@ -116,18 +143,28 @@ class NotificacionesProgramadasService:
         - Día: Lunes
         - Hora: 8:00 AM
 
+        Los conteos por antigüedad y el top de facturas de cada responsable
+        se obtienen con un número constante de consultas (ver
+        _obtener_pendientes_por_responsable), no con una consulta por usuario.
+
         Returns:
             Estadísticas de envío
         """
         logger.info("Iniciando envio de resumen semanal de facturas pendientes...")
 
         # Obtener todos los usuarios con email
-        usuarios = self.db.query(Usuario).filter(
+        usuarios = self.db.query(Usuario).options(
+            lazyload(Usuario.facturas)
+        ).filter(
             Usuario.email.isnot(None),
             Usuario.email != '',
             Usuario.activo == True
         ).all()
 
+        pendientes_por_responsable = self._obtener_pendientes_por_responsable(
+            responsable_ids=[u.id for u in usuarios]
+        )
+
         resultados = {
             'total_responsables': len(usuarios),
             'emails_enviados': 0,
@@ -136,41 +173,29 @@ class NotificacionesProgramadasService:
             'errores': []
         }
 
+        # Contextos de todos los destinatarios → un render en lote
+        destinatarios = []
         for responsable in usuarios:
-            try:
-                # Obtener facturas pendientes del usuario
-                facturas_pendientes = self.db.query(Factura).filter(
-                    and_(
-                        Factura.responsable_id == responsable.id,
-                        Factura.estado == EstadoFactura.en_revision
-                    )
-                ).all()
-
-                if not facturas_pendientes:
-                    resultados['responsables_sin_facturas'] += 1
-                    continue
-
-                # Clasificar facturas por urgencia
-                urgentes = []  # > 10 días
-                pendientes = []  # 3-10 días
-                recientes = []  # < 3 días
-
-                for factura in facturas_pendientes:
-                    dias = self._calcular_dias_pendiente(factura)
-
-                    if dias > 10:
-                        urgentes.append((factura, dias))
-                    elif dias >= 3:
-                        pendientes.append((factura, dias))
-                    else:
-                        recientes.append((factura, dias))
+            resumen = pendientes_por_responsable.get(responsable.id)
+
+            if not resumen:
+                resultados['responsables_sin_facturas'] += 1
+                continue
+            destinatarios.append((responsable, self._contexto_resumen_semanal(responsable, resumen)))
+
+        htmls = get_template_service().render_lote(
+            'resumen_semanal.html',
+            [contexto for _, contexto in destinatarios],
+            comunes={'frontend_url': settings.frontend_url}
+        )
 
+        for (responsable, contexto), body_html in zip(destinatarios, htmls):
+            try:
                 # Enviar email con resumen
                 resultado = self._enviar_email_resumen_semanal(
                     responsable=responsable,
-                    urgentes=urgentes,
-                    pendientes=pendientes,
-                    recientes=recientes
+                    total_facturas=contexto['total_facturas'],
+                    body_html=body_html
                 )
 
                 if resultado.get('success'):
@@ -215,53 +240,60 @@ class NotificacionesProgramadasService:
         """
         logger.info("Iniciando envio de alertas urgentes...")
 
-        # Obtener facturas urgentes (> 10 días pendientes)
-        facturas_urgentes = self.db.query(Factura).filter(
-            and_(
-                Factura.estado == EstadoFactura.en_revision,
-                Factura.responsable_id.isnot(None)
-            )
-        ).all()
+        # Conteos y top de facturas urgentes (> 10 días) agrupados en SQL
+        urgentes_por_responsable = self._obtener_pendientes_por_responsable(
+            solo_urgentes=True
+        )
 
-        # Filtrar por días
-        facturas_criticas = []
-        for factura in facturas_urgentes:
-            dias = self._calcular_dias_pendiente(factura)
-            if dias > 10:
-                facturas_criticas.append((factura, dias))
+        total_criticas = sum(r['urgentes'] for r in urgentes_por_responsable.values())
 
-        if not facturas_criticas:
+        if not total_criticas:
             logger.info("No hay facturas urgentes (> 10 dias)")
             return {'total': 0, 'enviados': 0}
 
-        # Agrupar por responsable
-        por_responsable = {}
-        for factura, dias in facturas_criticas:
-            resp_id = factura.responsable_id
-            if resp_id not in por_responsable:
-                por_responsable[resp_id] = []
-            por_responsable[resp_id].append((factura, dias))
+        # Cargar todos los responsables involucrados en una sola consulta
+        responsables = {
+            u.id: u
+            for u in self.db.query(Usuario).options(
+                lazyload(Usuario.facturas)
+            ).filter(
+                Usuario.id.in_(list(urgentes_por_responsable.keys()))
+            ).all()
+        }
 
         # Enviar alertas
-        resultados = {'total': len(facturas_criticas), 'enviados': 0, 'fallidos': 0}
-
-        for resp_id, facturas in por_responsable.items():
-            responsable = self.db.query(Usuario).filter(Usuario.id == resp_id).first()
-
-            if not responsable or not responsable.email:
-                continue
+        resultados = {'total': total_criticas, 'enviados': 0, 'fallidos': 0}
+
+        destinatarios = [
+            (responsables[resp_id], resumen)
+            for resp_id, resumen in urgentes_por_responsable.items()
+            if responsables.get(resp_id) and responsables[resp_id].email
+        ]
+        htmls = get_template_service().render_lote(
+            'alerta_urgente.html',
+            [
+                self._contexto_alerta_urgente(responsable, resumen['facturas'], total=resumen['urgentes'])
+                for responsable, resumen in destinatarios
+            ],
+            comunes={'frontend_url': settings.frontend_url}
+        )
 
+        for (responsable, resumen), body_html in zip(destinatarios, htmls):
             try:
-                resultado = self._enviar_email_alerta_urgente(responsable, facturas)
+                resultado = self._enviar_email_alerta_urgente(
+                    responsable,
+                    total=resumen['urgentes'],
+                    body_html=body_html
+                )
 
                 if resultado.get('success'):
-                    resultados['enviados'] += len(facturas)
+                    resultados['enviados'] += resumen['urgentes']
                 else:
-                    resultados['fallidos'] += len(facturas)
+                    resultados['fallidos'] += resumen['urgentes']
 
             except Exception as e:
                 logger.error(f"Error enviando alerta urgente a {responsable.usuario}: {str(e)}")
-                resultados['fallidos'] += len(facturas)
+                resultados['fallidos'] += resumen['urgentes']
 
         logger.info(f"Alertas urgentes: {resultados['enviados']} facturas notificadas")
         return resultados
@@ -276,58 +308,183 @@ class NotificacionesProgramadasService:
             return 0
         return (datetime.now().date() - factura.fecha_emision).days
 
+    def _condiciones_antiguedad(self, fecha_emision, hoy):
+        """
+        Condiciones SQL (urgente, reciente) equivalentes a _calcular_dias_pendiente.
+
+        dias > 10 → urgente | 3 <= dias <= 10 → pendiente | dias < 3 → reciente.
+        Sin fecha_emision son 0 días → reciente.
+        """
+        limite_urgente = hoy - timedelta(days=self.DIAS_URGENTE)
+        limite_reciente = hoy - timedelta(days=self.DIAS_PENDIENTE)
+        return (
+            fecha_emision < limite_urgente,
+            or_(fecha_emision.is_(None), fecha_emision > limite_reciente)
+        )
+
+    def _obtener_pendientes_por_responsable(
+        self,
+        responsable_ids: Optional[List[int]] = None,
+        solo_urgentes: bool = False
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Agrupa en SQL las facturas en revisión por responsable.
+
+        Ejecuta dos consultas sin importar el número de responsables:
+        1. GROUP BY responsable_id con conteos por antigüedad y monto total
+        2. ROW_NUMBER() por responsable para traer solo las N facturas más
+           antiguas (las que se muestran en el email)
+
+        Args:
+            responsable_ids: Limitar a estos responsables (None = todos)
+            solo_urgentes: Considerar solo facturas con más de 10 días
+
+        Returns:
+            {responsable_id: {'total', 'urgentes', 'pendientes', 'recientes',
+                              'monto_total', 'facturas': [(factura, dias), ...]}}
+        """
+        if responsable_ids is not None and not responsable_ids:
+            return {}
+
+        es_urgente, es_reciente = self._condiciones_antiguedad(
+            Factura.fecha_emision, datetime.now().date()
+        )
+        # Las más antiguas primero; sin fecha al final (NULL ordena primero en MySQL)
+        orden_antiguedad = (
+            case((Factura.fecha_emision.is_(None), 1), else_=0),
+            Factura.fecha_emision.asc(),
+            Factura.id.asc()
+        )
+
+        filtros = [
+            Factura.estado == EstadoFactura.en_revision,
+            Factura.responsable_id.isnot(None)
+        ]
+        if responsable_ids is not None:
+            filtros.append(Factura.responsable_id.in_(responsable_ids))
+        if solo_urgentes:
+            filtros.append(es_urgente)
+
+        # Mismo criterio que Factura.total_calculado (fallback a total_a_pagar)
+        subtotal_iva = func.coalesce(Factura.subtotal, 0) + func.coalesce(Factura.iva, 0)
+        total_factura = case(
+            (and_(subtotal_iva == 0, Factura.total_a_pagar.isnot(None)), Factura.total_a_pagar),
+            else_=subtotal_iva
+        )
+
+        # 1. Conteos agregados por responsable
+        conteos = self.db.query(
+            Factura.responsable_id,
+            func.count(Factura.id).label('total'),
+            func.sum(case((es_urgente, 1), else_=0)).label('urgentes'),
+            func.sum(case((es_reciente, 1), else_=0)).label('recientes'),
+            func.sum(total_factura).label('monto_total')
+        ).filter(*filtros).group_by(Factura.responsable_id).all()
+
+        resumen = {}
+        for fila in conteos:
+            urgentes = int(fila.urgentes or 0)
+            recientes = int(fila.recientes or 0)
+            resumen[fila.responsable_id] = {
+                'total': int(fila.total),
+                'urgentes': urgentes,
+                'pendientes': int(fila.total) - urgentes - recientes,
+                'recientes': recientes,
+                'monto_total': fila.monto_total or Decimal('0.00'),
+                'facturas': []
+            }
+
+        if not resumen:
+            return resumen
+
+        # 2. Top-N facturas más antiguas por responsable
+        ranking = self.db.query(
+            Factura.id.label('factura_id'),
+            func.row_number().over(
+                partition_by=Factura.responsable_id,
+                order_by=orden_antiguedad
+            ).label('posicion')
+        ).filter(*filtros).subquery()
+
+        facturas_top = self.db.query(Factura).options(
+            joinedload(Factura.proveedor),
+            lazyload(Factura.usuario),
+            lazyload(Factura.grupo),
+            lazyload(Factura.items)
+        ).join(
+            ranking, ranking.c.factura_id == Factura.id
+        ).filter(
+            ranking.c.posicion <= self.MAX_FACTURAS_POR_EMAIL
+        ).order_by(
+            Factura.responsable_id, *orden_antiguedad
+        ).all()
+
+        for factura in facturas_top:
+            resumen[factura.responsable_id]['facturas'].append(
+                (factura, self._calcular_dias_pendiente(factura))
+            )
+
+        return resumen
+
+    def _contexto_resumen_semanal(
+        self,
+        responsable: Usuario,
+        resumen: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Contexto de resumen_semanal.html para un responsable."""
+        # Clasificar el top de facturas por urgencia (los conteos vienen de SQL)
+        urgentes = []  # > 10 días
+        pendientes = []  # 3-10 días
+        recientes = []  # < 3 días
+
+        for factura, dias in resumen['facturas']:
+            if dias > self.DIAS_URGENTE:
+                urgentes.append((factura, dias))
+            elif dias >= self.DIAS_PENDIENTE:
+                pendientes.append((factura, dias))
+            else:
+                recientes.append((factura, dias))
+
+        return {
+            'nombre_responsable': responsable.nombre or responsable.usuario,
+            'total_facturas': resumen['total'],
+            'monto_total': f"${resumen['monto_total']:,.2f}",
+            'html_urgentes': self._generar_lista_facturas(
+                urgentes, "URGENTES (> 10 dias)", "red", total=resumen['urgentes']
+            ),
+            'html_pendientes': self._generar_lista_facturas(
+                pendientes, "PENDIENTES (3-10 dias)", "orange", total=resumen['pendientes']
+            ),
+            'html_recientes': self._generar_lista_facturas(
+                recientes, "RECIENTES (< 3 dias)", "green", total=resumen['recientes']
+            ),
+        }
+
+    def _contexto_alerta_urgente(
+        self,
+        responsable: Usuario,
+        facturas: List,
+        total: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Contexto de alerta_urgente.html para un responsable."""
+        total = total if total is not None else len(facturas)
+        return {
+            'nombre_responsable': responsable.nombre or responsable.usuario,
+            'total': total,
+            'html_facturas': self._generar_lista_facturas(facturas, "FACTURAS URGENTES", "red", total=total),
+        }
+
     def _enviar_email_resumen_semanal(
         self,
         responsable: Usuario,
-        urgentes: List,
-        pendientes: List,
-        recientes: List
+        total_facturas: int,
+        body_html: Optional[str]
     ) -> Dict[str, Any]:
-        """Envía email de resumen semanal."""
+        """Envía email de resumen semanal (HTML ya renderizado en lote)."""
         from app.services.unified_email_service import get_unified_email_service
 
-        # Construir HTML del resumen
-        total_facturas = len(urgentes) + len(pendientes) + len(recientes)
-        total_monto = sum(
-            f.total_calculado or 0
-            for f, _ in (urgentes + pendientes + recientes)
-        )
-
-        html_urgentes = self._generar_lista_facturas(urgentes, "URGENTES (> 10 dias)", "red")
-        html_pendientes = self._generar_lista_facturas(pendientes, "PENDIENTES (3-10 dias)", "orange")
-        html_recientes = self._generar_lista_facturas(recientes, "RECIENTES (< 3 dias)", "green")
-
-        body_html = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f4f4f4;">
-            <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 8px;">
-                <h1 style="color: #333; border-bottom: 3px solid #007bff; padding-bottom: 15px;">
-                    Resumen Semanal - Facturas Pendientes
-                </h1>
-
-                <p>Hola <strong>{responsable.nombre or responsable.usuario}</strong>,</p>
-
-                <p>Tienes <strong>{total_facturas} facturas</strong> pendientes de revision por un total de <strong>${total_monto:,.2f} COP</strong>.</p>
-
-                {html_urgentes}
-                {html_pendientes}
-                {html_recientes}
-
-                <div style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.frontend_url}/facturas"
-                       style="display: inline-block; padding: 12px 24px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px;">
-                        Ver todas en el sistema
-                    </a>
-                </div>
-
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center; color: #777; font-size: 12px;">
-                    <p>Este es un resumen semanal automatico del Sistema AFE</p>
-                    <p>Zentria - Gestion de Facturas Electronicas</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        if body_html is None:
+            return {'success': False, 'error': 'Error renderizando plantilla resumen_semanal.html'}
 
         service = get_unified_email_service()
         return service.send_email(
@@ -340,85 +497,64 @@ class NotificacionesProgramadasService:
     def _enviar_email_alerta_urgente(
         self,
         responsable: Usuario,
-        facturas: List
+        total: int,
+        body_html: Optional[str]
     ) -> Dict[str, Any]:
-        """Envía email de alerta urgente."""
+        """Envía email de alerta urgente (HTML ya renderizado en lote)."""
         from app.services.unified_email_service import get_unified_email_service
 
-        html_facturas = self._generar_lista_facturas(facturas, "FACTURAS URGENTES", "red")
-
-        body_html = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f4f4f4;">
-            <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 8px;">
-                <h1 style="color: #dc3545; border-bottom: 3px solid #dc3545; padding-bottom: 15px;">
-                    ALERTA: Facturas Urgentes
-                </h1>
-
-                <p>Hola <strong>{responsable.nombre or responsable.usuario}</strong>,</p>
-
-                <p style="color: #dc3545; font-weight: bold;">
-                    Tienes {len(facturas)} facturas con mas de 10 dias sin revisar.
-                </p>
-
-                {html_facturas}
-
-                <div style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.frontend_url}/facturas"
-                       style="display: inline-block; padding: 12px 24px; background-color: #dc3545; color: white; text-decoration: none; border-radius: 5px;">
-                        Revisar urgentemente
-                    </a>
-                </div>
-
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center; color: #777; font-size: 12px;">
-                    <p>Alerta automatica del Sistema AFE</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        if body_html is None:
+            return {'success': False, 'error': 'Error renderizando plantilla alerta_urgente.html'}
 
         service = get_unified_email_service()
         return service.send_email(
             to_email=responsable.email,
-            subject=f"URGENTE: {len(facturas)} facturas pendientes > 10 dias",
+            subject=f"URGENTE: {total} facturas pendientes > 10 dias",
             body_html=body_html,
             importance="high"
         )
 
-    def _generar_lista_facturas(self, facturas: List, titulo: str, color: str) -> str:
-        """Genera HTML para lista de facturas."""
-        if not facturas:
-            return ""
+    def _generar_lista_facturas(
+        self,
+        facturas: List,
+        titulo: str,
+        color: str,
+        total: Optional[int] = None
+    ) -> str:
+        """
+        Genera HTML para lista de facturas.
 
-        color_map = {
-            "red": "#dc3545",
-            "orange": "#ff9800",
-            "green": "#28a745"
-        }
+        Cada fila se renderiza una vez por (factura, días, color) y se
+        reutiliza en los demás emails del envío.
 
-        html = f"""
-        <div style="margin: 20px 0; padding: 15px; background-color: #f8f9fa; border-left: 4px solid {color_map.get(color, '#007bff')}; border-radius: 4px;">
-            <h3 style="color: {color_map.get(color, '#007bff')}; margin-top: 0;">{titulo}: {len(facturas)}</h3>
-            <ul style="list-style: none; padding: 0;">
+        Args:
+            total: Conteo real del grupo; si es mayor que las facturas listadas
+                   se agrega una línea "y N más".
         """
+        total = total if total is not None else len(facturas)
+        if not total:
+            return ""
 
+        hex_color = self.COLORES.get(color, '#007bff')
+        filas = []
         for factura, dias in facturas:
-            monto = f"${factura.total_calculado:,.2f}" if factura.total_calculado else "N/A"
-            proveedor = factura.proveedor.razon_social[:30] if factura.proveedor else "N/A"
-
-            html += f"""
-                <li style="padding: 8px 0; border-bottom: 1px solid #dee2e6;">
-                    <strong>{factura.numero_factura}</strong> - {proveedor} - {monto} COP - <span style="color: {color_map.get(color)};">{dias} dias</span>
-                </li>
-            """
-
-        html += """
-            </ul>
-        </div>
-        """
-
-        return html
+            filas.append(self.fragmentos.render(
+                'fila_factura',
+                (factura.id, dias, hex_color),
+                numero_factura=factura.numero_factura,
+                proveedor=factura.proveedor.razon_social[:30] if factura.proveedor else "N/A",
+                monto=f"${factura.total_calculado:,.2f}" if factura.total_calculado else "N/A",
+                dias=dias,
+                color=hex_color
+            ))
+
+        return self.fragmentos.modulo.lista_facturas(
+            titulo=titulo,
+            color=hex_color,
+            total=total,
+            filas=filas,
+            restantes=total - len(facturas)
+        )
 
 
 # FUNCIONES DE CONVENIENCIA
@@ -0,0 +1,307 @@
+"""
+Ciclo de vida de particiones RANGE de la tabla facturas (MySQL).
+
+app/scripts/manage_partitions.py era un CLI manual: había que recordar crear
+la partición del año siguiente antes de enero (si no, todo caía en p_future)
+y no había forma de sacar años antiguos sin borrarlos.
+
+Este servicio, ejecutado a diario por el scheduler cluster:
+
+1. Lee las particiones actuales de INFORMATION_SCHEMA.PARTITIONS
+2. Crea por adelantado el período actual + N futuros (REORGANIZE de la
+   partición MAXVALUE), con granularidad anual o mensual
+3. Archiva particiones más antiguas que la retención: EXCHANGE PARTITION a
+   una tabla facturas_archivo_<período> (ROW_FORMAT=COMPRESSED) y DROP de la
+   partición ya vacía. Los datos quedan consultables en la tabla de archivo.
+
+Soporta las tres formas de particionar por fecha de emisión:
+- RANGE COLUMNS(fecha_emision)          → límites 'YYYY-MM-DD'
+- RANGE (TO_DAYS(fecha_emision))        → límites TO_DAYS('YYYY-MM-DD')
+- RANGE (YEAR(fecha_emision))           → límites YYYY (solo anual)
+
+Si la tabla no está particionada (el esquema actual tiene llaves foráneas,
+incompatibles con particiones InnoDB) el mantenimiento no hace nada. Las
+consultas por período usan rangos semiabiertos (DateHelper.create_mes_filter)
+para que MySQL pueda podar particiones cuando existan.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+GRANULARIDADES = ("anual", "mensual")
+TABLA = "facturas"
+PREFIJO_ARCHIVO = "facturas_archivo_"
+
+
+@dataclass
+class Particion:
+    """Partición existente (limite=None: MAXVALUE)."""
+    nombre: str
+    limite: Optional[date]
+    filas: int = 0
+    comentario: str = ""
+
+
+@dataclass
+class PlanParticiones:
+    """Cambios a aplicar: particiones nuevas (desde, hasta) y a archivar."""
+    crear: List[Tuple[str, date, date]] = field(default_factory=list)
+    archivar: List[Particion] = field(default_factory=list)
+
+    @property
+    def vacio(self) -> bool:
+        return not self.crear and not self.archivar
+
+
+# ----------------------------------------------------------------------
+# Planificación (sin BD)
+# ----------------------------------------------------------------------
+
+def inicio_periodo(fecha: date, granularidad: str) -> date:
+    if granularidad == "anual":
+        return date(fecha.year, 1, 1)
+    return date(fecha.year, fecha.month, 1)
+
+
+def siguiente_periodo(inicio: date, granularidad: str) -> date:
+    if granularidad == "anual":
+        return date(inicio.year + 1, 1, 1)
+    if inicio.month == 12:
+        return date(inicio.year + 1, 1, 1)
+    return date(inicio.year, inicio.month + 1, 1)
+
+
+def restar_meses(fecha: date, meses: int) -> date:
+    total = fecha.year * 12 + (fecha.month - 1) - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nombre_particion(inicio: date, granularidad: str) -> str:
+    """p2027 (anual) o p2027_03 (mensual)."""
+    if granularidad == "anual":
+        return f"p{inicio.year}"
+    return f"p{inicio.year}_{inicio.month:02d}"
+
+
+def parsear_limite(descripcion: Optional[str]) -> Optional[date]:
+    """
+    PARTITION_DESCRIPTION → fecha límite (exclusiva).
+
+    'MAXVALUE' → None; '2027' → 2027-01-01; "'2027-03-01'" → 2027-03-01;
+    '739252' (TO_DAYS) → fecha equivalente.
+    """
+    valor = (descripcion or "").strip().strip("'\"")
+    if not valor or valor.upper() == "MAXVALUE":
+        return None
+    if valor.isdigit():
+        numero = int(valor)
+        if numero < 10000:
+            return date(numero, 1, 1)
+        # TO_DAYS('0001-01-01') = 366; date.toordinal(0001-01-01) = 1
+        return date.fromordinal(numero - 365)
+    return datetime.strptime(valor[:10], "%Y-%m-%d").date()
+
+
+def planificar(
+    particiones: List[Particion],
+    hoy: date,
+    granularidad: str = "anual",
+    periodos_adelante: int = 2,
+    retencion_meses: int = 0
+) -> PlanParticiones:
+    """
+    Calcula qué crear y qué archivar.
+
+    - Crear: desde el último límite acotado hasta cubrir el período actual
+      y `periodos_adelante` períodos más. La granularidad aplica a las
+      particiones nuevas (se puede pasar de anual a mensual sin reorganizar).
+    - Archivar: particiones acotadas cuyo límite es <= hoy - retencion_meses
+      (inicio de mes). Nunca la partición MAXVALUE.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida: {granularidad} (use {' | '.join(GRANULARIDADES)})")
+
+    plan = PlanParticiones()
+    limites = [p.limite for p in particiones if p.limite is not None]
+    if not limites:
+        return plan
+
+    objetivo = inicio_periodo(hoy, granularidad)
+    for _ in range(periodos_adelante + 1):
+        objetivo = siguiente_periodo(objetivo, granularidad)
+
+    desde = max(limites)
+    while desde < objetivo:
+        # Si el último límite no está alineado (p.ej. anual → mensual a mitad
+        # de año) la primera partición nueva llega al siguiente inicio de período
+        hasta = siguiente_periodo(inicio_periodo(desde, granularidad), granularidad)
+        plan.crear.append((nombre_particion(desde, granularidad), desde, hasta))
+        desde = hasta
+
+    if retencion_meses > 0:
+        corte = restar_meses(date(hoy.year, hoy.month, 1), retencion_meses)
+        plan.archivar = [p for p in particiones if p.limite is not None and p.limite <= corte]
+    return plan
+
+
+# ----------------------------------------------------------------------
+# Ejecución (MySQL)
+# ----------------------------------------------------------------------
+
+class GestorParticionesFacturas:
+    """Lee y modifica las particiones de facturas."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _es_mysql(self) -> bool:
+        return self.db.get_bind().dialect.name == "mysql"
+
+    def metodo(self) -> Tuple[Optional[str], Optional[str]]:
+        """(PARTITION_METHOD, PARTITION_EXPRESSION); (None, None) si no está particionada."""
+        if not self._es_mysql():
+            return None, None
+        fila = self.db.execute(text("""
+            SELECT PARTITION_METHOD, PARTITION_EXPRESSION
+            FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla
+              AND PARTITION_NAME IS NOT NULL
+            LIMIT 1
+        """), {"tabla": TABLA}).first()
+        if fila is None:
+            return None, None
+        return fila[0], fila[1]
+
+    def particiones(self) -> List[Particion]:
+        if not self._es_mysql():
+            return []
+        filas = self.db.execute(text("""
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS, PARTITION_COMMENT
+            FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla
+              AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """), {"tabla": TABLA}).all()
+        return [
+            Particion(nombre=f[0], limite=parsear_limite(f[1]), filas=int(f[2] or 0), comentario=f[3] or "")
+            for f in filas
+        ]
+
+    def _valor_limite(self, limite: date, metodo: str, expresion: str) -> str:
+        expresion = (expresion or "").lower()
+        if metodo == "RANGE COLUMNS":
+            return f"'{limite.isoformat()}'"
+        if "to_days" in expresion:
+            return f"TO_DAYS('{limite.isoformat()}')"
+        if "year" in expresion:
+            if limite.month != 1 or limite.day != 1:
+                raise ValueError("Particiones por YEAR() solo admiten granularidad anual")
+            return str(limite.year)
+        raise ValueError(f"Expresión de partición no soportada: {metodo} {expresion}")
+
+    def crear(self, nuevas: List[Tuple[str, date, date]]) -> None:
+        """Divide la partición MAXVALUE (o agrega al final si no existe)."""
+        if not nuevas:
+            return
+        metodo, expresion = self.metodo()
+        definiciones = [
+            f"PARTITION {nombre} VALUES LESS THAN ({self._valor_limite(hasta, metodo, expresion)}) "
+            f"COMMENT = 'Facturas desde {desde.isoformat()}'"
+            for nombre, desde, hasta in nuevas
+        ]
+        maxvalue = next((p for p in self.particiones() if p.limite is None), None)
+        if maxvalue is not None:
+            definiciones.append(
+                f"PARTITION {maxvalue.nombre} VALUES LESS THAN MAXVALUE COMMENT = 'Facturas futuras'"
+            )
+            sentencia = f"ALTER TABLE {TABLA} REORGANIZE PARTITION {maxvalue.nombre} INTO ({', '.join(definiciones)})"
+        else:
+            sentencia = f"ALTER TABLE {TABLA} ADD PARTITION ({', '.join(definiciones)})"
+        self.db.execute(text(sentencia))
+        logger.info("Particiones creadas en %s: %s", TABLA, ", ".join(n for n, _, _ in nuevas))
+
+    def _tabla_existe(self, tabla: str) -> bool:
+        return self.db.execute(text("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla
+        """), {"tabla": tabla}).scalar() > 0
+
+    def _esta_particionada(self, tabla: str) -> bool:
+        return self.db.execute(text("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND PARTITION_NAME IS NOT NULL
+        """), {"tabla": tabla}).scalar() > 0
+
+    def _tiene_filas(self, origen: str) -> bool:
+        return self.db.execute(text(f"SELECT 1 FROM {origen} LIMIT 1")).first() is not None
+
+    def archivar(self, particion: Particion) -> str:
+        """
+        Mueve una partición a facturas_archivo_<período> comprimida.
+
+        EXCHANGE exige la misma estructura sin particionar y el mismo formato
+        de fila, por eso la compresión se aplica después del intercambio.
+
+        Reanudable: si una ejecución anterior falló a mitad, la tabla de
+        archivo puede existir (particionada o no) o ya tener las filas tras
+        el EXCHANGE. Nunca se intercambia contra una tabla de archivo con
+        filas: EXCHANGE + DROP PARTITION las borraría.
+        """
+        archivo = f"{PREFIJO_ARCHIVO}{particion.nombre.lstrip('p')}"
+        if not self._tabla_existe(archivo):
+            self.db.execute(text(f"CREATE TABLE {archivo} LIKE {TABLA}"))
+            self.db.execute(text(f"ALTER TABLE {archivo} REMOVE PARTITIONING"))
+        elif self._esta_particionada(archivo):
+            # Falló entre CREATE TABLE ... LIKE y REMOVE PARTITIONING
+            self.db.execute(text(f"ALTER TABLE {archivo} REMOVE PARTITIONING"))
+
+        if not self._tiene_filas(archivo):
+            self.db.execute(text(f"ALTER TABLE {TABLA} EXCHANGE PARTITION {particion.nombre} WITH TABLE {archivo}"))
+        elif self._tiene_filas(f"{TABLA} PARTITION ({particion.nombre})"):
+            raise RuntimeError(
+                f"{archivo} ya tiene filas y la partición {particion.nombre} no está vacía; "
+                f"revisar manualmente antes de archivar"
+            )
+        else:
+            # EXCHANGE de una ejecución anterior ya hecho; falta el DROP
+            logger.warning("Reanudando archivo de %s: las filas ya están en %s", particion.nombre, archivo)
+
+        self.db.execute(text(f"ALTER TABLE {TABLA} DROP PARTITION {particion.nombre}"))
+        self.db.execute(text(f"ALTER TABLE {archivo} ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8"))
+        logger.info("Partición %s archivada en %s (%d filas aprox.)", particion.nombre, archivo, particion.filas)
+        return archivo
+
+    def mantener(
+        self,
+        hoy: Optional[date] = None,
+        granularidad: str = "anual",
+        periodos_adelante: int = 2,
+        retencion_meses: int = 0,
+        simular: bool = False
+    ) -> dict:
+        """Planifica y aplica (salvo simular=True)."""
+        particiones = self.particiones()
+        if not particiones:
+            return {"particionada": False, "creadas": [], "archivadas": []}
+
+        plan = planificar(particiones, hoy or date.today(), granularidad, periodos_adelante, retencion_meses)
+        resultado = {
+            "particionada": True,
+            "creadas": [nombre for nombre, _, _ in plan.crear],
+            "archivadas": [p.nombre for p in plan.archivar],
+            "simulado": simular,
+        }
+        if simular or plan.vacio:
+            return resultado
+
+        self.crear(plan.crear)
+        resultado["tablas_archivo"] = [self.archivar(p) for p in plan.archivar]
+        return resultado
@@ -0,0 +1,447 @@
+"""
+Scheduler en proceso seguro para múltiples workers (leader election por trabajo).
+
+Cada worker de la API arranca el mismo scheduler, pero una ejecución
+programada (slot) solo la ejecuta el worker que reclama el lease del
+trabajo en `leases_tareas_programadas`:
+
+    UPDATE leases_tareas_programadas
+       SET titular = :yo, lease_expira_en = :ahora + ttl, ultimo_slot = :slot, ...
+     WHERE nombre = :trabajo
+       AND (lease_expira_en IS NULL OR lease_expira_en < :ahora)   -- nadie lo ejecuta
+       AND (ultimo_slot IS NULL OR ultimo_slot < :limite)          -- slot no reclamado
+
+El UPDATE es atómico en la BD: exactamente un worker obtiene rowcount=1.
+Mientras el trabajo corre, un heartbeat renueva el lease; si el worker
+muere, el lease vence y el siguiente slot lo toma otro worker.
+
+Además:
+- Jitter: cada worker espera un retardo aleatorio antes de reclamar, para
+  no golpear la BD a la vez (y repartir trabajos entre workers).
+- Recuperación de ejecuciones perdidas: al arrancar, si el último slot
+  reclamado es anterior al slot más reciente del trigger (p.ej. todos los
+  workers estaban caídos el lunes 08:00), se ejecuta una vez de inmediato
+  (ejecuciones perdidas consecutivas se agrupan en una sola).
+- Estado: `estado_trabajos()` lista último inicio, duración, estado y
+  próxima ejecución (endpoint GET /automation/scheduler/estado).
+
+Los triggers de APScheduler (CronTrigger, IntervalTrigger) se usan solo
+para calcular las fechas; todas las fechas persistidas son UTC naive.
+"""
+
+import os
+import random
+import socket
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.estado_tarea import LeaseTareaProgramada
+from app.utils.logger import logger
+
+
+ORIGEN = "afe-backend"
+
+# Intervalo del bucle del scheduler (segundos)
+INTERVALO_TICK = 15
+
+# Máximo de slots a recorrer al buscar el último slot perdido
+MAX_SLOTS_RECUPERACION = 10000
+
+
+def _utc_ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _a_utc(fecha: Optional[datetime]) -> Optional[datetime]:
+    """Fecha (aware) del trigger → UTC naive para persistir/comparar."""
+    if fecha is None:
+        return None
+    return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _siguiente_slot(trigger, desde: datetime) -> Optional[datetime]:
+    """Primer slot del trigger >= desde (ambos UTC naive)."""
+    return _a_utc(trigger.get_next_fire_time(None, desde.replace(tzinfo=timezone.utc)))
+
+
+def _ultimo_slot_vencido(trigger, desde: datetime, ahora: datetime) -> Optional[datetime]:
+    """Slot más reciente en (desde, ahora]; None si no hay ninguno."""
+    ultimo = None
+    slot = _siguiente_slot(trigger, desde + timedelta(microseconds=1))
+    for _ in range(MAX_SLOTS_RECUPERACION):
+        if slot is None or slot > ahora:
+            break
+        ultimo = slot
+        slot = _siguiente_slot(trigger, slot + timedelta(microseconds=1))
+    return ultimo
+
+
+def generar_titular() -> str:
+    """Identificador único del worker: host:pid:token."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseTareas:
+    """
+    Lease distribuido sobre leases_tareas_programadas.
+
+    Cada operación usa su propia sesión corta (commit inmediato), separada
+    de la sesión del trabajo.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        titular: Optional[str] = None,
+        origen: str = ORIGEN
+    ):
+        self.session_factory = session_factory
+        self.titular = titular or generar_titular()
+        self.origen = origen
+
+    def registrar(self, nombre: str, proxima_ejecucion: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Crea la fila del trabajo si no existe y actualiza la próxima ejecución.
+
+        Returns:
+            ultimo_slot reclamado (None si el trabajo nunca se ha ejecutado)
+        """
+        db = self.session_factory()
+        try:
+            fila = db.get(LeaseTareaProgramada, nombre)
+            if fila is None:
+                db.add(LeaseTareaProgramada(nombre=nombre, origen=self.origen, proxima_ejecucion=proxima_ejecucion))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Otro worker la creó en paralelo
+                    db.rollback()
+                return db.execute(
+                    select(LeaseTareaProgramada.ultimo_slot).where(LeaseTareaProgramada.nombre == nombre)
+                ).scalar()
+
+            if proxima_ejecucion is not None and fila.proxima_ejecucion != proxima_ejecucion:
+                fila.proxima_ejecucion = proxima_ejecucion
+                db.commit()
+            return fila.ultimo_slot
+        finally:
+            db.close()
+
+    def reclamar(self, nombre: str, slot: datetime, ttl_segundos: int, limite: Optional[datetime] = None) -> bool:
+        """
+        Reclama el lease para ejecutar `slot`.
+
+        Args:
+            nombre: Trabajo
+            slot: Ejecución programada (UTC naive, sin jitter)
+            ttl_segundos: Duración del lease (se renueva con heartbeat)
+            limite: Se reclama solo si ultimo_slot < limite (por defecto el
+                propio slot: cada slot se ejecuta una sola vez)
+
+        Returns:
+            True si este worker obtuvo el lease.
+        """
+        ahora = _utc_ahora()
+        limite = limite or slot
+        db = self.session_factory()
+        try:
+            resultado = db.execute(
+                update(LeaseTareaProgramada)
+                .where(
+                    LeaseTareaProgramada.nombre == nombre,
+                    or_(LeaseTareaProgramada.lease_expira_en.is_(None),
+                        LeaseTareaProgramada.lease_expira_en < ahora),
+                    or_(LeaseTareaProgramada.ultimo_slot.is_(None),
+                        LeaseTareaProgramada.ultimo_slot < limite),
+                )
+                .values(
+                    titular=self.titular,
+                    lease_expira_en=ahora + timedelta(seconds=ttl_segundos),
+                    ultimo_slot=slot,
+                    ultimo_inicio=ahora,
+                    ultimo_fin=None,
+                    ultimo_estado="en_ejecucion",
+                    ultimo_error=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return resultado.rowcount == 1
+        finally:
+            db.close()
+
+    def renovar(self, nombre: str, ttl_segundos: int) -> bool:
+        """Heartbeat: extiende el lease si este worker sigue siendo el titular."""
+        db = self.session_factory()
+        try:
+            resultado = db.execute(
+                update(LeaseTareaProgramada)
+                .where(LeaseTareaProgramada.nombre == nombre, LeaseTareaProgramada.titular == self.titular)
+                .values(lease_expira_en=_utc_ahora() + timedelta(seconds=ttl_segundos))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return resultado.rowcount == 1
+        finally:
+            db.close()
+
+    def liberar(
+        self,
+        nombre: str,
+        inicio: datetime,
+        error: Optional[str] = None,
+        proxima_ejecucion: Optional[datetime] = None
+    ) -> None:
+        """Libera el lease y registra duración, estado y próxima ejecución."""
+        fin = _utc_ahora()
+        valores: Dict[str, Any] = {
+            "lease_expira_en": None,
+            "ultimo_fin": fin,
+            "ultima_duracion_seg": round((fin - inicio).total_seconds(), 3),
+            "ultimo_estado": "error" if error else "exitoso",
+            "ultimo_error": error[:500] if error else None,
+        }
+        if proxima_ejecucion is not None:
+            valores["proxima_ejecucion"] = proxima_ejecucion
+
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(LeaseTareaProgramada)
+                .where(LeaseTareaProgramada.nombre == nombre, LeaseTareaProgramada.titular == self.titular)
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def listar(self) -> List[LeaseTareaProgramada]:
+        db = self.session_factory()
+        try:
+            return list(db.execute(
+                select(LeaseTareaProgramada).order_by(LeaseTareaProgramada.nombre)
+            ).scalars())
+        finally:
+            db.close()
+
+
+@dataclass
+class TrabajoProgramado:
+    """
+    Definición de un trabajo del scheduler.
+
+    trigger=None → trabajo de arranque: se ejecuta una vez al iniciar, salvo
+    que otro worker lo haya ejecutado en los últimos `intervalo_minimo`.
+    """
+    nombre: str
+    descripcion: str
+    funcion: Callable[[], Any]
+    trigger: Any = None
+    jitter_segundos: int = 30
+    lease_segundos: int = 900
+    recuperar_perdidas: bool = True
+    intervalo_minimo: timedelta = field(default_factory=lambda: timedelta(minutes=10))
+
+    def siguiente(self, desde: datetime) -> Optional[datetime]:
+        if self.trigger is None:
+            return None
+        return _siguiente_slot(self.trigger, desde)
+
+
+class SchedulerCluster:
+    """Scheduler en un thread daemon; cada slot se ejecuta en un solo worker."""
+
+    def __init__(self, trabajos: List[TrabajoProgramado], lease: Optional[LeaseTareas] = None):
+        self.trabajos = {t.nombre: t for t in trabajos}
+        self.lease = lease or LeaseTareas()
+        # nombre -> (slot, momento del intento con jitter, limite)
+        self._pendientes: Dict[str, tuple] = {}
+        self._en_ejecucion: Dict[str, threading.Thread] = {}
+        self._detener = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== CICLO DE VIDA ====================
+
+    def iniciar(self) -> None:
+        ahora = _utc_ahora()
+        for trabajo in self.trabajos.values():
+            try:
+                self._planificar_inicial(trabajo, ahora)
+            except Exception as e:
+                logger.error(f" Scheduler: no se pudo registrar '{trabajo.nombre}': {str(e)}", exc_info=True)
+
+        self._thread = threading.Thread(target=self._bucle, name="scheduler-cluster", daemon=True)
+        self._thread.start()
+        logger.info(f" Scheduler cluster iniciado ({self.lease.titular}): {len(self.trabajos)} trabajos")
+
+    def detener(self, timeout: float = 5.0) -> None:
+        self._detener.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        logger.info(" Scheduler cluster detenido")
+
+    # ==================== PLANIFICACIÓN ====================
+
+    def _jitter(self, trabajo: TrabajoProgramado) -> timedelta:
+        return timedelta(seconds=random.uniform(0, trabajo.jitter_segundos))
+
+    def _planificar_inicial(self, trabajo: TrabajoProgramado, ahora: datetime) -> None:
+        proxima = trabajo.siguiente(ahora)
+        ultimo_slot = self.lease.registrar(trabajo.nombre, proxima)
+
+        if trabajo.trigger is None:
+            # Trabajo de arranque: un solo worker por ventana de intervalo_minimo
+            self._pendientes[trabajo.nombre] = (ahora, ahora + self._jitter(trabajo), ahora - trabajo.intervalo_minimo)
+            return
+
+        if trabajo.recuperar_perdidas and ultimo_slot is not None:
+            perdido = _ultimo_slot_vencido(trabajo.trigger, ultimo_slot, ahora)
+            if perdido is not None:
+                logger.info(f" Scheduler: recuperando ejecución perdida de '{trabajo.nombre}' ({perdido})")
+                self._pendientes[trabajo.nombre] = (perdido, ahora + self._jitter(trabajo), perdido)
+                return
+
+        if proxima is not None:
+            self._pendientes[trabajo.nombre] = (proxima, proxima + self._jitter(trabajo), proxima)
+
+    def _replanificar(self, trabajo: TrabajoProgramado, slot: datetime) -> None:
+        proxima = trabajo.siguiente(slot + timedelta(microseconds=1))
+        if proxima is None:
+            self._pendientes.pop(trabajo.nombre, None)
+        else:
+            self._pendientes[trabajo.nombre] = (proxima, proxima + self._jitter(trabajo), proxima)
+
+    # ==================== EJECUCIÓN ====================
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            try:
+                self.tick(_utc_ahora())
+            except Exception as e:
+                logger.error(f" Scheduler: error en tick: {str(e)}", exc_info=True)
+            self._detener.wait(INTERVALO_TICK)
+
+    def tick(self, ahora: datetime) -> None:
+        """Lanza los trabajos cuyo momento de intento (slot + jitter) ya llegó."""
+        for nombre, (slot, intento, limite) in list(self._pendientes.items()):
+            if intento > ahora:
+                continue
+            trabajo = self.trabajos[nombre]
+            hilo = self._en_ejecucion.get(nombre)
+            if hilo is not None and hilo.is_alive():
+                # El slot anterior sigue corriendo en este worker: se omite este
+                logger.warning(f" Scheduler: '{nombre}' sigue en ejecución, se omite slot {slot}")
+                self._replanificar(trabajo, slot)
+                continue
+
+            self._replanificar(trabajo, slot)
+            if not self.lease.reclamar(nombre, slot, trabajo.lease_segundos, limite):
+                continue
+
+            hilo = threading.Thread(
+                target=self._ejecutar, args=(trabajo, slot), name=f"job-{nombre}", daemon=True
+            )
+            self._en_ejecucion[nombre] = hilo
+            hilo.start()
+
+    def _ejecutar(self, trabajo: TrabajoProgramado, slot: datetime) -> None:
+        inicio = _utc_ahora()
+        fin_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not fin_heartbeat.wait(max(trabajo.lease_segundos / 3, 1)):
+                if not self.lease.renovar(trabajo.nombre, trabajo.lease_segundos):
+                    logger.warning(f" Scheduler: lease de '{trabajo.nombre}' perdido durante la ejecución")
+                    return
+
+        threading.Thread(target=heartbeat, name=f"heartbeat-{trabajo.nombre}", daemon=True).start()
+        logger.info(f" Scheduler: ejecutando '{trabajo.nombre}' (slot {slot})")
+
+        error = None
+        try:
+            trabajo.funcion()
+        except Exception as e:
+            error = str(e)
+            logger.error(f" Scheduler: error en '{trabajo.nombre}': {error}", exc_info=True)
+        finally:
+            fin_heartbeat.set()
+            try:
+                self.lease.liberar(
+                    trabajo.nombre, inicio, error,
+                    trabajo.siguiente(max(slot, inicio) + timedelta(microseconds=1))
+                )
+            except Exception as e:
+                logger.error(f" Scheduler: no se pudo liberar lease de '{trabajo.nombre}': {str(e)}")
+
+    # ==================== ESTADO ====================
+
+    def estado_trabajos(self) -> List[Dict[str, Any]]:
+        """Estado de todos los trabajos registrados en la BD (API y extractor)."""
+        return estado_trabajos(self.lease, self.trabajos)
+
+
+def estado_trabajos(
+    lease: Optional[LeaseTareas] = None,
+    trabajos: Optional[Dict[str, TrabajoProgramado]] = None
+) -> List[Dict[str, Any]]:
+    """Filas de leases_tareas_programadas con descripción y estado del lease."""
+    lease = lease or LeaseTareas()
+    trabajos = trabajos or {}
+    ahora = _utc_ahora()
+    resultado = []
+    for fila in lease.listar():
+        en_ejecucion = fila.lease_expira_en is not None and fila.lease_expira_en >= ahora
+        estado = fila.ultimo_estado
+        if estado == "en_ejecucion" and not en_ejecucion:
+            # El titular murió sin liberar el lease
+            estado = "abandonado"
+        trabajo = trabajos.get(fila.nombre)
+        resultado.append({
+            "nombre": fila.nombre,
+            "descripcion": trabajo.descripcion if trabajo else None,
+            "origen": fila.origen,
+            "en_ejecucion": en_ejecucion,
+            "titular": fila.titular,
+            "ultimo_slot": fila.ultimo_slot,
+            "ultimo_inicio": fila.ultimo_inicio,
+            "ultimo_fin": fila.ultimo_fin,
+            "ultima_duracion_seg": fila.ultima_duracion_seg,
+            "ultimo_estado": estado,
+            "ultimo_error": fila.ultimo_error,
+            "proxima_ejecucion": fila.proxima_ejecucion,
+        })
+    return resultado
+
+
+# Instancia del proceso (creada en lifespan)
+_scheduler: Optional[SchedulerCluster] = None
+
+
+def iniciar_scheduler_cluster(trabajos: List[TrabajoProgramado]) -> SchedulerCluster:
+    global _scheduler
+    if _scheduler is not None:
+        logger.warning("Scheduler cluster ya esta iniciado")
+        return _scheduler
+    _scheduler = SchedulerCluster(trabajos)
+    _scheduler.iniciar()
+    return _scheduler
+
+
+def detener_scheduler_cluster() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.detener()
+        _scheduler = None
+
+
+def obtener_scheduler_cluster() -> Optional[SchedulerCluster]:
+    return _scheduler
@@ -6,83 +6,50 @@ Configura y ejecuta notificaciones automáticas:
 - Resumen semanal: Lunes 8:00 AM
 - Alertas urgentes: Cada 3 días 8:00 AM
 
-Usa APScheduler para ejecución confiable y profesional.
+Los trabajos se ejecutan en el scheduler cluster (app/services/scheduler_cluster):
+con varios workers, cada envío lo hace un solo worker (lease en BD).
 """
 
 import logging
 from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
+from typing import List
+
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 from app.db.session import SessionLocal
 from app.services.notificaciones_programadas import NotificacionesProgramadasService
+from app.services.scheduler_cluster import TrabajoProgramado
 
 logger = logging.getLogger(__name__)
 
-# Scheduler global
-_scheduler = None
+# Ancla fija del ciclo de 3 días (lunes 8:00): el ciclo no se reinicia con
+# cada despliegue ni difiere entre workers
+ANCLA_ALERTAS_URGENTES = datetime(2025, 1, 6, 8, 0)
 
 
-def iniciar_scheduler_notificaciones():
+def trabajos_notificaciones() -> List[TrabajoProgramado]:
     """
-    Inicia el scheduler de notificaciones programadas.
+    Trabajos de notificaciones programadas para el scheduler cluster.
 
-    Se ejecuta al iniciar la aplicación (en lifespan).
+    Se registran al iniciar la aplicación (en lifespan).
     """
-    global _scheduler
-
-    if _scheduler is not None:
-        logger.warning("Scheduler de notificaciones ya esta iniciado")
-        return
-
-    _scheduler = BackgroundScheduler()
-
-    # ========================================================================
-    # JOB 1: Resumen Semanal - Lunes 8:00 AM
-    # ========================================================================
-    _scheduler.add_job(
-        func=_ejecutar_resumen_semanal,
-        trigger=CronTrigger(
-            day_of_week='mon',  # Lunes
-            hour=8,
-            minute=0
+    return [
+        # JOB 1: Resumen Semanal - Lunes 8:00 AM
+        TrabajoProgramado(
+            nombre='resumen_semanal_facturas',
+            descripcion='Resumen Semanal de Facturas Pendientes',
+            funcion=_ejecutar_resumen_semanal,
+            trigger=CronTrigger(day_of_week='mon', hour=8, minute=0),
         ),
-        id='resumen_semanal_facturas',
-        name='Resumen Semanal de Facturas Pendientes',
-        replace_existing=True
-    )
-
-    # ========================================================================
-    # JOB 2: Alertas Urgentes - Cada 3 días a las 8:00 AM
-    # ========================================================================
-    _scheduler.add_job(
-        func=_ejecutar_alertas_urgentes,
-        trigger=IntervalTrigger(days=3, start_date=datetime.now().replace(hour=8, minute=0, second=0)),
-        id='alertas_urgentes_facturas',
-        name='Alertas Urgentes Facturas > 10 dias',
-        replace_existing=True
-    )
-
-    _scheduler.start()
-
-    logger.info("Scheduler de notificaciones iniciado")
-    logger.info("  - Resumen semanal: Lunes 8:00 AM")
-    logger.info("  - Alertas urgentes: Cada 3 dias 8:00 AM")
-
-
-def detener_scheduler_notificaciones():
-    """
-    Detiene el scheduler de notificaciones.
-
-    Se ejecuta al cerrar la aplicación (en lifespan).
-    """
-    global _scheduler
-
-    if _scheduler is not None:
-        _scheduler.shutdown()
-        _scheduler = None
-        logger.info("Scheduler de notificaciones detenido")
+        # JOB 2: Alertas Urgentes - Cada 3 días a las 8:00 AM
+        TrabajoProgramado(
+            nombre='alertas_urgentes_facturas',
+            descripcion='Alertas Urgentes Facturas > 10 dias',
+            funcion=_ejecutar_alertas_urgentes,
+            trigger=IntervalTrigger(days=3, start_date=ANCLA_ALERTAS_URGENTES),
+        ),
+    ]
 
 
 # FUNCIONES DE EJECUCIÓN DE JOBS
@@ -0,0 +1,234 @@
+"""
+Resincronización masiva de facturas.responsable_id (set-based).
+
+POST /admin/sincronizar-facturas recorría todos los usuarios, cargaba como
+objetos ORM TODAS las facturas de sus proveedores y cambiaba responsable_id
+en Python, en una sola transacción.
+
+Este servicio:
+
+1. Calcula el responsable objetivo por proveedor en una subconsulta:
+   asignaciones activas (asignacion_nit_responsable) unidas a proveedores por
+   NIT. Si un proveedor tiene varios responsables gana el de mayor id (el
+   mismo resultado que el recorrido anterior, donde el último usuario
+   sobrescribía a los demás).
+2. Recorre facturas por rangos de id (lotes acotados) y, por lote, hace un
+   UPDATE ... FROM/JOIN contra esa subconsulta solo de las filas con
+   responsable distinto. Cada lote se confirma por separado: no hay
+   transacciones enormes y repetir la sincronización es idempotente.
+3. En modo simulación (dry-run) solo cuenta y muestra una muestra del diff.
+
+Como el UPDATE masivo no dispara los listeners de Factura, accion_por se
+sincroniza en la misma sentencia con las reglas de factura_listeners.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, literal, null, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.utils.logger import logger
+
+
+TAMANO_LOTE = 5000
+TAMANO_MUESTRA = 100
+
+
+@dataclass
+class ResultadoSincronizacion:
+    """Totales, detalle por responsable y (en simulación) muestra del diff."""
+    simulado: bool
+    lotes: int = 0
+    total_actualizadas: int = 0
+    total_ignoradas: int = 0
+    por_responsable: Dict[int, Dict[str, int]] = field(default_factory=dict)
+    muestra: List[dict] = field(default_factory=list)
+    segundos: float = 0.0
+
+
+class SincronizacionResponsablesService:
+    """Reasigna facturas al responsable de su NIT por lotes de id."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== SUBCONSULTAS ====================
+
+    def _objetivo(self, proveedor_ids: Optional[List[int]] = None):
+        """(proveedor_id, responsable_id, nombre) con desempate determinista (mayor id)."""
+        por_proveedor = (
+            select(
+                Proveedor.id.label("proveedor_id"),
+                func.max(AsignacionNitResponsable.responsable_id).label("responsable_id")
+            )
+            .join(AsignacionNitResponsable, AsignacionNitResponsable.nit == Proveedor.nit)
+            .where(
+                AsignacionNitResponsable.activo == True,
+                Proveedor.id.in_(proveedor_ids) if proveedor_ids is not None else true()
+            )
+            .group_by(Proveedor.id)
+            .subquery()
+        )
+        return (
+            select(por_proveedor.c.proveedor_id, por_proveedor.c.responsable_id, Usuario.nombre)
+            .join(Usuario, Usuario.id == por_proveedor.c.responsable_id)
+            .subquery("objetivo")
+        )
+
+    @staticmethod
+    def _difiere(objetivo):
+        return or_(Factura.responsable_id.is_(None), Factura.responsable_id != objetivo.c.responsable_id)
+
+    @staticmethod
+    def _accion_por(objetivo):
+        """Reglas de factura_listeners al cambiar responsable_id."""
+        return case(
+            (Factura.estado == EstadoFactura.aprobada_auto, literal('Sistema Automático')),
+            (Factura.estado.in_([EstadoFactura.aprobada, EstadoFactura.rechazada]),
+             func.coalesce(objetivo.c.nombre, Factura.accion_por)),
+            (Factura.estado == EstadoFactura.en_revision, null()),
+            else_=Factura.accion_por
+        )
+
+    # ==================== SINCRONIZACIÓN ====================
+
+    def sincronizar(
+        self,
+        simular: bool = False,
+        tamano_lote: int = TAMANO_LOTE,
+        proveedor_ids: Optional[List[int]] = None,
+        progreso: Optional[Callable[[int, int, ResultadoSincronizacion], None]] = None
+    ) -> ResultadoSincronizacion:
+        """
+        Ejecuta (o simula) la resincronización.
+
+        Args:
+            simular: True → solo lectura; retorna conteos y muestra del diff
+            tamano_lote: Rango de ids de factura por sentencia/transacción
+            proveedor_ids: Limitar a estos proveedores (None = todos)
+            progreso: Callback (lote, total_lotes, resultado parcial) tras cada lote
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoSincronizacion(simulado=simular)
+        id_min, id_max = self.db.execute(select(func.min(Factura.id), func.max(Factura.id))).one()
+        if id_min is None:
+            return resultado
+
+        objetivo = self._objetivo(proveedor_ids)
+        total_lotes = (id_max - id_min) // tamano_lote + 1
+
+        for numero, desde in enumerate(range(id_min, id_max + 1, tamano_lote), start=1):
+            rango = and_(Factura.id >= desde, Factura.id < desde + tamano_lote)
+            union = Factura.proveedor_id == objetivo.c.proveedor_id
+
+            # Conteo por responsable: a actualizar vs. ya correctas
+            conteos = self.db.execute(
+                select(
+                    objetivo.c.responsable_id,
+                    func.sum(case((self._difiere(objetivo), 1), else_=0)),
+                    func.count()
+                )
+                .select_from(Factura)
+                .join(objetivo, union)
+                .where(rango)
+                .group_by(objetivo.c.responsable_id)
+            ).all()
+            for responsable_id, a_actualizar, total in conteos:
+                detalle = resultado.por_responsable.setdefault(
+                    responsable_id, {"actualizadas": 0, "ignoradas": 0}
+                )
+                a_actualizar = int(a_actualizar or 0)
+                detalle["actualizadas"] += a_actualizar
+                detalle["ignoradas"] += total - a_actualizar
+                resultado.total_actualizadas += a_actualizar
+                resultado.total_ignoradas += total - a_actualizar
+
+            cambios = sum(int(c[1] or 0) for c in conteos)
+            if simular:
+                if cambios and len(resultado.muestra) < TAMANO_MUESTRA:
+                    resultado.muestra.extend(
+                        self._muestra(objetivo, union, rango, TAMANO_MUESTRA - len(resultado.muestra))
+                    )
+            elif cambios:
+                self.db.execute(
+                    update(Factura)
+                    .where(rango, union, self._difiere(objetivo))
+                    .values(responsable_id=objetivo.c.responsable_id, accion_por=self._accion_por(objetivo))
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.commit()
+
+            resultado.lotes = numero
+            logger.info(
+                f"[SYNC-RESPONSABLES] Lote {numero}/{total_lotes} (ids {desde}-{desde + tamano_lote - 1}): "
+                f"{cambios} {'por actualizar' if simular else 'actualizadas'}"
+            )
+            if progreso:
+                progreso(numero, total_lotes, resultado)
+
+        if simular:
+            self.db.rollback()
+        resultado.segundos = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    def _muestra(self, objetivo, union, rango, limite: int) -> List[dict]:
+        filas = self.db.execute(
+            select(Factura.id, Factura.numero_factura, Factura.responsable_id, objetivo.c.responsable_id)
+            .select_from(Factura)
+            .join(objetivo, union)
+            .where(rango, self._difiere(objetivo))
+            .order_by(Factura.id)
+            .limit(limite)
+        ).all()
+        return [
+            {
+                "factura_id": factura_id,
+                "numero_factura": numero,
+                "responsable_actual_id": actual,
+                "responsable_nuevo_id": nuevo,
+            }
+            for factura_id, numero, actual, nuevo in filas
+        ]
+
+    # ==================== RESUMEN POR RESPONSABLE ====================
+
+    def detalles(self, resultado: ResultadoSincronizacion) -> List[dict]:
+        """Detalle por usuario (mismo formato que la respuesta anterior del endpoint)."""
+        nits = dict(self.db.execute(
+            select(AsignacionNitResponsable.responsable_id, func.count(func.distinct(AsignacionNitResponsable.nit)))
+            .where(AsignacionNitResponsable.activo == True)
+            .group_by(AsignacionNitResponsable.responsable_id)
+        ).all())
+        proveedores = dict(self.db.execute(
+            select(AsignacionNitResponsable.responsable_id, func.count(func.distinct(Proveedor.id)))
+            .join(Proveedor, Proveedor.nit == AsignacionNitResponsable.nit)
+            .where(AsignacionNitResponsable.activo == True)
+            .group_by(AsignacionNitResponsable.responsable_id)
+        ).all())
+
+        detalles = []
+        for usuario_id, nombre in self.db.execute(select(Usuario.id, Usuario.nombre).order_by(Usuario.id)):
+            if not nits.get(usuario_id):
+                detalles.append({"responsable": nombre, "actualizadas": 0, "ignoradas": 0,
+                                 "nota": "Sin NITs asignados"})
+                continue
+            if not proveedores.get(usuario_id):
+                detalles.append({"responsable": nombre, "actualizadas": 0, "ignoradas": 0,
+                                 "nota": f"{nits[usuario_id]} NITs pero sin proveedores en BD"})
+                continue
+            conteo = resultado.por_responsable.get(usuario_id, {"actualizadas": 0, "ignoradas": 0})
+            detalles.append({
+                "responsable": nombre,
+                "nits_asignados": nits[usuario_id],
+                "proveedores": proveedores[usuario_id],
+                "facturas_totales": conteo["actualizadas"] + conteo["ignoradas"],
+                "actualizadas": conteo["actualizadas"],
+                "ignoradas": conteo["ignoradas"],
+            })
+        return detalles
@@ -193,7 +193,7 @@ class WorkflowAutomaticoService:
                 estado=EstadoFacturaWorkflow.RECIBIDA,
                 nit_proveedor=nit,
                 responsable_id=responsable.responsable_id,
-                area_responsable=responsable.responsable.area if hasattr(responsable.responsable, 'area') else None,
+                area_responsable=responsable.usuario.area if responsable.usuario else None,
                 fecha_asignacion=datetime.now(),
                 creado_en=datetime.now(),
                 creado_por="SISTEMA_AUTO"
@@ -213,18 +213,411 @@ class WorkflowAutomaticoService:
         self.db.flush()
         self.db.commit()
         self.db.refresh(factura)
-        if asignacion_nit:
+
+        resultado_analisis = self._completar_procesamiento_factura(
+            factura,
+            workflows_creados[0] if workflows_creados else None,
+            responsables_grupo,
+            asignacion_nit
+        )
+
+        return {
+            "exito": True,
+            "workflow_ids": [w.id for w in workflows_creados],
+            "factura_id": factura.id,
+            "nit": nit,
+            "grupo_id": factura.grupo_id,
+            "responsables_asignados": responsable_ids,
+            "total_responsables": len(responsables_grupo),
+            **resultado_analisis
+        }
+
+    def procesar_facturas_nuevas_lote(
+        self,
+        factura_ids: List[int],
+        tamano_lote: int = 500,
+        analizar: bool = True,
+        notificar: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Versión por lotes de procesar_factura_nueva.
+
+        Por cada lote de `tamano_lote` facturas ejecuta un número fijo de
+        consultas (facturas, workflows existentes, responsables por grupo,
+        asignaciones NIT y grupos en cuarentena), inserta todos los workflows
+        con un único INSERT multi-fila y hace un solo commit. El análisis de
+        similitud y las notificaciones se ejecutan después, cada factura en su
+        propio SAVEPOINT, y se confirman con un segundo commit por lote.
+
+        Args:
+            factura_ids: IDs de facturas a procesar
+            tamano_lote: Facturas por lote (un commit por lote)
+            analizar: Ejecutar análisis de similitud con el mes anterior
+            notificar: Notificar a los responsables del grupo
+
+        Returns:
+            Dict con conteos agregados y resultado por factura
+        """
+        resultado = {
+            "facturas_procesadas": 0,
+            "workflows_creados": 0,
+            "omitidas_con_workflow": 0,
+            "sin_grupo": 0,
+            "en_cuarentena": 0,
+            "aprobadas_automaticamente": 0,
+            "enviadas_revision": 0,
+            "errores": 0,
+            "resultados": []
+        }
+
+        ids_unicos = list(dict.fromkeys(factura_ids))
+
+        for inicio in range(0, len(ids_unicos), tamano_lote):
+            lote = ids_unicos[inicio:inicio + tamano_lote]
+            try:
+                self._procesar_lote_facturas_nuevas(lote, resultado, analizar, notificar)
+            except Exception as e:
+                self.db.rollback()
+                resultado["errores"] += len(lote)
+                logger.error(
+                    f"Error procesando lote de facturas nuevas: {str(e)}",
+                    exc_info=True,
+                    extra={"factura_ids": lote[:20], "total_lote": len(lote)}
+                )
+
+        return resultado
+
+    def _procesar_lote_facturas_nuevas(
+        self,
+        lote: List[int],
+        resultado: Dict[str, Any],
+        analizar: bool,
+        notificar: bool
+    ) -> None:
+        """Crea los workflows de un lote con consultas por conjunto y un solo commit."""
+        from sqlalchemy import insert
+        from app.models.grupo import Grupo
+
+        # 1. Facturas del lote (proveedor en el mismo SELECT para extraer el NIT)
+        facturas = self._cargar_facturas_lote(lote)
+
+        # 2. Facturas que ya tienen workflow
+        con_workflow = {
+            fila.factura_id for fila in self.db.query(
+                WorkflowAprobacionFactura.factura_id
+            ).filter(
+                WorkflowAprobacionFactura.factura_id.in_(lote)
+            ).distinct()
+        }
+
+        pendientes = []
+        for factura in facturas:
+            if factura.id in con_workflow:
+                resultado["omitidas_con_workflow"] += 1
+            else:
+                pendientes.append(factura)
+
+        if not pendientes:
+            return
+
+        # 3. Responsables activos de todos los grupos del lote
+        grupo_ids = {f.grupo_id for f in pendientes if f.grupo_id}
+        responsables_por_grupo = self._cargar_responsables_por_grupos(grupo_ids)
+
+        # 4. Datos de grupos sin responsables (para metadata de cuarentena)
+        grupos_sin_responsables = grupo_ids - set(responsables_por_grupo)
+        grupos = {}
+        if grupos_sin_responsables:
+            grupos = {
+                g.id: g for g in self.db.query(Grupo).filter(
+                    Grupo.id.in_(grupos_sin_responsables)
+                ).all()
+            }
+
+        # 5. Asignaciones NIT (la más antigua activa por NIT normalizado)
+        nits = {f.id: self._extraer_nit(f) for f in pendientes}
+        nits_normalizados = {}
+        for nit in set(n for n in nits.values() if n):
+            es_valido, nit_normalizado = NitValidator.validar_nit(nit)
+            if es_valido:
+                nits_normalizados[nit] = nit_normalizado
+
+        asignaciones = self._cargar_asignaciones_por_nit(set(nits_normalizados.values()))
+
+        for asignacion in asignaciones.values():
+            self._asegurar_clasificacion_proveedor(asignacion)
+
+        # 6. Construir filas de workflow y actualizar facturas en memoria.
+        # Solo se guardan valores escalares: tras el commit los objetos quedan
+        # expirados y recargarlos uno a uno anularía el beneficio del lote.
+        ahora = datetime.now()
+        filas_workflow = []
+        procesables = []
+
+        for factura in pendientes:
+            nit = nits[factura.id]
+
+            if not factura.grupo_id:
+                logger.error(
+                    f"ERROR CRÍTICO: Factura sin grupo_id asignado",
+                    extra={
+                        "factura_id": factura.id,
+                        "numero_factura": factura.numero_factura,
+                        "nit": nit,
+                        "proveedor_id": factura.proveedor_id
+                    }
+                )
+                filas_workflow.append({
+                    "factura_id": factura.id,
+                    "estado": EstadoFacturaWorkflow.PENDIENTE_REVISION,
+                    "nit_proveedor": nit,
+                    "responsable_id": None,
+                    "fecha_cambio_estado": ahora,
+                    "creado_en": ahora,
+                    "creado_por": "SISTEMA_AUTO",
+                    "metadata_workflow": self._metadata_workflow_sin_grupo()
+                })
+                resultado["sin_grupo"] += 1
+                resultado["resultados"].append({
+                    "factura_id": factura.id,
+                    "exito": False,
+                    "error": "Factura sin grupo_id - Configuración de grupos requerida"
+                })
+                continue
+
+            responsables_grupo = responsables_por_grupo.get(factura.grupo_id, [])
+
+            if not responsables_grupo:
+                grupo = grupos.get(factura.grupo_id)
+                nombre_grupo = grupo.nombre if grupo else f"Grupo ID {factura.grupo_id}"
+                codigo_grupo = grupo.codigo_corto if grupo and grupo.codigo_corto else "N/A"
+
+                self._log_grupo_sin_responsables(factura, nit, nombre_grupo, codigo_grupo)
+                factura.estado = EstadoFactura.en_cuarentena
+                factura.motivo_cuarentena = "GRUPO_SIN_RESPONSABLES"
+
+                filas_workflow.append({
+                    "factura_id": factura.id,
+                    "estado": EstadoFacturaWorkflow.PENDIENTE_REVISION,
+                    "nit_proveedor": nit,
+                    "responsable_id": None,
+                    "fecha_cambio_estado": ahora,
+                    "creado_en": ahora,
+                    "creado_por": "SISTEMA_AUTO",
+                    "metadata_workflow": self._metadata_workflow_grupo_sin_responsables(
+                        factura.grupo_id, nombre_grupo, codigo_grupo
+                    )
+                })
+                resultado["en_cuarentena"] += 1
+                resultado["resultados"].append({
+                    "factura_id": factura.id,
+                    "exito": False,
+                    "tipo_error": "GRUPO_SIN_RESPONSABLES",
+                    "error": f"Grupo '{nombre_grupo}' sin responsables - Factura en cuarentena"
+                })
+                continue
+
+            for responsable in responsables_grupo:
+                filas_workflow.append({
+                    "factura_id": factura.id,
+                    "estado": EstadoFacturaWorkflow.RECIBIDA,
+                    "nit_proveedor": nit,
+                    "responsable_id": responsable.responsable_id,
+                    "area_responsable": responsable.usuario.area if responsable.usuario else None,
+                    "fecha_asignacion": ahora,
+                    "fecha_cambio_estado": ahora,
+                    "creado_en": ahora,
+                    "creado_por": "SISTEMA_AUTO"
+                })
+
+            factura.responsable_id = responsables_grupo[0].responsable_id
+            procesables.append({
+                "factura_id": factura.id,
+                "grupo_id": factura.grupo_id,
+                "responsable_ids": [r.responsable_id for r in responsables_grupo],
+                "nit": nits_normalizados.get(nit) if nit else None
+            })
+
+        # 7. Un INSERT multi-fila + UPDATE de facturas + un commit por lote
+        self.db.flush()
+        if filas_workflow:
+            self.db.execute(insert(WorkflowAprobacionFactura), filas_workflow)
+        self.db.commit()
+
+        resultado["workflows_creados"] += len(filas_workflow)
+        resultado["facturas_procesadas"] += len(pendientes)
+
+        if not procesables:
+            return
+
+        if not analizar and not notificar:
+            for item in procesables:
+                resultado["enviadas_revision"] += 1
+                resultado["resultados"].append({
+                    "exito": True,
+                    "factura_id": item["factura_id"],
+                    "grupo_id": item["grupo_id"],
+                    "responsables_asignados": item["responsable_ids"],
+                    "total_responsables": len(item["responsable_ids"]),
+                    "requiere_revision": True,
+                    "motivo": "Análisis automático diferido al ciclo de automatización"
+                })
+            return
+
+        # 8. Análisis y notificaciones: recargar el lote con consultas por conjunto
+        ids_procesables = [item["factura_id"] for item in procesables]
+        facturas = {f.id: f for f in self._cargar_facturas_lote(ids_procesables)}
+        responsables_por_grupo = self._cargar_responsables_por_grupos(
+            {item["grupo_id"] for item in procesables}
+        )
+        asignaciones = self._cargar_asignaciones_por_nit(
+            {item["nit"] for item in procesables if item["nit"]}
+        ) if analizar else {}
+
+        primer_workflow = {}
+        if analizar:
+            for workflow in self.db.query(WorkflowAprobacionFactura).filter(
+                WorkflowAprobacionFactura.factura_id.in_(ids_procesables)
+            ).order_by(WorkflowAprobacionFactura.id.asc()).all():
+                primer_workflow.setdefault(workflow.factura_id, workflow)
+
+        for item in procesables:
+            factura = facturas.get(item["factura_id"])
+            if factura is None:
+                continue
+
+            try:
+                responsables_grupo = responsables_por_grupo.get(item["grupo_id"], [])
+                # SAVEPOINT: un error revierte solo esta factura, no el resto del lote
+                with self.db.begin_nested():
+                    analisis = self._completar_procesamiento_factura(
+                        factura,
+                        primer_workflow.get(item["factura_id"]),
+                        responsables_grupo,
+                        asignaciones.get(item["nit"]) if item["nit"] else None,
+                        analizar=analizar,
+                        notificar=notificar,
+                        confirmar=False
+                    )
+                if analisis.get("aprobacion_automatica"):
+                    resultado["aprobadas_automaticamente"] += 1
+                else:
+                    resultado["enviadas_revision"] += 1
+
+                resultado["resultados"].append({
+                    "exito": True,
+                    "factura_id": item["factura_id"],
+                    "grupo_id": item["grupo_id"],
+                    "responsables_asignados": item["responsable_ids"],
+                    "total_responsables": len(item["responsable_ids"]),
+                    **analisis
+                })
+            except Exception as e:
+                resultado["errores"] += 1
+                logger.error(
+                    f"Error completando procesamiento de factura {item['factura_id']}: {str(e)}",
+                    exc_info=True
+                )
+
+        self.db.commit()
+
+    def _cargar_facturas_lote(self, factura_ids: List[int]) -> List[Factura]:
+        """Carga facturas con su proveedor, sin arrastrar usuario, grupo ni items."""
+        from sqlalchemy.orm import joinedload, lazyload
+
+        return self.db.query(Factura).options(
+            joinedload(Factura.proveedor),
+            lazyload(Factura.usuario),
+            lazyload(Factura.grupo),
+            lazyload(Factura.items)
+        ).filter(Factura.id.in_(factura_ids)).all()
+
+    def _cargar_responsables_por_grupos(self, grupo_ids) -> Dict[int, list]:
+        """
+        Responsables activos de varios grupos en una sola consulta.
+
+        Returns:
+            {grupo_id: [ResponsableGrupo, ...]} en orden de asignación
+        """
+        from sqlalchemy.orm import joinedload
+        from app.models.grupo import ResponsableGrupo
+        from app.models.usuario import Usuario
+
+        responsables_por_grupo: Dict[int, list] = {}
+        if not grupo_ids:
+            return responsables_por_grupo
+
+        filas = self.db.query(ResponsableGrupo).options(
+            joinedload(ResponsableGrupo.usuario).lazyload(Usuario.facturas)
+        ).filter(
+            ResponsableGrupo.grupo_id.in_(grupo_ids),
+            ResponsableGrupo.activo == True
+        ).order_by(ResponsableGrupo.id.asc()).all()
+
+        for rg in filas:
+            responsables_por_grupo.setdefault(rg.grupo_id, []).append(rg)
+
+        return responsables_por_grupo
+
+    def _cargar_asignaciones_por_nit(self, nits) -> Dict[str, AsignacionNitResponsable]:
+        """
+        Asignación activa más antigua por NIT normalizado, en una sola consulta.
+
+        Mismo criterio que _buscar_asignacion_responsable.
+        """
+        asignaciones: Dict[str, AsignacionNitResponsable] = {}
+        if not nits:
+            return asignaciones
+
+        for asignacion in self.db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.nit.in_(nits),
+            AsignacionNitResponsable.activo == True
+        ).order_by(AsignacionNitResponsable.creado_en.asc()).all():
+            asignaciones.setdefault(asignacion.nit, asignacion)
+
+        return asignaciones
+
+    def _completar_procesamiento_factura(
+        self,
+        factura: Factura,
+        workflow: Optional[WorkflowAprobacionFactura],
+        responsables_grupo: list,
+        asignacion_nit: Optional[AsignacionNitResponsable],
+        analizar: bool = True,
+        notificar: bool = True,
+        confirmar: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Pasos posteriores a la creación de workflows de una factura nueva.
+
+        Ejecuta el análisis de similitud con el mes anterior (si hay asignación
+        NIT) y notifica a cada responsable del grupo. Con confirmar=False no
+        hace commit (solo flush): el flujo por lotes confirma una vez por lote.
+
+        Returns:
+            Resultado del análisis para incluir en la respuesta
+        """
+        if asignacion_nit and analizar:
             resultado_analisis = self._analizar_similitud_mes_anterior(
                 factura,
-                workflows_creados[0] if workflows_creados else None,
-                asignacion_nit
+                workflow,
+                asignacion_nit,
+                confirmar=confirmar
             )
+        elif asignacion_nit:
+            resultado_analisis = {
+                "requiere_revision": True,
+                "motivo": "Análisis automático diferido al ciclo de automatización"
+            }
         else:
             resultado_analisis = {
                 "requiere_revision": True,
                 "motivo": "Sin asignación NIT específica para análisis automático"
             }
 
+        if not notificar:
+            return resultado_analisis
+
         from app.services.notificaciones_programadas import NotificacionesProgramadasService
 
         notif_service = NotificacionesProgramadasService(self.db)
@@ -237,7 +630,7 @@ class WorkflowAutomaticoService:
 
             if resultado.get('success'):
                 logger.info(
-                    f"Notificación enviada a {responsable.responsable.usuario} "
+                    f"Notificación enviada a {responsable.usuario.usuario if responsable.usuario else responsable.responsable_id} "
                     f"(grupo_id={factura.grupo_id}) para factura {factura.numero_factura}"
                 )
             else:
@@ -249,16 +642,7 @@ class WorkflowAutomaticoService:
         factura.responsable_id = responsables_grupo[0].responsable_id
         self.db.flush()
 
-        return {
-            "exito": True,
-            "workflow_ids": [w.id for w in workflows_creados],
-            "factura_id": factura.id,
-            "nit": nit,
-            "grupo_id": factura.grupo_id,
-            "responsables_asignados": responsable_ids,
-            "total_responsables": len(responsables_grupo),
-            **resultado_analisis
-        }
+        return resultado_analisis
 
     def _extraer_nit(self, factura: Factura) -> Optional[str]:
         """Extrae el NIT del proveedor de la factura."""
@@ -359,11 +743,7 @@ class WorkflowAutomaticoService:
             responsable_id=None,
             creado_en=datetime.now(),
             creado_por="SISTEMA_AUTO",
-            metadata_workflow={
-                "error_critico": "Factura sin grupo_id asignado",
-                "requiere_configuracion": True,
-                "accion_requerida": "Verificar configuración de grupos en invoice_service.py"
-            }
+            metadata_workflow=self._metadata_workflow_sin_grupo()
         )
 
         self.db.add(workflow)
@@ -384,23 +764,12 @@ class WorkflowAutomaticoService:
 
         grupo = self.db.query(Grupo).filter(Grupo.id == factura.grupo_id).first()
         nombre_grupo = grupo.nombre if grupo else f"Grupo ID {factura.grupo_id}"
-        codigo_grupo = grupo.codigo if grupo else "N/A"
+        codigo_grupo = grupo.codigo_corto if grupo and grupo.codigo_corto else "N/A"
 
-        logger.error(
-            f"CUARENTENA: Grupo sin responsables",
-            extra={
-                "factura_id": factura.id,
-                "numero_factura": factura.numero_factura,
-                "grupo_id": factura.grupo_id,
-                "nombre_grupo": nombre_grupo,
-                "codigo_grupo": codigo_grupo,
-                "nit": nit,
-                "tipo_error": "GRUPO_SIN_RESPONSABLES",
-                "clasificacion": "CONFIGURACION_GRUPOS"
-            }
-        )
+        self._log_grupo_sin_responsables(factura, nit, nombre_grupo, codigo_grupo)
 
         factura.estado = EstadoFactura.en_cuarentena
+        factura.motivo_cuarentena = "GRUPO_SIN_RESPONSABLES"
 
         workflow = WorkflowAprobacionFactura(
             factura_id=factura.id,
@@ -409,30 +778,9 @@ class WorkflowAutomaticoService:
             responsable_id=None,
             creado_en=datetime.now(),
             creado_por="SISTEMA_AUTO",
-            metadata_workflow={
-                "tipo_error": "GRUPO_SIN_RESPONSABLES",
-                "categoria": "CONFIGURACION_GRUPOS",
-                "severidad": "CRITICA",
-                "grupo_id": factura.grupo_id,
-                "nombre_grupo": nombre_grupo,
-                "codigo_grupo": codigo_grupo,
-                "accion_dirigida": {
-                    "tipo": "ASIGNAR_RESPONSABLES_GRUPO",
-                    "url": f"/admin/grupos/{factura.grupo_id}/responsables",
-                    "descripcion": f"Asignar responsables al grupo {nombre_grupo}",
-                    "parametros": {
-                        "grupo_id": factura.grupo_id,
-                        "nombre_grupo": nombre_grupo,
-                        "codigo_grupo": codigo_grupo
-                    }
-                },
-                "agrupable_por": f"grupo_{factura.grupo_id}",
-                "mensaje_usuario": f"El grupo '{nombre_grupo}' no tiene responsables asignados. "
-                                   f"Asigne al menos un responsable para procesar las facturas de este grupo.",
-                "requiere_configuracion": True,
-                "en_cuarentena": True,
-                "bloqueada_hasta_configuracion": True
-            }
+            metadata_workflow=self._metadata_workflow_grupo_sin_responsables(
+                factura.grupo_id, nombre_grupo, codigo_grupo
+            )
         )
 
         self.db.add(workflow)
@@ -454,11 +802,74 @@ class WorkflowAutomaticoService:
             "mensaje_usuario": f"Asigne responsables al grupo '{nombre_grupo}' para procesar esta factura"
         }
 
+    def _metadata_workflow_sin_grupo(self) -> Dict[str, Any]:
+        """Metadata del workflow creado para una factura sin grupo_id."""
+        return {
+            "error_critico": "Factura sin grupo_id asignado",
+            "requiere_configuracion": True,
+            "accion_requerida": "Verificar configuración de grupos en invoice_service.py"
+        }
+
+    def _log_grupo_sin_responsables(
+        self,
+        factura: Factura,
+        nit: Optional[str],
+        nombre_grupo: str,
+        codigo_grupo: str
+    ) -> None:
+        """Registra la entrada en cuarentena de una factura por grupo sin responsables."""
+        logger.error(
+            f"CUARENTENA: Grupo sin responsables",
+            extra={
+                "factura_id": factura.id,
+                "numero_factura": factura.numero_factura,
+                "grupo_id": factura.grupo_id,
+                "nombre_grupo": nombre_grupo,
+                "codigo_grupo": codigo_grupo,
+                "nit": nit,
+                "tipo_error": "GRUPO_SIN_RESPONSABLES",
+                "clasificacion": "CONFIGURACION_GRUPOS"
+            }
+        )
+
+    def _metadata_workflow_grupo_sin_responsables(
+        self,
+        grupo_id: int,
+        nombre_grupo: str,
+        codigo_grupo: str
+    ) -> Dict[str, Any]:
+        """Metadata del workflow de cuarentena para un grupo sin responsables."""
+        return {
+            "tipo_error": "GRUPO_SIN_RESPONSABLES",
+            "categoria": "CONFIGURACION_GRUPOS",
+            "severidad": "CRITICA",
+            "grupo_id": grupo_id,
+            "nombre_grupo": nombre_grupo,
+            "codigo_grupo": codigo_grupo,
+            "accion_dirigida": {
+                "tipo": "ASIGNAR_RESPONSABLES_GRUPO",
+                "url": f"/admin/grupos/{grupo_id}/responsables",
+                "descripcion": f"Asignar responsables al grupo {nombre_grupo}",
+                "parametros": {
+                    "grupo_id": grupo_id,
+                    "nombre_grupo": nombre_grupo,
+                    "codigo_grupo": codigo_grupo
+                }
+            },
+            "agrupable_por": f"grupo_{grupo_id}",
+            "mensaje_usuario": f"El grupo '{nombre_grupo}' no tiene responsables asignados. "
+                               f"Asigne al menos un responsable para procesar las facturas de este grupo.",
+            "requiere_configuracion": True,
+            "en_cuarentena": True,
+            "bloqueada_hasta_configuracion": True
+        }
+
     def _analizar_similitud_mes_anterior(
         self,
         factura: Factura,
         workflow: WorkflowAprobacionFactura,
-        asignacion: AsignacionNitResponsable
+        asignacion: AsignacionNitResponsable,
+        confirmar: bool = True
     ) -> Dict[str, Any]:
         """Compara la factura item por item con facturas del mes anterior."""
         workflow.estado = EstadoFacturaWorkflow.EN_ANALISIS
@@ -501,11 +912,12 @@ class WorkflowAutomaticoService:
                 factura,
                 resultado_comparacion
             ):
-                return self._aprobar_automaticamente(workflow, factura)
+                return self._aprobar_automaticamente(workflow, factura, confirmar=confirmar)
             else:
                 return self._enviar_a_revision_manual_v2(
                     workflow,
-                    resultado_comparacion
+                    resultado_comparacion,
+                    confirmar=confirmar
                 )
 
         except Exception as e:
@@ -517,7 +929,7 @@ class WorkflowAutomaticoService:
                 "requiere_revision_manual": True
             }
             self._sincronizar_estado_factura(workflow)
-            self.db.commit()
+            self._confirmar(confirmar)
 
             return {
                 "requiere_revision": True,
@@ -588,7 +1000,8 @@ class WorkflowAutomaticoService:
     def _aprobar_automaticamente(
         self,
         workflow: WorkflowAprobacionFactura,
-        factura: Factura
+        factura: Factura,
+        confirmar: bool = True
     ) -> Dict[str, Any]:
         """Aprueba automáticamente una factura."""
         workflow.estado = EstadoFacturaWorkflow.APROBADA_AUTO
@@ -605,7 +1018,7 @@ class WorkflowAutomaticoService:
 
         self._sincronizar_estado_factura(workflow)
 
-        self.db.commit()
+        self._confirmar(confirmar)
 
         emails_enviados = 0
         if self.notification_service:
@@ -680,7 +1093,8 @@ class WorkflowAutomaticoService:
             destinatarios=[],  # Los destinatarios ya se manejaron en NotificationService
             asunto=f" Factura Aprobada Automáticamente - {factura.numero_factura}",
             cuerpo=f"La factura {factura.numero_factura} ha sido aprobada automáticamente. "
-                   f"Emails enviados: {emails_enviados}"
+                   f"Emails enviados: {emails_enviados}",
+            confirmar=confirmar
         )
 
         return {
@@ -694,7 +1108,8 @@ class WorkflowAutomaticoService:
     def _enviar_a_revision_manual_v2(
         self,
         workflow: WorkflowAprobacionFactura,
-        resultado_comparacion: Dict[str, Any]
+        resultado_comparacion: Dict[str, Any],
+        confirmar: bool = True
     ) -> Dict[str, Any]:
         """Envía la factura a revisión manual."""
         workflow.estado = EstadoFacturaWorkflow.PENDIENTE_REVISION
@@ -702,7 +1117,7 @@ class WorkflowAutomaticoService:
 
         self._sincronizar_estado_factura(workflow)
 
-        self.db.commit()
+        self._confirmar(confirmar)
 
         emails_enviados = 0
         if self.notification_service:
@@ -756,7 +1171,8 @@ Razón: La factura no alcanzó el umbral de confianza requerido para aprobación
             destinatarios=[],  # Los destinatarios ya se manejaron en NotificationService
             asunto=f"Factura Pendiente de Revisión - {workflow.factura.numero_factura}",
             cuerpo=f"La factura requiere revisión manual. Emails enviados: {emails_enviados}. "
-                   f"Alertas: {len(resultado_comparacion.get('alertas', []))}"
+                   f"Alertas: {len(resultado_comparacion.get('alertas', []))}",
+            confirmar=confirmar
         )
 
         return {
@@ -804,7 +1220,8 @@ Razón: La factura no alcanzó el umbral de confianza requerido para aprobación
         tipo: TipoNotificacion,
         destinatarios: List[str],
         asunto: str,
-        cuerpo: str
+        cuerpo: str,
+        confirmar: bool = True
     ) -> NotificacionWorkflow:
         """Crea un registro de notificación."""
         notif = NotificacionWorkflow(
@@ -818,10 +1235,17 @@ Razón: La factura no alcanzó el umbral de confianza requerido para aprobación
         )
 
         self.db.add(notif)
-        self.db.commit()
+        self._confirmar(confirmar)
 
         return notif
 
+    def _confirmar(self, confirmar: bool) -> None:
+        """Commit, o solo flush cuando el llamador confirma por lote."""
+        if confirmar:
+            self.db.commit()
+        else:
+            self.db.flush()
+
     def _notificar_a_otros_responsables(
         self,
         factura_id: int,
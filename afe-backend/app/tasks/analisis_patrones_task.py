@@ -37,7 +37,8 @@ def analizar_patrones_periodico(
 
     Args:
         ventana_meses: Cantidad de meses hacia atrás a analizar
-        forzar_recalculo: Si True, recalcula todos los patrones
+        forzar_recalculo: Si True, recalcula todos los patrones (reconciliación);
+            si False, solo procesa facturas aprobadas desde la última ejecución
 
     Returns:
         Resultado del análisis con estadísticas
@@ -55,15 +56,23 @@ def analizar_patrones_periodico(
         # Ejecutar análisis
         analizador = AnalizadorPatronesService(db)
 
-        resultado = analizador.analizar_patrones_desde_bd(
-            ventana_meses=ventana_meses,
-            forzar_recalculo=forzar_recalculo
-        )
+        if forzar_recalculo:
+            resultado = analizador.analizar_patrones_desde_bd(
+                ventana_meses=ventana_meses,
+                forzar_recalculo=True
+            )
+        else:
+            # Incremental desde la última marca de agua; reconcilia
+            # automáticamente cada DIAS_RECONCILIACION días
+            resultado = analizador.actualizar_patrones_incremental(
+                ventana_meses=ventana_meses
+            )
 
         # Log de resultados
         if resultado['exito']:
             stats = resultado['estadisticas']
             logger.info("  ANÁLISIS COMPLETADO EXITOSAMENTE")
+            logger.info(f"   Modo: {resultado.get('modo', 'completo')}")
             logger.info(f"   Facturas analizadas: {stats['facturas_analizadas']}")
             logger.info(f"   Patrones detectados: {stats['patrones_detectados']}")
             logger.info(f"   Patrones nuevos: {stats['patrones_nuevos']}")
@@ -8,8 +8,8 @@ Centralizado para evitar redundancia.
 """
 
 from datetime import datetime, date
-from typing import Union, Tuple
-from sqlalchemy import func, and_
+from typing import Optional, Union, Tuple
+from sqlalchemy import and_, DateTime
 from sqlalchemy.orm import Session
 
 
@@ -87,6 +87,50 @@ class DateHelper:
         else:
             return f"{year}-{month - 1:02d}"
 
+    @staticmethod
+    def get_rango_periodo(año: int, mes: Optional[int] = None) -> Tuple[date, date]:
+        """
+        Rango semiabierto [inicio, fin) de un mes, o del año si mes es None.
+
+        Ejemplo:
+            >>> DateHelper.get_rango_periodo(2025, 12)
+            (datetime.date(2025, 12, 1), datetime.date(2026, 1, 1))
+            >>> DateHelper.get_rango_periodo(2025)
+            (datetime.date(2025, 1, 1), datetime.date(2026, 1, 1))
+        """
+        if mes is None:
+            return date(año, 1, 1), date(año + 1, 1, 1)
+        inicio = date(año, mes, 1)
+        if mes == 12:
+            return inicio, date(año + 1, 1, 1)
+        return inicio, date(año, mes + 1, 1)
+
+    @staticmethod
+    def create_rango_filter(fecha_column, desde: date, hasta: date):
+        """
+        Filtro semiabierto: fecha_column >= desde AND fecha_column < hasta.
+
+        A diferencia de YEAR()/MONTH()/EXTRACT() sobre la columna, la
+        comparación directa usa índices y permite partition pruning.
+        En columnas DateTime los límites se pasan como medianoche.
+        """
+        if isinstance(fecha_column.type, DateTime):
+            desde = datetime.combine(desde, datetime.min.time()) if type(desde) is date else desde
+            hasta = datetime.combine(hasta, datetime.min.time()) if type(hasta) is date else hasta
+        return and_(fecha_column >= desde, fecha_column < hasta)
+
+    @staticmethod
+    def create_mes_filter(fecha_column, año: int, mes: Optional[int] = None):
+        """
+        Filtro por mes (o año completo si mes es None) como rango semiabierto.
+
+        Ejemplo:
+            >>> query = db.query(Factura).filter(
+            ...     DateHelper.create_mes_filter(Factura.creado_en, 2025, 11)
+            ... )
+        """
+        return DateHelper.create_rango_filter(fecha_column, *DateHelper.get_rango_periodo(año, mes))
+
     @staticmethod
     def create_periodo_filter(fecha_column, periodo: str):
         """
@@ -108,16 +152,12 @@ class DateHelper:
             ... )
         """
         year, month = map(int, periodo.split('-'))
-
-        return and_(
-            func.year(fecha_column) == year,
-            func.month(fecha_column) == month
-        )
+        return DateHelper.create_mes_filter(fecha_column, year, month)
 
     @staticmethod
     def create_periodo_range_filter(fecha_column, desde_periodo: str, hasta_periodo: str):
         """
-        Crea un filtro para rango de períodos.
+        Crea un filtro para rango de períodos (ambos meses incluidos).
 
         Args:
             fecha_column: Columna SQLAlchemy de tipo Date/DateTime
@@ -139,14 +179,11 @@ class DateHelper:
         desde_year, desde_month = map(int, desde_periodo.split('-'))
         hasta_year, hasta_month = map(int, hasta_periodo.split('-'))
 
-        desde_date = date(desde_year, desde_month, 1)
-        # Calcular último día del mes
-        if hasta_month == 12:
-            hasta_date = date(hasta_year + 1, 1, 1)
-        else:
-            hasta_date = date(hasta_year, hasta_month + 1, 1)
+        desde_date, _ = DateHelper.get_rango_periodo(desde_year, desde_month)
+        # Límite exclusivo: primer día del mes siguiente a hasta_periodo
+        _, hasta_date = DateHelper.get_rango_periodo(hasta_year, hasta_month)
 
-        return fecha_column.between(desde_date, hasta_date)
+        return DateHelper.create_rango_filter(fecha_column, desde_date, hasta_date)
 
     @staticmethod
     def get_date_range_for_periodo(periodo: str) -> Tuple[date, date]:
@@ -0,0 +1,415 @@
+"""
+Benchmark end-to-end de los endpoints y procesos críticos.
+
+Siembra un dataset sintético (dataset_sintetico.py) y mide latencia,
+throughput y consultas SQL de:
+
+- listado_cursor            GET /api/v1/facturas/cursor (primera página, admin)
+- listado_cursor_profundo   GET /api/v1/facturas/cursor siguiendo next_cursor
+- dashboard_stats           GET /api/v1/dashboard/stats (admin)
+- contabilidad_por_revisar  GET /api/v1/accounting/facturas/por-revisar (contador)
+- export_csv                GET /api/v1/facturas/export/csv (admin)
+- ciclo_automatizacion      run_automation_task() (ciclo horario: workflows + decisiones)
+- ingesta                   IngestService del invoice_extractor (solo MySQL)
+
+Los resultados se guardan en JSON (p50/p95/media/min/max en ms, operaciones
+por segundo, consultas SQL por operación) junto con el commit, el dialecto y
+los volúmenes, para comparar entre commits:
+
+    python scripts/benchmarks/benchmark_endpoints.py --sqlite --salida base.json
+    git checkout otra-rama
+    python scripts/benchmarks/benchmark_endpoints.py --sqlite --comparar base.json
+
+--comparar imprime la variación de p50 por escenario y termina con código 1
+si algún escenario empeora más que --umbral (por defecto 20%).
+
+Uso:
+    # SQLite en memoria (no requiere MySQL; la ingesta se omite)
+    python scripts/benchmarks/benchmark_endpoints.py --sqlite --perfil pequeno
+
+    # BD configurada en DATABASE_URL (crea y borra datos BENCH-DS*)
+    python scripts/benchmarks/benchmark_endpoints.py --perfil mediano --repeticiones 30
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+RAIZ_BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RAIZ_EXTRACTOR = os.path.join(os.path.dirname(RAIZ_BACKEND), "invoice_extractor")
+sys.path.insert(0, RAIZ_BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ESCENARIOS = (
+    "listado_cursor",
+    "listado_cursor_profundo",
+    "dashboard_stats",
+    "contabilidad_por_revisar",
+    "export_csv",
+    "ciclo_automatizacion",
+    "ingesta",
+)
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * percentil
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def _resumir(tiempos_ms: List[float], consultas: List[int], unidades: int = 1, **extra) -> dict:
+    """Estadísticas de un escenario. `unidades` = elementos procesados por operación."""
+    total_s = sum(tiempos_ms) / 1000
+    return {
+        "repeticiones": len(tiempos_ms),
+        "p50_ms": round(statistics.median(tiempos_ms), 2),
+        "p95_ms": round(_percentil(tiempos_ms, 0.95), 2),
+        "media_ms": round(statistics.fmean(tiempos_ms), 2),
+        "min_ms": round(min(tiempos_ms), 2),
+        "max_ms": round(max(tiempos_ms), 2),
+        "operaciones_por_s": round(len(tiempos_ms) / total_s, 2) if total_s else None,
+        "unidades_por_s": round(len(tiempos_ms) * unidades / total_s, 2) if total_s else None,
+        "consultas_sql": max(consultas) if consultas else None,
+        **extra,
+    }
+
+
+class BenchmarkHTTP:
+    """Cliente de prueba sobre la app real con get_db apuntando al engine del benchmark."""
+
+    def __init__(self, engine, resumen):
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import sessionmaker
+
+        from app.core import instrumentacion_sql
+        from app.core.security import create_access_token
+        from app.db.session import get_db
+        from app.main import app
+
+        sesiones = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+        def get_db_benchmark():
+            db = sesiones()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = get_db_benchmark
+        instrumentacion_sql.instalar_listeners(engine)
+
+        # Sin context manager: no se ejecuta el lifespan (scheduler, init_db)
+        self.app = app
+        self.cliente = TestClient(app)
+        self.tokens = {
+            "admin": f"Bearer {create_access_token(resumen.admin_id)}",
+            "contador": f"Bearer {create_access_token(resumen.contador_id)}",
+        }
+        self._contextos = []
+        self._observadores = instrumentacion_sql.observadores
+        self._observadores.append(self._contextos.append)
+
+    def cerrar(self):
+        from app.db.session import get_db
+
+        self._observadores.remove(self._contextos.append)
+        self.app.dependency_overrides.pop(get_db, None)
+
+    def get(self, ruta: str, rol: str = "admin", **params):
+        """GET autenticado; devuelve (respuesta, ms, consultas SQL del request)."""
+        self._contextos.clear()
+        inicio = time.perf_counter()
+        respuesta = self.cliente.get(ruta, params=params, headers={"Authorization": self.tokens[rol]})
+        ms = (time.perf_counter() - inicio) * 1000
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"GET {ruta} → {respuesta.status_code}: {respuesta.text[:300]}")
+        consultas = self._contextos[-1].consultas if self._contextos else 0
+        return respuesta, ms, consultas
+
+    def medir(self, ruta: str, repeticiones: int, rol: str = "admin", **params) -> dict:
+        self.get(ruta, rol, **params)  # calentamiento
+        tiempos, consultas, bytes_respuesta = [], [], 0
+        for _ in range(repeticiones):
+            respuesta, ms, n = self.get(ruta, rol, **params)
+            tiempos.append(ms)
+            consultas.append(n)
+            bytes_respuesta = len(respuesta.content)
+        return _resumir(tiempos, consultas, bytes_respuesta=bytes_respuesta)
+
+    def medir_cursor_profundo(self, paginas: int, limit: int) -> dict:
+        """Recorre `paginas` páginas del cursor; la latencia debe ser constante."""
+        tiempos, consultas, cursor = [], [], None
+        for _ in range(paginas):
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            respuesta, ms, n = self.get("/api/v1/facturas/cursor", **params)
+            tiempos.append(ms)
+            consultas.append(n)
+            cursor = respuesta.json()["cursor"]["next_cursor"]
+            if not cursor:
+                break
+        return _resumir(
+            tiempos, consultas, unidades=limit,
+            primera_pagina_ms=round(tiempos[0], 2), ultima_pagina_ms=round(tiempos[-1], 2)
+        )
+
+
+def medir_ciclo_automatizacion(engine, repeticiones: int) -> dict:
+    """
+    Ciclo horario real (run_automation_task) sobre el engine del benchmark.
+
+    Cada ciclo consume hasta 100 facturas pendientes de la cola, igual que en
+    producción; las repeticiones se detienen si la cola se vacía.
+    """
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core import lifespan
+    from app.core.instrumentacion_sql import instalar_listeners, medir_consultas
+    from app.crud.factura import get_facturas_pendientes_procesamiento
+
+    sesiones = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    original = lifespan.SessionLocal
+    lifespan.SessionLocal = sesiones
+    instalar_listeners(engine)
+    tiempos, consultas, procesadas = [], [], 0
+    try:
+        for _ in range(repeticiones):
+            db = sesiones()
+            pendientes = len(get_facturas_pendientes_procesamiento(db, limit=100))
+            db.close()
+            if not pendientes:
+                break
+            with medir_consultas() as sql:
+                inicio = time.perf_counter()
+                lifespan.run_automation_task()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(sql.consultas)
+            procesadas += pendientes
+    finally:
+        lifespan.SessionLocal = original
+
+    if not tiempos:
+        return {"omitido": "sin facturas pendientes de automatización"}
+    return _resumir(tiempos, consultas, unidades=procesadas // len(tiempos), facturas_procesadas=procesadas)
+
+
+def medir_ingesta(engine, resumen, facturas_por_nit: int, nits: int) -> dict:
+    """
+    Ingesta de consolidado.json generados con NITs del dataset (IngestService).
+
+    El SQL de ingesta del invoice_extractor es específico de MySQL
+    (ON DUPLICATE KEY UPDATE), por eso se omite en SQLite.
+    """
+    if engine.dialect.name != "mysql":
+        return {"omitido": f"la ingesta requiere MySQL (dialecto actual: {engine.dialect.name})"}
+
+    from app.core.instrumentacion_sql import instalar_listeners, medir_consultas
+    from app.models.proveedor import Proveedor
+    from sqlalchemy.orm import sessionmaker
+
+    sys.path.insert(0, RAIZ_EXTRACTOR)
+    from src.services.ingest_service import IngestService
+
+    prefijo = f"{resumen.config['prefijo']}-ING"
+    db = sessionmaker(bind=engine)()
+    nits_dataset = [
+        nit for (nit,) in db.query(Proveedor.nit)
+        .filter(Proveedor.razon_social.like(f"{resumen.config['prefijo']} %"))
+        .limit(nits)
+    ]
+    db.close()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for n, nit in enumerate(nits_dataset):
+            os.makedirs(os.path.join(directorio, nit))
+            facturas = [
+                {
+                    "numero_factura": f"{prefijo}-{n}-{i}",
+                    "cufe": f"{prefijo}-CUFE-{n:05d}-{i:06d}",
+                    "fecha_emision": datetime.now().date().isoformat(),
+                    "fecha_vencimiento": "",
+                    "nit_proveedor": nit,
+                    "razon_social_proveedor": f"{resumen.config['prefijo']} Proveedor",
+                    "nit_cliente": "900000000-1",
+                    "razon_social_cliente": "Cliente Benchmark",
+                    "subtotal": 1_000_000.0,
+                    "iva": 190_000.0,
+                    "retenciones": 0.0,
+                    "total_a_pagar": 1_190_000.0,
+                    "items_resumen": [
+                        {"descripcion": "Servicio de soporte técnico mensual", "cantidad": 1,
+                         "precio_unitario": 1_000_000.0, "subtotal": 1_000_000.0,
+                         "total_impuestos": 190_000.0, "total": 1_190_000.0},
+                    ],
+                }
+                for i in range(facturas_por_nit)
+            ]
+            with open(os.path.join(directorio, nit, "consolidado.json"), "w", encoding="utf-8") as f:
+                json.dump(facturas, f)
+
+        cfg = SimpleNamespace(
+            database_url=engine.url.render_as_string(hide_password=False),
+            OUTPUT_DIR=directorio,
+            INGEST_BATCH_SIZE=50,
+        )
+        servicio = IngestService(cfg)
+        instalar_listeners(servicio.engine)
+        with medir_consultas() as sql:
+            inicio = time.perf_counter()
+            estadisticas = servicio.ingest_to_db()
+            ms = (time.perf_counter() - inicio) * 1000
+
+    _limpiar_ingesta(engine, prefijo)
+    total = estadisticas["total_procesadas"]
+    return _resumir(
+        [ms], [sql.consultas], unidades=total,
+        facturas=total, exitosas=estadisticas["total_exitosas"], fallidas=estadisticas["total_fallidas"]
+    )
+
+
+def _limpiar_ingesta(engine, prefijo: str) -> None:
+    from sqlalchemy.orm import sessionmaker
+    from app.models.factura import Factura
+    from app.models.factura_item import FacturaItem
+
+    db = sessionmaker(bind=engine)()
+    try:
+        ids = db.query(Factura.id).filter(Factura.numero_factura.like(f"{prefijo}-%"))
+        db.query(FacturaItem).filter(FacturaItem.factura_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Factura).filter(Factura.numero_factura.like(f"{prefijo}-%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _commit_git() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_BACKEND, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> bool:
+    """Imprime la variación de p50 por escenario. Retorna True si hay regresiones."""
+    print(f"\nComparación contra {base['metadata'].get('commit')} (umbral {umbral:.0%})")
+    print(f"{'escenario':<26} {'base p50':>10} {'actual p50':>11} {'Δ':>8} {'SQL':>9}")
+    regresion = False
+    for nombre, resultado in actual["escenarios"].items():
+        anterior = base["escenarios"].get(nombre, {})
+        if "p50_ms" not in resultado or "p50_ms" not in anterior:
+            continue
+        delta = (resultado["p50_ms"] - anterior["p50_ms"]) / anterior["p50_ms"] if anterior["p50_ms"] else 0.0
+        marca = "  ← REGRESIÓN" if delta > umbral else ""
+        regresion = regresion or delta > umbral
+        sql = f"{anterior.get('consultas_sql')}→{resultado.get('consultas_sql')}"
+        print(f"{nombre:<26} {anterior['p50_ms']:>10.1f} {resultado['p50_ms']:>11.1f} {delta:>+8.1%} {sql:>9}{marca}")
+    return regresion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqlite", action="store_true", help="Usar SQLite en memoria en lugar de DATABASE_URL")
+    parser.add_argument("--perfil", choices=["pequeno", "mediano", "grande"], default="pequeno")
+    parser.add_argument("--facturas", type=int, help="Sobrescribe el número de facturas del perfil")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--escenarios", nargs="+", choices=ESCENARIOS, default=list(ESCENARIOS))
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para calcular variaciones")
+    parser.add_argument("--umbral", type=float, default=0.20, help="Regresión máxima tolerada de p50 (0.20 = 20%%)")
+    parser.add_argument("--conservar", action="store_true", help="No borrar el dataset al terminar")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        os.environ.setdefault("DATABASE_URL", "sqlite://")
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from dataset_sintetico import ConfigDataset, crear_engine_sqlite, limpiar, sembrar
+
+    if args.sqlite:
+        engine = crear_engine_sqlite()
+    else:
+        from app.db.session import engine
+
+    config = ConfigDataset.desde_perfil(args.perfil, facturas=args.facturas)
+    print(f"Sembrando dataset '{args.perfil}' ({config.facturas:,} facturas, {engine.dialect.name})...")
+    resumen = sembrar(engine, config)
+    print(f"  listo en {resumen.segundos:.1f}s: {resumen.conteos}")
+
+    repeticiones = args.repeticiones
+    resultados: Dict[str, dict] = {}
+    medidores: Dict[str, Callable[[], dict]] = {}
+
+    http = BenchmarkHTTP(engine, resumen)
+    medidores.update({
+        "listado_cursor": lambda: http.medir("/api/v1/facturas/cursor", repeticiones, limit=500),
+        "listado_cursor_profundo": lambda: http.medir_cursor_profundo(paginas=20, limit=500),
+        "dashboard_stats": lambda: http.medir("/api/v1/dashboard/stats", repeticiones),
+        "contabilidad_por_revisar": lambda: http.medir(
+            "/api/v1/accounting/facturas/por-revisar", repeticiones, rol="contador"
+        ),
+        "export_csv": lambda: http.medir("/api/v1/facturas/export/csv", max(repeticiones // 4, 3)),
+        "ciclo_automatizacion": lambda: medir_ciclo_automatizacion(engine, max(repeticiones // 10, 2)),
+        "ingesta": lambda: medir_ingesta(engine, resumen, facturas_por_nit=50, nits=20),
+    })
+
+    try:
+        for nombre in args.escenarios:
+            print(f"  {nombre}...", end=" ", flush=True)
+            try:
+                resultados[nombre] = medidores[nombre]()
+            except Exception as exc:
+                resultados[nombre] = {"error": str(exc)[:500]}
+            resultado = resultados[nombre]
+            if "p50_ms" in resultado:
+                print(f"p50 {resultado['p50_ms']:.1f} ms · p95 {resultado['p95_ms']:.1f} ms · "
+                      f"{resultado['consultas_sql']} SQL")
+            else:
+                print(resultado.get("omitido") or f"ERROR: {resultado['error']}")
+    finally:
+        http.cerrar()
+        if not args.conservar:
+            limpiar(engine, config.prefijo)
+
+    informe = {
+        "metadata": {
+            "commit": _commit_git(),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "dialecto": engine.dialect.name,
+            "perfil": args.perfil,
+            "repeticiones": repeticiones,
+            "dataset": {"config": resumen.config, "conteos": resumen.conteos, "siembra_s": resumen.segundos},
+        },
+        "escenarios": resultados,
+    }
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(informe, base, args.umbral):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
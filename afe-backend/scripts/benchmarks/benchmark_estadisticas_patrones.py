@@ -0,0 +1,119 @@
+"""
+Benchmark: estadísticas de patrones (statistics por grupo vs NumPy vectorizado).
+
+Genera en memoria facturas sintéticas para G grupos (proveedor, concepto) con
+12 meses de historia y mide:
+
+- anterior:     promedio/desviación/CV/meses/frecuencia grupo por grupo con
+                `statistics` (la implementación previa de
+                AnalizadorPatronesService._calcular_estadisticas_grupos)
+- vectorizado:  AnalizadorPatronesService._calcular_estadisticas_grupos actual
+- detector:     PatternDetector.analizar_patron_recurrencia caso por caso vs
+                PatternDetector.analizar_patrones_lote
+
+No requiere base de datos.
+
+Uso:
+    python scripts/benchmarks/benchmark_estadisticas_patrones.py
+    python scripts/benchmarks/benchmark_estadisticas_patrones.py --grupos 1000 10000 --meses 12
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _generar_grupos(total_grupos: int, meses: int, semilla: int = 42):
+    """{"proveedor|concepto": [facturas]} con facturas mensuales/quincenales."""
+    rng = random.Random(semilla)
+    grupos = {}
+    factura_id = 0
+    for g in range(total_grupos):
+        intervalo = rng.choice([15, 30, 30, 30, 60])
+        monto_base = rng.choice([85000, 450000, 2300000])
+        ruido = rng.choice([0.0, 0.02, 0.15, 0.5])
+        fecha = date(2024, 1, 1) + timedelta(days=rng.randint(0, 20))
+        facturas = []
+        for _ in range(max(1, meses * 30 // intervalo)):
+            factura_id += 1
+            monto = Decimal(str(round(monto_base * (1 + rng.uniform(-ruido, ruido)), 2)))
+            facturas.append(SimpleNamespace(id=factura_id, fecha_emision=fecha, total_a_pagar=monto))
+            fecha += timedelta(days=intervalo + rng.randint(-2, 2))
+        grupos[f"{g // 5 + 1}|concepto {g}"] = facturas
+    return grupos
+
+
+def _estadisticas_anterior(grupos, minimo_facturas=3, minimo_meses=2):
+    """Implementación previa (statistics por grupo), solo las métricas."""
+    resultado = []
+    for key, facturas in grupos.items():
+        montos = [float(f.total_a_pagar) for f in facturas if f.total_a_pagar]
+        fechas = [f.fecha_emision for f in facturas]
+        if len(montos) < minimo_facturas:
+            continue
+        meses = set((f.year, f.month) for f in fechas)
+        if len(meses) < minimo_meses:
+            continue
+        promedio = Decimal(str(statistics.mean(montos)))
+        desviacion = Decimal(str(statistics.stdev(montos)))
+        cv = desviacion / promedio * 100 if promedio > 0 else Decimal('0')
+        ordenadas = sorted(fechas)
+        intervalo_medio = statistics.mean(
+            [(ordenadas[i + 1] - ordenadas[i]).days for i in range(len(ordenadas) - 1)]
+        )
+        resultado.append((key, promedio, desviacion, cv, len(meses), intervalo_medio))
+    return resultado
+
+
+def _medir(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grupos", type=int, nargs="+", default=[1000, 10000],
+                        help="Cantidad de grupos proveedor+concepto (default: 1000 10000)")
+    parser.add_argument("--meses", type=int, default=12,
+                        help="Meses de historia por grupo (default: 12)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    from app.services.analisis_patrones_service import AnalizadorPatronesService
+    from app.services.automation.pattern_detector import PatternDetector
+
+    service = AnalizadorPatronesService(db=None)
+    detector = PatternDetector()
+
+    print(f"{'grupos':>8} {'facturas':>9} {'anterior':>10} {'vector':>10} {'x':>6} "
+          f"{'detector 1x1':>13} {'detector lote':>14} {'x':>6}")
+    for total in args.grupos:
+        grupos = _generar_grupos(total, args.meses)
+        total_facturas = sum(len(f) for f in grupos.values())
+        casos = [(facturas[-1], facturas[:-1]) for facturas in grupos.values()]
+
+        t_anterior = _medir(_estadisticas_anterior, grupos)
+        t_vector = _medir(service._calcular_estadisticas_grupos, grupos, args.meses)
+        t_individual = _medir(lambda: [detector.analizar_patron_recurrencia(n, h) for n, h in casos])
+        t_lote = _medir(detector.analizar_patrones_lote, casos)
+
+        print(
+            f"{total:>8} {total_facturas:>9} {t_anterior:>9.3f}s {t_vector:>9.3f}s "
+            f"{t_anterior / t_vector:>5.1f}x {t_individual:>12.3f}s {t_lote:>13.3f}s "
+            f"{t_individual / t_lote:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
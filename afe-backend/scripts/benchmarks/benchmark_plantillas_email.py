@@ -0,0 +1,171 @@
+"""
+Benchmark: renderizado de emails programados (resumen semanal).
+
+Genera en memoria R responsables con F facturas listadas cada uno y mide
+renders por segundo para:
+
+- f-strings:           HTML armado con f-strings (implementación previa de
+                       NotificacionesProgramadasService)
+- entorno por render:  un EmailTemplateService con Environment propio por
+                       email (como lo creaban los servicios de contabilidad),
+                       sin caché de bytecode: compila en cada render
+- entorno compartido:  get_jinja_env + render_lote + CacheFragmentos (filas
+                       renderizadas una vez por factura y envío)
+
+No requiere base de datos ni envía emails.
+
+Uso:
+    python scripts/benchmarks/benchmark_plantillas_email.py
+    python scripts/benchmarks/benchmark_plantillas_email.py --responsables 500 --facturas 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+COLORES = {"red": "#dc3545", "orange": "#ff9800", "green": "#28a745"}
+
+
+def _generar(total_responsables: int, por_responsable: int, semilla: int = 42):
+    rng = random.Random(semilla)
+    resumenes = []
+    factura_id = 0
+    for i in range(1, total_responsables + 1):
+        facturas = []
+        for _ in range(por_responsable):
+            factura_id += 1
+            facturas.append((SimpleNamespace(
+                id=factura_id,
+                numero_factura=f"FE-{factura_id}",
+                proveedor=SimpleNamespace(razon_social=f"Proveedor {rng.randint(1, 300)} S.A.S"),
+                total_calculado=Decimal(rng.randint(100000, 50000000)),
+            ), rng.randint(0, 30)))
+        resumenes.append((
+            SimpleNamespace(id=i, nombre=f"Responsable {i}", usuario=f"resp{i}", email=f"resp{i}@test.com"),
+            {
+                "total": por_responsable + 10,
+                "monto_total": sum(f.total_calculado for f, _ in facturas),
+                "urgentes": sum(1 for _, d in facturas if d > 10) + 10,
+                "pendientes": sum(1 for _, d in facturas if 3 <= d <= 10),
+                "recientes": sum(1 for _, d in facturas if d < 3),
+                "facturas": facturas,
+            },
+        ))
+    return resumenes
+
+
+def _lista_fstring(facturas, titulo, color, total):
+    """Implementación previa de _generar_lista_facturas."""
+    if not total:
+        return ""
+    html = f"""
+        <div style="margin: 20px 0; padding: 15px; background-color: #f8f9fa; border-left: 4px solid {COLORES[color]}; border-radius: 4px;">
+            <h3 style="color: {COLORES[color]}; margin-top: 0;">{titulo}: {total}</h3>
+            <ul style="list-style: none; padding: 0;">
+        """
+    for factura, dias in facturas:
+        monto = f"${factura.total_calculado:,.2f}" if factura.total_calculado else "N/A"
+        proveedor = factura.proveedor.razon_social[:30] if factura.proveedor else "N/A"
+        html += f"""
+                <li style="padding: 8px 0; border-bottom: 1px solid #dee2e6;">
+                    <strong>{factura.numero_factura}</strong> - {proveedor} - {monto} COP - <span style="color: {COLORES[color]};">{dias} dias</span>
+                </li>
+            """
+    restantes = total - len(facturas)
+    if restantes > 0:
+        html += f"""
+                <li style="padding: 8px 0; color: #777;">
+                    ... y {restantes} facturas mas
+                </li>
+            """
+    return html + "</ul></div>"
+
+
+def _resumen_fstring(responsable, resumen, frontend_url):
+    grupos = {"red": [], "orange": [], "green": []}
+    for factura, dias in resumen["facturas"]:
+        grupos["red" if dias > 10 else "orange" if dias >= 3 else "green"].append((factura, dias))
+    return f"""
+        <html><body>
+        <p>Hola <strong>{responsable.nombre or responsable.usuario}</strong>,</p>
+        <p>Tienes <strong>{resumen['total']} facturas</strong> por <strong>${resumen['monto_total']:,.2f} COP</strong>.</p>
+        {_lista_fstring(grupos['red'], "URGENTES (> 10 dias)", "red", resumen['urgentes'])}
+        {_lista_fstring(grupos['orange'], "PENDIENTES (3-10 dias)", "orange", resumen['pendientes'])}
+        {_lista_fstring(grupos['green'], "RECIENTES (< 3 dias)", "green", resumen['recientes'])}
+        <a href="{frontend_url}/facturas">Ver todas en el sistema</a>
+        </body></html>
+        """
+
+
+def _medir(funcion, renders: int):
+    inicio = time.perf_counter()
+    funcion()
+    transcurrido = time.perf_counter() - inicio
+    return transcurrido, renders / transcurrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responsables", type=int, default=300, help="Destinatarios del envío (default: 300)")
+    parser.add_argument("--facturas", type=int, default=20, help="Facturas listadas por email (default: 20)")
+    parser.add_argument("--muestra", type=int, default=30,
+                        help="Emails para medir el entorno por render (default: 30)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    from app.services.email_template_service import TEMPLATE_DIR, get_template_service
+    from app.services.notificaciones_programadas import NotificacionesProgramadasService
+
+    resumenes = _generar(args.responsables, args.facturas)
+    frontend_url = "https://afe.example.com"
+
+    t_fstring, rps_fstring = _medir(
+        lambda: [_resumen_fstring(r, s, frontend_url) for r, s in resumenes], len(resumenes)
+    )
+
+    muestra = resumenes[:args.muestra]
+
+    def entorno_por_render():
+        for responsable, resumen in muestra:
+            entorno = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)),
+                                  autoescape=select_autoescape(['html', 'xml']),
+                                  trim_blocks=True, lstrip_blocks=True)
+            fragmentos = entorno.get_template('fragmentos_notificaciones.html').module
+            servicio = NotificacionesProgramadasService(db=None)
+            servicio._fragmentos = SimpleNamespace(
+                modulo=fragmentos,
+                render=lambda macro, clave, **kw: getattr(fragmentos, macro)(**kw),
+            )
+            contexto = servicio._contexto_resumen_semanal(responsable, resumen)
+            entorno.get_template('resumen_semanal.html').render(frontend_url=frontend_url, **contexto)
+
+    t_por_render, rps_por_render = _medir(entorno_por_render, len(muestra))
+
+    def entorno_compartido():
+        servicio = NotificacionesProgramadasService(db=None)
+        contextos = [servicio._contexto_resumen_semanal(r, s) for r, s in resumenes]
+        return get_template_service().render_lote('resumen_semanal.html', contextos,
+                                                  comunes={'frontend_url': frontend_url})
+
+    entorno_compartido()  # compilación inicial (una vez por proceso)
+    t_compartido, rps_compartido = _medir(entorno_compartido, len(resumenes))
+
+    print(f"responsables={len(resumenes)} facturas_por_email={args.facturas}")
+    print(f"  f-strings            {rps_fstring:>10.0f} renders/s  ({t_fstring:.3f}s)")
+    print(f"  entorno por render   {rps_por_render:>10.0f} renders/s  ({t_por_render:.3f}s, muestra de {len(muestra)})")
+    print(f"  entorno compartido   {rps_compartido:>10.0f} renders/s  ({t_compartido:.3f}s)")
+    print(f"  vs. entorno por render {rps_compartido / rps_por_render:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
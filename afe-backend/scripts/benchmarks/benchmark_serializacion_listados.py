@@ -0,0 +1,124 @@
+"""
+Benchmark: serialización de listados de facturas (/facturas/cursor, /facturas/all).
+
+Genera en memoria N facturas ORM transitorias (proveedor, usuario y workflow
+cargados) y mide el tiempo de convertirlas en el cuerpo HTTP:
+
+- pydantic + JSONResponse:  camino previo de FastAPI con response_model
+                            (FacturaRead.model_validate por objeto, dump a
+                            modo JSON y json.dumps)
+- directo + JSONRapido:     serializar_factura_read + JSONRapidoResponse
+                            (orjson si está instalado)
+
+Además reporta el tamaño del cuerpo sin comprimir, con gzip y con brotli (si
+está instalado).
+
+No requiere base de datos.
+
+Uso:
+    python scripts/benchmarks/benchmark_serializacion_listados.py
+    python scripts/benchmarks/benchmark_serializacion_listados.py --filas 500 5000 --repeticiones 5
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _generar(cantidad: int, semilla: int = 42):
+    from app.models.factura import EstadoFactura, Factura
+    from app.models.proveedor import Proveedor
+    from app.models.usuario import Usuario
+    from app.models.workflow_aprobacion import TipoAprobacion, WorkflowAprobacionFactura
+
+    rng = random.Random(semilla)
+    proveedores = [Proveedor(id=i, nit=f"900{i:06d}-1", razon_social=f"Proveedor {i} S.A.S") for i in range(1, 301)]
+    usuarios = [Usuario(id=i, nombre=f"Responsable {i}", usuario=f"resp{i}") for i in range(1, 41)]
+    base = datetime(2026, 1, 1, 8, 0)
+    facturas = []
+    for i in range(1, cantidad + 1):
+        usuario = rng.choice(usuarios)
+        wf = WorkflowAprobacionFactura(
+            tipo_aprobacion=rng.choice(list(TipoAprobacion)),
+            aprobada_por=usuario.nombre,
+            fecha_aprobacion=base + timedelta(hours=i),
+        )
+        factura = Factura(
+            id=i,
+            numero_factura=f"FE-{i:07d}",
+            fecha_emision=date(2026, rng.randint(1, 12), rng.randint(1, 28)),
+            cufe=f"CUFE-{i:040d}",
+            subtotal=Decimal(rng.randint(100000, 50000000)) / 100,
+            iva=Decimal(rng.randint(10000, 5000000)) / 100,
+            total_a_pagar=Decimal(rng.randint(100000, 60000000)) / 100,
+            estado=rng.choice(list(EstadoFactura)),
+            grupo_id=rng.randint(1, 8),
+            responsable_id=usuario.id,
+            creado_en=base + timedelta(minutes=i),
+            actualizado_en=base + timedelta(minutes=i, seconds=30),
+            accion_por=usuario.nombre,
+        )
+        factura.proveedor = rng.choice(proveedores)
+        factura.proveedor_id = factura.proveedor.id
+        factura.usuario = usuario
+        factura.workflow_history = [wf]
+        facturas.append(factura)
+    return facturas
+
+
+def _medir(funcion, repeticiones: int):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+def main(filas: List[int], repeticiones: int) -> None:
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.core import respuestas_http
+    from app.core.respuestas_http import JSONRapidoResponse
+    from app.schemas.factura import FacturaRead, serializar_factura_read
+
+    adaptador = TypeAdapter(List[FacturaRead])
+
+    def camino_pydantic(facturas):
+        modelos = adaptador.validate_python(facturas, from_attributes=True)
+        return JSONResponse(adaptador.dump_python(modelos, mode="json")).body
+
+    def camino_directo(facturas):
+        return JSONRapidoResponse([serializar_factura_read(f) for f in facturas]).body
+
+    print(f"JSON: {'orjson' if respuestas_http.orjson else 'json estándar (orjson no instalado)'}; "
+          f"brotli: {'sí' if respuestas_http.brotli else 'no instalado'}")
+    print(f"{'filas':>6} | {'pydantic+JSONResponse':>22} | {'directo+JSONRapido':>19} | {'mejora':>7} | "
+          f"{'bytes':>9} | {'gzip':>8} | {'brotli':>8}")
+    for cantidad in filas:
+        facturas = _generar(cantidad)
+        t_pyd, cuerpo_pyd = _medir(lambda: camino_pydantic(facturas), repeticiones)
+        t_dir, cuerpo_dir = _medir(lambda: camino_directo(facturas), repeticiones)
+        assert len(cuerpo_pyd) > 0 and len(cuerpo_dir) > 0
+
+        tam_gzip = len(gzip.compress(cuerpo_dir, compresslevel=6))
+        tam_br = len(respuestas_http.brotli.compress(cuerpo_dir, quality=4)) if respuestas_http.brotli else None
+        print(f"{cantidad:>6} | {t_pyd * 1000:>19.1f} ms | {t_dir * 1000:>16.1f} ms | {t_pyd / t_dir:>6.1f}x | "
+              f"{len(cuerpo_dir):>9} | {tam_gzip:>8} | {tam_br if tam_br is not None else '-':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+    main(args.filas, args.repeticiones)
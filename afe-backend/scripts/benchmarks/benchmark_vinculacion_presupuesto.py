@@ -0,0 +1,137 @@
+"""
+Benchmark: vinculación automática factura → línea presupuestal.
+
+Genera en memoria F facturas y L líneas presupuestales sintéticas y mide:
+
+- recorrido completo:  score de TODAS las líneas para cada factura (la
+                       implementación previa de AutoVinculador). Se mide
+                       sobre una muestra de facturas y se extrapola.
+- índice invertido:    IndiceLineasPresupuesto (construcción + evaluación de
+                       las líneas candidatas de cada factura)
+
+Sobre la muestra verifica que ambos elijan la misma línea y score.
+
+No requiere base de datos.
+
+Uso:
+    python scripts/benchmarks/benchmark_vinculacion_presupuesto.py
+    python scripts/benchmarks/benchmark_vinculacion_presupuesto.py --facturas 10000 --lineas 2000 --muestra 300
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+CONCEPTOS = [
+    "aseo", "vigilancia", "energia", "acueducto", "internet", "telefonia", "software", "licencias",
+    "cafeteria", "arriendo", "mantenimiento", "papeleria", "transporte", "seguros", "nomina",
+    "publicidad", "capacitacion", "auditoria", "consultoria", "mensajeria", "hosting", "impresion",
+    "combustible", "dotacion", "fumigacion", "jardineria", "ascensores", "parqueadero", "alimentacion",
+    "hospedaje", "tiquetes", "honorarios", "calibracion", "laboratorio", "reactivos", "medicamentos",
+]
+SUFIJOS = ["s.a.s", "ltda", "s.a.", "& cia"]
+
+
+def _generar(total_facturas: int, total_lineas: int, año: int = 2026, semilla: int = 42):
+    from app.services.indice_vinculacion import MESES, DatosFactura
+
+    rng = random.Random(semilla)
+    proveedores = [
+        (f"{900000000 + i}-{i % 10}", f"{rng.choice(CONCEPTOS)} {rng.choice(['andina', 'del norte', 'integral', 'global', 'express'])} {i} {rng.choice(SUFIJOS)}")
+        for i in range(400)
+    ]
+    centros = [f"CC{n:03d}" for n in range(60)]
+
+    lineas = []
+    for i in range(1, total_lineas + 1):
+        nit, nombre = rng.choice(proveedores)
+        concepto = rng.choice(CONCEPTOS)
+        base = Decimal(rng.choice([150000, 850000, 2400000, 12000000]))
+        lineas.append(SimpleNamespace(
+            id=i, codigo=f"PRE-{i:05d}", nombre=f"{concepto} sede {i % 40}",
+            categoria=rng.choice([concepto, None]),
+            descripcion=rng.choice([None, f"servicio de {concepto} {rng.choice(CONCEPTOS)}"]),
+            proveedor_preferido=rng.choice([nombre, nit.split("-")[0], None]),
+            centro_costo=rng.choice(centros), año_fiscal=año,
+            **{f"presupuesto_{mes}": base for mes in MESES},
+        ))
+
+    facturas = []
+    for i in range(1, total_facturas + 1):
+        nit, nombre = rng.choice(proveedores)
+        facturas.append(DatosFactura(
+            id=i, numero_factura=f"FE-{i}", proveedor=nombre, nit=nit,
+            concepto=rng.choice([None, f"{rng.choice(CONCEPTOS)} {rng.choice(['mensual', 'periodo', 'sede'])}"]),
+            total=Decimal(rng.choice([140000, 900000, 2600000, 11000000, 30000000])),
+            fecha_emision=date(año, rng.randint(1, 12), rng.randint(1, 28)),
+        ))
+    return lineas, facturas
+
+
+def _recorrido_completo(facturas, lineas, umbral):
+    """Implementación previa: score de todas las líneas por factura."""
+    from app.services.indice_vinculacion import calcular_score
+
+    elegidas = []
+    for datos in facturas:
+        evaluados = [(linea, calcular_score(datos, linea)[0]) for linea in lineas]
+        evaluados.sort(key=lambda x: x[1], reverse=True)
+        mejor = evaluados[0] if evaluados and evaluados[0][1] >= umbral else None
+        elegidas.append((mejor[0].id, mejor[1]) if mejor else None)
+    return elegidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facturas", type=int, default=10000, help="Facturas pendientes (default: 10000)")
+    parser.add_argument("--lineas", type=int, default=2000, help="Líneas presupuestales activas (default: 2000)")
+    parser.add_argument("--muestra", type=int, default=200,
+                        help="Facturas para medir el recorrido completo y verificar (default: 200)")
+    parser.add_argument("--umbral", type=int, default=80, help="Umbral de confianza (default: 80)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    from app.services.indice_vinculacion import IndiceLineasPresupuesto
+
+    lineas, facturas = _generar(args.facturas, args.lineas)
+    muestra = facturas[:args.muestra]
+
+    inicio = time.perf_counter()
+    esperado = _recorrido_completo(muestra, lineas, args.umbral)
+    t_muestra = time.perf_counter() - inicio
+    t_completo = t_muestra / max(len(muestra), 1) * len(facturas)
+
+    inicio = time.perf_counter()
+    indice = IndiceLineasPresupuesto(lineas)
+    t_construccion = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    elegidas = []
+    for datos in facturas:
+        mejor, _ = indice.evaluar(datos, args.umbral)
+        elegidas.append((mejor["linea"].id, mejor["score"]) if mejor else None)
+    t_indice = time.perf_counter() - inicio
+
+    diferencias = sum(1 for a, b in zip(esperado, elegidas) if a != b)
+    vinculadas = sum(1 for e in elegidas if e)
+    total_pares = len(facturas) * len(lineas)
+
+    print(f"facturas={len(facturas)} lineas={len(lineas)} umbral={args.umbral}")
+    print(f"  recorrido completo  {t_completo:>9.2f}s  (extrapolado de {len(muestra)} facturas: {t_muestra:.2f}s)"
+          f"  scores={total_pares}")
+    print(f"  índice invertido    {t_construccion + t_indice:>9.2f}s  (construcción {t_construccion:.3f}s)"
+          f"  scores={indice.evaluaciones} ({indice.evaluaciones / total_pares:.1%})")
+    print(f"  aceleración         {t_completo / (t_construccion + t_indice):>9.1f}x")
+    print(f"  vinculadas {vinculadas}/{len(facturas)}; diferencias en la muestra: {diferencias}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark: creación de workflows para facturas nuevas (individual vs por lotes).
+
+Mide WorkflowAutomaticoService.procesar_facturas_nuevas_lote con N facturas
+pendientes (por defecto 1.000 y 10.000) y reporta tiempo total, facturas/s y
+número de sentencias SQL ejecutadas.
+
+El análisis de similitud y las notificaciones se desactivan para medir solo la
+creación de workflows (lo que se ejecuta en el PASO 1 del ciclo programado).
+
+Uso:
+    # Contra SQLite en memoria (no requiere MySQL)
+    python scripts/benchmarks/benchmark_workflow_lote.py --sqlite
+
+    # Contra la BD configurada en DATABASE_URL (crea y borra datos BENCH-*)
+    python scripts/benchmarks/benchmark_workflow_lote.py --facturas 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+PREFIJO = "BENCH-WF"
+
+
+def _crear_engine_sqlite():
+    """Engine SQLite en memoria con el esquema completo de la app."""
+    from sqlalchemy import BigInteger, create_engine
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.pool import StaticPool
+
+    # SQLite solo autoincrementa columnas INTEGER PRIMARY KEY
+    @compiles(BigInteger, "sqlite")
+    def _bigint_sqlite(type_, compiler, **kw):
+        return "INTEGER"
+
+    from app.db.base import Base
+    import app.models  # noqa: F401 - registra todos los modelos
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _sembrar_datos(db, total_facturas: int, grupos: int = 5, responsables_por_grupo: int = 2):
+    """Crea grupos, responsables, proveedores y facturas sin workflow."""
+    from app.models.factura import Factura, EstadoFactura
+    from app.models.grupo import Grupo, ResponsableGrupo
+    from app.models.proveedor import Proveedor
+    from app.models.role import Role
+    from app.models.usuario import Usuario
+
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+
+    grupo_ids = []
+    for g in range(grupos):
+        grupo = Grupo(nombre=f"{PREFIJO} Grupo {g}", codigo_corto=f"BWF{g}", nivel=1)
+        db.add(grupo)
+        db.flush()
+        grupo_ids.append(grupo.id)
+
+        for r in range(responsables_por_grupo):
+            usuario = Usuario(
+                usuario=f"{PREFIJO.lower()}.{g}.{r}",
+                email=f"{PREFIJO.lower()}.{g}.{r}@bench.local",
+                nombre=f"Responsable {g}-{r}",
+                role_id=rol.id
+            )
+            db.add(usuario)
+            db.flush()
+            db.add(ResponsableGrupo(responsable_id=usuario.id, grupo_id=grupo.id, activo=True))
+
+    proveedores = []
+    for p in range(50):
+        proveedor = Proveedor(nit=f"{PREFIJO}-{p}", razon_social=f"{PREFIJO} Proveedor {p}")
+        db.add(proveedor)
+        proveedores.append(proveedor)
+    db.flush()
+
+    hoy = date.today()
+    db.bulk_insert_mappings(Factura, [
+        {
+            "numero_factura": f"{PREFIJO}-{i}",
+            "fecha_emision": hoy - timedelta(days=i % 60),
+            "proveedor_id": proveedores[i % len(proveedores)].id,
+            "subtotal": Decimal("100000.00"),
+            "iva": Decimal("19000.00"),
+            "total_a_pagar": Decimal("119000.00"),
+            "cufe": f"{PREFIJO}-CUFE-{i}",
+            "estado": EstadoFactura.en_revision,
+            "grupo_id": grupo_ids[i % len(grupo_ids)]
+        }
+        for i in range(total_facturas)
+    ])
+    db.commit()
+
+    return [
+        fila.id for fila in db.query(Factura.id).filter(
+            Factura.numero_factura.like(f"{PREFIJO}-%")
+        )
+    ]
+
+
+def _limpiar_datos(db):
+    """Elimina los datos BENCH-* creados por el benchmark."""
+    from app.models.factura import Factura
+    from app.models.grupo import Grupo, ResponsableGrupo
+    from app.models.proveedor import Proveedor
+    from app.models.usuario import Usuario
+    from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+
+    factura_ids = db.query(Factura.id).filter(Factura.numero_factura.like(f"{PREFIJO}-%"))
+    db.query(WorkflowAprobacionFactura).filter(
+        WorkflowAprobacionFactura.factura_id.in_(factura_ids)
+    ).delete(synchronize_session=False)
+    db.query(Factura).filter(Factura.numero_factura.like(f"{PREFIJO}-%")).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.nit.like(f"{PREFIJO}-%")).delete(synchronize_session=False)
+    grupo_ids = db.query(Grupo.id).filter(Grupo.nombre.like(f"{PREFIJO}%"))
+    db.query(ResponsableGrupo).filter(ResponsableGrupo.grupo_id.in_(grupo_ids)).delete(synchronize_session=False)
+    db.query(Grupo).filter(Grupo.nombre.like(f"{PREFIJO}%")).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.usuario.like(f"{PREFIJO.lower()}.%")).delete(synchronize_session=False)
+    db.commit()
+
+
+def ejecutar(engine, total_facturas: int, tamano_lote: int):
+    """Ejecuta una corrida del benchmark y retorna sus métricas."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+    from app.services.workflow_automatico import WorkflowAutomaticoService
+
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    try:
+        _limpiar_datos(db)
+        factura_ids = _sembrar_datos(db, total_facturas)
+
+        sentencias = {"total": 0}
+
+        def _contar(conn, cursor, statement, parameters, context, executemany):
+            sentencias["total"] += 1
+
+        event.listen(engine, "before_cursor_execute", _contar)
+        try:
+            service = WorkflowAutomaticoService(db)
+            inicio = time.perf_counter()
+            resultado = service.procesar_facturas_nuevas_lote(
+                factura_ids,
+                tamano_lote=tamano_lote,
+                analizar=False,
+                notificar=False
+            )
+            duracion = time.perf_counter() - inicio
+        finally:
+            event.remove(engine, "before_cursor_execute", _contar)
+
+        return {
+            "facturas": total_facturas,
+            "workflows_creados": resultado["workflows_creados"],
+            "errores": resultado["errores"],
+            "segundos": duracion,
+            "facturas_por_segundo": total_facturas / duracion if duracion else 0,
+            "sentencias_sql": sentencias["total"]
+        }
+    finally:
+        _limpiar_datos(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facturas", type=int, nargs="+", default=[1000, 10000],
+                        help="Tamaños de backlog a medir (default: 1000 10000)")
+    parser.add_argument("--tamano-lote", type=int, default=500,
+                        help="Facturas por lote/commit (default: 500)")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="Usar SQLite en memoria en lugar de DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        os.environ.setdefault("DATABASE_URL", "sqlite://")
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        engine = _crear_engine_sqlite()
+    else:
+        from app.db.session import engine
+
+    print(f"{'facturas':>10} {'workflows':>10} {'segundos':>10} {'fact/s':>10} {'sql':>8}")
+    for total in args.facturas:
+        m = ejecutar(engine, total, args.tamano_lote)
+        print(
+            f"{m['facturas']:>10} {m['workflows_creados']:>10} {m['segundos']:>10.2f} "
+            f"{m['facturas_por_segundo']:>10.0f} {m['sentencias_sql']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
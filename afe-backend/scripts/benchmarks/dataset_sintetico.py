@@ -0,0 +1,463 @@
+"""
+Generador de datasets sintéticos para benchmarks.
+
+Siembra grupos, usuarios (responsables, admin, contador), proveedores,
+asignaciones NIT → responsable, facturas, factura_items y workflows con
+distribuciones realistas:
+
+- Facturas por proveedor: ley de potencias (Zipf s≈1.1): ~20% de los
+  proveedores emiten ~80% de las facturas.
+- Montos: log-normal por proveedor (mediana ~2,5 M COP). Los proveedores
+  recurrentes (70%) facturan su monto base ±5%; el resto, montos libres.
+- Fechas de emisión: uniformes en los últimos `meses`, con menos facturas
+  en fines de semana.
+- Estado según antigüedad: las facturas recientes están mayormente en
+  revisión; las antiguas, aprobadas/validadas por contabilidad.
+- Items por factura: 1 + Poisson(items_promedio - 1), truncado a items_max.
+
+Todos los registros llevan el prefijo `config.prefijo` (numero_factura,
+cufe, razon_social, usuario, nombre de grupo) para poder limpiarlos en una
+BD compartida. Inserción con INSERT multi-fila por bloques (no ORM).
+
+Uso como script:
+    python scripts/benchmarks/dataset_sintetico.py --sqlite --perfil pequeno
+    python scripts/benchmarks/dataset_sintetico.py --perfil mediano          # DATABASE_URL
+    python scripts/benchmarks/dataset_sintetico.py --limpiar
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Volúmenes predefinidos
+PERFILES = {
+    "pequeno": dict(grupos=3, responsables_por_grupo=2, proveedores=100, facturas=2_000),
+    "mediano": dict(grupos=8, responsables_por_grupo=3, proveedores=600, facturas=20_000),
+    "grande": dict(grupos=20, responsables_por_grupo=4, proveedores=3_000, facturas=200_000),
+}
+
+# Distribución de estados por antigüedad: (días máximos, {estado: peso})
+ESTADOS_POR_ANTIGUEDAD = (
+    (15, {"en_revision": 0.55, "aprobada": 0.15, "aprobada_auto": 0.20, "rechazada": 0.04,
+          "en_cuarentena": 0.06}),
+    (60, {"en_revision": 0.20, "aprobada": 0.30, "aprobada_auto": 0.25, "rechazada": 0.05,
+          "validada_contabilidad": 0.15, "devuelta_contabilidad": 0.03, "en_cuarentena": 0.02}),
+    (10_000, {"en_revision": 0.05, "aprobada": 0.10, "aprobada_auto": 0.10, "rechazada": 0.05,
+              "validada_contabilidad": 0.66, "devuelta_contabilidad": 0.03, "en_cuarentena": 0.01}),
+)
+
+# Estado del workflow para cada estado de factura
+ESTADO_WORKFLOW = {
+    "en_revision": "PENDIENTE_REVISION",
+    "aprobada": "APROBADA_MANUAL",
+    "aprobada_auto": "APROBADA_AUTO",
+    "rechazada": "RECHAZADA",
+    "validada_contabilidad": "ENVIADA_CONTABILIDAD",
+    "devuelta_contabilidad": "OBSERVADA",
+}
+
+TAMANO_BLOQUE = 5_000
+
+DESCRIPCIONES_ITEMS = (
+    "Servicio de soporte técnico mensual", "Licencia de software", "Arrendamiento de equipos",
+    "Servicio de vigilancia", "Mantenimiento preventivo", "Suministro de papelería",
+    "Servicio de aseo y cafetería", "Transporte de mercancía", "Consultoría profesional",
+    "Hosting y almacenamiento en la nube", "Energía eléctrica", "Plan de datos corporativo",
+)
+
+
+@dataclass
+class ConfigDataset:
+    """Volúmenes y parámetros de las distribuciones."""
+    grupos: int = 3
+    responsables_por_grupo: int = 2
+    proveedores: int = 100
+    facturas: int = 2_000
+    items_promedio: float = 3.0
+    items_max: int = 20
+    meses: int = 12
+    exponente_zipf: float = 1.1
+    proporcion_recurrentes: float = 0.7
+    semilla: int = 20261018
+    prefijo: str = "BENCH-DS"
+
+    @classmethod
+    def desde_perfil(cls, perfil: str, **cambios) -> "ConfigDataset":
+        return replace(cls(**PERFILES[perfil]), **{k: v for k, v in cambios.items() if v is not None})
+
+
+@dataclass
+class ResumenDataset:
+    """Conteos y usuarios de referencia del dataset sembrado."""
+    config: dict
+    conteos: Dict[str, int]
+    admin_id: int
+    contador_id: int
+    responsable_id: int
+    segundos: float
+
+
+def crear_engine_sqlite():
+    """Engine SQLite en memoria con el esquema completo de la app."""
+    from sqlalchemy import BigInteger, create_engine
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.pool import StaticPool
+
+    # SQLite solo autoincrementa columnas INTEGER PRIMARY KEY
+    @compiles(BigInteger, "sqlite")
+    def _bigint_sqlite(type_, compiler, **kw):
+        return "INTEGER"
+
+    from app.db.base import Base
+    import app.models  # noqa: F401 - registra todos los modelos
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _insertar_por_bloques(db, modelo, filas: List[dict]) -> None:
+    from sqlalchemy import insert
+
+    for inicio in range(0, len(filas), TAMANO_BLOQUE):
+        db.execute(insert(modelo), filas[inicio:inicio + TAMANO_BLOQUE])
+
+
+def _rol(db, nombre: str):
+    from app.models.role import Role
+
+    rol = db.query(Role).filter(Role.nombre == nombre).first()
+    if not rol:
+        rol = Role(nombre=nombre)
+        db.add(rol)
+        db.flush()
+    return rol
+
+
+def _nit(indice: int) -> str:
+    from app.utils.nit_validator import NitValidator
+
+    base = str(990_000_000 + indice)
+    return f"{base}-{NitValidator.calcular_digito_verificador(base)}"
+
+
+def _elegir_estados(rng, antiguedad_dias: np.ndarray) -> np.ndarray:
+    estados = np.empty(len(antiguedad_dias), dtype=object)
+    limite_inferior = -1
+    for limite, pesos in ESTADOS_POR_ANTIGUEDAD:
+        mascara = (antiguedad_dias > limite_inferior) & (antiguedad_dias <= limite)
+        nombres = list(pesos)
+        probabilidades = np.array(list(pesos.values()))
+        estados[mascara] = rng.choice(nombres, size=int(mascara.sum()), p=probabilidades / probabilidades.sum())
+        limite_inferior = limite
+    return estados
+
+
+def sembrar(engine, config: ConfigDataset) -> ResumenDataset:
+    """Crea el dataset completo en una transacción por tabla."""
+    from sqlalchemy.orm import sessionmaker
+    from app.models.factura import EstadoAsignacion, EstadoFactura, Factura
+    from app.models.factura_item import FacturaItem
+    from app.models.grupo import Grupo, ResponsableGrupo
+    from app.models.proveedor import Proveedor
+    from app.models.usuario import Usuario
+    from app.models.workflow_aprobacion import (
+        AsignacionNitResponsable,
+        EstadoFacturaWorkflow,
+        TipoAprobacion,
+        WorkflowAprobacionFactura,
+    )
+
+    inicio_siembra = time.perf_counter()
+    rng = np.random.default_rng(config.semilla)
+    prefijo = config.prefijo
+    usuario_prefijo = prefijo.lower()
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        limpiar(engine, prefijo)
+
+        # ---------------- Grupos y usuarios ----------------
+        rol_responsable = _rol(db, "responsable")
+        grupos = []
+        for g in range(config.grupos):
+            grupo = Grupo(nombre=f"{prefijo} Grupo {g}", codigo_corto=f"BDS{g}", nivel=1)
+            db.add(grupo)
+            grupos.append(grupo)
+        db.flush()
+
+        responsables = []  # (usuario, grupo_id)
+        for grupo in grupos:
+            for r in range(config.responsables_por_grupo):
+                usuario = Usuario(
+                    usuario=f"{usuario_prefijo}.resp.{grupo.id}.{r}",
+                    email=f"{usuario_prefijo}.resp.{grupo.id}.{r}@bench.local",
+                    nombre=f"{prefijo} Responsable {grupo.id}-{r}",
+                    role_id=rol_responsable.id,
+                    area="Operaciones"
+                )
+                db.add(usuario)
+                responsables.append((usuario, grupo.id))
+
+        admin = Usuario(usuario=f"{usuario_prefijo}.admin", email=f"{usuario_prefijo}.admin@bench.local",
+                        nombre=f"{prefijo} Admin", role_id=_rol(db, "admin").id)
+        contador = Usuario(usuario=f"{usuario_prefijo}.contador", email=f"{usuario_prefijo}.contador@bench.local",
+                           nombre=f"{prefijo} Contador", role_id=_rol(db, "contador").id)
+        db.add_all([admin, contador])
+        db.flush()
+
+        for usuario, grupo_id in responsables:
+            db.add(ResponsableGrupo(responsable_id=usuario.id, grupo_id=grupo_id, activo=True))
+        for grupo in grupos:
+            db.add(ResponsableGrupo(responsable_id=admin.id, grupo_id=grupo.id, activo=True))
+            db.add(ResponsableGrupo(responsable_id=contador.id, grupo_id=grupo.id, activo=True))
+        db.commit()
+
+        # ---------------- Proveedores y asignaciones ----------------
+        nits = [_nit(p) for p in range(config.proveedores)]
+        _insertar_por_bloques(db, Proveedor, [
+            {"nit": nit, "razon_social": f"{prefijo} Proveedor {p}", "activo": True}
+            for p, nit in enumerate(nits)
+        ])
+        proveedor_ids = dict(
+            db.query(Proveedor.nit, Proveedor.id).filter(Proveedor.razon_social.like(f"{prefijo} %"))
+        )
+
+        # Cada proveedor pertenece a un grupo y a un responsable de ese grupo
+        responsable_de_proveedor = rng.integers(0, len(responsables), size=config.proveedores)
+        _insertar_por_bloques(db, AsignacionNitResponsable, [
+            {
+                "nit": nit,
+                "responsable_id": responsables[responsable_de_proveedor[p]][0].id,
+                "grupo_id": responsables[responsable_de_proveedor[p]][1],
+                "permitir_aprobacion_automatica": True,
+                "requiere_revision_siempre": False,
+                "activo": True,
+                "creado_por": prefijo,
+            }
+            for p, nit in enumerate(nits)
+        ])
+        db.commit()
+
+        # ---------------- Facturas ----------------
+        n = config.facturas
+        pesos = 1.0 / np.arange(1, config.proveedores + 1) ** config.exponente_zipf
+        proveedor_idx = rng.choice(config.proveedores, size=n, p=pesos / pesos.sum())
+
+        monto_base = rng.lognormal(mean=np.log(2_500_000), sigma=1.2, size=config.proveedores)
+        recurrente = rng.random(config.proveedores) < config.proporcion_recurrentes
+        variacion = np.where(
+            recurrente[proveedor_idx],
+            rng.normal(1.0, 0.05, size=n),
+            rng.lognormal(0.0, 0.6, size=n)
+        )
+        subtotales = np.round(np.clip(monto_base[proveedor_idx] * variacion, 10_000, 5e9), 2)
+        con_retencion = rng.random(n) < 0.3
+        retenciones = np.round(np.where(con_retencion, subtotales * 0.025, 0.0), 2)
+
+        dias_ventana = config.meses * 30
+        antiguedad = rng.integers(0, dias_ventana, size=n)
+        hoy = date.today()
+        fechas = [hoy - timedelta(days=int(d)) for d in antiguedad]
+        # Fines de semana: 70% se mueve al viernes anterior
+        fechas = [
+            f - timedelta(days=f.weekday() - 4) if f.weekday() >= 5 and rng.random() < 0.7 else f
+            for f in fechas
+        ]
+        estados = _elegir_estados(rng, antiguedad)
+
+        filas_facturas = []
+        for i in range(n):
+            p = int(proveedor_idx[i])
+            responsable, grupo_id = responsables[responsable_de_proveedor[p]]
+            estado = estados[i]
+            en_cuarentena = estado == "en_cuarentena"
+            subtotal = Decimal(str(subtotales[i]))
+            iva = (subtotal * Decimal("0.19")).quantize(Decimal("0.01"))
+            retencion = Decimal(str(retenciones[i]))
+            if estado == "aprobada_auto":
+                accion_por = "Sistema Automático"
+            elif estado in ("aprobada", "rechazada") and not en_cuarentena:
+                accion_por = responsable.nombre
+            else:
+                accion_por = None
+            filas_facturas.append({
+                "numero_factura": f"{prefijo}-{i}",
+                "cufe": f"{prefijo}-CUFE-{i:08d}",
+                "fecha_emision": fechas[i],
+                "fecha_vencimiento": fechas[i] + timedelta(days=30),
+                "proveedor_id": proveedor_ids[nits[p]],
+                "subtotal": subtotal,
+                "iva": iva,
+                "retenciones": retencion,
+                "total_a_pagar": subtotal + iva - retencion,
+                "estado": EstadoFactura(estado),
+                "grupo_id": None if en_cuarentena else grupo_id,
+                "responsable_id": None if en_cuarentena else responsable.id,
+                "estado_asignacion": EstadoAsignacion.sin_asignar if en_cuarentena else EstadoAsignacion.asignado,
+                "accion_por": accion_por,
+            })
+        _insertar_por_bloques(db, Factura, filas_facturas)
+        db.commit()
+
+        factura_ids = dict(
+            db.query(Factura.numero_factura, Factura.id).filter(Factura.numero_factura.like(f"{prefijo}-%"))
+        )
+
+        # ---------------- Items ----------------
+        # En MySQL subtotal/total de factura_items son columnas GENERATED
+        columnas_generadas = engine.dialect.name == "mysql"
+        items_por_factura = np.minimum(1 + rng.poisson(config.items_promedio - 1, size=n), config.items_max)
+        filas_items = []
+        for i in range(n):
+            k = int(items_por_factura[i])
+            factura_id = factura_ids[f"{prefijo}-{i}"]
+            partes = rng.dirichlet(np.ones(k)) * float(subtotales[i])
+            for linea in range(k):
+                cantidad = int(rng.integers(1, 10))
+                precio = round(max(partes[linea] / cantidad, 1.0), 2)
+                impuestos = round(precio * cantidad * 0.19, 2)
+                descripcion = DESCRIPCIONES_ITEMS[(int(proveedor_idx[i]) + linea) % len(DESCRIPCIONES_ITEMS)]
+                fila = {
+                    "factura_id": factura_id,
+                    "numero_linea": linea + 1,
+                    "descripcion": descripcion,
+                    "descripcion_normalizada": descripcion.lower(),
+                    "cantidad": cantidad,
+                    "precio_unitario": precio,
+                    "total_impuestos": impuestos,
+                }
+                if not columnas_generadas:
+                    fila["subtotal"] = round(precio * cantidad, 2)
+                    fila["total"] = round(precio * cantidad + impuestos, 2)
+                filas_items.append(fila)
+        _insertar_por_bloques(db, FacturaItem, filas_items)
+        db.commit()
+
+        # ---------------- Workflows ----------------
+        ahora = datetime.now()
+        filas_workflows = []
+        for i in range(n):
+            estado = estados[i]
+            if estado == "en_cuarentena":
+                continue
+            p = int(proveedor_idx[i])
+            responsable, _ = responsables[responsable_de_proveedor[p]]
+            aprobada = estado in ("aprobada", "aprobada_auto", "validada_contabilidad", "devuelta_contabilidad")
+            filas_workflows.append({
+                "factura_id": factura_ids[f"{prefijo}-{i}"],
+                "estado": EstadoFacturaWorkflow[ESTADO_WORKFLOW[estado]],
+                "nit_proveedor": nits[p],
+                "responsable_id": responsable.id,
+                "fecha_asignacion": ahora - timedelta(days=int(antiguedad[i])),
+                "tipo_aprobacion": (
+                    TipoAprobacion.AUTOMATICA if estado == "aprobada_auto"
+                    else TipoAprobacion.MANUAL if aprobada else None
+                ),
+                "aprobada": aprobada,
+                "aprobada_por": ("Sistema Automático" if estado == "aprobada_auto" else responsable.nombre)
+                if aprobada else None,
+                "fecha_aprobacion": ahora - timedelta(days=max(int(antiguedad[i]) - 2, 0)) if aprobada else None,
+                "rechazada": estado == "rechazada",
+                "rechazada_por": responsable.nombre if estado == "rechazada" else None,
+                "creado_en": ahora,
+                "creado_por": prefijo,
+            })
+        _insertar_por_bloques(db, WorkflowAprobacionFactura, filas_workflows)
+        db.commit()
+
+        return ResumenDataset(
+            config=asdict(config),
+            conteos={
+                "grupos": len(grupos),
+                "usuarios": len(responsables) + 2,
+                "proveedores": len(nits),
+                "asignaciones": len(nits),
+                "facturas": n,
+                "factura_items": len(filas_items),
+                "workflows": len(filas_workflows),
+            },
+            admin_id=admin.id,
+            contador_id=contador.id,
+            responsable_id=responsables[0][0].id,
+            segundos=round(time.perf_counter() - inicio_siembra, 3),
+        )
+    finally:
+        db.close()
+
+
+def limpiar(engine, prefijo: str = ConfigDataset.prefijo) -> None:
+    """Elimina todos los registros del dataset con el prefijo dado."""
+    from sqlalchemy.orm import sessionmaker
+    from app.models.factura import Factura
+    from app.models.factura_item import FacturaItem
+    from app.models.grupo import Grupo, ResponsableGrupo
+    from app.models.proveedor import Proveedor
+    from app.models.usuario import Usuario
+    from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
+
+    db = sessionmaker(bind=engine)()
+    try:
+        facturas = db.query(Factura.id).filter(Factura.numero_factura.like(f"{prefijo}-%"))
+        db.query(FacturaItem).filter(FacturaItem.factura_id.in_(facturas)).delete(synchronize_session=False)
+        db.query(WorkflowAprobacionFactura).filter(
+            WorkflowAprobacionFactura.factura_id.in_(facturas)
+        ).delete(synchronize_session=False)
+        db.query(Factura).filter(Factura.numero_factura.like(f"{prefijo}-%")).delete(synchronize_session=False)
+        db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.creado_por == prefijo
+        ).delete(synchronize_session=False)
+        db.query(Proveedor).filter(Proveedor.razon_social.like(f"{prefijo} %")).delete(synchronize_session=False)
+        usuarios = db.query(Usuario.id).filter(Usuario.usuario.like(f"{prefijo.lower()}.%"))
+        db.query(ResponsableGrupo).filter(ResponsableGrupo.responsable_id.in_(usuarios)).delete(
+            synchronize_session=False
+        )
+        db.query(Usuario).filter(Usuario.usuario.like(f"{prefijo.lower()}.%")).delete(synchronize_session=False)
+        db.query(Grupo).filter(Grupo.nombre.like(f"{prefijo} %")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfil", choices=sorted(PERFILES), default="pequeno")
+    parser.add_argument("--facturas", type=int, help="Sobrescribe el número de facturas del perfil")
+    parser.add_argument("--semilla", type=int, help="Semilla de las distribuciones")
+    parser.add_argument("--sqlite", action="store_true", help="Usar SQLite en memoria en lugar de DATABASE_URL")
+    parser.add_argument("--limpiar", action="store_true", help="Solo eliminar el dataset existente")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        os.environ.setdefault("DATABASE_URL", "sqlite://")
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        engine = crear_engine_sqlite()
+    else:
+        from app.db.session import engine
+
+    if args.limpiar:
+        limpiar(engine)
+        print("Dataset eliminado")
+        return
+
+    config = ConfigDataset.desde_perfil(args.perfil, facturas=args.facturas, semilla=args.semilla)
+    resumen = sembrar(engine, config)
+    print(f"Dataset '{args.perfil}' sembrado en {resumen.segundos:.1f}s")
+    for tabla, total in resumen.conteos.items():
+        print(f"  {tabla:>14}: {total:,}")
+
+
+if __name__ == "__main__":
+    main()
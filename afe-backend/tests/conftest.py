@@ -165,3 +165,8 @@ def pytest_configure(config):
         "markers",
         "payment: pruebas del sistema de pagos"
     )
+
+    # Plugin de presupuesto de consultas SQL (marcador presupuesto_sql)
+    from tests import presupuesto_sql
+    if not config.pluginmanager.is_registered(presupuesto_sql):
+        config.pluginmanager.register(presupuesto_sql, "presupuesto_sql")
@@ -0,0 +1,77 @@
+"""
+Plugin de pytest: presupuesto de consultas SQL por endpoint.
+
+Se registra desde conftest.py (pytest_configure). Uso:
+
+    @pytest.mark.presupuesto_sql(max_consultas=8, max_repeticiones=3)
+    def test_listar_facturas(client, auth_token_contador):
+        client.get("/api/v1/facturas/", headers={"Authorization": auth_token_contador})
+
+Cada request hecho durante el test (TestClient pasa por
+InstrumentacionSQLMiddleware) se compara con el presupuesto: el test falla
+si un request excede max_consultas o si una misma sentencia se repite más de
+max_repeticiones veces (N+1).
+
+Para código de servicios (sin HTTP) usar el fixture `medir_sql`:
+
+    def test_dashboard(db, medir_sql):
+        with medir_sql() as sql:
+            DashboardService(db).obtener(...)
+        assert sql.consultas <= 6
+"""
+
+from typing import List
+
+import pytest
+
+from app.core import instrumentacion_sql
+from app.core.instrumentacion_sql import ContextoSQL, medir_consultas
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "presupuesto_sql(max_consultas=None, max_repeticiones=None): "
+        "falla si un request del test excede el presupuesto de consultas SQL"
+    )
+
+
+def _violaciones(contextos: List[ContextoSQL], max_consultas, max_repeticiones) -> List[str]:
+    errores = []
+    for contexto in contextos:
+        endpoint = f"{contexto.metodo} {contexto.ruta}"
+        if max_consultas is not None and contexto.consultas > max_consultas:
+            errores.append(f"{endpoint}: {contexto.consultas} consultas (presupuesto {max_consultas})")
+        if max_repeticiones is not None:
+            for huella, veces in contexto.repetidas(max_repeticiones + 1).items():
+                errores.append(f"{endpoint}: sentencia repetida {veces} veces (N+1): {huella[:300]}")
+    return errores
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marcador = item.get_closest_marker("presupuesto_sql")
+    if marcador is None:
+        return (yield)
+
+    contextos: List[ContextoSQL] = []
+    instrumentacion_sql.observadores.append(contextos.append)
+    try:
+        resultado = yield
+    finally:
+        instrumentacion_sql.observadores.remove(contextos.append)
+
+    errores = _violaciones(
+        contextos,
+        marcador.kwargs.get("max_consultas"),
+        marcador.kwargs.get("max_repeticiones"),
+    )
+    if errores:
+        pytest.fail("Presupuesto SQL excedido:\n  " + "\n  ".join(errores), pytrace=False)
+    return resultado
+
+
+@pytest.fixture
+def medir_sql():
+    """Context manager medir_consultas (cuenta consultas de un bloque)."""
+    return medir_consultas
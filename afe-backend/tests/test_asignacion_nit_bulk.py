@@ -0,0 +1,140 @@
+"""
+Test Suite: Asignación masiva NIT -> Responsable (set-based)
+
+Verifica el diff (dry-run) y la aplicación de AsignacionNitBulkService:
+
+1. Plan clasifica NITs nuevos, repetidos, existentes y no registrados, con
+   un error por NIT repetido o no registrado
+2. Aplicar crea asignaciones y asigna facturas sin responsable
+3. Reactivación de asignaciones inactivas (origen nit_configuracion)
+4. Sin reactivar, una asignación inactiva se omite y se reporta como error
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+from app.models.factura import Factura, EstadoFactura
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.services.asignacion_nit_bulk import AsignacionNitBulkService
+from app.utils.nit_validator import NitValidator
+from datetime import date
+from decimal import Decimal
+
+
+def _nit(base: int) -> str:
+    return f"{base}-{NitValidator.calcular_digito_verificador(str(base))}"
+
+
+@pytest.fixture
+def escenario(db: Session):
+    """Responsable + 3 proveedores de prueba (el primero ya asignado)."""
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+
+    responsable = Usuario(
+        usuario="test_bulk_nit", nombre="Responsable Bulk Test",
+        email="test_bulk_nit@test.com", role_id=rol.id, area="TI"
+    )
+    db.add(responsable)
+    db.flush()
+
+    nits = [_nit(999990001 + i) for i in range(3)]
+    proveedores = []
+    for i, nit in enumerate(nits):
+        proveedor = Proveedor(nit=nit, razon_social=f"Proveedor Bulk Test {i}")
+        db.add(proveedor)
+        proveedores.append(proveedor)
+    db.flush()
+
+    db.add(AsignacionNitResponsable(nit=nits[0], responsable_id=responsable.id, activo=True))
+    db.add(Factura(
+        numero_factura="TEST-BULK-1", cufe="CUFE-TEST-BULK-1",
+        fecha_emision=date.today(), proveedor_id=proveedores[1].id,
+        total_a_pagar=Decimal("1000.00"), estado=EstadoFactura.aprobada
+    ))
+    db.flush()
+
+    return responsable, nits
+
+
+class TestAsignacionNitBulk:
+    """Tests del servicio de asignación masiva."""
+
+    def test_plan_dry_run(self, db: Session, escenario):
+        """TEST 1: diff sin escribir."""
+        responsable, nits = escenario
+        servicio = AsignacionNitBulkService(db)
+        nit_inexistente = _nit(999990099)
+        entrada = [nits[0], nits[1], nits[2], nits[1], nit_inexistente]
+
+        plan = servicio.planificar(
+            responsable.id, entrada, nits_validos=servicio.nits_en_proveedores(entrada)
+        )
+
+        assert plan.crear == [nits[1], nits[2]]
+        assert plan.omitir == [nits[0], nits[1]]
+        assert plan.no_registrados == [nit_inexistente]
+        assert plan.errores == [
+            f"NIT {nits[1]}: repetido en la solicitud",
+            f"NIT {nit_inexistente}: no registrado como proveedor",
+        ]
+        assert db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.responsable_id == responsable.id
+        ).count() == 1
+
+    def test_aplicar_crea_y_sincroniza_facturas(self, db: Session, escenario):
+        """TEST 2: INSERT multi-fila + UPDATE de facturas con accion_por."""
+        responsable, nits = escenario
+        servicio = AsignacionNitBulkService(db)
+
+        plan = servicio.planificar(responsable.id, nits)
+        total_facturas = servicio.aplicar(plan, responsable, "test")
+        db.expire_all()
+
+        assert total_facturas == 1
+        assert db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.responsable_id == responsable.id
+        ).count() == 3
+        factura = db.query(Factura).filter(Factura.numero_factura == "TEST-BULK-1").one()
+        assert factura.responsable_id == responsable.id
+        assert factura.accion_por == responsable.nombre
+
+    def test_reactivar_inactivas(self, db: Session, escenario):
+        """TEST 3: asignación inactiva se reactiva en lugar de duplicarse."""
+        responsable, nits = escenario
+        db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.nit == nits[0]
+        ).update({AsignacionNitResponsable.activo: False})
+        servicio = AsignacionNitBulkService(db)
+
+        plan = servicio.planificar(responsable.id, [nits[0]], reactivar_inactivas=True)
+        servicio.aplicar(plan, responsable, "BULK_NIT_CONFIG", sincronizar_facturas=False)
+        db.expire_all()
+
+        assert plan.reactivar == [nits[0]]
+        asignacion = db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.nit == nits[0],
+            AsignacionNitResponsable.responsable_id == responsable.id
+        ).one()
+        assert asignacion.activo is True
+        assert asignacion.actualizado_por == "BULK_NIT_CONFIG"
+
+    def test_inactiva_sin_reactivar_es_error(self, db: Session, escenario):
+        """TEST 4: /bulk y /bulk-simple no reactivan; el NIT queda en errores."""
+        responsable, nits = escenario
+        db.query(AsignacionNitResponsable).filter(
+            AsignacionNitResponsable.nit == nits[0]
+        ).update({AsignacionNitResponsable.activo: False})
+        servicio = AsignacionNitBulkService(db)
+
+        plan = servicio.planificar(responsable.id, [nits[0], nits[1]])
+
+        assert plan.crear == [nits[1]]
+        assert plan.omitir == [nits[0]]
+        assert plan.reactivar == []
+        assert plan.errores == [f"NIT {nits[0]}: asignación inactiva para el responsable (no se reactiva)"]
@@ -0,0 +1,167 @@
+"""
+Test Suite: Búsqueda de proveedores y facturas (índice de términos + trigramas)
+
+Casos de prueba:
+1. Normalización: minúsculas, sin tildes, sin palabras vacías
+2. Palabras en número, concepto e ítems; todas las palabras requeridas
+3. Tolerancia a errores de digitación (similitud de trigramas) y prefijos
+4. Filtro por grupos: facturas de otros grupos excluidas, proveedores visibles
+5. Reindexar sin cambios no toca postings; con cambios ajusta frecuencias
+6. Prefijo de CUFE / NIT primero en los resultados
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.busqueda import BusquedaPosting, BusquedaTermino
+from app.models.factura import EstadoFactura, Factura
+from app.models.factura_item import FacturaItem
+from app.models.grupo import Grupo
+from app.models.proveedor import Proveedor
+from app.services.busqueda import (
+    TIPO_FACTURA,
+    TIPO_PROVEEDOR,
+    BusquedaService,
+    IndiceBusquedaService,
+    tokenizar,
+)
+
+
+def _grupo(codigo: str) -> Grupo:
+    return Grupo(
+        nombre=f"GRUPO {codigo}", codigo_corto=codigo, nivel=1, ruta_jerarquica="",
+        correos_corporativos=[], activo=True, eliminado=False, creado_por="system_test"
+    )
+
+
+@pytest.fixture
+def indice(db: Session):
+    """Proveedor + 3 facturas en dos grupos, indexados."""
+    grupo1, grupo2 = _grupo("TEST_BUSQ_1"), _grupo("TEST_BUSQ_2")
+    proveedor = Proveedor(nit="999997711-2", razon_social="Distribuidora Quetzalcoatl Test S.A.S.")
+    db.add_all([grupo1, grupo2, proveedor])
+    db.flush()
+
+    datos = [
+        ("TEST-BUSQ-001", grupo1, "mantenimiento ascensores torre norte", ["Revisión xilófono hidráulico"]),
+        ("TEST-BUSQ-002", grupo1, "arriendo bodega", ["Canon mensual bodega"]),
+        ("TEST-BUSQ-003", grupo2, "mantenimiento ascensores sede sur", ["Repuesto xilófono"]),
+    ]
+    facturas = []
+    for numero, grupo, concepto, items in datos:
+        factura = Factura(
+            numero_factura=numero, cufe=f"CUFETESTBUSQ{numero[-3:]}ABCDEF", fecha_emision=date.today(),
+            proveedor_id=proveedor.id, grupo_id=grupo.id, total_a_pagar=Decimal("1000.00"),
+            estado=EstadoFactura.en_revision, concepto_normalizado=concepto
+        )
+        db.add(factura)
+        db.flush()
+        for linea, descripcion in enumerate(items, start=1):
+            db.add(FacturaItem(
+                factura_id=factura.id, numero_linea=linea, descripcion=descripcion,
+                cantidad=Decimal("1"), precio_unitario=Decimal("1000.00"),
+                subtotal=Decimal("1000.00"), total=Decimal("1000.00")
+            ))
+        facturas.append(factura)
+    db.commit()
+
+    servicio = IndiceBusquedaService(db)
+    servicio.indexar_facturas([f.id for f in facturas])
+    servicio.indexar_proveedores([proveedor.id])
+
+    yield {"proveedor": proveedor, "facturas": facturas, "grupo1": grupo1, "grupo2": grupo2}
+
+    db.rollback()
+    servicio.eliminar(TIPO_FACTURA, [f.id for f in facturas])
+    servicio.eliminar(TIPO_PROVEEDOR, [proveedor.id])
+    ids = [f.id for f in facturas]
+    db.query(FacturaItem).filter(FacturaItem.factura_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Factura).filter(Factura.id.in_(ids)).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.query(Grupo).filter(Grupo.id.in_([grupo1.id, grupo2.id])).delete(synchronize_session=False)
+    db.commit()
+
+
+def _claves(resultados):
+    return [(r.tipo, r.id) for r in resultados]
+
+
+class TestBusqueda:
+    """Tests de IndiceBusquedaService + BusquedaService."""
+
+    def test_tokenizar(self):
+        """TEST 1: normalización del texto."""
+        assert tokenizar("Compañía Eléctrica de la Sabana S.A.") == ["compania", "electrica", "sabana"]
+        assert tokenizar("FE-00123") == ["fe", "00123"]
+
+    def test_palabras_requeridas(self, db: Session, indice):
+        """TEST 2: ítems y concepto indexados; todas las palabras deben coincidir."""
+        facturas = indice["facturas"]
+        resultados = BusquedaService(db).buscar("xilofono ascensores", tipo=TIPO_FACTURA)
+        assert set(_claves(resultados)) == {(TIPO_FACTURA, facturas[0].id), (TIPO_FACTURA, facturas[2].id)}
+
+        resultados = BusquedaService(db).buscar("ascensores torre", tipo=TIPO_FACTURA)
+        assert _claves(resultados)[0] == (TIPO_FACTURA, facturas[0].id)
+        assert (TIPO_FACTURA, facturas[1].id) not in _claves(resultados)
+
+        resultados = BusquedaService(db).buscar("TEST-BUSQ-002")
+        assert _claves(resultados)[0] == (TIPO_FACTURA, facturas[1].id)
+        assert resultados[0].detalle["estado"] == EstadoFactura.en_revision.value
+
+    def test_tolerancia_errores(self, db: Session, indice):
+        """TEST 3: 'quetzalcotl' encuentra 'Quetzalcoatl'; 'quetzal' por prefijo."""
+        proveedor = indice["proveedor"]
+        for consulta in ("quetzalcotl", "quetzal", "distribuidora quetzalcoalt"):
+            resultados = BusquedaService(db).buscar(consulta, tipo=TIPO_PROVEEDOR)
+            assert _claves(resultados)[:1] == [(TIPO_PROVEEDOR, proveedor.id)], consulta
+
+    def test_filtro_grupos(self, db: Session, indice):
+        """TEST 4: facturas del grupo 2 no aparecen para el grupo 1."""
+        facturas = indice["facturas"]
+        resultados = BusquedaService(db).buscar("quetzalcoatl", grupos=[indice["grupo1"].id])
+        claves = set(_claves(resultados))
+        assert (TIPO_PROVEEDOR, indice["proveedor"].id) in claves
+        assert {(TIPO_FACTURA, facturas[0].id), (TIPO_FACTURA, facturas[1].id)} <= claves
+        assert (TIPO_FACTURA, facturas[2].id) not in claves
+
+        # Sin grupos: solo catálogo de proveedores
+        resultados = BusquedaService(db).buscar("quetzalcoatl", grupos=[])
+        assert {r.tipo for r in resultados} == {TIPO_PROVEEDOR}
+
+    def test_huella_y_frecuencias(self, db: Session, indice):
+        """TEST 5: sin cambios no reindexa; cambiar concepto mueve la frecuencia del término."""
+        factura = indice["facturas"][1]
+        servicio = IndiceBusquedaService(db)
+        servicio.indexar_facturas([factura.id])
+        assert servicio.stats["documentos_actualizados"] == 0
+        assert servicio.stats["documentos_sin_cambios"] == 1
+
+        def frecuencia(termino):
+            return db.query(BusquedaTermino.documentos).filter(BusquedaTermino.termino == termino).scalar() or 0
+
+        arriendo_antes = frecuencia("arriendo")
+        factura.concepto_normalizado = "alquiler bodega"
+        db.commit()
+        servicio.indexar_facturas([factura.id])
+
+        assert servicio.stats["documentos_actualizados"] == 1
+        assert frecuencia("arriendo") == arriendo_antes - 1
+        assert frecuencia("alquiler") >= 1
+        assert _claves(BusquedaService(db).buscar("alquiler bodega", tipo=TIPO_FACTURA)) == [
+            (TIPO_FACTURA, factura.id)
+        ]
+        assert db.query(BusquedaPosting).join(
+            BusquedaTermino, BusquedaTermino.id == BusquedaPosting.termino_id
+        ).filter(BusquedaTermino.termino == "arriendo").count() == arriendo_antes - 1
+
+    def test_identificadores(self, db: Session, indice):
+        """TEST 6: prefijo de CUFE y de NIT."""
+        factura = indice["facturas"][2]
+        resultados = BusquedaService(db).buscar("CUFETESTBUSQ003")
+        assert _claves(resultados)[0] == (TIPO_FACTURA, factura.id)
+
+        resultados = BusquedaService(db).buscar("99999771")
+        assert _claves(resultados)[0] == (TIPO_PROVEEDOR, indice["proveedor"].id)
@@ -0,0 +1,177 @@
+"""
+Test Suite: Caché HTTP con ETag (app/core/cache_http.py)
+
+Verifica el decorador @respuesta_cacheable con el middleware sobre una app
+mínima y la invalidación por versión de datos:
+
+1. Fallo → acierto: el endpoint se ejecuta una vez; ambas respuestas llevan
+   el mismo ETag y cuerpo (serialización de response_model incluida)
+2. If-None-Match con el ETag vigente → 304 sin cuerpo (en fallo y en acierto)
+3. La clave separa usuarios, query params y X-Grupo-Id
+4. Commit que escribe en una tabla versionada (grupos) invalida la caché;
+   un rollback no
+5. LRU: desalojo por número de entradas y por bytes
+6. Métricas: aciertos, fallos, 304 y memoria en formato Prometheus
+"""
+
+import time
+
+import pytest
+from fastapi import Depends, FastAPI, Header
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.cache_http import (
+    CacheHTTPMiddleware,
+    CacheRespuestas,
+    EntradaCache,
+    cache_respuestas,
+    instalar_listeners_version,
+    registro_cache,
+    respuesta_cacheable,
+    version_datos,
+)
+from app.models.grupo import Grupo
+
+
+class Resumen(BaseModel):
+    total: int
+    usuario: str
+
+
+@pytest.fixture
+def cliente():
+    """App mínima con dos endpoints cacheados y contador de ejecuciones."""
+    cache_respuestas.limpiar()
+    registro_cache.reiniciar()
+    llamadas = {"resumen": 0, "global": 0}
+
+    def usuario_actual(x_usuario: str = Header("ana")):
+        return type("Usuario", (), {"id": x_usuario})()
+
+    app = FastAPI()
+
+    @app.get("/resumen", response_model=Resumen)
+    @respuesta_cacheable("test_resumen")
+    def resumen(mes: int = 1, current_user=Depends(usuario_actual)):
+        llamadas["resumen"] += 1
+        return {"total": mes * 10, "usuario": current_user.id, "ignorado": True}
+
+    @app.get("/global")
+    @respuesta_cacheable("test_global", por_usuario=False)
+    async def global_(current_user=Depends(usuario_actual)):
+        llamadas["global"] += 1
+        return {"ejecuciones": llamadas["global"]}
+
+    app.add_middleware(CacheHTTPMiddleware)
+    with TestClient(app) as c:
+        yield c, llamadas
+    cache_respuestas.limpiar()
+
+
+class TestCacheHTTP:
+    """Decorador + middleware + invalidación."""
+
+    def test_fallo_y_acierto(self, cliente):
+        """TEST 1: segunda petición desde la caché con el mismo ETag."""
+        c, llamadas = cliente
+        r1 = c.get("/resumen?mes=2")
+        r2 = c.get("/resumen?mes=2")
+
+        assert llamadas["resumen"] == 1
+        assert r1.status_code == r2.status_code == 200
+        assert r1.json() == r2.json() == {"total": 20, "usuario": "ana"}
+        assert r1.headers["etag"] == r2.headers["etag"]
+        assert (r1.headers["x-cache"], r2.headers["x-cache"]) == ("MISS", "HIT")
+        assert r2.headers["cache-control"] == "private, no-cache"
+
+    def test_if_none_match_304(self, cliente):
+        """TEST 2: 304 sin cuerpo si el cliente ya tiene el contenido."""
+        c, llamadas = cliente
+        etag = c.get("/global").headers["etag"]
+
+        r = c.get("/global", headers={"If-None-Match": etag})
+        assert r.status_code == 304 and r.content == b""
+        assert r.headers["etag"] == etag
+
+        # Tras limpiar la caché: fallo, mismo contenido → 304 desde el middleware
+        cache_respuestas.limpiar()
+        llamadas["global"] = 0
+        r = c.get("/global", headers={"If-None-Match": etag})
+        assert r.status_code == 304 and r.headers["x-cache"] == "MISS"
+
+    def test_clave_por_usuario_params_y_grupo(self, cliente):
+        """TEST 3: usuario, params y X-Grupo-Id son parte de la clave."""
+        c, llamadas = cliente
+        c.get("/resumen?mes=1")
+        assert c.get("/resumen?mes=1", headers={"X-Usuario": "luis"}).json()["usuario"] == "luis"
+        c.get("/resumen?mes=3")
+        c.get("/resumen?mes=1", headers={"X-Grupo-Id": "7"})
+        assert llamadas["resumen"] == 4
+
+        # Endpoint global: el usuario no cuenta
+        c.get("/global")
+        c.get("/global", headers={"X-Usuario": "luis"})
+        assert llamadas["global"] == 1
+
+    def test_commit_versionado_invalida(self, cliente, db: Session):
+        """TEST 4: commit en grupos invalida; rollback no."""
+        c, llamadas = cliente
+        instalar_listeners_version()
+        c.get("/global")
+
+        db.add(Grupo(nombre="GRUPO CACHE TEST", codigo_corto="TEST_CACHE", nivel=1, ruta_jerarquica="",
+                     correos_corporativos=[], activo=True, eliminado=False, creado_por="system_test"))
+        db.flush()
+        db.rollback()
+        c.get("/global")
+        assert llamadas["global"] == 1
+
+        grupo = Grupo(nombre="GRUPO CACHE TEST", codigo_corto="TEST_CACHE", nivel=1, ruta_jerarquica="",
+                      correos_corporativos=[], activo=True, eliminado=False, creado_por="system_test")
+        db.add(grupo)
+        db.commit()
+        try:
+            assert c.get("/global").json() == {"ejecuciones": 2}
+            assert registro_cache.invalidaciones >= 1
+        finally:
+            db.delete(grupo)
+            db.commit()
+
+    def test_lru_entradas_y_bytes(self):
+        """TEST 5: se desaloja lo menos usado al superar entradas o bytes."""
+        cache = CacheRespuestas(max_entradas=2, max_bytes=100, ttl_segundos=60)
+        version = version_datos.actual()
+
+        def entrada(n):
+            return EntradaCache(b"x" * n, '"e"', "application/json", time.monotonic())
+
+        cache.guardar(("a",), version, entrada(10))
+        cache.guardar(("b",), version, entrada(10))
+        assert cache.obtener(("a",), version) is not None  # "a" pasa a ser la más reciente
+        cache.guardar(("c",), version, entrada(10))
+        assert cache.obtener(("b",), version) is None
+        assert cache.entradas == 2 and cache.bytes == 20
+
+        cache.guardar(("d",), version, entrada(95))
+        assert cache.entradas == 1 and cache.bytes == 95
+        cache.guardar(("e",), version, entrada(101))  # mayor que el límite: no se guarda
+        assert cache.obtener(("e",), version) is None
+
+    def test_metricas(self, cliente):
+        """TEST 6: contadores y memoria en /health/metrics."""
+        c, _ = cliente
+        etag = c.get("/global").headers["etag"]
+        c.get("/global")
+        c.get("/global", headers={"If-None-Match": etag})
+
+        resumen = registro_cache.resumen()
+        assert (resumen["aciertos"], resumen["fallos"], resumen["no_modificados"]) == (2, 1, 1)
+        assert resumen["tasa_aciertos"] == pytest.approx(2 / 3, abs=1e-3)
+        assert resumen["entradas"] == 1 and resumen["bytes"] > 0
+
+        texto = registro_cache.formato_prometheus()
+        assert 'afe_http_cache_hits_total{endpoint="test_global"} 2' in texto
+        assert 'afe_http_cache_misses_total{endpoint="test_global"} 1' in texto
+        assert "afe_http_cache_bytes " in texto
@@ -0,0 +1,178 @@
+"""
+Test Suite: Reclasificación de proveedores en lote
+
+Verifica ClasificacionProveedoresService.reclasificar_lote:
+
+1. Equivalencia: misma clasificación que clasificar_proveedor_automatico
+   (por NIT) para fijo, variable, consumo, montos altos y sin historial
+2. Solo cambios: una segunda ejecución no escribe nada
+3. Simulación: reporta cambios sin escribir
+4. La clasificación aplica a todas las asignaciones activas del NIT
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.services.clasificacion_proveedores import ClasificacionProveedoresService
+
+
+CAMPOS = [
+    "tipo_servicio_proveedor",
+    "nivel_confianza_proveedor",
+    "coeficiente_variacion_historico",
+    "requiere_orden_compra_obligatoria",
+]
+
+# (días desde emisión, monto, estado) por proveedor
+FACTURAS = {
+    "fijo": [(30 * i + 5, "1500000.00", EstadoFactura.aprobada) for i in range(7)],
+    "variable": [(d, m, EstadoFactura.aprobada_auto) for d, m in
+                 [(10, "800000"), (40, "1200000"), (70, "950000"), (100, "1500000"), (130, "700000")]],
+    "consumo": [(d, m, e) for d, m, e in
+                [(20, "100000", EstadoFactura.aprobada), (50, "2500000", EstadoFactura.en_revision),
+                 (80, "0", EstadoFactura.validada_contabilidad), (95, "40000", EstadoFactura.aprobada),
+                 (96, "9000000", EstadoFactura.rechazada)]],
+    "monto_alto": [(30 * i + 15, "25000000.00", EstadoFactura.aprobada) for i in range(4)],
+    "pocas": [(10, "500000", EstadoFactura.aprobada), (40, "500000", EstadoFactura.aprobada)],
+    "antiguas": [(400 + 30 * i, "500000", EstadoFactura.aprobada) for i in range(4)],
+}
+
+
+@pytest.fixture
+def escenario(db: Session):
+    """Un proveedor por patrón con su asignación (commit real: el servicio confirma)."""
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+    responsable = Usuario(usuario="test_clasif_lote", nombre="Clasificación Lote Test",
+                          email="test_clasif_lote@test.com", role_id=rol.id)
+    db.add(responsable)
+    db.flush()
+
+    proveedores = {}
+    facturas = []
+    for i, (patron, filas) in enumerate(FACTURAS.items()):
+        proveedor = Proveedor(nit=f"99999550{i}-1", razon_social=f"Proveedor Lote {patron}")
+        db.add(proveedor)
+        db.flush()
+        proveedores[patron] = proveedor
+        db.add(AsignacionNitResponsable(nit=proveedor.nit, responsable_id=responsable.id, activo=True))
+        for j, (dias, monto, estado) in enumerate(filas):
+            facturas.append(Factura(
+                numero_factura=f"TEST-CLASIF-{i}-{j}", cufe=f"CUFE-TEST-CLASIF-{i}-{j}",
+                fecha_emision=date.today() - timedelta(days=dias), proveedor_id=proveedor.id,
+                total_a_pagar=Decimal(monto), estado=estado
+            ))
+    db.add_all(facturas)
+    db.commit()
+
+    nits = [p.nit for p in proveedores.values()]
+    yield {"responsable": responsable, "proveedores": proveedores, "nits": nits}
+
+    db.rollback()
+    db.query(Factura).filter(Factura.id.in_([f.id for f in facturas])).delete(synchronize_session=False)
+    db.query(AsignacionNitResponsable).filter(
+        AsignacionNitResponsable.responsable_id == responsable.id
+    ).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.nit.in_(nits)).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.id == responsable.id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _asignaciones(db: Session, nits):
+    db.expire_all()
+    return db.query(AsignacionNitResponsable).filter(
+        AsignacionNitResponsable.nit.in_(nits)
+    ).order_by(AsignacionNitResponsable.id).all()
+
+
+def _snapshot(db: Session, nits):
+    return {
+        a.id: tuple(getattr(a, campo) for campo in CAMPOS)
+        + (a.fecha_inicio_relacion.date() if a.fecha_inicio_relacion else None,)
+        for a in _asignaciones(db, nits)
+    }
+
+
+def _limpiar_clasificacion(db: Session, nits):
+    for asignacion in _asignaciones(db, nits):
+        for campo in CAMPOS + ["fecha_inicio_relacion", "metadata_riesgos"]:
+            setattr(asignacion, campo, None)
+    db.commit()
+
+
+class TestReclasificacionLote:
+    """Motor por lotes vs. clasificación por NIT."""
+
+    def test_equivalente_a_clasificacion_por_nit(self, db: Session, escenario):
+        """TEST 1: mismos tipo, nivel, CV, OC y fecha de inicio que el camino por NIT."""
+        servicio = ClasificacionProveedoresService(db)
+        for nit in escenario["nits"]:
+            servicio.clasificar_proveedor_automatico(nit, forzar_reclasificacion=True)
+        esperado = _snapshot(db, escenario["nits"])
+
+        _limpiar_clasificacion(db, escenario["nits"])
+        resultado = servicio.reclasificar_lote(nits=escenario["nits"])
+
+        assert _snapshot(db, escenario["nits"]) == esperado
+        assert resultado["total_procesados"] == len(escenario["nits"])
+        assert resultado["escritos"] == len(escenario["nits"])
+        assert set(resultado["tiempos"]) == {"consulta", "clasificacion", "escritura", "total"}
+
+        # Los patrones cubren todos los tipos y la OC por monto alto
+        por_nit = {a.nit: a for a in _asignaciones(db, escenario["nits"])}
+        tipos = {p: por_nit[prov.nit].tipo_servicio_proveedor for p, prov in escenario["proveedores"].items()}
+        assert tipos == {
+            "fijo": "servicio_fijo_mensual",
+            "variable": "servicio_variable_predecible",
+            "consumo": "servicio_por_consumo",
+            "monto_alto": "servicio_fijo_mensual",
+            "pocas": "servicio_eventual",
+            "antiguas": "servicio_eventual",
+        }
+        assert por_nit[escenario["proveedores"]["monto_alto"].nit].requiere_orden_compra_obligatoria is True
+        assert por_nit[escenario["proveedores"]["fijo"].nit].requiere_orden_compra_obligatoria is False
+        assert por_nit[escenario["proveedores"]["fijo"].nit].metadata_riesgos["meses_con_facturas"] >= 6
+
+    def test_solo_cambios(self, db: Session, escenario):
+        """TEST 2: la segunda ejecución no escribe ni reporta cambios."""
+        servicio = ClasificacionProveedoresService(db)
+        primera = servicio.reclasificar_lote(nits=escenario["nits"])
+        assert primera["actualizados"] == len(escenario["nits"])
+
+        segunda = servicio.reclasificar_todos_periodicamente()
+        assert segunda["total_procesados"] >= len(escenario["nits"])
+        assert not [c for c in segunda["cambios"] if c["nit"] in escenario["nits"]]
+        assert servicio.reclasificar_lote(nits=escenario["nits"])["escritos"] == 0
+
+    def test_simulacion_no_escribe(self, db: Session, escenario):
+        """TEST 3: simular=True reporta cambios sin escribir."""
+        resultado = ClasificacionProveedoresService(db).reclasificar_lote(nits=escenario["nits"], simular=True)
+
+        assert resultado["simulado"] is True
+        assert resultado["actualizados"] == len(escenario["nits"])
+        assert resultado["escritos"] == 0
+        assert all(a.tipo_servicio_proveedor is None for a in _asignaciones(db, escenario["nits"]))
+
+    def test_todas_las_asignaciones_del_nit(self, db: Session, escenario):
+        """TEST 4: un NIT con dos responsables queda clasificado en ambas asignaciones."""
+        nit = escenario["proveedores"]["fijo"].nit
+        db.add(AsignacionNitResponsable(nit=nit, responsable_id=escenario["responsable"].id, activo=True))
+        db.commit()
+
+        ClasificacionProveedoresService(db).reclasificar_lote(nits=[nit])
+
+        asignaciones = _asignaciones(db, [nit])
+        assert len(asignaciones) == 2
+        assert {a.tipo_servicio_proveedor for a in asignaciones} == {"servicio_fijo_mensual"}
+        assert len({a.coeficiente_variacion_historico for a in asignaciones}) == 1
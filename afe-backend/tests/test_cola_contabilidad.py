@@ -0,0 +1,112 @@
+"""
+Test Suite: Cola de revisión de Contabilidad (keyset + agregados)
+
+1. Rango del mes (incluye diciembre → enero)
+2. Paginación keyset recorre la cola sin repetir ni omitir (empates de creado_en)
+3. Estadísticas agregadas sobre toda la cola, no solo la página
+4. Cursor inválido → ValueError
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.services.cola_contabilidad import ColaContabilidadService, rango_mes
+
+
+@pytest.fixture
+def facturas_cola(db: Session):
+    """5 facturas aprobadas del mes (dos con el mismo creado_en) + 2 fuera de la cola."""
+    proveedor = Proveedor(nit="999991234-5", razon_social="Proveedor Cola Contabilidad Test")
+    db.add(proveedor)
+    db.flush()
+
+    desde, _ = rango_mes()
+    base = desde + timedelta(hours=1)
+    creados = [base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+               base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    facturas = []
+    for i, creado in enumerate(creados):
+        factura = Factura(
+            numero_factura=f"TEST-COLA-{i}", cufe=f"CUFE-TEST-COLA-{i}",
+            fecha_emision=date.today(), proveedor_id=proveedor.id,
+            total_a_pagar=Decimal("1000.00") * (i + 1),
+            estado=EstadoFactura.aprobada_auto if i % 2 else EstadoFactura.aprobada,
+            creado_en=creado
+        )
+        db.add(factura)
+        facturas.append(factura)
+
+    # Fuera de la cola: en revisión y aprobada del mes anterior
+    db.add(Factura(
+        numero_factura="TEST-COLA-REV", cufe="CUFE-TEST-COLA-REV", fecha_emision=date.today(),
+        proveedor_id=proveedor.id, total_a_pagar=Decimal("999"), estado=EstadoFactura.en_revision,
+        creado_en=base
+    ))
+    db.add(Factura(
+        numero_factura="TEST-COLA-ANT", cufe="CUFE-TEST-COLA-ANT", fecha_emision=date.today(),
+        proveedor_id=proveedor.id, total_a_pagar=Decimal("999"), estado=EstadoFactura.aprobada,
+        creado_en=desde - timedelta(seconds=1)
+    ))
+    db.flush()
+    return facturas
+
+
+class TestColaContabilidad:
+    """Tests de ColaContabilidadService."""
+
+    def test_rango_mes(self):
+        """TEST 1: [inicio, inicio del mes siguiente)."""
+        assert rango_mes(datetime(2026, 10, 18, 15, 30)) == (datetime(2026, 10, 1), datetime(2026, 11, 1))
+        assert rango_mes(datetime(2026, 12, 31, 23, 59)) == (datetime(2026, 12, 1), datetime(2027, 1, 1))
+
+    def test_keyset_recorre_sin_repetir(self, db: Session, facturas_cola):
+        """TEST 2: páginas de 2 → todas las facturas una vez, en orden (creado_en, id) DESC."""
+        cola = ColaContabilidadService(db)
+        vistas, cursor = [], None
+        while True:
+            pagina = cola.obtener_pagina(limit=2, cursor=cursor)
+            assert len(pagina.facturas) <= 2
+            vistas.extend(pagina.facturas)
+            if not pagina.has_more:
+                break
+            cursor = pagina.next_cursor
+
+        ids = [f.id for f in vistas]
+        assert len(ids) == len(set(ids))
+        claves = [(f.creado_en, f.id) for f in vistas]
+        assert claves == sorted(claves, reverse=True)
+
+        propias = [f for f in vistas if f.numero_factura.startswith("TEST-COLA-")]
+        esperadas = sorted(facturas_cola, key=lambda f: (f.creado_en, f.id), reverse=True)
+        assert [f.id for f in propias] == [f.id for f in esperadas]
+
+    def test_estadisticas_de_toda_la_cola(self, db: Session):
+        """TEST 3: total y monto incluyen facturas fuera de la primera página."""
+        antes = ColaContabilidadService(db).estadisticas()
+        proveedor = Proveedor(nit="999991235-3", razon_social="Proveedor Cola Estadisticas Test")
+        db.add(proveedor)
+        db.flush()
+        for i in range(3):
+            db.add(Factura(
+                numero_factura=f"TEST-COLA-EST-{i}", cufe=f"CUFE-TEST-COLA-EST-{i}",
+                fecha_emision=date.today(), proveedor_id=proveedor.id,
+                total_a_pagar=Decimal("250.50"), estado=EstadoFactura.aprobada,
+                creado_en=rango_mes()[0] + timedelta(hours=2)
+            ))
+        db.flush()
+
+        cola = ColaContabilidadService(db)
+        cola.obtener_pagina(limit=1)
+        despues = cola.estadisticas()
+        assert despues["total_pendiente"] == antes["total_pendiente"] + 3
+        assert despues["monto_pendiente"] == pytest.approx(antes["monto_pendiente"] + 751.50)
+
+    def test_cursor_invalido(self, db: Session):
+        """TEST 4: cursor corrupto → ValueError (el router responde 400)."""
+        with pytest.raises(ValueError):
+            ColaContabilidadService(db).obtener_pagina(limit=10, cursor="no-es-un-cursor")
@@ -0,0 +1,203 @@
+"""
+Test Suite: Resumen y liberación de cuarentena por conjuntos
+
+Verifica CuarentenaService:
+
+1. Resumen agregado en SQL: totales, impacto, problemas por motivo (incluye
+   facturas sin motivo como SIN_CLASIFICAR) y subproblemas por grupo
+2. incluir_ids=False omite los IDs (modo dashboard) con los mismos conteos
+3. WorkflowAutomaticoService guarda motivo_cuarentena al poner en cuarentena
+4. Liberación masiva: estado, responsable, accion_por, workflows por
+   responsable y marca de liberación en el workflow de cuarentena
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.grupo import Grupo, ResponsableGrupo
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+from app.services.cuarentena_service import CuarentenaService
+from app.services.workflow_automatico import WorkflowAutomaticoService
+
+
+def _grupo(codigo: str) -> Grupo:
+    return Grupo(
+        nombre=f"GRUPO {codigo}", codigo_corto=codigo, nivel=1, ruta_jerarquica="",
+        correos_corporativos=[], activo=True, eliminado=False, creado_por="system_test"
+    )
+
+
+@pytest.fixture
+def escenario(db: Session):
+    """Dos grupos sin responsables con facturas en cuarentena (commit real)."""
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+    responsables = [
+        Usuario(usuario=f"test_cuarentena_{i}", nombre=f"Cuarentena Test {i}",
+                email=f"test_cuarentena_{i}@test.com", role_id=rol.id, area=f"Area {i}")
+        for i in range(2)
+    ]
+    grupo_a, grupo_b = _grupo("TEST_CUAR_A"), _grupo("TEST_CUAR_B")
+    proveedor = Proveedor(nit="999996611-3", razon_social="Proveedor Cuarentena Test")
+    db.add_all(responsables + [grupo_a, grupo_b, proveedor])
+    db.flush()
+
+    datos = [
+        (grupo_a, "1000.50", "GRUPO_SIN_RESPONSABLES"),
+        (grupo_a, "2000.00", "GRUPO_SIN_RESPONSABLES"),
+        (grupo_a, "500.00", "GRUPO_SIN_RESPONSABLES"),
+        (grupo_b, "9000.00", "GRUPO_SIN_RESPONSABLES"),
+        (grupo_b, "300.00", None),
+    ]
+    facturas = []
+    for i, (grupo, total, motivo) in enumerate(datos):
+        facturas.append(Factura(
+            numero_factura=f"TEST-CUAR-{i}", cufe=f"CUFE-TEST-CUAR-{i}", fecha_emision=date(2026, 9, 1),
+            proveedor_id=proveedor.id, grupo_id=grupo.id, total_a_pagar=Decimal(total),
+            estado=EstadoFactura.en_cuarentena, motivo_cuarentena=motivo
+        ))
+    db.add_all(facturas)
+    db.flush()
+    db.add_all([
+        WorkflowAprobacionFactura(
+            factura_id=f.id, nit_proveedor=proveedor.nit, creado_por="SISTEMA_AUTO",
+            metadata_workflow={"tipo_error": "GRUPO_SIN_RESPONSABLES", "grupo_id": f.grupo_id}
+        )
+        for f in facturas
+    ])
+    db.commit()
+
+    yield {"grupos": (grupo_a, grupo_b), "facturas": facturas, "responsables": responsables,
+           "proveedor": proveedor}
+
+    db.rollback()
+    ids = [f.id for f in facturas]
+    db.query(WorkflowAprobacionFactura).filter(
+        WorkflowAprobacionFactura.factura_id.in_(ids)
+    ).delete(synchronize_session=False)
+    db.query(Factura).filter(Factura.id.in_(ids)).delete(synchronize_session=False)
+    db.query(ResponsableGrupo).filter(
+        ResponsableGrupo.grupo_id.in_([grupo_a.id, grupo_b.id])
+    ).delete(synchronize_session=False)
+    db.query(Grupo).filter(Grupo.id.in_([grupo_a.id, grupo_b.id])).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.id.in_([u.id for u in responsables])).delete(synchronize_session=False)
+    db.commit()
+
+
+class TestResumenCuarentena:
+    """Resumen como agregado SQL sobre motivo_cuarentena."""
+
+    def test_resumen_agregado(self, db: Session, escenario):
+        """TEST 1: totales, problemas por motivo y subproblemas por grupo."""
+        grupo_a, grupo_b = escenario["grupos"]
+        ids = [f.id for f in escenario["facturas"]]
+
+        resumen = CuarentenaService(db).obtener_resumen_cuarentena()
+
+        assert resumen["total"] == 5
+        assert resumen["impacto_financiero"] == 12800.5
+        critico, sin_clasificar = resumen["problemas"]
+        assert (critico["tipo_error"], critico["severidad"], critico["total_facturas"]) == \
+            ("GRUPO_SIN_RESPONSABLES", "CRITICA", 4)
+        assert critico["facturas_ids"] == ids[:4]
+        assert (sin_clasificar["tipo_error"], sin_clasificar["facturas_ids"]) == ("SIN_CLASIFICAR", [ids[4]])
+
+        # Subproblemas ordenados por impacto: grupo B (9000) antes que A (3500.50)
+        sub_b, sub_a = critico["subproblemas"]
+        assert (sub_b["grupo_id"], sub_b["total_facturas"], sub_b["impacto_financiero"]) == (grupo_b.id, 1, 9000.0)
+        assert (sub_a["grupo_id"], sub_a["total_facturas"], sub_a["impacto_financiero"]) == (grupo_a.id, 3, 3500.5)
+        assert sub_a["codigo_grupo"] == "TEST_CUAR_A"
+        assert sub_a["facturas_ids"] == ids[:3]
+        assert critico["accion_dirigida"]["url"] == f"/admin/grupos/{grupo_b.id}/responsables"
+        assert [a["tipo_accion"] for a in resumen["acciones_recomendadas"]] == \
+            ["ASIGNAR_RESPONSABLES", "ASIGNAR_RESPONSABLES", "REVISION_MANUAL"]
+
+        filtradas = CuarentenaService(db).obtener_facturas_cuarentena(tipo_error="SIN_CLASIFICAR")
+        assert [f.id for f in filtradas] == [ids[4]]
+
+    def test_resumen_sin_ids(self, db: Session, escenario):
+        """TEST 2: modo dashboard sin IDs, mismos conteos."""
+        servicio = CuarentenaService(db)
+        completo = servicio.obtener_resumen_cuarentena()
+        liviano = servicio.obtener_resumen_cuarentena(incluir_ids=False)
+
+        assert liviano["total"] == completo["total"]
+        assert liviano["impacto_financiero"] == completo["impacto_financiero"]
+        for problema in liviano["problemas"]:
+            assert "facturas_ids" not in problema
+            assert all("facturas_ids" not in sub for sub in problema["subproblemas"])
+
+    def test_motivo_al_entrar_en_cuarentena(self, db: Session, escenario):
+        """TEST 3: el procesamiento por lotes fija motivo_cuarentena."""
+        grupo_a, _ = escenario["grupos"]
+        factura = Factura(
+            numero_factura="TEST-CUAR-NUEVA", cufe="CUFE-TEST-CUAR-NUEVA", fecha_emision=date(2026, 9, 2),
+            proveedor_id=escenario["proveedor"].id, grupo_id=grupo_a.id,
+            total_a_pagar=Decimal("100"), estado=EstadoFactura.en_revision
+        )
+        db.add(factura)
+        db.commit()
+        escenario["facturas"].append(factura)
+
+        resultado = WorkflowAutomaticoService(db).procesar_facturas_nuevas_lote(
+            [factura.id], analizar=False, notificar=False
+        )
+
+        assert resultado["en_cuarentena"] == 1
+        db.expire_all()
+        factura = db.get(Factura, factura.id)
+        assert factura.estado == EstadoFactura.en_cuarentena
+        assert factura.motivo_cuarentena == "GRUPO_SIN_RESPONSABLES"
+
+
+class TestLiberacionCuarentena:
+    """Liberación de un grupo con UPDATE masivo e INSERT por lotes."""
+
+    def test_liberacion_masiva(self, db: Session, escenario):
+        """TEST 4: 3 facturas × 2 responsables → 6 workflows, lotes de 2."""
+        grupo_a, _ = escenario["grupos"]
+        responsables = escenario["responsables"]
+        servicio = CuarentenaService(db)
+        assert servicio.liberar_facturas_grupo(grupo_a.id)["exito"] is False
+
+        db.add_all([ResponsableGrupo(grupo_id=grupo_a.id, responsable_id=u.id, activo=True)
+                    for u in responsables])
+        db.commit()
+
+        resultado = servicio.liberar_facturas_grupo(grupo_a.id, tamano_lote=2)
+
+        ids = [f.id for f in escenario["facturas"][:3]]
+        assert resultado["facturas_ids"] == ids
+        assert resultado["workflows_creados"] == 6
+
+        for factura in db.query(Factura).filter(Factura.id.in_(ids)):
+            assert factura.estado == EstadoFactura.en_revision
+            assert factura.responsable_id == responsables[0].id
+            assert factura.accion_por is None
+
+        workflows = db.query(WorkflowAprobacionFactura).filter(
+            WorkflowAprobacionFactura.factura_id.in_(ids)
+        ).all()
+        nuevos = [w for w in workflows if w.creado_por == "SISTEMA_AUTO_LIBERACION_CUARENTENA"]
+        anteriores = [w for w in workflows if w.creado_por == "SISTEMA_AUTO"]
+        assert {(w.factura_id, w.responsable_id) for w in nuevos} == {
+            (i, u.id) for i in ids for u in responsables
+        }
+        assert {w.area_responsable for w in nuevos} == {"Area 0", "Area 1"}
+        assert all(w.metadata_workflow["liberada_de_cuarentena"] for w in anteriores)
+        assert all(w.metadata_workflow["tipo_error"] == "GRUPO_SIN_RESPONSABLES" for w in anteriores)
+
+        resumen = servicio.obtener_resumen_cuarentena()
+        assert resumen["total"] == 2
+        assert servicio.liberar_facturas_grupo(grupo_a.id)["facturas_liberadas"] == 0
@@ -0,0 +1,251 @@
+"""
+Test Suite: Motor vectorizado de estadísticas de recurrencia
+
+Verifica que PatternDetector y AnalizadorPatronesService, ahora apoyados en
+app.services.automation.estadisticas_recurrencia (NumPy), producen los mismos
+resultados que la implementación anterior basada en `statistics`.
+
+Casos de prueba:
+1. Estadísticas por grupo == statistics.mean / stdev / min / max
+2. Intervalos y periodos distintos por grupo
+3. PatternDetector: analizar_patron_recurrencia == implementación anterior
+4. PatternDetector: analizar_patrones_lote == llamadas individuales
+5. AnalizadorPatronesService: patrones calculados == implementación anterior
+"""
+
+import random
+import statistics
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.models.patrones_facturas import TipoPatron
+from app.services.analisis_patrones_service import AnalizadorPatronesService
+from app.services.automation.estadisticas_recurrencia import (
+    clasificar_por_rangos,
+    estadisticas_por_grupo,
+    intervalos_por_grupo,
+    periodos_distintos_por_grupo,
+)
+from app.services.automation.pattern_detector import PatternDetector
+
+
+# ==================== DATOS DE PRUEBA ====================
+
+def _factura(id_, fecha, monto):
+    return SimpleNamespace(id=id_, fecha_emision=fecha, total_a_pagar=monto)
+
+
+def _serie(rng, id_inicial, n, intervalo, ruido_dias, monto_base, ruido_monto):
+    """Serie de facturas con intervalo y monto aproximadamente regulares."""
+    fecha = date(2024, 1, 5)
+    facturas = []
+    for i in range(n):
+        monto = Decimal(str(round(monto_base * (1 + rng.uniform(-ruido_monto, ruido_monto)), 2)))
+        facturas.append(_factura(id_inicial + i, fecha, monto))
+        fecha += timedelta(days=intervalo + rng.randint(-ruido_dias, ruido_dias))
+    return facturas
+
+
+@pytest.fixture
+def casos_detector():
+    """Casos (factura_nueva, historicas) con patrones variados."""
+    rng = random.Random(42)
+    casos = []
+    for c in range(60):
+        intervalo = rng.choice([7, 15, 30, 30, 30, 61, 90, 45])
+        serie = _serie(
+            rng, c * 100, rng.randint(1, 12), intervalo,
+            rng.choice([0, 1, 2, 6]), rng.choice([150000, 2500000, 99999.99]),
+            rng.choice([0.0, 0.02, 0.1, 0.4])
+        )
+        casos.append((serie[-1], serie[:-1]))
+    return casos
+
+
+# ==================== IMPLEMENTACIÓN ANTERIOR (REFERENCIA) ====================
+
+def _clasificar_anterior(detector, promedio_dias):
+    umbrales = detector.umbrales
+    if umbrales['dias_semanal_min'] <= promedio_dias <= umbrales['dias_semanal_max']:
+        return 'semanal'
+    elif umbrales['dias_quincenal_min'] <= promedio_dias <= umbrales['dias_quincenal_max']:
+        return 'quincenal'
+    elif umbrales['dias_mensual_min'] <= promedio_dias <= umbrales['dias_mensual_max']:
+        return 'mensual'
+    elif 60 <= promedio_dias <= 95:
+        return 'bimestral'
+    elif 85 <= promedio_dias <= 105:
+        return 'trimestral'
+    return 'irregular'
+
+
+def _temporal_anterior(detector, historicas, nueva):
+    fechas = sorted([f.fecha_emision for f in historicas] + [nueva.fecha_emision])
+    diferencias = [(fechas[i] - fechas[i - 1]).days for i in range(1, len(fechas))]
+    promedio = statistics.mean(diferencias)
+    desviacion = statistics.stdev(diferencias) if len(diferencias) > 1 else 0.0
+    consistente = desviacion <= detector.umbrales['desviacion_max_consistente']
+    return (
+        _clasificar_anterior(detector, promedio), promedio, desviacion, consistente,
+        detector._calcular_confianza_temporal(promedio, desviacion, len(diferencias), consistente)
+    )
+
+
+def _montos_anterior(detector, historicas, nueva):
+    montos = [f.total_a_pagar for f in historicas if f.total_a_pagar]
+    promedio = sum(montos) / len(montos)
+    variacion = max(
+        abs(float(m - promedio)) / float(promedio) * 100
+        for m in montos + [nueva.total_a_pagar or Decimal('0')]
+    )
+    estable = variacion <= detector.umbrales['variacion_monto_max_estable']
+    return promedio, variacion, estable, detector._calcular_confianza_monto(variacion, len(montos), estable)
+
+
+def _frecuencia_anterior(fechas):
+    fechas = sorted(fechas)
+    promedio = statistics.mean([(fechas[i + 1] - fechas[i]).days for i in range(len(fechas) - 1)])
+    for limite, frecuencia in ((10, "semanal"), (20, "quincenal"), (35, "mensual"),
+                               (65, "bimestral"), (100, "trimestral"), (200, "semestral")):
+        if promedio <= limite:
+            return frecuencia
+    return "anual"
+
+
+# ==================== TESTS ====================
+
+class TestMotorEstadisticas:
+    """Tests de las funciones columnares."""
+
+    def test_estadisticas_por_grupo_igual_a_statistics(self):
+        """TEST 1: media, desviación, mínimo y máximo por grupo."""
+        rng = random.Random(7)
+        valores_por_grupo = [[rng.uniform(1, 1e6) for _ in range(rng.randint(1, 30))] for _ in range(50)]
+        grupos = np.concatenate([[g] * len(v) for g, v in enumerate(valores_por_grupo)])
+        valores = np.concatenate(valores_por_grupo)
+
+        est = estadisticas_por_grupo(grupos, valores, len(valores_por_grupo))
+
+        for g, v in enumerate(valores_por_grupo):
+            assert est.n[g] == len(v)
+            assert est.media[g] == pytest.approx(statistics.mean(v), rel=1e-12)
+            esperado = statistics.stdev(v) if len(v) > 1 else 0.0
+            assert est.desviacion[g] == pytest.approx(esperado, rel=1e-9, abs=1e-9)
+            assert est.minimo[g] == min(v)
+            assert est.maximo[g] == max(v)
+
+    def test_intervalos_y_periodos(self):
+        """TEST 2: intervalos entre fechas (sin ordenar) y meses distintos."""
+        fechas = [date(2024, 3, 1), date(2024, 1, 1), date(2024, 2, 1), date(2024, 5, 20)]
+        grupos = np.array([0, 0, 0, 1])
+        dias = np.array([f.toordinal() for f in fechas])
+        periodos = np.array([f.year * 12 + f.month for f in fechas])
+
+        intervalos = intervalos_por_grupo(grupos, dias, 2)
+        assert intervalos.n.tolist() == [2, 0]
+        assert intervalos.media[0] == statistics.mean([31, 29])
+        assert periodos_distintos_por_grupo(grupos, periodos, 2).tolist() == [3, 1]
+
+        etiquetas = clasificar_por_rangos(np.array([7.0, 30.0, 400.0]), [(6, 9, 'semanal'), (26, 35, 'mensual')], 'irregular')
+        assert etiquetas.tolist() == ['semanal', 'mensual', 'irregular']
+
+
+class TestPatternDetectorVectorizado:
+    """Equivalencia de PatternDetector con la implementación anterior."""
+
+    def test_resultado_igual_a_implementacion_anterior(self, casos_detector):
+        """TEST 3: mismos patrones temporal y de monto, caso por caso."""
+        detector = PatternDetector()
+
+        for nueva, historicas in casos_detector:
+            resultado = detector.analizar_patron_recurrencia(nueva, historicas)
+            if len(historicas) < detector.umbrales['min_facturas_patron']:
+                assert resultado.patron_temporal.tipo == "insuficiente"
+                continue
+
+            tipo, promedio, desviacion, consistente, confianza_t = _temporal_anterior(detector, historicas, nueva)
+            pt = resultado.patron_temporal
+            assert pt.tipo == tipo
+            assert pt.promedio_dias == pytest.approx(promedio)
+            assert pt.desviacion_estandar == pytest.approx(desviacion)
+            assert pt.consistente == consistente
+            assert pt.confianza == pytest.approx(confianza_t)
+
+            monto_promedio, variacion, estable, confianza_m = _montos_anterior(detector, historicas, nueva)
+            pm = resultado.patron_monto
+            assert pm.monto_promedio == monto_promedio
+            assert pm.variacion_porcentaje == pytest.approx(variacion)
+            assert pm.estable == estable
+            assert pm.confianza == pytest.approx(confianza_m)
+
+    def test_lote_igual_a_individual(self, casos_detector):
+        """TEST 4: analizar_patrones_lote == analizar_patron_recurrencia por caso."""
+        detector = PatternDetector()
+
+        lote = detector.analizar_patrones_lote(casos_detector)
+
+        assert len(lote) == len(casos_detector)
+        for (nueva, historicas), resultado in zip(casos_detector, lote):
+            assert resultado == detector.analizar_patron_recurrencia(nueva, historicas)
+
+
+class TestAnalizadorPatronesVectorizado:
+    """Equivalencia de AnalizadorPatronesService._calcular_estadisticas_grupos."""
+
+    def _patron_anterior(self, service, facturas):
+        montos = [float(f.total_a_pagar) for f in facturas]
+        fechas = [f.fecha_emision for f in facturas]
+        meses = len(set((f.year, f.month) for f in fechas))
+        if len(montos) < service.MIN_FACTURAS_PATRON or meses < service.MIN_MESES_DIFERENTES:
+            return None
+        promedio = Decimal(str(statistics.mean(montos)))
+        desviacion = Decimal(str(statistics.stdev(montos)))
+        cv = desviacion / promedio * 100
+        return {
+            'monto_promedio': promedio,
+            'desviacion_estandar': desviacion,
+            'coeficiente_variacion': cv,
+            'monto_minimo': Decimal(str(min(montos))),
+            'monto_maximo': Decimal(str(max(montos))),
+            'meses_con_pagos': meses,
+            'tipo_patron': (
+                TipoPatron.TIPO_A if cv < service.UMBRAL_TIPO_A
+                else TipoPatron.TIPO_B if cv < service.UMBRAL_TIPO_B
+                else TipoPatron.TIPO_C
+            ),
+        }
+
+    def test_patrones_iguales_a_implementacion_anterior(self):
+        """TEST 5: mismas métricas y clasificación para todos los grupos."""
+        rng = random.Random(3)
+        service = AnalizadorPatronesService(db=None)
+        grupos = {}
+        for g in range(80):
+            serie = _serie(
+                rng, g * 100, rng.randint(1, 14), rng.choice([7, 15, 30, 60, 95, 180, 400]),
+                rng.choice([0, 2]), rng.choice([80000, 1200000]), rng.choice([0.0, 0.03, 0.2, 0.6])
+            )
+            grupos[f"{g % 20}|concepto {g}"] = serie
+
+        patrones = service._calcular_estadisticas_grupos(grupos, ventana_meses=12)
+        por_clave = {f"{p['proveedor_id']}|{p['concepto_normalizado']}": p for p in patrones}
+
+        for key, facturas in grupos.items():
+            esperado = self._patron_anterior(service, facturas)
+            if esperado is None:
+                assert key not in por_clave
+                continue
+
+            patron = por_clave[key]
+            # Promedio, desviación y CV se guardan redondeados a 2 decimales
+            for campo in ('monto_promedio', 'desviacion_estandar', 'coeficiente_variacion'):
+                assert float(patron[campo]) == pytest.approx(float(esperado[campo]), abs=0.0051)
+            for campo in ('monto_minimo', 'monto_maximo'):
+                assert float(patron[campo]) == pytest.approx(float(esperado[campo]), rel=1e-9, abs=1e-6)
+            assert patron['meses_con_pagos'] == esperado['meses_con_pagos']
+            assert patron['tipo_patron'] == esperado['tipo_patron']
+            assert patron['frecuencia_detectada'] == _frecuencia_anterior([f.fecha_emision for f in facturas])
@@ -0,0 +1,120 @@
+"""
+Test Suite: Proveedor compartido de tokens de Microsoft Graph
+
+Verifica app.services.graph_token_provider (sin red ni BD):
+
+1. Un proveedor por credenciales: varios MicrosoftGraphEmailService (y
+   reinitialize) piden un solo token
+2. Renovación anticipada dentro del margen; si falla, se usa el token vigente
+3. Single-flight: hilos concurrentes generan una sola petición
+4. Caché en archivo: un token escrito por otro proceso (p.ej. el
+   invoice_extractor, mismo formato) se reutiliza sin pedir otro
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+import pytest
+
+from app.services import graph_token_provider as modulo
+from app.services.graph_token_provider import GRAPH_SCOPE, GraphTokenProvider, get_graph_token_provider
+from app.services.microsoft_graph_email_service import get_graph_email_service
+
+
+class _TokenServer:
+    """Endpoint de tokens simulado: token-N, con demora opcional."""
+
+    def __init__(self, expires_in=3600, demora=0.0):
+        self.expires_in = expires_in
+        self.demora = demora
+        self.emitidos = 0
+        self.falla = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.demora:
+            time.sleep(self.demora)
+        if self.falla:
+            raise ConnectionError("login.microsoftonline.com no disponible")
+        with self._lock:
+            self.emitidos += 1
+            return {"access_token": f"token-{self.emitidos}", "expires_in": self.expires_in}
+
+
+def _proveedor(monkeypatch, servidor, **kwargs):
+    proveedor = GraphTokenProvider("tenant", "client", "secret", **kwargs)
+    monkeypatch.setattr(proveedor, "_solicitar_token", servidor)
+    return proveedor
+
+
+class TestGraphTokenProvider:
+    """Token compartido, renovado anticipadamente y sin peticiones duplicadas."""
+
+    def test_un_proveedor_por_credenciales(self, monkeypatch):
+        """TEST 1: dos servicios de email con las mismas credenciales comparten token."""
+        monkeypatch.setattr(modulo, "_proveedores", {})
+        servidor = _TokenServer()
+        proveedor = get_graph_token_provider("t-test", "c-test", "s-test")
+        monkeypatch.setattr(proveedor, "_solicitar_token", servidor)
+
+        servicios = [
+            get_graph_email_service("t-test", "c-test", "s-test", "afe@test.com", "AFE")
+            for _ in range(3)
+        ]
+        assert {s._get_token() for s in servicios} == {"token-1"}
+        assert servidor.emitidos == 1
+        assert get_graph_token_provider("t-test", "c-test", "s-rotado") is not proveedor
+
+    def test_renovacion_anticipada(self, monkeypatch):
+        """TEST 2: renueva con < margen restante; conserva el vigente si falla."""
+        servidor = _TokenServer()
+        proveedor = _proveedor(monkeypatch, servidor, margen_refresco=300)
+        assert proveedor.get_token() == "token-1"
+
+        proveedor._expira_en = time.time() + 200
+        assert proveedor.get_token() == "token-2"
+
+        proveedor._expira_en = time.time() + 200
+        servidor.falla = True
+        assert proveedor.get_token() == "token-2"
+
+        proveedor._expira_en = time.time() - 1
+        with pytest.raises(ConnectionError):
+            proveedor.get_token()
+
+    def test_single_flight(self, monkeypatch):
+        """TEST 3: 8 hilos sin token → 1 petición."""
+        servidor = _TokenServer(demora=0.2)
+        proveedor = _proveedor(monkeypatch, servidor)
+
+        tokens = []
+        hilos = [threading.Thread(target=lambda: tokens.append(proveedor.get_token())) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert tokens == ["token-1"] * 8
+        assert servidor.emitidos == 1
+
+    def test_cache_en_archivo_compartida(self, monkeypatch, tmp_path):
+        """TEST 4: token escrito por otro proceso (formato del extractor) se reutiliza."""
+        llave = hashlib.sha256(f"tenant|client|{GRAPH_SCOPE}".encode("utf-8")).hexdigest()[:32]
+        (tmp_path / f"{llave}.json").write_text(
+            json.dumps({"access_token": "token-extractor", "expires_at": time.time() + 3000}),
+            encoding="utf-8"
+        )
+        servidor = _TokenServer()
+        proveedor = _proveedor(monkeypatch, servidor, cache_dir=str(tmp_path))
+        assert proveedor.get_token() == "token-extractor"
+        assert servidor.emitidos == 0
+
+        # Un 401 descarta el token compartido; el siguiente proceso renueva y lo guarda
+        proveedor.invalidar()
+        otro = _proveedor(monkeypatch, servidor, cache_dir=str(tmp_path))
+        assert otro.get_token() == "token-1"
+        assert proveedor.get_token() == "token-1"
+        assert servidor.emitidos == 1
+        assert json.loads((tmp_path / f"{llave}.json").read_text())["access_token"] == "token-1"
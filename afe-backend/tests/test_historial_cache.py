@@ -0,0 +1,121 @@
+"""
+Test Suite: Caché de historial por proveedor (automatización)
+
+Verifica que HistorialProveedorCache devuelve el mismo historial que las
+consultas directas de app.crud.factura usadas por AutomationService.
+
+Casos de prueba:
+1. Historial desde caché == historial desde consultas, factura por factura
+2. La caché carga todos los proveedores del lote con una sola consulta
+3. Una factura aprobada durante el ciclo pasa a ser "mes anterior"
+
+
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+from app.models.factura import Factura, EstadoFactura
+from app.models.proveedor import Proveedor
+from app.services.automation.automation_service import AutomationService
+from app.services.automation.historial_cache import HistorialProveedorCache
+from datetime import date
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+
+
+@pytest.fixture
+def proveedor_historial(db: Session):
+    """Proveedor con un año de facturas mensuales y dos pendientes."""
+    proveedor = Proveedor(nit="TEST-HIST-900", razon_social="Proveedor Historial Test")
+    db.add(proveedor)
+    db.flush()
+
+    base = date.today().replace(day=10)
+    for i in range(1, 13):
+        db.add(Factura(
+            numero_factura=f"TEST-HIST-{i}",
+            cufe=f"CUFE-TEST-HIST-{i}",
+            fecha_emision=base - relativedelta(months=i),
+            proveedor_id=proveedor.id,
+            total_a_pagar=Decimal("1000000.00"),
+            estado=EstadoFactura.aprobada if i % 3 else EstadoFactura.rechazada,
+            concepto_normalizado="arriendo oficina",
+            concepto_hash="a" * 32 if i % 2 else "b" * 32,
+            orden_compra_numero="OC-TEST-1" if i % 4 == 0 else None
+        ))
+
+    for i in range(2):
+        db.add(Factura(
+            numero_factura=f"TEST-HIST-PEND-{i}",
+            cufe=f"CUFE-TEST-HIST-PEND-{i}",
+            fecha_emision=base + relativedelta(months=i),
+            proveedor_id=proveedor.id,
+            total_a_pagar=Decimal("1000000.00"),
+            estado=EstadoFactura.en_revision,
+            concepto_normalizado="arriendo oficina",
+            concepto_hash="a" * 32,
+            orden_compra_numero="OC-TEST-1"
+        ))
+    db.commit()
+
+    yield proveedor
+
+    db.rollback()
+    db.query(Factura).filter(Factura.proveedor_id == proveedor.id).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _pendientes(db: Session, proveedor: Proveedor):
+    return db.query(Factura).filter(
+        Factura.proveedor_id == proveedor.id,
+        Factura.estado == EstadoFactura.en_revision
+    ).order_by(Factura.fecha_emision).all()
+
+
+class TestHistorialProveedorCache:
+    """Tests de equivalencia entre caché y consultas directas."""
+
+    def test_historial_cache_igual_a_consultas(self, db: Session, proveedor_historial: Proveedor):
+        """TEST 1: Mismas facturas, en el mismo orden, con y sin caché."""
+        service = AutomationService()
+        pendientes = _pendientes(db, proveedor_historial)
+
+        cache = HistorialProveedorCache(db)
+        cache.precargar(pendientes)
+
+        for factura in pendientes:
+            directo = [f.id for f in service._buscar_facturas_historicas(db, factura)]
+            desde_cache = [f.id for f in service._buscar_facturas_historicas(db, factura, cache)]
+            assert desde_cache == directo
+
+    def test_una_consulta_por_lote(self, db: Session, proveedor_historial: Proveedor):
+        """TEST 2: Las búsquedas no generan consultas adicionales."""
+        service = AutomationService()
+        pendientes = _pendientes(db, proveedor_historial)
+
+        cache = HistorialProveedorCache(db)
+        cache.precargar(pendientes)
+        for factura in pendientes:
+            service._buscar_facturas_historicas(db, factura, cache)
+
+        assert cache.consultas == 1
+
+    def test_actualizar_refleja_aprobacion(self, db: Session, proveedor_historial: Proveedor):
+        """TEST 3: Aprobar la primera pendiente la vuelve mes anterior de la segunda."""
+        primera, segunda = _pendientes(db, proveedor_historial)
+
+        cache = HistorialProveedorCache(db)
+        cache.precargar([primera, segunda])
+
+        primera.estado = EstadoFactura.aprobada_auto
+        cache.actualizar(primera)
+
+        mes_anterior = cache.buscar_mes_anterior(
+            proveedor_id=segunda.proveedor_id,
+            fecha_actual=segunda.fecha_emision,
+            concepto_hash=segunda.concepto_hash,
+            numero_factura=segunda.numero_factura
+        )
+        assert mes_anterior is not None
+        assert mes_anterior.id == primera.id
@@ -0,0 +1,128 @@
+"""
+Test Suite: Índice invertido de líneas presupuestales (vinculación automática)
+
+Verifica app.services.indice_vinculacion (sin BD):
+
+1. Equivalencia: la mejor línea con umbral es la misma que el recorrido
+   completo (todas las líneas) en un dataset aleatorio
+2. Pre-filtro: se evalúa solo una fracción de las líneas (llaves + cota)
+3. Proveedor por NIT: el preferido con NIT coincide aunque el nombre no
+4. Comodines: líneas sin llaves comunes que pueden superar el umbral por
+   puntos base se evalúan igual
+"""
+
+import random
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.indice_vinculacion import (
+    MESES,
+    DatosFactura,
+    IndiceLineasPresupuesto,
+    calcular_score,
+)
+
+
+PALABRAS = ["aseo", "vigilancia", "energia", "internet", "software", "cafeteria", "arriendo",
+            "mantenimiento", "papeleria", "transporte", "seguros", "telefonia", "licencias", "nomina"]
+PROVEEDORES = [f"{p} s.a.s" for p in ["alfa ingenieria", "beta seguridad", "gamma redes",
+                                       "delta aseo", "omega energia", "sigma software"]]
+
+
+def _linea(id, **campos):
+    valores = dict(
+        id=id, codigo=f"L{id}", nombre=None, categoria=None, descripcion=None,
+        proveedor_preferido=None, centro_costo=None, año_fiscal=2026,
+    )
+    valores.update({f"presupuesto_{mes}": Decimal("1000000") for mes in MESES})
+    valores.update(campos)
+    return SimpleNamespace(**valores)
+
+
+def _factura(id, **campos):
+    valores = dict(
+        id=id, numero_factura=f"F{id}", proveedor=None, nit=None, concepto=None,
+        total=Decimal("1000000"), fecha_emision=date(2026, 5, 10),
+    )
+    valores.update(campos)
+    return DatosFactura(**valores)
+
+
+def _dataset(semilla=7, lineas=200, facturas=300):
+    rng = random.Random(semilla)
+    todas = [
+        _linea(
+            i,
+            nombre=f"{rng.choice(PALABRAS)} sede {i}",
+            categoria=rng.choice(PALABRAS + [None]),
+            descripcion=rng.choice([None, f"servicio de {rng.choice(PALABRAS)}"]),
+            proveedor_preferido=rng.choice(PROVEEDORES + [None, None]),
+            **{f"presupuesto_{mes}": Decimal(rng.choice([500000, 1000000, 2000000])) for mes in MESES},
+        )
+        for i in range(1, lineas + 1)
+    ]
+    pendientes = [
+        _factura(
+            i,
+            proveedor=rng.choice(PROVEEDORES + [None]),
+            concepto=rng.choice([None, f"pago {rng.choice(PALABRAS)} mes", rng.choice(PALABRAS)]),
+            total=Decimal(rng.choice([480000, 1050000, 1900000, 3000000])),
+            fecha_emision=date(2026, rng.randint(1, 12), 15),
+        )
+        for i in range(1, facturas + 1)
+    ]
+    return todas, pendientes
+
+
+def _mejor_recorrido_completo(datos, lineas, umbral):
+    evaluados = [(linea, calcular_score(datos, linea)[0]) for linea in lineas]
+    evaluados.sort(key=lambda x: x[1], reverse=True)
+    if evaluados and evaluados[0][1] >= umbral:
+        return evaluados[0][0].id, evaluados[0][1]
+    return None
+
+
+class TestIndiceVinculacion:
+    """Pre-filtro por llaves vs. recorrido completo."""
+
+    def test_equivalente_a_recorrido_completo(self):
+        """TEST 1: misma línea y score para umbrales 60, 70 y 80."""
+        lineas, facturas = _dataset()
+        indice = IndiceLineasPresupuesto(lineas)
+        for umbral in (60, 70, 80):
+            for datos in facturas:
+                mejor, _ = indice.evaluar(datos, umbral)
+                obtenido = (mejor["linea"].id, mejor["score"]) if mejor else None
+                assert obtenido == _mejor_recorrido_completo(datos, lineas, umbral), (umbral, datos)
+
+    def test_prefiltro_reduce_evaluaciones(self):
+        """TEST 2: con umbral alto se evalúa una fracción de facturas × líneas."""
+        lineas, facturas = _dataset()
+        indice = IndiceLineasPresupuesto(lineas)
+        for datos in facturas:
+            indice.evaluar(datos, 80)
+        assert 0 < indice.evaluaciones < len(facturas) * len(lineas) // 2
+
+    def test_proveedor_por_nit(self):
+        """TEST 3: proveedor preferido registrado por NIT."""
+        lineas = [_linea(1, proveedor_preferido="900.123.456-7", categoria="energia"),
+                  _linea(2, proveedor_preferido="Otra Empresa", categoria="energia")]
+        datos = _factura(1, proveedor="Electrificadora Regional", nit="900123456-7", concepto="energia")
+
+        mejor, candidatos = IndiceLineasPresupuesto(lineas).evaluar(datos, 70)
+        assert mejor["linea"].id == 1
+        assert mejor["criterios"]["proveedor"]["match"] is True
+        # Línea 2: proveedor distinto → cota 65 < 70, ni se calcula su score
+        assert [c["linea"].id for c in candidatos] == [1]
+
+    def test_comodines_por_puntos_base(self):
+        """TEST 4: línea sin llaves comunes pero con 65 puntos posibles."""
+        linea = _linea(1, nombre="general")
+        datos = _factura(1, proveedor="Proveedor Sin Relacion", concepto="consultoria")
+
+        indice = IndiceLineasPresupuesto([linea])
+        assert indice.candidatos(datos, umbral=65) == [linea]
+        assert indice.candidatos(datos, umbral=70) == []
+        mejor, _ = indice.evaluar(datos, 65)
+        assert mejor["score"] == 65
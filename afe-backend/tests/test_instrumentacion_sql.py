@@ -0,0 +1,80 @@
+"""
+Test Suite: Instrumentación SQL por request y detector N+1
+
+1. Huella normaliza literales y listas IN
+2. medir_consultas cuenta sentencias y detecta repeticiones (N+1)
+3. Middleware: headers X-SQL-* y métricas Prometheus por ruta
+4. Marcador presupuesto_sql sobre un endpoint dentro del presupuesto
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.instrumentacion_sql import (
+    InstrumentacionSQLMiddleware,
+    huella_sql,
+    instalar_listeners,
+    medir_consultas,
+    registro_metricas,
+)
+from app.models.proveedor import Proveedor
+
+
+@pytest.fixture
+def cliente_instrumentado(db: Session):
+    """App mínima con el middleware y un endpoint N+1 (una consulta por id)."""
+    instalar_listeners(db.get_bind())
+    app = FastAPI()
+    app.add_middleware(InstrumentacionSQLMiddleware, headers=True)
+
+    @app.get("/proveedores/{cantidad}")
+    def listar(cantidad: int):
+        for proveedor_id in range(cantidad):
+            db.execute(select(Proveedor.id).where(Proveedor.id == proveedor_id)).all()
+        return {"ok": True}
+
+    registro_metricas.reiniciar()
+    return TestClient(app)
+
+
+class TestInstrumentacionSQL:
+    """Tests de la instrumentación SQL."""
+
+    def test_huella_normaliza_literales_e_in(self):
+        """TEST 1: misma huella para distintos ids y tamaños de IN."""
+        a = huella_sql("SELECT * FROM facturas WHERE id IN (?, ?, ?) AND total > 10")
+        b = huella_sql("SELECT *  FROM facturas\n WHERE id IN (?) AND total > 2500.5")
+        assert a == b == "SELECT * FROM facturas WHERE id IN (?...) AND total > ?"
+        assert huella_sql("SELECT 1 FROM t WHERE nit = '900-1'") == "SELECT ? FROM t WHERE nit = ?"
+
+    def test_medir_consultas_detecta_repeticiones(self, db: Session):
+        """TEST 2: la misma sentencia 6 veces es candidata a N+1."""
+        instalar_listeners(db.get_bind())
+        with medir_consultas() as sql:
+            for proveedor_id in range(6):
+                db.execute(select(Proveedor.id).where(Proveedor.id == proveedor_id)).all()
+
+        assert sql.consultas == 6
+        assert sql.tiempo_total_ms > 0
+        assert list(sql.repetidas(5).values()) == [6]
+        assert sql.repetidas(7) == {}
+
+    def test_middleware_headers_y_metricas(self, cliente_instrumentado):
+        """TEST 3: headers por request y agregados por plantilla de ruta."""
+        respuesta = cliente_instrumentado.get("/proveedores/6")
+        cliente_instrumentado.get("/proveedores/2")
+
+        assert respuesta.headers["x-sql-queries"] == "6"
+        assert respuesta.headers["x-sql-repeated"] == "6"
+        metricas = registro_metricas.formato_prometheus()
+        assert 'afe_sql_queries_total{method="GET",route="/proveedores/{cantidad}"} 8' in metricas
+        assert 'afe_sql_n_plus_one_requests_total{method="GET",route="/proveedores/{cantidad}"} 1' in metricas
+        assert 'afe_sql_queries_per_request_bucket{method="GET",route="/proveedores/{cantidad}",le="5"} 1' in metricas
+
+    @pytest.mark.presupuesto_sql(max_consultas=3, max_repeticiones=3)
+    def test_presupuesto_respetado(self, cliente_instrumentado):
+        """TEST 4: request dentro del presupuesto no falla el test."""
+        assert cliente_instrumentado.get("/proveedores/3").status_code == 200
@@ -0,0 +1,166 @@
+"""
+Test Suite: Conteos del resumen semanal y de alertas urgentes en SQL
+
+Verifica NotificacionesProgramadasService._obtener_pendientes_por_responsable
+contra la clasificación anterior factura por factura (_calcular_dias_pendiente:
+> 10 días urgente, 3-10 pendiente, < 3 reciente):
+
+1. Las condiciones SQL de antigüedad clasifican igual que los días calculados
+   en Python en todos los bordes, incluida una fecha_emision NULL (0 días)
+2. Conteos por responsable (total, urgentes, pendientes, recientes y monto)
+   iguales a la clasificación por factura
+3. solo_urgentes: mismos conteos y facturas que el filtro dias > 10
+4. Las facturas listadas son las más antiguas, con los mismos días
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Date, case, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.services.notificaciones_programadas import NotificacionesProgramadasService
+
+# Días desde la emisión alrededor de los umbrales (negativo = fecha futura)
+DIAS = (30, 11, 10, 9, 4, 3, 2, 1, 0, -2)
+
+
+def _clasificar(servicio: NotificacionesProgramadasService, factura: Factura) -> str:
+    """Clasificación anterior, en Python y por factura."""
+    dias = servicio._calcular_dias_pendiente(factura)
+    if dias > 10:
+        return "urgentes"
+    if dias >= 3:
+        return "pendientes"
+    return "recientes"
+
+
+@pytest.fixture
+def escenario(db: Session):
+    """Dos responsables con facturas en revisión de todas las antigüedades (commit real)."""
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+    responsables = [
+        Usuario(usuario=f"test_resumen_{i}", nombre=f"Resumen Test {i}",
+                email=f"test_resumen_{i}@test.com", role_id=rol.id)
+        for i in range(2)
+    ]
+    proveedor = Proveedor(nit="999996613-3", razon_social="Proveedor Resumen Test")
+    db.add_all(responsables + [proveedor])
+    db.flush()
+
+    hoy = datetime.now().date()
+    facturas = []
+    for r, responsable in enumerate(responsables):
+        for i, dias in enumerate(DIAS[r:]):
+            facturas.append(Factura(
+                numero_factura=f"TEST-RESUMEN-{r}-{i}", cufe=f"CUFE-TEST-RESUMEN-{r}-{i}",
+                fecha_emision=hoy - timedelta(days=dias), proveedor_id=proveedor.id,
+                responsable_id=responsable.id, estado=EstadoFactura.en_revision,
+                subtotal=Decimal("100.00") * (i + 1), iva=Decimal("19.00") * (i + 1)
+            ))
+        # Fuera del resumen: otro estado
+        facturas.append(Factura(
+            numero_factura=f"TEST-RESUMEN-{r}-APROBADA", cufe=f"CUFE-TEST-RESUMEN-{r}-APROBADA",
+            fecha_emision=hoy - timedelta(days=40), proveedor_id=proveedor.id,
+            responsable_id=responsable.id, estado=EstadoFactura.aprobada,
+            total_a_pagar=Decimal("5000.00")
+        ))
+    db.add_all(facturas)
+    db.commit()
+
+    yield {"responsables": responsables, "facturas": facturas}
+
+    db.rollback()
+    db.query(Factura).filter(Factura.id.in_([f.id for f in facturas])).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.id.in_([u.id for u in responsables])).delete(synchronize_session=False)
+    db.commit()
+
+
+def _esperado(servicio, facturas, responsable_id, solo_urgentes=False):
+    """Conteos de la implementación anterior para un responsable."""
+    en_revision = [
+        f for f in facturas
+        if f.responsable_id == responsable_id and f.estado == EstadoFactura.en_revision
+    ]
+    if solo_urgentes:
+        en_revision = [f for f in en_revision if _clasificar(servicio, f) == "urgentes"]
+    conteos = {"total": len(en_revision), "urgentes": 0, "pendientes": 0, "recientes": 0}
+    for factura in en_revision:
+        conteos[_clasificar(servicio, factura)] += 1
+    conteos["monto_total"] = sum(f.total_calculado for f in en_revision)
+    return conteos, en_revision
+
+
+class TestCondicionesAntiguedad:
+    """Condiciones SQL vs. días calculados en Python."""
+
+    def test_bordes_y_fecha_nula(self, db: Session):
+        """TEST 1: misma clasificación en SQL y en Python, NULL incluido."""
+        servicio = NotificacionesProgramadasService(db)
+        hoy = datetime.now().date()
+        fechas = [hoy - timedelta(days=d) for d in range(-3, 16)] + [None]
+
+        for fecha in fechas:
+            es_urgente, es_reciente = servicio._condiciones_antiguedad(literal(fecha, Date), hoy)
+            en_sql = db.execute(select(case(
+                (es_urgente, "urgentes"), (es_reciente, "recientes"), else_="pendientes"
+            ))).scalar()
+            assert en_sql == _clasificar(servicio, Factura(fecha_emision=fecha)), fecha
+
+
+class TestConteosPorResponsable:
+    """Conteos agrupados en SQL vs. clasificación por factura."""
+
+    def test_resumen_semanal(self, db: Session, escenario):
+        """TEST 2: total, urgentes, pendientes, recientes y monto por responsable."""
+        servicio = NotificacionesProgramadasService(db)
+        ids = [u.id for u in escenario["responsables"]]
+
+        resumen = servicio._obtener_pendientes_por_responsable(responsable_ids=ids)
+
+        assert set(resumen) == set(ids)
+        for responsable_id in ids:
+            esperado, _ = _esperado(servicio, escenario["facturas"], responsable_id)
+            obtenido = {k: resumen[responsable_id][k] for k in esperado}
+            assert obtenido == esperado, responsable_id
+
+    def test_alertas_urgentes(self, db: Session, escenario):
+        """TEST 3: solo_urgentes cuenta y lista las facturas con más de 10 días."""
+        servicio = NotificacionesProgramadasService(db)
+        ids = {u.id for u in escenario["responsables"]}
+
+        resumen = {
+            k: v for k, v in servicio._obtener_pendientes_por_responsable(solo_urgentes=True).items()
+            if k in ids
+        }
+
+        for responsable_id in ids:
+            esperado, urgentes = _esperado(servicio, escenario["facturas"], responsable_id, solo_urgentes=True)
+            assert resumen[responsable_id]["urgentes"] == esperado["urgentes"] == len(urgentes)
+            assert {f.id for f, _ in resumen[responsable_id]["facturas"]} == {f.id for f in urgentes}
+
+    def test_facturas_listadas_mas_antiguas(self, db: Session, escenario, monkeypatch):
+        """TEST 4: el top de cada responsable son sus facturas con más días."""
+        monkeypatch.setattr(NotificacionesProgramadasService, "MAX_FACTURAS_POR_EMAIL", 4)
+        servicio = NotificacionesProgramadasService(db)
+        ids = [u.id for u in escenario["responsables"]]
+
+        resumen = servicio._obtener_pendientes_por_responsable(responsable_ids=ids)
+
+        for responsable_id in ids:
+            _, en_revision = _esperado(servicio, escenario["facturas"], responsable_id)
+            mas_antiguas = sorted(
+                en_revision, key=lambda f: (-servicio._calcular_dias_pendiente(f), f.id)
+            )[:4]
+            assert [(f.id, dias) for f, dias in resumen[responsable_id]["facturas"]] == \
+                [(f.id, servicio._calcular_dias_pendiente(f)) for f in mas_antiguas]
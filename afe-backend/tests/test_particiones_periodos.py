@@ -0,0 +1,226 @@
+"""
+Test Suite: Filtros por período en rango semiabierto + ciclo de vida de particiones
+
+Casos de prueba:
+1. Rango del período: mes, diciembre → enero, año completo
+2. Filtro semiabierto: sin funciones sobre la columna; DateTime recibe datetime
+3. EXPLAIN: el rango usa índice (y poda particiones si la tabla está
+   particionada); extract() no
+4. Resumen mensual detallado agregado en una consulta == conteos por estado
+5. Plan de particiones: crear futuras (anual, mensual, cambio anual → mensual)
+6. Plan de particiones: archivar por retención, nunca MAXVALUE
+7. Límites de INFORMATION_SCHEMA: MAXVALUE, YEAR, RANGE COLUMNS, TO_DAYS
+8. Archivar reanudable: tabla de archivo nueva, existente particionada,
+   EXCHANGE ya hecho (solo DROP) y tabla con filas + partición con filas
+   (error, sin EXCHANGE ni DROP)
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import extract, text
+from sqlalchemy.orm import Session
+
+from app.crud.factura import get_facturas_resumen_por_mes_detallado
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.services.particiones_facturas import GestorParticionesFacturas, Particion, parsear_limite, planificar
+from app.utils.date_helpers import DateHelper
+
+
+def _sql(db: Session, query) -> str:
+    return str(query.statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _explain(db: Session, query) -> str:
+    """Plan de ejecución como texto (MySQL: EXPLAIN; SQLite: EXPLAIN QUERY PLAN)."""
+    sql = _sql(db, query)
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "mysql":
+        filas = db.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        return " | ".join(
+            f"partitions={f.get('partitions')} possible_keys={f.get('possible_keys')} key={f.get('key')}"
+            for f in filas
+        )
+    if dialecto == "sqlite":
+        db.execute(text("CREATE INDEX IF NOT EXISTS idx_facturas_fecha_estado ON facturas (fecha_emision, estado)"))
+        return " | ".join(str(f[-1]) for f in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    pytest.skip(f"EXPLAIN no soportado en {dialecto}")
+
+
+class TestFiltrosPeriodo:
+    """DateHelper: rangos semiabiertos."""
+
+    def test_rango_periodo(self):
+        """TEST 1: [inicio, fin) del mes y del año."""
+        assert DateHelper.get_rango_periodo(2026, 10) == (date(2026, 10, 1), date(2026, 11, 1))
+        assert DateHelper.get_rango_periodo(2026, 12) == (date(2026, 12, 1), date(2027, 1, 1))
+        assert DateHelper.get_rango_periodo(2026) == (date(2026, 1, 1), date(2027, 1, 1))
+
+    def test_filtro_sin_funciones(self, db: Session):
+        """TEST 2: la columna se compara directamente, límites datetime en DateTime."""
+        filtro = DateHelper.create_mes_filter(Factura.creado_en, 2026, 12)
+        assert [type(c.right.value) for c in filtro.clauses] == [datetime, datetime]
+        assert filtro.clauses[1].right.value == datetime(2027, 1, 1)
+
+        sql = _sql(db, db.query(Factura.id).filter(DateHelper.create_periodo_filter(Factura.fecha_emision, "2026-02")))
+        assert "EXTRACT" not in sql.upper() and "STRFTIME" not in sql.upper()
+        assert "fecha_emision >=" in sql and "fecha_emision <" in sql
+
+    def test_explain_usa_indice(self, db: Session):
+        """TEST 3: rango → índice / poda de particiones; extract() → escaneo."""
+        rango = db.query(Factura.id).filter(DateHelper.create_mes_filter(Factura.fecha_emision, 2026, 10))
+        funcion = db.query(Factura.id).filter(
+            extract('year', Factura.fecha_emision) == 2026,
+            extract('month', Factura.fecha_emision) == 10
+        )
+        plan_rango, plan_funcion = _explain(db, rango), _explain(db, funcion)
+
+        if db.get_bind().dialect.name == "sqlite":
+            assert "SEARCH" in plan_rango and "fecha_emision" in plan_rango
+            assert "SCAN" in plan_funcion
+        else:
+            assert "idx_facturas_fecha_estado" in plan_rango
+            assert "idx_facturas_fecha_estado" not in plan_funcion.split("possible_keys=")[1].split(" ")[0]
+            if "partitions=None" not in plan_rango:
+                # Tabla particionada: solo la partición del período (+ MAXVALUE si aplica)
+                assert plan_rango.count(",") < plan_funcion.count(",")
+
+    def test_resumen_detallado_agregado(self, db: Session):
+        """TEST 4: una consulta agregada por (año, mes, estado) con los mismos conteos."""
+        proveedor = Proveedor(nit="999993311-1", razon_social="Proveedor Resumen Periodos Test")
+        db.add(proveedor)
+        db.flush()
+        estados = [EstadoFactura.en_revision, EstadoFactura.aprobada, EstadoFactura.aprobada,
+                   EstadoFactura.rechazada, EstadoFactura.validada_contabilidad]
+        for i, estado in enumerate(estados):
+            db.add(Factura(
+                numero_factura=f"TEST-PER-{i}", cufe=f"CUFE-TEST-PER-{i}", fecha_emision=date(2019, 3, 1),
+                proveedor_id=proveedor.id, total_a_pagar=Decimal("100.00"), subtotal=Decimal("80.00"),
+                iva=Decimal("20.00"), estado=estado, creado_en=datetime(2019, 3, 31, 23, 59, 59)
+            ))
+        # Límite exclusivo: 1 de abril no pertenece a marzo
+        db.add(Factura(
+            numero_factura="TEST-PER-ABR", cufe="CUFE-TEST-PER-ABR", fecha_emision=date(2019, 4, 1),
+            proveedor_id=proveedor.id, total_a_pagar=Decimal("999.00"), estado=EstadoFactura.aprobada,
+            creado_en=datetime(2019, 4, 1)
+        ))
+        db.flush()
+
+        resumen = get_facturas_resumen_por_mes_detallado(db, año=2019, proveedor_id=proveedor.id)
+        assert [p["periodo"] for p in resumen] == ["2019-04", "2019-03"]
+        marzo = resumen[1]
+        assert marzo["total_facturas"] == 5
+        assert marzo["monto_total"] == pytest.approx(500.0)
+        assert marzo["iva_total"] == pytest.approx(100.0)
+        assert marzo["facturas_por_estado"] == {"en_revision": 1, "aprobada": 2, "aprobada_auto": 0, "rechazada": 1}
+
+
+class TestPlanParticiones:
+    """planificar() y parsear_limite() (sin BD)."""
+
+    ANUALES = [
+        Particion("p2024", date(2025, 1, 1)),
+        Particion("p2025", date(2026, 1, 1)),
+        Particion("p2026", date(2027, 1, 1)),
+        Particion("p_future", None),
+    ]
+
+    def test_crear_futuras(self):
+        """TEST 5: cubre el período actual + N futuros."""
+        plan = planificar(self.ANUALES, date(2026, 10, 18), "anual", periodos_adelante=2)
+        assert plan.crear == [("p2027", date(2027, 1, 1), date(2028, 1, 1)),
+                              ("p2028", date(2028, 1, 1), date(2029, 1, 1))]
+        assert planificar(self.ANUALES, date(2026, 10, 18), "anual", periodos_adelante=0).vacio
+
+        plan = planificar(self.ANUALES, date(2026, 12, 15), "mensual", periodos_adelante=1)
+        assert [n for n, _, _ in plan.crear] == ["p2027_01"]
+
+        # Anual → mensual: las nuevas son mensuales desde el último límite
+        plan = planificar(self.ANUALES, date(2027, 1, 10), "mensual", periodos_adelante=1)
+        assert plan.crear == [("p2027_01", date(2027, 1, 1), date(2027, 2, 1)),
+                              ("p2027_02", date(2027, 2, 1), date(2027, 3, 1))]
+
+        with pytest.raises(ValueError):
+            planificar(self.ANUALES, date(2026, 1, 1), "semanal")
+
+    def test_archivar_por_retencion(self):
+        """TEST 6: límite <= hoy - retención; MAXVALUE nunca."""
+        plan = planificar(self.ANUALES, date(2026, 10, 18), "anual", periodos_adelante=0, retencion_meses=12)
+        assert [p.nombre for p in plan.archivar] == ["p2024"]
+        plan = planificar(self.ANUALES, date(2026, 10, 18), "anual", periodos_adelante=0, retencion_meses=0)
+        assert plan.archivar == []
+        assert planificar([Particion("p_future", None)], date(2026, 1, 1), retencion_meses=1).vacio
+
+    def test_parsear_limite(self):
+        """TEST 7: formatos de PARTITION_DESCRIPTION."""
+        assert parsear_limite("MAXVALUE") is None
+        assert parsear_limite("2027") == date(2027, 1, 1)
+        assert parsear_limite("'2027-03-01'") == date(2027, 3, 1)
+        # TO_DAYS('2027-03-01') en MySQL
+        assert parsear_limite(str(date(2027, 3, 1).toordinal() + 365)) == date(2027, 3, 1)
+
+
+class _SesionGuionada:
+    """Sesión falsa: registra las sentencias y responde las consultas de estado."""
+
+    def __init__(self, existe=False, particionada=False, archivo_con_filas=False, particion_con_filas=True):
+        self.estado = dict(existe=existe, particionada=particionada,
+                           archivo_con_filas=archivo_con_filas, particion_con_filas=particion_con_filas)
+        self.sentencias = []
+
+    def execute(self, sentencia, parametros=None):
+        sql = " ".join(str(sentencia).split())
+        self.sentencias.append(sql)
+        resultado = None
+        if "INFORMATION_SCHEMA.TABLES" in sql:
+            resultado = int(self.estado["existe"])
+        elif "INFORMATION_SCHEMA.PARTITIONS" in sql:
+            resultado = int(self.estado["particionada"])
+        elif sql.startswith("SELECT 1 FROM facturas PARTITION"):
+            resultado = 1 if self.estado["particion_con_filas"] else None
+        elif sql.startswith("SELECT 1 FROM facturas_archivo_"):
+            resultado = 1 if self.estado["archivo_con_filas"] else None
+        return type("Resultado", (), {
+            "scalar": lambda _: resultado,
+            "first": lambda _: (resultado,) if resultado is not None else None,
+        })()
+
+
+class TestArchivarParticion:
+    """archivar() no pierde filas y se puede reanudar tras un fallo."""
+
+    PARTICION = Particion(nombre="p2020", limite=date(2021, 1, 1), filas=10)
+
+    def _archivar(self, **estado):
+        db = _SesionGuionada(**estado)
+        return GestorParticionesFacturas(db), db
+
+    def test_archivar_reanudable(self):
+        """TEST 8: nueva, existente particionada, EXCHANGE hecho y conflicto."""
+        gestor, db = self._archivar()
+        assert gestor.archivar(self.PARTICION) == "facturas_archivo_2020"
+        sql = " ; ".join(db.sentencias)
+        assert "CREATE TABLE facturas_archivo_2020 LIKE facturas" in sql
+        assert "REMOVE PARTITIONING" in sql and "EXCHANGE PARTITION p2020" in sql
+        assert "DROP PARTITION p2020" in sql
+
+        # Falló antes de REMOVE PARTITIONING: no se vuelve a crear
+        gestor, db = self._archivar(existe=True, particionada=True)
+        gestor.archivar(self.PARTICION)
+        sql = " ; ".join(db.sentencias)
+        assert "CREATE TABLE" not in sql and "REMOVE PARTITIONING" in sql and "EXCHANGE" in sql
+
+        # Falló entre EXCHANGE y DROP: las filas ya están en el archivo
+        gestor, db = self._archivar(existe=True, archivo_con_filas=True, particion_con_filas=False)
+        gestor.archivar(self.PARTICION)
+        sql = " ; ".join(db.sentencias)
+        assert "REMOVE PARTITIONING" not in sql and "EXCHANGE" not in sql and "DROP PARTITION p2020" in sql
+
+        # Archivo con filas y partición con filas: nada se intercambia ni se borra
+        gestor, db = self._archivar(existe=True, archivo_con_filas=True, particion_con_filas=True)
+        with pytest.raises(RuntimeError):
+            gestor.archivar(self.PARTICION)
+        sql = " ; ".join(db.sentencias)
+        assert "EXCHANGE" not in sql and "DROP PARTITION" not in sql
@@ -0,0 +1,122 @@
+"""
+Test Suite: Mantenimiento incremental de patrones_facturas
+
+Verifica que actualizar un patrón con sus agregados acumulados (suma, suma de
+cuadrados, pagos_detalle) produce las mismas estadísticas que recalcularlo
+desde todo el historial.
+
+Casos de prueba:
+1. Patrón recalculado desde historial guarda agregados
+2. Incremento con facturas nuevas == recálculo completo (mismos valores
+   Decimal guardados)
+3. Reaplicar las mismas facturas no cambia el patrón (idempotencia)
+"""
+
+import pytest
+from sqlalchemy.orm import Session
+from app.models.factura import Factura, EstadoFactura
+from app.models.patrones_facturas import PatronesFacturas
+from app.models.proveedor import Proveedor
+from app.services.analisis_patrones_service import AnalizadorPatronesService
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+
+ESTADOS = [EstadoFactura.aprobada, EstadoFactura.aprobada_auto]
+CONCEPTO = "arriendo bodega test"
+
+
+@pytest.fixture
+def proveedor_patron(db: Session):
+    """Proveedor con 8 meses de facturas aprobadas del mismo concepto."""
+    proveedor = Proveedor(nit="TEST-PATINC-901", razon_social="Proveedor Patrón Incremental Test")
+    db.add(proveedor)
+    db.flush()
+
+    for i in range(8, 0, -1):
+        db.add(Factura(
+            numero_factura=f"TEST-PATINC-{i}",
+            cufe=f"CUFE-TEST-PATINC-{i}",
+            fecha_emision=date.today() - timedelta(days=30 * i),
+            proveedor_id=proveedor.id,
+            total_a_pagar=Decimal("1500000.00") + Decimal(i * 1000),
+            estado=EstadoFactura.aprobada,
+            concepto_normalizado=CONCEPTO
+        ))
+    db.commit()
+
+    yield proveedor
+
+    db.rollback()
+    db.query(PatronesFacturas).filter(PatronesFacturas.proveedor_id == proveedor.id).delete(synchronize_session=False)
+    db.query(Factura).filter(Factura.proveedor_id == proveedor.id).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _filas(service: AnalizadorPatronesService, proveedor: Proveedor, fecha_desde: datetime):
+    return service._obtener_facturas_para_analisis(fecha_desde, [proveedor.id], ESTADOS)
+
+
+class TestPatronesIncrementales:
+    """Tests de equivalencia incremental vs recálculo completo."""
+
+    def test_incremento_igual_a_recalculo(self, db: Session, proveedor_patron: Proveedor):
+        """TEST 1 y 2: agregados guardados y estadísticas equivalentes."""
+        service = AnalizadorPatronesService(db)
+        fecha_desde = datetime.now() - timedelta(days=360)
+        key = f"{proveedor_patron.id}|{CONCEPTO}"
+
+        service._recalcular_grupos({key}, fecha_desde, ESTADOS, 12)
+        patron = db.query(PatronesFacturas).filter(PatronesFacturas.proveedor_id == proveedor_patron.id).one()
+        assert patron.suma_montos is not None
+        assert patron.pagos_analizados == 8
+
+        # Dos facturas nuevas aprobadas
+        for i in range(2):
+            db.add(Factura(
+                numero_factura=f"TEST-PATINC-NUEVA-{i}",
+                cufe=f"CUFE-TEST-PATINC-NUEVA-{i}",
+                fecha_emision=date.today() - timedelta(days=i),
+                proveedor_id=proveedor_patron.id,
+                total_a_pagar=Decimal("1620000.00"),
+                estado=EstadoFactura.aprobada_auto,
+                concepto_normalizado=CONCEPTO
+            ))
+        db.commit()
+
+        ayer = date.today() - timedelta(days=1)
+        nuevas = [f for f in _filas(service, proveedor_patron, fecha_desde) if f.fecha_emision >= ayer]
+        assert len(nuevas) == 2
+        service._aplicar_incremento(patron, key, nuevas, fecha_desde, 12)
+        db.commit()
+
+        esperado = service._calcular_estadisticas_grupos(
+            service._agrupar_facturas_por_patron(_filas(service, proveedor_patron, fecha_desde)), 12
+        )[0]
+
+        db.refresh(patron)
+        assert patron.pagos_analizados == esperado['pagos_analizados'] == 10
+        assert patron.meses_con_pagos == esperado['meses_con_pagos']
+        assert patron.tipo_patron == esperado['tipo_patron']
+        assert patron.frecuencia_detectada == esperado['frecuencia_detectada']
+        assert patron.puede_aprobar_auto == esperado['puede_aprobar_auto']
+        for campo in ('monto_promedio', 'desviacion_estandar', 'monto_minimo', 'monto_maximo', 'coeficiente_variacion'):
+            assert getattr(patron, campo) == esperado[campo], campo
+
+    def test_incremento_idempotente(self, db: Session, proveedor_patron: Proveedor):
+        """TEST 3: facturas ya incluidas en pagos_detalle se ignoran."""
+        service = AnalizadorPatronesService(db)
+        fecha_desde = datetime.now() - timedelta(days=360)
+        key = f"{proveedor_patron.id}|{CONCEPTO}"
+
+        service._recalcular_grupos({key}, fecha_desde, ESTADOS, 12)
+        patron = db.query(PatronesFacturas).filter(PatronesFacturas.proveedor_id == proveedor_patron.id).one()
+        suma_antes = patron.suma_montos
+
+        resultado = service._aplicar_incremento(
+            patron, key, _filas(service, proveedor_patron, fecha_desde), fecha_desde, 12
+        )
+
+        assert resultado is None
+        assert patron.suma_montos == suma_antes
@@ -0,0 +1,161 @@
+"""
+Test Suite: Plantillas de email compiladas y render en lote
+
+Verifica app.services.email_template_service y su uso en
+NotificacionesProgramadasService (sin BD ni envío real):
+
+1. render_lote produce el mismo HTML que renders individuales, combina los
+   valores comunes y marca con None el render que falla
+2. Entorno compartido: todas las instancias usan el mismo Environment
+3. Fragmentos: cada fila de factura se renderiza una vez y se reutiliza;
+   los datos del proveedor se escapan
+4. Resumen semanal: un render en lote por envío, "y N facturas mas" y
+   render fallido contado como fallido
+5. Caché de bytecode: un directorio configurado accesible por otros
+   usuarios no se usa; uno propio con 0700 sí
+"""
+
+import os
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.email_template_service import (
+    CacheFragmentos,
+    _bytecode_cache,
+    EmailTemplateService,
+    get_jinja_env,
+    get_template_service,
+)
+from app.services.notificaciones_programadas import NotificacionesProgramadasService
+
+
+def _factura(id, proveedor="Proveedor Test S.A.S", total="1500000"):
+    return SimpleNamespace(
+        id=id,
+        numero_factura=f"FE-{id}",
+        proveedor=SimpleNamespace(razon_social=proveedor) if proveedor else None,
+        total_calculado=Decimal(total) if total else None,
+    )
+
+
+def _responsable(id):
+    return SimpleNamespace(id=id, nombre=f"Responsable {id}", usuario=f"resp{id}", email=f"resp{id}@test.com")
+
+
+class _EmailFalso:
+    def __init__(self):
+        self.enviados = []
+
+    def send_email(self, **kwargs):
+        self.enviados.append(kwargs)
+        return {'success': True}
+
+
+class TestRenderLote:
+    """Plantillas compiladas una vez y renderizadas en lote."""
+
+    def test_lote_igual_a_renders_individuales(self):
+        """TEST 1: mismo HTML, comunes combinados y None en el render fallido."""
+        servicio = get_template_service()
+        contextos = [
+            {'nombre_responsable': f"R{i}", 'total': i, 'html_facturas': ""}
+            for i in range(1, 4)
+        ]
+        lote = servicio.render_lote('alerta_urgente.html', contextos, comunes={'frontend_url': "https://afe"})
+
+        individuales = [
+            servicio.env.get_template('alerta_urgente.html').render(frontend_url="https://afe", **c)
+            for c in contextos
+        ]
+        assert lote == individuales
+        assert all("https://afe/facturas" in html for html in lote)
+
+        assert servicio.render_lote('no_existe.html', contextos) == [None, None, None]
+
+    def test_entorno_compartido(self):
+        """TEST 2: las instancias no recompilan: comparten Environment."""
+        assert EmailTemplateService().env is get_jinja_env()
+        assert EmailTemplateService().env is EmailTemplateService().env
+        assert 'currency' in get_jinja_env().filters
+
+
+class TestFragmentos:
+    """Filas de factura renderizadas una vez por envío."""
+
+    def test_fila_reutilizada_y_escapada(self):
+        """TEST 3: una fila por (factura, días, color) y proveedor escapado."""
+        servicio = NotificacionesProgramadasService(db=None)
+        facturas = [(_factura(1, proveedor="<b>ACME</b> & Cia"), 12), (_factura(2, total=None), 15)]
+
+        primera = servicio._generar_lista_facturas(facturas, "URGENTES", "red", total=2)
+        segunda = servicio._generar_lista_facturas(facturas, "URGENTES", "red", total=2)
+
+        assert primera == segunda
+        assert len(servicio.fragmentos) == 2
+        assert "&lt;b&gt;ACME&lt;/b&gt; &amp; Cia" in primera
+        assert "N/A COP" in primera
+        assert "#dc3545" in primera
+        assert servicio._generar_lista_facturas([], "RECIENTES", "green", total=0) == ""
+
+        aislado = CacheFragmentos('fragmentos_notificaciones.html')
+        assert len(aislado) == 0
+
+
+class TestResumenSemanal:
+    """Resumen semanal renderizado en lote."""
+
+    @pytest.fixture
+    def email(self, monkeypatch):
+        falso = _EmailFalso()
+        monkeypatch.setattr(
+            "app.services.unified_email_service.get_unified_email_service", lambda: falso
+        )
+        return falso
+
+    def test_un_email_por_responsable(self, email):
+        """TEST 4: contenido, "y N facturas mas" y fallo de render contado."""
+        servicio = NotificacionesProgramadasService(db=None)
+        responsable = _responsable(1)
+        resumen = {
+            'total': 25, 'monto_total': Decimal("37500000"),
+            'urgentes': 22, 'pendientes': 2, 'recientes': 1,
+            'facturas': [(_factura(1), 12), (_factura(2), 5), (_factura(3), 1)],
+        }
+        contexto = servicio._contexto_resumen_semanal(responsable, resumen)
+        html = get_template_service().render_lote('resumen_semanal.html', [contexto],
+                                                  comunes={'frontend_url': "https://afe"})[0]
+
+        assert "$37,500,000.00 COP" in html
+        assert "URGENTES (&gt; 10 dias): 22" in html
+        assert "... y 21 facturas mas" in html
+        assert "FE-1" in html and "FE-3" in html
+
+        resultado = servicio._enviar_email_resumen_semanal(responsable, 25, html)
+        assert resultado['success'] is True
+        assert email.enviados[0]['subject'] == "Resumen Semanal: 25 facturas pendientes"
+        assert email.enviados[0]['body_html'] == html
+
+        fallido = servicio._enviar_email_resumen_semanal(responsable, 25, None)
+        assert fallido['success'] is False
+        assert len(email.enviados) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="permisos POSIX")
+class TestCacheBytecode:
+    """El bytecode se ejecuta al cargarlo: solo directorios propios y privados."""
+
+    def test_directorio_inseguro_se_rechaza(self, tmp_path, monkeypatch):
+        """TEST 5: 0777 → sin caché; directorio nuevo → creado con 0700."""
+        inseguro = tmp_path / "compartido"
+        inseguro.mkdir()
+        inseguro.chmod(0o777)
+        monkeypatch.setattr(settings, "email_templates_cache_dir", str(inseguro))
+        assert _bytecode_cache() is None
+
+        privado = tmp_path / "privado"
+        monkeypatch.setattr(settings, "email_templates_cache_dir", str(privado))
+        assert _bytecode_cache() is not None
+        assert oct(privado.stat().st_mode & 0o777) == oct(0o700)
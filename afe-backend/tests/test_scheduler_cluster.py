@@ -0,0 +1,126 @@
+"""
+Test Suite: Scheduler cluster con lease en BD
+
+Verifica que, con varios workers, cada ejecución programada corre una vez:
+
+1. Solo un titular reclama un slot; el slot no se repite tras liberarlo
+2. Un lease vencido (worker caído) se puede reclamar para el siguiente slot
+3. Dos schedulers en el mismo tick → la función se ejecuta una sola vez
+4. Recuperación de la ejecución perdida al arrancar
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.estado_tarea import LeaseTareaProgramada
+from app.services.scheduler_cluster import LeaseTareas, SchedulerCluster, TrabajoProgramado
+
+
+NOMBRE = "test_scheduler_cluster"
+
+
+@pytest.fixture
+def fabrica(db: Session):
+    """Sesiones independientes (cada operación del lease hace commit)."""
+    fabrica = sessionmaker(bind=db.get_bind())
+    yield fabrica
+    limpieza = fabrica()
+    limpieza.query(LeaseTareaProgramada).filter(
+        LeaseTareaProgramada.nombre.like(f"{NOMBRE}%")
+    ).delete(synchronize_session=False)
+    limpieza.commit()
+    limpieza.close()
+
+
+def _ahora() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+
+class TestLeaseTareas:
+    """Tests del lease distribuido."""
+
+    def test_un_solo_titular_por_slot(self, fabrica):
+        """TEST 1: el segundo worker no reclama el mismo slot, ni después de liberarlo."""
+        worker_a = LeaseTareas(fabrica, titular="a")
+        worker_b = LeaseTareas(fabrica, titular="b")
+        worker_a.registrar(NOMBRE)
+        slot = _ahora()
+
+        assert worker_a.reclamar(NOMBRE, slot, 60) is True
+        assert worker_b.reclamar(NOMBRE, slot, 60) is False
+
+        worker_a.liberar(NOMBRE, slot)
+        assert worker_b.reclamar(NOMBRE, slot, 60) is False
+        assert worker_b.reclamar(NOMBRE, slot + timedelta(hours=1), 60) is True
+
+    def test_lease_vencido_se_reclama(self, fabrica):
+        """TEST 2: si el titular muere, el lease vence y otro toma el siguiente slot."""
+        worker_a = LeaseTareas(fabrica, titular="a")
+        worker_b = LeaseTareas(fabrica, titular="b")
+        worker_a.registrar(NOMBRE)
+        slot = _ahora()
+
+        assert worker_a.reclamar(NOMBRE, slot, 3600) is True
+        assert worker_b.reclamar(NOMBRE, slot + timedelta(hours=1), 60) is False
+
+        db = fabrica()
+        db.query(LeaseTareaProgramada).filter(LeaseTareaProgramada.nombre == NOMBRE).update(
+            {LeaseTareaProgramada.lease_expira_en: slot - timedelta(seconds=1)}
+        )
+        db.commit()
+        db.close()
+
+        assert worker_b.reclamar(NOMBRE, slot + timedelta(hours=1), 60) is True
+
+
+class TestSchedulerCluster:
+    """Tests del scheduler con varios workers."""
+
+    def _trabajo(self, ejecuciones):
+        return TrabajoProgramado(
+            nombre=NOMBRE, descripcion="test", funcion=lambda: ejecuciones.append(1),
+            trigger=CronTrigger(minute=0, timezone="UTC"), jitter_segundos=0
+        )
+
+    def test_dos_workers_una_sola_ejecucion(self, fabrica):
+        """TEST 3: ambos workers llegan al slot; solo uno ejecuta."""
+        ejecuciones = []
+        workers = [
+            SchedulerCluster([self._trabajo(ejecuciones)], LeaseTareas(fabrica, titular=t))
+            for t in ("a", "b")
+        ]
+        workers[0].lease.registrar(NOMBRE)
+        slot = _ahora().replace(minute=0, second=0) + timedelta(hours=1)
+        for worker in workers:
+            worker._pendientes[NOMBRE] = (slot, slot, slot)
+
+        for worker in workers:
+            worker.tick(slot + timedelta(seconds=1))
+        for worker in workers:
+            for hilo in worker._en_ejecucion.values():
+                hilo.join(5)
+
+        assert len(ejecuciones) == 1
+        estado = workers[0].estado_trabajos()
+        fila = next(e for e in estado if e["nombre"] == NOMBRE)
+        assert fila["ultimo_estado"] == "exitoso"
+        assert fila["ultimo_slot"] == slot
+        assert fila["proxima_ejecucion"] == slot + timedelta(hours=1)
+
+    def test_recupera_ejecucion_perdida(self, fabrica):
+        """TEST 4: último slot reclamado hace 3 horas → se recupera el más reciente."""
+        lease = LeaseTareas(fabrica, titular="a")
+        lease.registrar(NOMBRE)
+        hora_actual = _ahora().replace(minute=0, second=0)
+        lease.reclamar(NOMBRE, hora_actual - timedelta(hours=3), 60)
+        lease.liberar(NOMBRE, _ahora())
+
+        worker = SchedulerCluster([self._trabajo([])], LeaseTareas(fabrica, titular="b"))
+        worker._planificar_inicial(worker.trabajos[NOMBRE], _ahora())
+
+        slot, _, limite = worker._pendientes[NOMBRE]
+        assert slot == hora_actual
+        assert limite == hora_actual
@@ -0,0 +1,175 @@
+"""
+Test Suite: Serialización rápida de listados y compresión de respuestas
+
+Verifica app.schemas.factura.serializar_factura_read y app.core.respuestas_http
+(sin BD: objetos ORM transitorios):
+
+1. Equivalencia: serializar_factura_read produce exactamente el mismo JSON que
+   FacturaRead.model_validate(...).model_dump(mode="json") (valores y orden)
+   en facturas con/sin proveedor, usuario y workflows, y con accion_por
+   automático, de aprobación y de rechazo
+2. JSONRapidoResponse: mismo cuerpo que JSONResponse para contenido JSON y
+   Decimal/fecha como texto
+3. Compresión: gzip por encima del mínimo, sin comprimir por debajo o sin
+   Accept-Encoding; negociación de brotli en Accept-Encoding
+4. ETag con compresión (caché HTTP detrás): débil (W/) en la respuesta
+   comprimida, fuerte sin comprimir; If-None-Match débil → 304 con W/
+"""
+
+import json
+import random
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.cache_http import CacheHTTPMiddleware, cache_respuestas, respuesta_cacheable
+from app.core.respuestas_http import CompresionMiddleware, JSONRapidoResponse, _acepta_brotli
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import TipoAprobacion, WorkflowAprobacionFactura
+from app.schemas.factura import FacturaRead, serializar_factura_read
+
+
+def _facturas(cantidad=300, semilla=11):
+    """Facturas transitorias con combinaciones variadas de relaciones y workflow."""
+    rng = random.Random(semilla)
+    proveedores = [Proveedor(id=i, nit=f"90012345{i}-1", razon_social=f"Proveedor {i} S.A.S") for i in range(1, 6)]
+    usuarios = [Usuario(id=i, nombre=f"Responsable Ñandú {i}", usuario=f"resp{i}") for i in range(1, 4)]
+    base = datetime(2026, 9, 1, 8, 30)
+    facturas = []
+    for i in range(1, cantidad + 1):
+        usuario = rng.choice(usuarios + [None])
+        workflows = []
+        accion_por = None
+        caso = rng.choice(["sin_workflow", "auto", "aprobada", "rechazada"])
+        if caso != "sin_workflow":
+            wf = WorkflowAprobacionFactura(tipo_aprobacion=rng.choice(list(TipoAprobacion)))
+            if caso in ("auto", "aprobada"):
+                wf.aprobada_por = "Sistema Automático" if caso == "auto" else usuario and usuario.nombre
+                wf.fecha_aprobacion = base + timedelta(days=i % 20, microseconds=i)
+            else:
+                wf.rechazada_por = usuario and usuario.nombre
+                wf.fecha_rechazo = base + timedelta(days=i % 15)
+                wf.detalle_rechazo = "Valor no coincide con la orden de compra"
+            accion_por = wf.aprobada_por or wf.rechazada_por
+            workflows = [WorkflowAprobacionFactura(), wf] if rng.random() < 0.3 else [wf]
+
+        factura = Factura(
+            id=i,
+            numero_factura=f"FE-{i:06d}",
+            fecha_emision=date(2026, rng.randint(1, 12), rng.randint(1, 28)),
+            fecha_vencimiento=rng.choice([None, date(2026, 12, 31)]),
+            cufe=f"CUFE-{i}",
+            subtotal=rng.choice([None, Decimal("1000.00"), Decimal("84033.61")]),
+            iva=rng.choice([None, Decimal("15966.39")]),
+            total_a_pagar=rng.choice([None, Decimal("0.00"), Decimal("100000.00"), Decimal("1234567.89")]),
+            estado=rng.choice(list(EstadoFactura)),
+            grupo_id=rng.choice([None, 1, 2]),
+            creado_en=rng.choice([base, base.replace(tzinfo=timezone.utc),
+                                  base.replace(tzinfo=timezone(timedelta(hours=-5)))]),
+            actualizado_en=rng.choice([None, base + timedelta(seconds=i)]),
+            confianza_automatica=rng.choice([None, Decimal("0.95")]),
+            motivo_decision=rng.choice([None, "Idéntica al mes anterior"]),
+            accion_por=accion_por,
+            responsable_id=usuario.id if usuario else None,
+        )
+        factura.proveedor = rng.choice(proveedores + [None])
+        factura.proveedor_id = factura.proveedor.id if factura.proveedor else None
+        factura.usuario = usuario
+        factura.workflow_history = workflows
+        facturas.append(factura)
+    return facturas
+
+
+def _app_con_compresion(minimo_bytes=500):
+    app = FastAPI(default_response_class=JSONRapidoResponse)
+
+    @app.get("/grande")
+    def grande():
+        return {"filas": [{"id": i, "nombre": f"Factura {i}"} for i in range(200)]}
+
+    @app.get("/pequena")
+    def pequena():
+        return {"ok": True}
+
+    app.add_middleware(CompresionMiddleware, minimo_bytes=minimo_bytes)
+    return TestClient(app)
+
+
+class TestSerializacionFacturas:
+    """Serialización directa vs. validación de Pydantic."""
+
+    def test_equivalente_a_factura_read(self):
+        """TEST 1: mismo dict y mismo orden de campos que FacturaRead."""
+        for factura in _facturas():
+            esperado = FacturaRead.model_validate(factura).model_dump(mode="json")
+            obtenido = serializar_factura_read(factura)
+            assert obtenido == esperado, factura.numero_factura
+            assert list(obtenido) == list(esperado)
+
+    def test_json_rapido_igual_a_json_response(self):
+        """TEST 2: mismo cuerpo que JSONResponse; Decimal y fechas como texto."""
+        contenido = {"data": [serializar_factura_read(f) for f in _facturas(50)], "ñ": "áé", "n": None}
+        rapido = JSONRapidoResponse(contenido).body
+        assert json.loads(rapido) == json.loads(JSONResponse(contenido).body)
+
+        cuerpo = json.loads(JSONRapidoResponse({"valor": Decimal("10.50"), "fecha": date(2026, 1, 2)}).body)
+        assert cuerpo == {"valor": "10.50", "fecha": "2026-01-02"}
+
+
+class TestCompresion:
+    """Negociación de Content-Encoding."""
+
+    def test_gzip_sobre_el_minimo(self):
+        """TEST 3a: gzip si el cliente lo acepta y el cuerpo supera el mínimo."""
+        cliente = _app_con_compresion()
+        r = cliente.get("/grande", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert int(r.headers["content-length"]) < len(json.dumps(r.json()))
+        assert "accept-encoding" in r.headers["vary"].lower()
+        assert r.json()["filas"][0] == {"id": 0, "nombre": "Factura 0"}
+
+    def test_sin_comprimir(self):
+        """TEST 3b: cuerpos pequeños o sin Accept-Encoding se envían tal cual."""
+        cliente = _app_con_compresion()
+        assert "content-encoding" not in cliente.get("/pequena", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in cliente.get("/grande", headers={"Accept-Encoding": "identity"}).headers
+
+    def test_negociacion_brotli(self):
+        """TEST 3c: br aceptado salvo q=0."""
+        assert _acepta_brotli("gzip, deflate, br")
+        assert _acepta_brotli("br;q=0.8, gzip")
+        assert not _acepta_brotli("gzip, br;q=0")
+        assert not _acepta_brotli("gzip, deflate")
+
+    def test_etag_debil_al_comprimir(self):
+        """TEST 4: el ETag fuerte es del cuerpo sin comprimir; comprimido va como W/."""
+        cache_respuestas.limpiar()
+        app = FastAPI(default_response_class=JSONRapidoResponse)
+
+        @app.get("/listado")
+        @respuesta_cacheable("test_listado_comprimido", por_usuario=False)
+        def listado():
+            return {"filas": [{"id": i, "nombre": f"Factura {i}"} for i in range(200)]}
+
+        app.add_middleware(CacheHTTPMiddleware)
+        app.add_middleware(CompresionMiddleware, minimo_bytes=500)
+        cliente = TestClient(app)
+
+        try:
+            comprimida = cliente.get("/listado", headers={"Accept-Encoding": "gzip"})
+            plana = cliente.get("/listado", headers={"Accept-Encoding": "identity"})
+            assert comprimida.headers["content-encoding"] == "gzip"
+            assert "content-encoding" not in plana.headers
+            assert comprimida.headers["etag"] == f"W/{plana.headers['etag']}"
+
+            r = cliente.get("/listado", headers={"Accept-Encoding": "gzip",
+                                                 "If-None-Match": comprimida.headers["etag"]})
+            assert r.status_code == 304
+            assert r.headers["etag"] == comprimida.headers["etag"]
+        finally:
+            cache_respuestas.limpiar()
@@ -0,0 +1,128 @@
+"""
+Test Suite: Resincronización masiva de responsables (admin/sincronizar-facturas)
+
+Verifica SincronizacionResponsablesService:
+
+1. Dry-run: cuenta el diff y retorna muestra sin escribir
+2. Aplicar por lotes: reasigna, ignora correctas, sincroniza accion_por
+3. Desempate determinista: con dos responsables para un NIT gana el de mayor id
+4. Idempotencia: una segunda ejecución no actualiza nada
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.services.sincronizacion_responsables import SincronizacionResponsablesService
+
+
+@pytest.fixture
+def escenario(db: Session):
+    """2 responsables, 3 proveedores, 12 facturas (commit real: el servicio confirma por lote)."""
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+
+    ana = Usuario(usuario="test_sync_ana", nombre="Ana Sync Test", email="test_sync_ana@test.com", role_id=rol.id)
+    beto = Usuario(usuario="test_sync_beto", nombre="Beto Sync Test", email="test_sync_beto@test.com", role_id=rol.id)
+    db.add_all([ana, beto])
+    db.flush()
+
+    proveedores = [Proveedor(nit=f"99999440{i}-1", razon_social=f"Proveedor Sync Test {i}") for i in range(3)]
+    db.add_all(proveedores)
+    db.flush()
+
+    # P0 → Ana; P1 → Ana y Beto (gana el mayor id); P2 → sin asignación
+    db.add_all([
+        AsignacionNitResponsable(nit=proveedores[0].nit, responsable_id=ana.id, activo=True),
+        AsignacionNitResponsable(nit=proveedores[1].nit, responsable_id=ana.id, activo=True),
+        AsignacionNitResponsable(nit=proveedores[1].nit, responsable_id=beto.id, activo=True),
+    ])
+
+    estados = [EstadoFactura.en_revision, EstadoFactura.aprobada, EstadoFactura.aprobada_auto,
+               EstadoFactura.rechazada]
+    facturas = []
+    for p, proveedor in enumerate(proveedores):
+        for i, estado in enumerate(estados):
+            facturas.append(Factura(
+                numero_factura=f"TEST-SYNC-{p}-{i}", cufe=f"CUFE-TEST-SYNC-{p}-{i}", fecha_emision=date.today(),
+                proveedor_id=proveedor.id, total_a_pagar=Decimal("100.00"), estado=estado,
+                responsable_id=ana.id if i == 0 else None, accion_por="Otro"
+            ))
+    db.add_all(facturas)
+    db.commit()
+
+    ids = [f.id for f in facturas]
+    yield {"ana": ana, "beto": beto, "proveedores": proveedores, "ids": ids}
+
+    db.rollback()
+    db.query(Factura).filter(Factura.id.in_(ids)).delete(synchronize_session=False)
+    db.query(AsignacionNitResponsable).filter(
+        AsignacionNitResponsable.responsable_id.in_([ana.id, beto.id])
+    ).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id.in_([p.id for p in proveedores])).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.id.in_([ana.id, beto.id])).delete(synchronize_session=False)
+    db.commit()
+
+
+def _sincronizar(db, escenario, **kwargs):
+    servicio = SincronizacionResponsablesService(db)
+    return servicio.sincronizar(proveedor_ids=[p.id for p in escenario["proveedores"]], tamano_lote=5, **kwargs)
+
+
+class TestSincronizacionResponsables:
+
+    def test_dry_run_no_escribe(self, db: Session, escenario):
+        """TEST 1: diff y muestra sin modificar facturas."""
+        resultado = _sincronizar(db, escenario, simular=True)
+
+        # P0: 3 por actualizar + 1 correcta (Ana); P1: 4 por actualizar a Beto
+        assert resultado.total_actualizadas == 7
+        assert resultado.total_ignoradas == 1
+        assert resultado.por_responsable[escenario["beto"].id] == {"actualizadas": 4, "ignoradas": 0}
+        assert len(resultado.muestra) == 7
+        assert {m["responsable_nuevo_id"] for m in resultado.muestra} == {escenario["ana"].id, escenario["beto"].id}
+
+        db.expire_all()
+        assert db.query(Factura).filter(
+            Factura.id.in_(escenario["ids"]), Factura.responsable_id.is_(None)
+        ).count() == 9
+
+    def test_aplicar_por_lotes(self, db: Session, escenario):
+        """TEST 2 y 3: reasignación, desempate por mayor id y accion_por."""
+        progreso = []
+        resultado = _sincronizar(db, escenario, progreso=lambda n, total, r: progreso.append((n, total)))
+        assert resultado.total_actualizadas == 7
+        assert progreso and progreso[-1][0] == progreso[-1][1] == resultado.lotes
+
+        db.expire_all()
+        ana, beto = escenario["ana"], escenario["beto"]
+        por_numero = {f.numero_factura: f for f in db.query(Factura).filter(Factura.id.in_(escenario["ids"]))}
+
+        assert {por_numero[f"TEST-SYNC-1-{i}"].responsable_id for i in range(4)} == {beto.id}
+        assert {por_numero[f"TEST-SYNC-0-{i}"].responsable_id for i in range(4)} == {ana.id}
+        assert {por_numero[f"TEST-SYNC-2-{i}"].responsable_id for i in range(1, 4)} == {None}
+
+        # accion_por según factura_listeners
+        assert por_numero["TEST-SYNC-1-0"].accion_por is None  # en_revision
+        assert por_numero["TEST-SYNC-1-1"].accion_por == "Beto Sync Test"  # aprobada
+        assert por_numero["TEST-SYNC-1-2"].accion_por == "Sistema Automático"  # aprobada_auto
+        assert por_numero["TEST-SYNC-1-3"].accion_por == "Beto Sync Test"  # rechazada
+        # Sin cambio de responsable no se toca
+        assert por_numero["TEST-SYNC-0-0"].accion_por == "Otro"
+
+    def test_idempotente(self, db: Session, escenario):
+        """TEST 4: segunda ejecución sin cambios."""
+        _sincronizar(db, escenario)
+        resultado = _sincronizar(db, escenario)
+        assert resultado.total_actualizadas == 0
+        assert resultado.total_ignoradas == 8
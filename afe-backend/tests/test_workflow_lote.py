@@ -0,0 +1,206 @@
+"""
+Test Suite: Procesamiento de facturas nuevas por lotes
+
+Verifica que WorkflowAutomaticoService.procesar_facturas_nuevas_lote deja la
+base en el mismo estado que procesar_factura_nueva factura por factura:
+
+1. Mismas facturas por ambos caminos (grupo con dos responsables, grupo sin
+   responsables y sin grupo): mismos workflows (responsable, estado, NIT,
+   metadata), mismo estado, responsable y motivo_cuarentena de la factura
+2. El lote hace un commit para los workflows y otro para el análisis y las
+   notificaciones, no uno por factura
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.factura import EstadoFactura, Factura
+from app.models.grupo import Grupo, ResponsableGrupo
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
+from app.services.notificaciones_programadas import NotificacionesProgramadasService
+from app.services.workflow_automatico import WorkflowAutomaticoService
+
+NIT = "999996612-6"
+CASOS = ("CON_RESPONSABLES", "SIN_RESPONSABLES", "SIN_GRUPO")
+
+
+def _grupo(codigo: str) -> Grupo:
+    return Grupo(
+        nombre=f"GRUPO {codigo}", codigo_corto=codigo, nivel=1, ruta_jerarquica="",
+        correos_corporativos=[], activo=True, eliminado=False, creado_por="system_test"
+    )
+
+
+def _servicio(db: Session) -> WorkflowAutomaticoService:
+    """Servicio con comparador determinista y sin envío de correos."""
+    servicio = WorkflowAutomaticoService(db)
+    servicio.comparador = MagicMock()
+    servicio.comparador.comparar_factura_vs_historial.return_value = {
+        "items_analizados": 4, "items_ok": 3, "items_con_alertas": 1, "nuevos_items_count": 0,
+        "confianza": 75, "alertas": [{"tipo": "precio", "mensaje": "Variación", "severidad": "media"}]
+    }
+    servicio.notification_service = None
+    return servicio
+
+
+@pytest.fixture
+def escenario(db: Session, monkeypatch):
+    """Dos juegos idénticos de facturas nuevas, uno por camino (commit real)."""
+    monkeypatch.setattr(
+        NotificacionesProgramadasService, "notificar_nueva_factura",
+        lambda self, factura_id: {"success": True}
+    )
+    rol = db.query(Role).filter(Role.nombre == "responsable").first()
+    if not rol:
+        rol = Role(nombre="responsable")
+        db.add(rol)
+        db.flush()
+    usuarios = [
+        Usuario(usuario=f"test_wf_lote_{i}", nombre=f"Lote Test {i}",
+                email=f"test_wf_lote_{i}@test.com", role_id=rol.id, area=f"Area {i}")
+        for i in range(2)
+    ]
+    con_responsables, sin_responsables = _grupo("TEST_LOTE_A"), _grupo("TEST_LOTE_B")
+    proveedor = Proveedor(nit=NIT, razon_social="Proveedor Lote Test")
+    db.add_all(usuarios + [con_responsables, sin_responsables, proveedor])
+    db.flush()
+    db.add_all([
+        ResponsableGrupo(responsable_id=u.id, grupo_id=con_responsables.id, activo=True,
+                         asignado_por="system_test")
+        for u in usuarios
+    ])
+    db.add(AsignacionNitResponsable(nit=NIT, responsable_id=usuarios[0].id, activo=True))
+    db.commit()
+
+    grupo_por_caso = {
+        "CON_RESPONSABLES": con_responsables.id,
+        "SIN_RESPONSABLES": sin_responsables.id,
+        "SIN_GRUPO": None,
+    }
+    juegos = {}
+    for camino in ("individual", "lote"):
+        juegos[camino] = {
+            caso: Factura(
+                numero_factura=f"TEST-LOTE-{camino}-{caso}", cufe=f"CUFE-TEST-LOTE-{camino}-{caso}",
+                fecha_emision=date(2026, 9, 1), proveedor_id=proveedor.id,
+                grupo_id=grupo_por_caso[caso], total_a_pagar=Decimal("1190.00"),
+                estado=EstadoFactura.en_revision
+            )
+            for caso in CASOS
+        }
+        db.add_all(juegos[camino].values())
+    db.commit()
+
+    yield {k: {caso: f.id for caso, f in v.items()} for k, v in juegos.items()}
+
+    db.rollback()
+    ids = [f.id for juego in juegos.values() for f in juego.values()]
+    grupo_ids = [con_responsables.id, sin_responsables.id]
+    db.query(WorkflowAprobacionFactura).filter(
+        WorkflowAprobacionFactura.factura_id.in_(ids)
+    ).delete(synchronize_session=False)
+    db.query(Factura).filter(Factura.id.in_(ids)).delete(synchronize_session=False)
+    db.query(AsignacionNitResponsable).filter(AsignacionNitResponsable.nit == NIT).delete(
+        synchronize_session=False
+    )
+    db.query(ResponsableGrupo).filter(ResponsableGrupo.grupo_id.in_(grupo_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(Grupo).filter(Grupo.id.in_(grupo_ids)).delete(synchronize_session=False)
+    db.query(Proveedor).filter(Proveedor.id == proveedor.id).delete(synchronize_session=False)
+    db.query(Usuario).filter(Usuario.id.in_([u.id for u in usuarios])).delete(synchronize_session=False)
+    db.commit()
+
+
+def _resultado(db: Session, factura_id: int):
+    """Estado persistido de una factura y sus workflows, sin IDs ni fechas."""
+    factura = db.get(Factura, factura_id)
+    workflows = db.query(WorkflowAprobacionFactura).filter(
+        WorkflowAprobacionFactura.factura_id == factura_id
+    ).order_by(WorkflowAprobacionFactura.id.asc()).all()
+    return {
+        "estado": factura.estado,
+        "responsable_id": factura.responsable_id,
+        "motivo_cuarentena": factura.motivo_cuarentena,
+        "workflows": [
+            {
+                "responsable_id": wf.responsable_id,
+                "estado": wf.estado,
+                "nit_proveedor": wf.nit_proveedor,
+                "area_responsable": wf.area_responsable,
+                "metadata_workflow": wf.metadata_workflow,
+                "porcentaje_similitud": wf.porcentaje_similitud,
+                "criterios_comparacion": wf.criterios_comparacion,
+            }
+            for wf in workflows
+        ],
+    }
+
+
+class TestLoteEquivalenteAIndividual:
+    """Ambos caminos producen los mismos workflows, estados y cuarentenas."""
+
+    def test_mismo_resultado_por_ambos_caminos(self, db: Session, escenario):
+        """TEST 1: workflows, estado y metadata de cuarentena coinciden por caso."""
+        servicio = _servicio(db)
+        for factura_id in escenario["individual"].values():
+            servicio.procesar_factura_nueva(factura_id)
+
+        resultado = _servicio(db).procesar_facturas_nuevas_lote(list(escenario["lote"].values()))
+
+        assert resultado["errores"] == 0
+        assert (resultado["sin_grupo"], resultado["en_cuarentena"], resultado["enviadas_revision"]) == (1, 1, 1)
+
+        db.expire_all()
+        for caso in CASOS:
+            individual = _resultado(db, escenario["individual"][caso])
+            lote = _resultado(db, escenario["lote"][caso])
+            assert lote == individual, caso
+
+        con_responsables = _resultado(db, escenario["lote"]["CON_RESPONSABLES"])
+        assert len(con_responsables["workflows"]) == 2
+        assert con_responsables["workflows"][0]["porcentaje_similitud"] == Decimal("75.00")
+        cuarentena = _resultado(db, escenario["lote"]["SIN_RESPONSABLES"])
+        assert cuarentena["estado"] == EstadoFactura.en_cuarentena
+        assert cuarentena["motivo_cuarentena"] == "GRUPO_SIN_RESPONSABLES"
+        assert cuarentena["workflows"][0]["metadata_workflow"]["codigo_grupo"] == "TEST_LOTE_B"
+
+    def test_dos_commits_por_lote(self, db: Session, escenario, monkeypatch):
+        """TEST 2: el análisis por factura no hace commit propio."""
+        base = db.get(Factura, escenario["lote"]["CON_RESPONSABLES"])
+        extra = [
+            Factura(numero_factura=f"TEST-LOTE-EXTRA-{i}", cufe=f"CUFE-TEST-LOTE-EXTRA-{i}",
+                    fecha_emision=base.fecha_emision, proveedor_id=base.proveedor_id,
+                    grupo_id=base.grupo_id, total_a_pagar=base.total_a_pagar,
+                    estado=EstadoFactura.en_revision)
+            for i in range(3)
+        ]
+        db.add_all(extra)
+        db.commit()
+        ids = list(escenario["lote"].values()) + [f.id for f in extra]
+
+        commits = []
+        commit_original = db.commit
+        monkeypatch.setattr(db, "commit", lambda: (commits.append(1), commit_original())[1])
+        servicio = _servicio(db)
+        monkeypatch.setattr(servicio, "_asegurar_clasificacion_proveedor", lambda asignacion: None)
+
+        try:
+            resultado = servicio.procesar_facturas_nuevas_lote(ids)
+            assert resultado["enviadas_revision"] == 4
+            assert len(commits) == 2
+        finally:
+            monkeypatch.undo()
+            db.rollback()
+            db.query(WorkflowAprobacionFactura).filter(
+                WorkflowAprobacionFactura.factura_id.in_([f.id for f in extra])
+            ).delete(synchronize_session=False)
+            db.query(Factura).filter(Factura.id.in_([f.id for f in extra])).delete(synchronize_session=False)
+            db.commit()
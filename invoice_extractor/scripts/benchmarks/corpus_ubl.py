@@ -0,0 +1,442 @@
+"""
+Generador de corpus sintético de facturación electrónica DIAN (UBL 2.1).
+
+Produce Invoice y CreditNote, directos o envueltos en AttachedDocument con el
+documento en CDATA (el caso más común en los correos reales), con:
+
+- Número de líneas variable (1 + distribución geométrica, truncada).
+- Descuentos por línea (AllowanceCharge) y líneas exentas de IVA.
+- CustomFieldExtension con ValorTotalDocumento/Subtotal/Iva y, a veces,
+  TotalRetencion.
+- Retenciones como WithholdingTaxTotal (ReteFuente, ReteICA, ReteIVA) o
+  como CustomField TotalRetencion.
+- Extensiones DIAN y firma ds:Signature de relleno para tamaños realistas.
+
+Cada documento trae los valores `esperado` que el pipeline debe extraer
+(numero_factura, cufe, nit_proveedor, subtotal, iva, retenciones,
+total_a_pagar, lineas), de modo que el corpus sirve tanto para benchmark
+como para verificar que un cambio de rendimiento no altera los resultados.
+
+Uso:
+    python scripts/benchmarks/corpus_ubl.py --documentos 5000 --salida /tmp/corpus
+"""
+
+import argparse
+import base64
+import hashlib
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils.nit_utils import calcular_digito_verificador_nit, completar_nit_con_dv  # noqa: E402
+
+NS = {
+    "cbc": "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2",
+    "cac": "urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2",
+    "ext": "urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2",
+    "sts": "dian:gov:co:facturaelectronica:Structures-2-1",
+    "ds": "http://www.w3.org/2000/09/xmldsig#",
+}
+NS_DOCUMENTO = {
+    "Invoice": "urn:oasis:names:specification:ubl:schema:xsd:Invoice-2",
+    "CreditNote": "urn:oasis:names:specification:ubl:schema:xsd:CreditNote-2",
+    "AttachedDocument": "urn:oasis:names:specification:ubl:schema:xsd:AttachedDocument-2",
+}
+
+# (código DIAN, nombre, tarifa %, base: 'subtotal' | 'iva')
+RETENCIONES = (
+    ("06", "ReteRenta", Decimal("2.50"), "subtotal"),
+    ("07", "ReteICA", Decimal("0.966"), "subtotal"),
+    ("05", "ReteIVA", Decimal("15.00"), "iva"),
+)
+
+DESCRIPCIONES = (
+    "Servicio de soporte técnico mensual", "Licencia de software anual", "Arrendamiento de equipos de cómputo",
+    "Servicio de vigilancia privada", "Mantenimiento preventivo de aires acondicionados",
+    "Suministro de papelería y útiles", "Servicio de aseo y cafetería", "Transporte de mercancía",
+    "Honorarios consultoría profesional", "Hosting y almacenamiento en la nube", "Insumos médicos quirúrgicos",
+    "Plan de datos corporativo", "Reactivos de laboratorio clínico", "Alimentación pacientes hospitalizados",
+)
+
+CENTAVO = Decimal("0.01")
+CLIENTE_NIT = "900123456"
+
+
+def _dinero(valor: Decimal) -> str:
+    return str(valor.quantize(CENTAVO, rounding=ROUND_HALF_UP))
+
+
+def _redondear(valor: Decimal) -> Decimal:
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+@dataclass
+class ConfigCorpus:
+    """Proporciones y tamaños del corpus (valores por defecto ≈ buzón real)."""
+    documentos: int = 1000
+    proveedores: int = 50
+    proporcion_notas_credito: float = 0.05
+    proporcion_attached: float = 0.80
+    proporcion_custom_fields: float = 0.10
+    proporcion_retenciones: float = 0.30
+    proporcion_retencion_custom: float = 0.50
+    proporcion_descuentos: float = 0.15
+    lineas_promedio: float = 4.0
+    lineas_max: int = 300
+    bytes_firma: int = 3000
+    semilla: int = 20261018
+
+
+@dataclass
+class DocumentoSintetico:
+    """Documento generado y los valores que el pipeline debe extraer."""
+    nombre: str
+    tipo: str
+    envuelto: bool
+    contenido: bytes
+    esperado: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class _Linea:
+    descripcion: str
+    codigo: str
+    cantidad: int
+    precio: Decimal
+    descuento: Decimal
+    tarifa_iva: Decimal
+
+    @property
+    def subtotal(self) -> Decimal:
+        return _redondear(self.precio * self.cantidad - self.descuento)
+
+    @property
+    def iva(self) -> Decimal:
+        return _redondear(self.subtotal * self.tarifa_iva / 100)
+
+
+class GeneradorCorpus:
+    """Genera documentos UBL deterministas a partir de una semilla."""
+
+    def __init__(self, config: Optional[ConfigCorpus] = None):
+        self.config = config or ConfigCorpus()
+        self.rng = random.Random(self.config.semilla)
+        self.proveedores = [
+            (str(800_000_000 + self.rng.randrange(99_999_999)), f"PROVEEDOR SINTETICO {p} S.A.S.")
+            for p in range(self.config.proveedores)
+        ]
+        # Ley de potencias: pocos proveedores emiten la mayoría de facturas
+        self.pesos = [1 / (p + 1) ** 1.1 for p in range(self.config.proveedores)]
+        self.relleno_firma = base64.b64encode(
+            bytes(self.rng.getrandbits(8) for _ in range(self.config.bytes_firma * 3 // 4))
+        ).decode()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def documentos(self) -> Iterator[DocumentoSintetico]:
+        for indice in range(self.config.documentos):
+            yield self.documento(indice)
+
+    def documento(self, indice: int) -> DocumentoSintetico:
+        cfg = self.config
+        rng = self.rng
+        tipo = "CreditNote" if rng.random() < cfg.proporcion_notas_credito else "Invoice"
+        nit, razon_social = rng.choices(self.proveedores, weights=self.pesos)[0]
+        prefijo = "NC" if tipo == "CreditNote" else "FE"
+        numero = f"{prefijo}{indice + 1:07d}"
+        emision = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+        cufe = hashlib.sha384(f"{numero}{nit}{emision}{cfg.semilla}".encode()).hexdigest()
+
+        lineas = self._lineas()
+        subtotal = sum((linea.subtotal for linea in lineas), Decimal("0"))
+        iva = sum((linea.iva for linea in lineas), Decimal("0"))
+
+        retenciones: List[tuple] = []
+        retencion_custom = False
+        if tipo == "Invoice" and rng.random() < cfg.proporcion_retenciones:
+            for codigo, nombre, tarifa, base in rng.sample(RETENCIONES, rng.randint(1, len(RETENCIONES))):
+                monto_base = subtotal if base == "subtotal" else iva
+                if monto_base > 0:
+                    retenciones.append((codigo, nombre, tarifa, monto_base, _redondear(monto_base * tarifa / 100)))
+            retencion_custom = rng.random() < cfg.proporcion_retencion_custom
+        total_retenciones = sum((r[4] for r in retenciones), Decimal("0"))
+
+        custom_fields = retencion_custom or rng.random() < cfg.proporcion_custom_fields
+        payable = subtotal + iva
+
+        xml = self._documento_ubl(
+            tipo, numero, cufe, emision, nit, razon_social, lineas, subtotal, iva, payable,
+            retenciones, retencion_custom, custom_fields
+        )
+        envuelto = rng.random() < cfg.proporcion_attached
+        if envuelto:
+            xml = self._attached_document(numero, cufe, emision, nit, razon_social, xml)
+
+        return DocumentoSintetico(
+            nombre=f"{cufe}.xml",
+            tipo=tipo,
+            envuelto=envuelto,
+            contenido=xml.encode("utf-8"),
+            esperado={
+                "numero_factura": numero,
+                "cufe": cufe,
+                "nit_proveedor": completar_nit_con_dv(nit),
+                "subtotal": float(subtotal),
+                "iva": float(iva),
+                "retenciones": float(total_retenciones),
+                "total_a_pagar": float(payable - total_retenciones),
+                "lineas": len(lineas),
+            },
+        )
+
+    def escribir(self, directorio: Path) -> List[DocumentoSintetico]:
+        """Escribe el corpus como {cufe}.xml (nomenclatura de attachments.py)."""
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        documentos = []
+        for documento in self.documentos():
+            (directorio / documento.nombre).write_bytes(documento.contenido)
+            documento.contenido = b""  # no retener el corpus completo en memoria
+            documentos.append(documento)
+        return documentos
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    def _lineas(self) -> List[_Linea]:
+        cfg, rng = self.config, self.rng
+        p = 1 / cfg.lineas_promedio
+        cantidad_lineas = 1
+        while rng.random() > p and cantidad_lineas < cfg.lineas_max:
+            cantidad_lineas += 1
+        lineas = []
+        for _ in range(cantidad_lineas):
+            precio = _redondear(Decimal(str(rng.lognormvariate(11.5, 1.3))))
+            cantidad = rng.randint(1, 20)
+            descuento = Decimal("0")
+            if rng.random() < cfg.proporcion_descuentos:
+                descuento = _redondear(precio * cantidad * Decimal(rng.choice((5, 10, 15))) / 100)
+            lineas.append(_Linea(
+                descripcion=rng.choice(DESCRIPCIONES),
+                codigo=f"SKU-{rng.randrange(10_000):04d}",
+                cantidad=cantidad,
+                precio=precio,
+                descuento=descuento,
+                tarifa_iva=Decimal("0") if rng.random() < 0.1 else Decimal("19"),
+            ))
+        return lineas
+
+    def _extensiones(self, custom: Dict[str, Decimal]) -> str:
+        partes = [
+            "<ext:UBLExtensions>",
+            "<ext:UBLExtension><ext:ExtensionContent><sts:DianExtensions>"
+            "<sts:InvoiceControl><sts:InvoiceAuthorization>18760000001</sts:InvoiceAuthorization>"
+            "<sts:AuthorizationPeriod><cbc:StartDate>2026-01-01</cbc:StartDate>"
+            "<cbc:EndDate>2027-01-01</cbc:EndDate></sts:AuthorizationPeriod></sts:InvoiceControl>"
+            "<sts:SoftwareProvider><sts:ProviderID>900000000</sts:ProviderID>"
+            "<sts:SoftwareID>bench-software</sts:SoftwareID></sts:SoftwareProvider>"
+            "</sts:DianExtensions></ext:ExtensionContent></ext:UBLExtension>",
+        ]
+        if custom:
+            campos = "".join(
+                f"<CustomFieldExtension Name={quoteattr(nombre)} Value={quoteattr(_dinero(valor))}/>"
+                for nombre, valor in custom.items()
+            )
+            partes.append(
+                "<ext:UBLExtension><ext:ExtensionContent>"
+                f"<CustomFieldExtension>{campos}</CustomFieldExtension>"
+                "</ext:ExtensionContent></ext:UBLExtension>"
+            )
+        partes.append(
+            "<ext:UBLExtension><ext:ExtensionContent><ds:Signature Id=\"firma\"><ds:SignedInfo>"
+            "<ds:SignatureMethod Algorithm=\"http://www.w3.org/2001/04/xmldsig-more#rsa-sha256\"/>"
+            "</ds:SignedInfo>"
+            f"<ds:SignatureValue>{self.relleno_firma[:344]}</ds:SignatureValue>"
+            f"<ds:KeyInfo><ds:X509Data><ds:X509Certificate>{self.relleno_firma}</ds:X509Certificate>"
+            "</ds:X509Data></ds:KeyInfo></ds:Signature></ext:ExtensionContent></ext:UBLExtension>"
+            "</ext:UBLExtensions>"
+        )
+        return "".join(partes)
+
+    @staticmethod
+    def _parte(rol: str, nit: str, razon_social: str) -> str:
+        return (
+            f"<cac:{rol}><cac:Party>"
+            f"<cac:PartyName><cbc:Name>{escape(razon_social)}</cbc:Name></cac:PartyName>"
+            "<cac:PartyTaxScheme>"
+            f"<cbc:RegistrationName>{escape(razon_social)}</cbc:RegistrationName>"
+            f"<cbc:CompanyID schemeAgencyID=\"195\" schemeID=\"{calcular_digito_verificador_nit(nit)}\" "
+            f"schemeName=\"31\">{nit}</cbc:CompanyID>"
+            "<cbc:TaxLevelCode>O-13</cbc:TaxLevelCode>"
+            "<cac:TaxScheme><cbc:ID>01</cbc:ID><cbc:Name>IVA</cbc:Name></cac:TaxScheme>"
+            "</cac:PartyTaxScheme>"
+            f"<cac:PartyLegalEntity><cbc:RegistrationName>{escape(razon_social)}</cbc:RegistrationName>"
+            f"<cbc:CompanyID>{nit}</cbc:CompanyID></cac:PartyLegalEntity>"
+            f"</cac:Party></cac:{rol}>"
+        )
+
+    @staticmethod
+    def _impuesto(etiqueta: str, codigo: str, nombre: str, base: Decimal, tarifa: Decimal, monto: Decimal) -> str:
+        return (
+            f"<cac:{etiqueta}><cbc:TaxAmount currencyID=\"COP\">{_dinero(monto)}</cbc:TaxAmount>"
+            f"<cac:TaxSubtotal><cbc:TaxableAmount currencyID=\"COP\">{_dinero(base)}</cbc:TaxableAmount>"
+            f"<cbc:TaxAmount currencyID=\"COP\">{_dinero(monto)}</cbc:TaxAmount>"
+            f"<cac:TaxCategory><cbc:Percent>{tarifa}</cbc:Percent>"
+            f"<cac:TaxScheme><cbc:ID>{codigo}</cbc:ID><cbc:Name>{nombre}</cbc:Name></cac:TaxScheme>"
+            f"</cac:TaxCategory></cac:TaxSubtotal></cac:{etiqueta}>"
+        )
+
+    def _linea_xml(self, tipo: str, numero: int, linea: _Linea) -> str:
+        etiqueta = "CreditNoteLine" if tipo == "CreditNote" else "InvoiceLine"
+        cantidad = "CreditedQuantity" if tipo == "CreditNote" else "InvoicedQuantity"
+        descuento = ""
+        if linea.descuento:
+            descuento = (
+                "<cac:AllowanceCharge><cbc:ID>1</cbc:ID><cbc:ChargeIndicator>false</cbc:ChargeIndicator>"
+                f"<cbc:Amount currencyID=\"COP\">{_dinero(linea.descuento)}</cbc:Amount>"
+                f"<cbc:BaseAmount currencyID=\"COP\">{_dinero(linea.precio * linea.cantidad)}</cbc:BaseAmount>"
+                "</cac:AllowanceCharge>"
+            )
+        return (
+            f"<cac:{etiqueta}><cbc:ID>{numero}</cbc:ID>"
+            f"<cbc:{cantidad} unitCode=\"94\">{linea.cantidad}</cbc:{cantidad}>"
+            f"<cbc:LineExtensionAmount currencyID=\"COP\">{_dinero(linea.subtotal)}</cbc:LineExtensionAmount>"
+            f"{descuento}"
+            + self._impuesto("TaxTotal", "01", "IVA", linea.subtotal, linea.tarifa_iva, linea.iva)
+            + f"<cac:Item><cbc:Description>{escape(linea.descripcion)}</cbc:Description>"
+            f"<cac:SellersItemIdentification><cbc:ID>{linea.codigo}</cbc:ID></cac:SellersItemIdentification>"
+            f"<cac:StandardItemIdentification><cbc:ID schemeID=\"999\">{linea.codigo}</cbc:ID>"
+            "</cac:StandardItemIdentification>"
+            "<cac:AdditionalItemProperty><cbc:Name>Centro de costo</cbc:Name><cbc:Value>CC-100</cbc:Value>"
+            "</cac:AdditionalItemProperty></cac:Item>"
+            f"<cac:Price><cbc:PriceAmount currencyID=\"COP\">{_dinero(linea.precio)}</cbc:PriceAmount>"
+            f"<cbc:BaseQuantity unitCode=\"94\">1</cbc:BaseQuantity></cac:Price>"
+            f"</cac:{etiqueta}>"
+        )
+
+    def _documento_ubl(
+        self, tipo, numero, cufe, emision, nit, razon_social, lineas, subtotal, iva, payable,
+        retenciones, retencion_custom, custom_fields
+    ) -> str:
+        rng = self.rng
+        custom: Dict[str, Decimal] = {}
+        if custom_fields:
+            custom = {"ValorTotalDocumento": payable, "Subtotal": subtotal, "Iva": iva}
+        if retencion_custom:
+            custom["TotalRetencion"] = sum((r[4] for r in retenciones), Decimal("0"))
+
+        cabecera_tipo = (
+            "<cbc:CreditNoteTypeCode>91</cbc:CreditNoteTypeCode>" if tipo == "CreditNote"
+            else "<cbc:InvoiceTypeCode>01</cbc:InvoiceTypeCode>"
+        )
+        referencia = ""
+        if tipo == "CreditNote":
+            referencia = (
+                "<cac:DiscrepancyResponse><cbc:ReferenceID>FE0000001</cbc:ReferenceID>"
+                "<cbc:ResponseCode>2</cbc:ResponseCode><cbc:Description>Anulación de factura</cbc:Description>"
+                "</cac:DiscrepancyResponse><cac:BillingReference><cac:InvoiceDocumentReference>"
+                f"<cbc:ID>FE0000001</cbc:ID><cbc:UUID schemeName=\"CUFE-SHA384\">{'0' * 96}</cbc:UUID>"
+                "</cac:InvoiceDocumentReference></cac:BillingReference>"
+            )
+        orden = ""
+        if rng.random() < 0.3:
+            orden = (
+                f"<cac:OrderReference><cbc:ID>OC-{rng.randrange(100_000)}</cbc:ID>"
+                f"<cbc:IssueDate>{emision}</cbc:IssueDate></cac:OrderReference>"
+            )
+        retencion_xml = "" if retencion_custom else "".join(
+            self._impuesto("WithholdingTaxTotal", codigo, nombre, base, tarifa, monto)
+            for codigo, nombre, tarifa, base, monto in retenciones
+        )
+        namespaces = " ".join(f"xmlns:{prefijo}=\"{uri}\"" for prefijo, uri in NS.items())
+        return (
+            "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"no\"?>"
+            f"<{tipo} xmlns=\"{NS_DOCUMENTO[tipo]}\" {namespaces}>"
+            + self._extensiones(custom)
+            + "<cbc:UBLVersionID>UBL 2.1</cbc:UBLVersionID><cbc:CustomizationID>10</cbc:CustomizationID>"
+            "<cbc:ProfileExecutionID>1</cbc:ProfileExecutionID>"
+            f"<cbc:ID>{numero}</cbc:ID><cbc:UUID schemeID=\"1\" schemeName=\"CUFE-SHA384\">{cufe}</cbc:UUID>"
+            f"<cbc:IssueDate>{emision}</cbc:IssueDate><cbc:IssueTime>10:00:00-05:00</cbc:IssueTime>"
+            f"<cbc:DueDate>{emision + timedelta(days=30)}</cbc:DueDate>"
+            f"{cabecera_tipo}"
+            f"<cbc:Note>Documento sintético de benchmark {numero}</cbc:Note>"
+            "<cbc:DocumentCurrencyCode>COP</cbc:DocumentCurrencyCode>"
+            f"<cbc:LineCountNumeric>{len(lineas)}</cbc:LineCountNumeric>"
+            f"{referencia}{orden}"
+            + self._parte("AccountingSupplierParty", nit, razon_social)
+            + self._parte("AccountingCustomerParty", CLIENTE_NIT, "CLIENTE BENCHMARK S.A.")
+            + "<cac:PaymentMeans><cbc:ID>2</cbc:ID><cbc:PaymentMeansCode>42</cbc:PaymentMeansCode>"
+            f"<cbc:PaymentDueDate>{emision + timedelta(days=30)}</cbc:PaymentDueDate></cac:PaymentMeans>"
+            + self._impuesto("TaxTotal", "01", "IVA", subtotal, Decimal("19"), iva)
+            + retencion_xml
+            + "<cac:LegalMonetaryTotal>"
+            f"<cbc:LineExtensionAmount currencyID=\"COP\">{_dinero(subtotal)}</cbc:LineExtensionAmount>"
+            f"<cbc:TaxExclusiveAmount currencyID=\"COP\">{_dinero(subtotal)}</cbc:TaxExclusiveAmount>"
+            f"<cbc:TaxInclusiveAmount currencyID=\"COP\">{_dinero(payable)}</cbc:TaxInclusiveAmount>"
+            f"<cbc:PayableAmount currencyID=\"COP\">{_dinero(payable)}</cbc:PayableAmount>"
+            "</cac:LegalMonetaryTotal>"
+            + "".join(self._linea_xml(tipo, n, linea) for n, linea in enumerate(lineas, 1))
+            + f"</{tipo}>"
+        )
+
+    def _attached_document(self, numero, cufe, emision, nit, razon_social, documento: str) -> str:
+        namespaces = " ".join(f"xmlns:{prefijo}=\"{uri}\"" for prefijo, uri in NS.items())
+        respuesta_dian = (
+            "<?xml version=\"1.0\" encoding=\"utf-8\" standalone=\"no\"?>"
+            f"<ApplicationResponse xmlns:cbc=\"{NS['cbc']}\"><cbc:ID>{numero}</cbc:ID>"
+            "<cbc:ResponseCode>02</cbc:ResponseCode>"
+            "<cbc:Description>Documento validado por la DIAN</cbc:Description></ApplicationResponse>"
+        )
+        return (
+            "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"no\"?>"
+            f"<AttachedDocument xmlns=\"{NS_DOCUMENTO['AttachedDocument']}\" {namespaces}>"
+            "<cbc:UBLVersionID>UBL 2.1</cbc:UBLVersionID><cbc:CustomizationID>Documentos adjuntos</cbc:CustomizationID>"
+            f"<cbc:ID>{numero}</cbc:ID><cbc:IssueDate>{emision}</cbc:IssueDate>"
+            "<cbc:DocumentType>Contenedor de Factura Electrónica</cbc:DocumentType>"
+            f"<cbc:ParentDocumentID>{numero}</cbc:ParentDocumentID>"
+            f"<cac:SenderParty><cac:PartyTaxScheme><cbc:RegistrationName>{escape(razon_social)}"
+            f"</cbc:RegistrationName><cbc:CompanyID schemeID=\"{calcular_digito_verificador_nit(nit)}\">{nit}"
+            "</cbc:CompanyID></cac:PartyTaxScheme></cac:SenderParty>"
+            "<cac:ReceiverParty><cac:PartyTaxScheme><cbc:RegistrationName>CLIENTE BENCHMARK S.A."
+            f"</cbc:RegistrationName><cbc:CompanyID>{CLIENTE_NIT}</cbc:CompanyID></cac:PartyTaxScheme>"
+            "</cac:ReceiverParty>"
+            "<cac:Attachment><cac:ExternalReference><cbc:MimeCode>text/xml</cbc:MimeCode>"
+            "<cbc:EncodingCode>UTF-8</cbc:EncodingCode>"
+            f"<cbc:Description><![CDATA[{documento}]]></cbc:Description>"
+            "</cac:ExternalReference></cac:Attachment>"
+            f"<cac:ParentDocumentLineReference><cbc:LineID>1</cbc:LineID><cac:DocumentReference>"
+            f"<cbc:ID>{numero}</cbc:ID><cbc:UUID schemeName=\"CUFE-SHA384\">{cufe}</cbc:UUID>"
+            "<cac:Attachment><cac:ExternalReference><cbc:MimeCode>text/xml</cbc:MimeCode>"
+            f"<cbc:Description><![CDATA[{respuesta_dian}]]></cbc:Description>"
+            "</cac:ExternalReference></cac:Attachment></cac:DocumentReference>"
+            "</cac:ParentDocumentLineReference></AttachedDocument>"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documentos", type=int, default=1000)
+    parser.add_argument("--lineas-promedio", type=float, default=4.0)
+    parser.add_argument("--semilla", type=int, default=ConfigCorpus.semilla)
+    parser.add_argument("--salida", required=True, help="Directorio destino de los XML")
+    args = parser.parse_args()
+
+    config = ConfigCorpus(documentos=args.documentos, lineas_promedio=args.lineas_promedio, semilla=args.semilla)
+    documentos = GeneradorCorpus(config).escribir(Path(args.salida))
+    tamano = sum(f.stat().st_size for f in Path(args.salida).glob("*.xml"))
+    print(f"{len(documentos):,} documentos en {args.salida} ({tamano / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
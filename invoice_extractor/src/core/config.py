@@ -77,6 +77,13 @@ class Settings(BaseSettings):
     # Solo DATABASE_URL
     database_url: str = Field(..., alias="DATABASE_URL")
 
+    # Ingesta: workers > 1 reparte los batches en paralelo (una conexión por worker)
+    INGEST_WORKERS: int = 1
+
+    # Token de Graph compartido con afe-backend (mismo directorio; None = solo memoria)
+    GRAPH_TOKEN_CACHE_DIR: Optional[str] = None
+    GRAPH_TOKEN_MARGEN_REFRESCO: int = 300
+
     @field_validator("users", mode="before")
     @classmethod
     def ensure_users_list(cls, v):
@@ -131,10 +131,12 @@ def execute_ingest(cfg, logger) -> int:
             stats = ingest_service.ingest_to_db()
             
             # Verificar si hubo errores críticos
-            if stats['total_exitosas'] == 0 and stats['total_procesadas'] > 0:
+            # Las omitidas (sin cambios desde la última ingesta) no cuentan como fallo
+            ingestadas = stats['total_procesadas'] - stats['total_omitidas']
+            if stats['total_exitosas'] == 0 and ingestadas > 0:
                 logger.error(
                     "ADVERTENCIA: Ninguna factura fue ingestada exitosamente de %d procesadas",
-                    stats['total_procesadas']
+                    ingestadas
                 )
                 return EXIT_INGEST_ERROR
             
@@ -144,9 +146,10 @@ def execute_ingest(cfg, logger) -> int:
             logger.info("  Facturas procesadas: %d", stats['total_procesadas'])
             logger.info("  Facturas exitosas: %d", stats['total_exitosas'])
             logger.info("  Facturas fallidas: %d", stats['total_fallidas'])
+            logger.info("  Facturas sin cambios: %d", stats['total_omitidas'])
             
             if stats['total_fallidas'] > 0:
-                success_rate = (stats['total_exitosas'] / stats['total_procesadas']) * 100
+                success_rate = (stats['total_exitosas'] / ingestadas) * 100
                 logger.warning("  Tasa de éxito: %.2f%%", success_rate)
             
             # Mostrar progreso actual en DB
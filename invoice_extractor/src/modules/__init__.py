@@ -2,18 +2,21 @@
 """
 Módulo modules - Funcionalidades de integración con servicios externos.
 """
-from src.modules.auth import GraphAuth
+from src.modules.auth import GraphAuth, get_graph_auth
 from src.modules.email_reader import EmailReader
 from src.modules.graph_client import get_user_messages, get_message_attachments
 from src.modules.storage import LocalJSONWriter, WriterInterface
-from src.modules.attachments import save_attachment
+from src.modules.attachments import save_attachment, AttachmentStore, get_attachment_store
 
 __all__ = [
     'GraphAuth',
+    'get_graph_auth',
     'EmailReader',
     'get_user_messages',
     'get_message_attachments',
     'LocalJSONWriter',
     'WriterInterface',
     'save_attachment',
+    'AttachmentStore',
+    'get_attachment_store',
 ]
\ No newline at end of file
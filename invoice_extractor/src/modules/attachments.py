@@ -1,14 +1,63 @@
 # src/attachments.py
+"""
+Almacén de adjuntos direccionado por contenido.
+
+ARQUITECTURA (2026-10):
+=======================
+    adjuntos/
+        .objects/ab/cd/abcd...<sha256>.pdf   ← blob único por contenido (shard por prefijo)
+        .attachments.db                      ← índice SQLite único (todos los NITs)
+        <nit>/<cufe>.pdf                     ← vista con nomenclatura estándar (hardlink)
+        <nit>/<cufe>.xml
+
+- Cada contenido se escribe UNA vez (SHA-256); las vistas por NIT/CUFE son
+  hardlinks al blob (symlink o copia si el sistema de archivos no soporta
+  hardlinks). invoice_pdf_service sigue encontrando {CUFE}.pdf sin cambios.
+- El índice registra hash, NIT, CUFE, message id y nombre original. Guardar
+  un adjunto es un INSERT (O(1)), no reescribir un JSON completo por NIT.
+- PDFs sin CUFE ya no se guardan como temp_*: quedan en el índice sin CUFE y
+  al cerrar el lote del mensaje se vinculan al CUFE del XML del mismo correo.
+- `lote()` agrupa los registros de un mensaje en una sola transacción
+  (los blobs se escriben de inmediato; el índice se confirma al salir).
+
+El backend consulta el mismo índice (solo lectura) desde InvoicePDFService.
+"""
 from __future__ import annotations
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+import os
 import re
 import hashlib
-import json
-from typing import Union, Dict
+import shutil
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Union, Optional, List, Iterator, Tuple
 from src.utils.logger import logger
 
 ADJUNTOS_ROOT = Path("adjuntos")
-INDEX_FILENAME = ".attachments_index.json"
+OBJECTS_DIRNAME = ".objects"
+INDEX_DB_FILENAME = ".attachments.db"
+
+EXTENSIONES_ESTANDAR = ('.pdf', '.xml')
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS adjuntos (
+    sha256          TEXT NOT NULL,
+    nit             TEXT NOT NULL,
+    cufe            TEXT,
+    message_id      TEXT,
+    nombre_original TEXT,
+    extension       TEXT NOT NULL,
+    tamano          INTEGER NOT NULL,
+    vista           TEXT,
+    creado_en       TEXT NOT NULL,
+    PRIMARY KEY (nit, sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_adjuntos_cufe ON adjuntos (cufe);
+CREATE INDEX IF NOT EXISTS idx_adjuntos_message ON adjuntos (message_id);
+"""
 
 
 def _sanitize_folder_name(name: str) -> str:
@@ -19,218 +68,337 @@ def _sha256(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def _load_index(path: Path) -> Dict[str, str]:
-    if not path.exists():
-        return {}
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-
-def _save_index(path: Path, index: Dict[str, str]) -> None:
-    with open(path, "w", encoding="utf-8") as fh:
-        json.dump(index, fh, ensure_ascii=False, indent=2)
-
-def save_attachment(
-    content: Union[bytes, memoryview],
-    filename: str,
-    nit: str,
-    correo_id: str,
-    cufe: str = None
-) -> Path | None:
+class AttachmentStore:
     """
-    Guarda un adjunto en adjuntos/<nit>/ con nomenclatura ESTANDARIZADA.
-
-    ARQUITECTURA 2025-12-27:
-    ========================
-    - Si se provee CUFE → renombra a {CUFE}.{ext} (nomenclatura estándar)
-    - Si NO hay CUFE → guarda temporalmente con hash (se renombrará después)
-
-    Se deduplica por hash SHA256 del contenido.
-
-    Args:
-        content: Contenido del archivo en bytes
-        filename: Nombre original del archivo (del proveedor)
-        nit: NIT del proveedor
-        correo_id: ID del correo de origen
-        cufe: CUFE de la factura (opcional, pero REQUERIDO para nomenclatura estándar)
-
-    Returns:
-        Path del archivo guardado, o None si era duplicado
-
-    Ejemplos:
-        # XML con CUFE → Nomenclatura estándar
-        save_attachment(xml_bytes, "FACTURA.xml", "800136505", "msg123", cufe="08001365...")
-        Resultado: adjuntos/800136505/08001365050512500067543abc123def456.xml
+    Blob store por SHA-256 con índice SQLite embebido y vistas por CUFE.
 
-        # PDF sin CUFE → Temporal (se renombrará al procesar XML)
-        save_attachment(pdf_bytes, "DOC.pdf", "800136505", "msg123", cufe=None)
-        Resultado: adjuntos/800136505/temp_abc12345_DOC.pdf
+    Seguro para uso desde varios hilos: cada hilo usa su propia conexión y
+    su propio lote.
     """
-    nit_s = _sanitize_folder_name(nit)
-    folder = ADJUNTOS_ROOT / nit_s
-    folder.mkdir(parents=True, exist_ok=True)
-
-    index_path = folder / INDEX_FILENAME
-    index = _load_index(index_path)
 
-    content_bytes = bytes(content)
-    key = _sha256(content_bytes)
-
-    # === DEDUPLICACIÓN CON MIGRACIÓN AUTOMÁTICA ===
-    extension = Path(filename).suffix.lower()
-
-    if key in index:
-        existing_filename = index[key]
-        existing_path = folder / existing_filename
-
-        # Si el archivo existente tiene nomenclatura temporal Y ahora tenemos CUFE válido,
-        # RENOMBRAR al estándar profesional
-        if (existing_filename.startswith("temp_") and
-            cufe and
-            extension in ['.pdf', '.xml'] and
-            existing_path.exists()):
+    def __init__(self, root: Union[str, Path] = ADJUNTOS_ROOT):
+        self.root = Path(root)
+        self.objects_dir = self.root / OBJECTS_DIRNAME
+        self.index_path = self.root / INDEX_DB_FILENAME
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_ESQUEMA)
+            self._local.conn = conn
+            self._local.pendientes = None
+        return conn
+
+    @contextmanager
+    def lote(self, message_id: Optional[str] = None) -> Iterator["AttachmentStore"]:
+        """
+        Agrupa los adjuntos de un mensaje: los blobs se escriben al guardar y
+        los registros del índice se confirman en UNA transacción al salir.
+
+        Al salir, los PDFs del mensaje que quedaron sin CUFE se vinculan al
+        CUFE del XML del mismo mensaje (si hay exactamente uno).
+        """
+        self._conexion()
+        if self._local.pendientes is not None:
+            # Lote anidado: se integra al lote externo
+            yield self
+            return
+
+        self._local.pendientes = {}
+        try:
+            yield self
+            if message_id:
+                self._vincular_sin_cufe(message_id)
+            self._confirmar(self._local.pendientes)
+        finally:
+            self._local.pendientes = None
+
+    def _confirmar(self, pendientes: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        if not pendientes:
+            return
+        conn = self._conexion()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO adjuntos (sha256, nit, cufe, message_id, nombre_original, extension, "
+                "tamano, vista, creado_en) VALUES (:sha256, :nit, :cufe, :message_id, "
+                ":nombre_original, :extension, :tamano, :vista, :creado_en) "
+                "ON CONFLICT (nit, sha256) DO UPDATE SET "
+                "cufe = COALESCE(adjuntos.cufe, excluded.cufe), "
+                "vista = COALESCE(adjuntos.vista, excluded.vista)",
+                list(pendientes.values())
+            )
 
-            cufe_sanitized = cufe.lower().strip()
-            nuevo_nombre = f"{cufe_sanitized}{extension}"
-            nuevo_path = folder / nuevo_nombre
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def ruta_blob(self, sha256: str, extension: str = "") -> Path:
+        """adjuntos/.objects/ab/cd/<sha256><ext>"""
+        return self.objects_dir / sha256[:2] / sha256[2:4] / f"{sha256}{extension}"
+
+    def _escribir_blob(self, data: bytes, sha256: str, extension: str) -> Path:
+        blob = self.ruta_blob(sha256, extension)
+        if blob.exists():
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, blob)
+        return blob
+
+    def _crear_vista(self, blob: Path, nit: str, cufe: str, extension: str, sha256: str) -> Tuple[Path, bool]:
+        """
+        Crea adjuntos/<nit>/<cufe><ext> apuntando al blob.
+
+        Returns:
+            (ruta de la vista, True si se creó / False si ya existía con el mismo contenido)
+        """
+        folder = self.root / _sanitize_folder_name(nit)
+        folder.mkdir(parents=True, exist_ok=True)
+        cufe_sanitized = _sanitize_folder_name(cufe.lower().strip())
+        vista = folder / f"{cufe_sanitized}{extension}"
+
+        counter = 1
+        while vista.exists():
+            if _sha256(vista.read_bytes()) == sha256:
+                logger.info("📋 Archivo con mismo CUFE y contenido ya existe: %s", vista.name)
+                return vista, False
+            if counter == 1:
+                logger.error(
+                    "🚨 COLISIÓN CRÍTICA: CUFE %s... ya existe con contenido DIFERENTE. "
+                    "Esto NO debería ocurrir (CUFE debe ser único por factura).",
+                    cufe[:20]
+                )
+            vista = folder / f"{cufe_sanitized}_v{counter}{extension}"
+            counter += 1
 
-            # Renombrar archivo temporal a nomenclatura estándar
+        try:
+            os.link(blob, vista)
+        except OSError:
             try:
-                # Verificar si el archivo destino ya existe
-                if nuevo_path.exists():
-                    # Verificar si tienen el mismo contenido
-                    hash_destino = _sha256(nuevo_path.read_bytes())
-
-                    if hash_destino == key:
-                        # El archivo con nombre correcto ya existe con el mismo contenido
-                        # Eliminar el temp_* y actualizar índice
-                        existing_path.unlink()
-                        index[key] = nuevo_nombre
-                        _save_index(index_path, index)
-
-                        logger.info(
-                            "🔄 LIMPIADO: %s (archivo correcto %s ya existía)",
-                            existing_filename, nuevo_nombre
-                        )
-                        return nuevo_path
-                    else:
-                        # Contenido diferente - no debería pasar, pero por seguridad
-                        logger.error(
-                            "⚠️ CONFLICTO: %s existe pero con contenido diferente",
-                            nuevo_nombre
-                        )
-                        return existing_path if existing_path.exists() else None
-
-                # Si no existe, hacer el rename normal
-                existing_path.rename(nuevo_path)
-
-                # Actualizar índice con nuevo nombre
-                index[key] = nuevo_nombre
-                _save_index(index_path, index)
-
-                logger.info(
-                    "🔄 MIGRADO: %s → %s (hash=%s...)",
-                    existing_filename, nuevo_nombre, key[:8]
-                )
-                return nuevo_path
+                vista.symlink_to(blob.resolve())
+            except OSError:
+                shutil.copyfile(blob, vista)
+        return vista, True
+
+    def guardar(
+        self,
+        content: Union[bytes, memoryview],
+        filename: str,
+        nit: str,
+        message_id: str,
+        cufe: Optional[str] = None
+    ) -> Optional[Path]:
+        """
+        Guarda un adjunto (O(1): hash + blob + un registro en el índice).
+
+        Fuera de `lote()` el registro se confirma de inmediato.
+
+        Returns:
+            - Vista {CUFE}.{ext} si hay CUFE
+            - Ruta del blob si aún no hay CUFE (PDF suelto, ZIP, etc.)
+            - None si el contenido ya estaba registrado para el NIT
+        """
+        content_bytes = bytes(content)
+        return self._registrar(
+            _sha256(content_bytes), len(content_bytes), filename, nit, message_id, cufe,
+            lambda key, extension: self._escribir_blob(content_bytes, key, extension)
+        )
 
-            except Exception as e:
-                logger.error(
-                    "❌ Error renombrando %s a %s: %s",
-                    existing_filename, nuevo_nombre, e
+    def archivo_temporal(self) -> Path:
+        """Archivo temporal en el mismo sistema de archivos que los blobs."""
+        tmp_dir = self.objects_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, ruta = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        os.close(fd)
+        return Path(ruta)
+
+    def guardar_archivo(
+        self,
+        ruta_temporal: Path,
+        sha256: str,
+        tamano: int,
+        filename: str,
+        nit: str,
+        message_id: str,
+        cufe: Optional[str] = None
+    ) -> Optional[Path]:
+        """
+        Igual que `guardar`, para contenido ya volcado a `ruta_temporal` (de
+        `archivo_temporal()`) con su hash calculado. El temporal se mueve al
+        blob (sin copiar) o se elimina si el contenido ya existía.
+        """
+        try:
+            return self._registrar(
+                sha256, tamano, filename, nit, message_id, cufe,
+                lambda key, extension: self._mover_blob(ruta_temporal, key, extension)
+            )
+        finally:
+            if ruta_temporal.exists():
+                ruta_temporal.unlink()
+
+    def _mover_blob(self, ruta_temporal: Path, sha256: str, extension: str) -> Path:
+        blob = self.ruta_blob(sha256, extension)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(ruta_temporal, blob)
+        return blob
+
+    def _registrar(
+        self,
+        key: str,
+        tamano: int,
+        filename: str,
+        nit: str,
+        message_id: str,
+        cufe: Optional[str],
+        materializar: Callable[[str, str], Path]
+    ) -> Optional[Path]:
+        if getattr(self._local, "pendientes", None) is None:
+            with self.lote():
+                return self._registrar(key, tamano, filename, nit, message_id, cufe, materializar)
+
+        pendientes = self._local.pendientes
+        extension = Path(filename).suffix.lower()
+        cufe = cufe.lower().strip() if cufe and extension in EXTENSIONES_ESTANDAR else None
+
+        existente = pendientes.get((nit, key)) or self._conexion().execute(
+            "SELECT * FROM adjuntos WHERE nit = ? AND sha256 = ?", (nit, key)
+        ).fetchone()
+
+        if existente is not None:
+            # Duplicado; si antes no tenía CUFE y ahora sí, crear la vista estándar
+            if cufe and not existente["cufe"]:
+                fila = dict(existente)
+                vista, creada = self._crear_vista(
+                    self.ruta_blob(key, fila["extension"]), nit, cufe, fila["extension"], key
+                )
+                fila.update(cufe=cufe, vista=self._relativa(vista))
+                pendientes[(nit, key)] = fila
+                logger.info("🔄 VINCULADO: %s... → %s", key[:8], vista.name)
+                return vista if creada else None
+            logger.info(
+                "📋 Adjunto duplicado detectado para NIT=%s (hash=%s). Ya existe como %s",
+                nit, key[:8], existente["vista"] or key
+            )
+            return None
+
+        blob = materializar(key, extension)
+
+        vista, creada = None, True
+        if cufe:
+            # Si la vista ya existía con el mismo contenido (archivo previo al
+            # índice), solo se registra en el índice
+            vista, creada = self._crear_vista(blob, nit, cufe, extension, key)
+
+        pendientes[(nit, key)] = {
+            "sha256": key,
+            "nit": nit,
+            "cufe": cufe,
+            "message_id": message_id,
+            "nombre_original": filename,
+            "extension": extension,
+            "tamano": tamano,
+            "vista": self._relativa(vista),
+            "creado_en": datetime.now(timezone.utc).isoformat(),
+        }
+
+        if not creada:
+            return None
+
+        logger.info("💾 Archivo guardado: %s (hash=%s...)", (vista or blob).name, key[:8])
+        return vista or blob
+
+    def _vincular_sin_cufe(self, message_id: str) -> None:
+        """Asigna a los PDFs sin CUFE del mensaje el CUFE único de sus XML."""
+        filas = [f for f in self._local.pendientes.values() if f["message_id"] == message_id]
+
+        cufes = {f["cufe"] for f in filas if f["cufe"] and f["extension"] == ".xml"}
+        sin_cufe = [f for f in filas if not f["cufe"] and f["extension"] == ".pdf"]
+        if len(cufes) != 1 or not sin_cufe:
+            if sin_cufe and len(cufes) > 1:
+                logger.warning(
+                    "⚠️ Mensaje %s con %d CUFEs: PDFs sin CUFE quedan sin vincular",
+                    message_id, len(cufes)
                 )
-                # Si falla el renombre, continuar con el archivo existente
-                return existing_path if existing_path.exists() else None
+            return
 
-        # Archivo ya existe con nomenclatura correcta (no es temp_*)
-        logger.info(
-            "📋 Adjunto duplicado detectado para NIT=%s (hash=%s). Ya existe como %s",
-            nit, key[:8], existing_filename
-        )
-        return existing_path if existing_path.exists() else None
+        cufe = cufes.pop()
+        for fila in sin_cufe:
+            vista, _ = self._crear_vista(
+                self.ruta_blob(fila["sha256"], ".pdf"), fila["nit"], cufe, ".pdf", fila["sha256"]
+            )
+            fila.update(cufe=cufe, vista=self._relativa(vista))
+            logger.info("🔗 PDF %s vinculado a CUFE %s... (mensaje)", fila["sha256"][:8], cufe[:20])
 
-    # === NOMENCLATURA ESTANDARIZADA (2025-12-27) ===
-    # (extension ya definida arriba en línea 82)
+    def _relativa(self, path: Optional[Path]) -> Optional[str]:
+        if path is None:
+            return None
+        return path.relative_to(self.root).as_posix()
 
-    if cufe and extension in ['.pdf', '.xml']:
-        # ✅ NOMENCLATURA ESTÁNDAR: {CUFE}.{extension}
-        cufe_sanitized = cufe.lower().strip()
-        nombre_estandar = f"{cufe_sanitized}{extension}"
-        filepath = folder / nombre_estandar
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
 
-        logger.info(
-            "✅ Guardando con nomenclatura estándar: %s → %s",
-            filename, nombre_estandar
-        )
+    def buscar_por_cufe(self, cufe: str, extension: Optional[str] = None) -> List[sqlite3.Row]:
+        """Registros del índice para un CUFE (opcionalmente filtrados por extensión)."""
+        conn = self._conexion()
+        sql = "SELECT * FROM adjuntos WHERE cufe = ?"
+        params = [cufe.lower().strip()]
+        if extension:
+            sql += " AND extension = ?"
+            params.append(extension.lower())
+        return conn.execute(sql + " ORDER BY creado_en", params).fetchall()
 
-        # Detectar colisión (mismo CUFE, archivo ya existe)
-        if filepath.exists():
-            # Verificar si es el mismo contenido
-            existing_hash = _sha256(filepath.read_bytes())
 
-            if existing_hash == key:
-                # Mismo contenido, mismo CUFE → Es un duplicado legítimo
-                logger.info(
-                    "📋 Archivo con mismo CUFE y contenido ya existe: %s",
-                    nombre_estandar
-                )
-                index[key] = filepath.name
-                _save_index(index_path, index)
-                return None  # Ya existe, no guardar
-            else:
-                # ⚠️ COLISIÓN: Mismo CUFE pero contenido diferente (caso ANORMAL)
-                logger.error(
-                    "🚨 COLISIÓN CRÍTICA: CUFE %s... ya existe con contenido DIFERENTE. "
-                    "Esto NO debería ocurrir (CUFE debe ser único por factura).",
-                    cufe[:20]
-                )
-                # Agregar sufijo de versión para no perder datos
-                counter = 1
-                while filepath.exists():
-                    nombre_colision = f"{cufe_sanitized}_v{counter}{extension}"
-                    filepath = folder / nombre_colision
-                    counter += 1
+_default_store: Optional[AttachmentStore] = None
+_default_lock = threading.Lock()
 
-                logger.warning(
-                    "⚠️ Guardando versión alternativa: %s",
-                    filepath.name
-                )
 
-    else:
-        # ⚠️ FALLBACK: Sin CUFE o archivo no estándar (.zip, etc.)
-        # Guardar temporalmente con hash del contenido
-        if cufe is None and extension in ['.pdf', '.xml']:
-            # Archivo PDF/XML sin CUFE → Temporal (se renombrará después)
-            hash_prefix = key[:8]
-            nombre_temporal = f"temp_{hash_prefix}_{_sanitize_folder_name(filename)}"
-            filepath = folder / nombre_temporal
-
-            logger.warning(
-                "⚠️ Guardando temporalmente sin CUFE (tipo=%s): %s → %s",
-                extension, filename, nombre_temporal
-            )
-        else:
-            # Otros tipos de archivo (.zip, etc.) → Nombre sanitizado
-            filepath = folder / _sanitize_folder_name(filename)
-            counter = 1
-            while filepath.exists():
-                filepath = folder / f"{counter}_{_sanitize_folder_name(filename)}"
-                counter += 1
-
-            logger.debug(
-                "📦 Guardando archivo no estándar (tipo=%s): %s",
-                extension, filename
-            )
+def get_attachment_store() -> AttachmentStore:
+    """Instancia compartida sobre ADJUNTOS_ROOT."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AttachmentStore(ADJUNTOS_ROOT)
+        return _default_store
 
-    # === GUARDAR ARCHIVO ===
-    with open(filepath, "wb") as fh:
-        fh.write(content_bytes)
 
-    # Actualizar índice de deduplicación
-    index[key] = filepath.name
-    _save_index(index_path, index)
+def save_attachment(
+    content: Union[bytes, memoryview],
+    filename: str,
+    nit: str,
+    correo_id: str,
+    cufe: str = None
+) -> Path | None:
+    """
+    Guarda un adjunto en el almacén compartido (ver AttachmentStore.guardar).
 
-    logger.info("💾 Archivo guardado: %s (hash=%s...)", filepath.name, key[:8])
-    return filepath
+    Ejemplos:
+        # XML con CUFE → vista estándar
+        save_attachment(xml_bytes, "FACTURA.xml", "800136505", "msg123", cufe="08001365...")
+        Resultado: adjuntos/800136505/08001365050512500067543abc123def456.xml
+
+        # PDF sin CUFE → blob; se vincula al CUFE del XML al cerrar el lote del mensaje
+        save_attachment(pdf_bytes, "DOC.pdf", "800136505", "msg123", cufe=None)
+        Resultado: adjuntos/.objects/ab/cd/abcd....pdf
+    """
+    return get_attachment_store().guardar(content, filename, nit, correo_id, cufe=cufe)
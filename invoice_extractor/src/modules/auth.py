@@ -1,21 +1,90 @@
 # src/modules/auth.py
+"""
+Token de aplicación de Microsoft Graph (client credentials), compartido.
+
+Usa el mismo protocolo que afe-backend (app/services/graph_token_provider.py):
+
+- Una instancia por credenciales en el proceso (get_graph_auth)
+- Caché opcional en archivo (GRAPH_TOKEN_CACHE_DIR) con lock exclusivo: el
+  extractor y los workers del backend comparten el token si usan la misma
+  app registration y el mismo directorio
+- Renovación anticipada (margen_refresco) y, si falla, se usa el token
+  actual mientras siga vigente
+- Single-flight: una sola petición aunque varios hilos lo pidan a la vez
+
+    <dir>/<sha256(tenant|client_id|scope)[:32]>.json   {"access_token", "expires_at"}
+    <dir>/<...>.lock
+"""
 from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import threading
 import time
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, Tuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from src.utils.logger import logger
 
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+MARGEN_REFRESCO_SEGUNDOS = 300
+
+
+@contextmanager
+def _bloqueo_archivo(ruta: Path) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre `ruta` (bloqueante)."""
+    with open(ruta, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
 class GraphAuth:
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str, timeout: int = 30):
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str, timeout: int = 30,
+                 cache_dir: Optional[str] = None, margen_refresco: int = MARGEN_REFRESCO_SEGUNDOS,
+                 scope: str = GRAPH_SCOPE):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
         self.timeout = timeout
+        self.scope = scope
+        self.margen_refresco = margen_refresco
 
         self._token: Optional[str] = None
         self._expires_at: float = 0.0
+        self._lock = threading.Lock()
+        self.solicitudes = 0
+
+        self._archivo: Optional[Path] = None
+        if cache_dir:
+            try:
+                Path(cache_dir).mkdir(parents=True, exist_ok=True)
+                llave = hashlib.sha256(f"{tenant_id}|{client_id}|{scope}".encode("utf-8")).hexdigest()[:32]
+                self._archivo = Path(cache_dir) / f"{llave}.json"
+            except OSError as e:
+                logger.warning("Caché de tokens en archivo deshabilitada (%s): %s", cache_dir, e)
 
     def _session_with_retries(self) -> requests.Session:
         s = requests.Session()
@@ -24,10 +93,11 @@ class GraphAuth:
         return s
 
     def _request_new_token(self) -> Dict[str, Any]:
+        self.solicitudes += 1
         url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
         data = {
             "client_id": self.client_id,
-            "scope": "https://graph.microsoft.com/.default",
+            "scope": self.scope,
             "client_secret": self.client_secret,
             "grant_type": "client_credentials",
         }
@@ -37,16 +107,93 @@ class GraphAuth:
         resp.raise_for_status()
         return resp.json()
 
+    def _vigente(self, token: Optional[str], expires_at: float, margen: float) -> bool:
+        return bool(token) and time.time() < expires_at - margen
+
     def get_token(self) -> str:
-        now = time.time()
-        if self._token and now < self._expires_at - 60:
+        if self._vigente(self._token, self._expires_at, self.margen_refresco):
             return self._token
-        data = self._request_new_token()
+        with self._lock:
+            if self._vigente(self._token, self._expires_at, self.margen_refresco):
+                return self._token
+            if self._archivo is None:
+                self._renovar()
+            else:
+                with _bloqueo_archivo(self._archivo.with_suffix(".lock")):
+                    token, expires_at = self._leer_archivo()
+                    if self._vigente(token, expires_at, self.margen_refresco):
+                        # Otro proceso (backend u otro extractor) ya lo renovó
+                        self._token, self._expires_at = token, expires_at
+                    else:
+                        if self._vigente(token, expires_at, 0) and expires_at > self._expires_at:
+                            self._token, self._expires_at = token, expires_at
+                        if self._renovar():
+                            self._escribir_archivo()
+            return self._token
+
+    def invalidar(self) -> None:
+        """Descarta el token actual (p.ej. tras un 401)."""
+        with self._lock:
+            descartado, self._token, self._expires_at = self._token, None, 0.0
+            if self._archivo is not None and descartado:
+                with _bloqueo_archivo(self._archivo.with_suffix(".lock")):
+                    if self._leer_archivo()[0] == descartado:
+                        try:
+                            self._archivo.unlink()
+                        except OSError:
+                            pass
+
+    def _renovar(self) -> bool:
+        """True si obtuvo token nuevo; False si falló pero el actual sigue vigente."""
+        try:
+            data = self._request_new_token()
+        except Exception as e:
+            if self._vigente(self._token, self._expires_at, 0):
+                logger.warning("Renovación anticipada del token falló; se usa el actual (%ds restantes): %s",
+                               int(self._expires_at - time.time()), e)
+                return False
+            raise
         access = data.get("access_token")
         expires = data.get("expires_in", 0)
         if not access:
             raise RuntimeError("No se obtuvo access_token")
         self._token = access
-        self._expires_at = now + int(expires)
+        self._expires_at = time.time() + int(expires)
         logger.info("Token obtenido; expira en %s segundos", expires)
-        return self._token
+        return True
+
+    def _leer_archivo(self) -> Tuple[Optional[str], float]:
+        try:
+            datos = json.loads(self._archivo.read_text(encoding="utf-8"))
+            return datos["access_token"], float(datos["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0.0
+
+    def _escribir_archivo(self) -> None:
+        try:
+            fd, temporal = tempfile.mkstemp(dir=str(self._archivo.parent), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"access_token": self._token, "expires_at": self._expires_at}, fh)
+            os.chmod(temporal, 0o600)
+            os.replace(temporal, self._archivo)
+        except OSError as e:
+            logger.warning("No se pudo guardar el token en %s: %s", self._archivo, e)
+
+
+_instancias: Dict[Tuple[str, str, str, str], GraphAuth] = {}
+_instancias_lock = threading.Lock()
+
+
+def get_graph_auth(tenant_id: str, client_id: str, client_secret: str, timeout: int = 30,
+                   cache_dir: Optional[str] = None,
+                   margen_refresco: int = MARGEN_REFRESCO_SEGUNDOS) -> GraphAuth:
+    """GraphAuth único por credenciales en el proceso (un secreto rotado crea otro)."""
+    huella = hashlib.sha256(client_secret.encode("utf-8")).hexdigest()
+    llave = (tenant_id, client_id, GRAPH_SCOPE, huella)
+    with _instancias_lock:
+        auth = _instancias.get(llave)
+        if auth is None:
+            auth = GraphAuth(tenant_id, client_id, client_secret, timeout=timeout,
+                             cache_dir=cache_dir, margen_refresco=margen_refresco)
+            _instancias[llave] = auth
+        return auth
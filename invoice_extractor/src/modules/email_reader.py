@@ -8,9 +8,19 @@ from datetime import datetime, timezone, timedelta
 
 from src.utils.logger import logger
 from src.utils.nit_utils import completar_nit_con_dv
-from src.modules.auth import GraphAuth
+from src.modules.auth import MARGEN_REFRESCO_SEGUNDOS, get_graph_auth
 from src.modules.graph_client import get_user_messages, get_message_attachments, get_attachment_content_binary
-from src.modules.attachments import save_attachment
+from src.modules.attachments import get_attachment_store
+from src.modules.zip_stream import (
+    MAX_TOTAL_DESCOMPRIMIDO,
+    MiembroZip,
+    ZipBombError,
+    abrir_zip,
+    emparejar_pdfs,
+    extraer_cufe,
+    validar_directorio_central,
+    volcar_miembro,
+)
 
 
 class EmailReader:
@@ -35,11 +45,14 @@ class EmailReader:
     
     def __init__(self, cfg: Dict[str, Any], timeout: int = 60):
         self.timeout = timeout
-        self.auth = GraphAuth(
+        # Token compartido por credenciales (y con el backend vía GRAPH_TOKEN_CACHE_DIR)
+        self.auth = get_graph_auth(
             cfg["TENANT_ID_CORREOS"],
             cfg["CLIENT_ID_CORREOS"],
             cfg["CLIENT_SECRET_CORREOS"],
             timeout=timeout,
+            cache_dir=cfg.get("GRAPH_TOKEN_CACHE_DIR"),
+            margen_refresco=cfg.get("GRAPH_TOKEN_MARGEN_REFRESCO") or MARGEN_REFRESCO_SEGUNDOS,
         )
 
         # Estadísticas de procesamiento
@@ -50,6 +63,9 @@ class EmailReader:
             'razones_rechazo': {}
         }
 
+        # Almacén de adjuntos por contenido (índice SQLite compartido)
+        self.store = get_attachment_store()
+
 
     def _extract_nit_base(self, nit: str) -> str:
         """
@@ -146,6 +162,21 @@ class EmailReader:
         
         return False, "Tipo de archivo no reconocido"
 
+    def _validate_member_header(self, header: bytes, filename: str) -> Tuple[bool, Optional[str]]:
+        """
+        Valida magic bytes con el primer bloque de un miembro de ZIP.
+
+        El tamaño se controla durante la lectura en streaming (zip_stream).
+        """
+        extension = self._get_file_extension(filename)
+        if extension == '.pdf':
+            if not header.startswith(self.MAGIC_BYTES['pdf']):
+                return False, "Archivo con extensión .pdf no contiene magic bytes de PDF"
+            return True, None
+        if extension == '.xml':
+            return self._validate_xml(header)
+        return False, f"Extensión no permitida: {extension}"
+
     def _get_file_extension(self, filename: str) -> str:
         """Obtiene la extensión del archivo en minúsculas."""
         import os
@@ -205,10 +236,9 @@ class EmailReader:
         # Validar que sea un ZIP válido intentando abrirlo
         try:
             with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                # Verificar que no esté corrupto
-                if zf.testzip() is not None:
-                    return False, "ZIP corrupto detectado"
-                
+                # Solo directorio central: el CRC de cada miembro se verifica
+                # al leerlo en streaming (_handle_zip), sin descomprimir dos veces
+
                 # Verificar que contenga archivos
                 if len(zf.namelist()) == 0:
                     return False, "ZIP vacío (sin archivos)"
@@ -268,34 +298,21 @@ class EmailReader:
             Retorna: "08001365050512500067543abc123def456"
         """
         try:
-            # Decodificar contenido a string
-            content_str = content.decode('utf-8', errors='ignore')
-
-            # Buscar tag <cbc:UUID> con regex
-            # Patrón: <cbc:UUID [atributos opcionales]>VALOR</cbc:UUID>
-            import re
-            pattern = r'<cbc:UUID[^>]*>([a-f0-9\-]+)</cbc:UUID>'
-            match = re.search(pattern, content_str, re.IGNORECASE)
-
-            if match:
-                # Normalizar CUFE: lowercase, sin guiones
-                cufe_raw = match.group(1)
-                cufe_normalized = cufe_raw.replace('-', '').lower().strip()
+            # Parser incremental: se detiene en el primer cbc:UUID sin
+            # decodificar ni parsear el resto del documento
+            cufe_normalized, _ = extraer_cufe(content)
 
+            if cufe_normalized:
                 logger.debug(
                     "✅ CUFE extraído rápidamente: %s... (longitud: %d)",
                     cufe_normalized[:20], len(cufe_normalized)
                 )
-
                 return cufe_normalized
 
             # No se encontró tag UUID
             logger.warning("⚠️ No se encontró tag <cbc:UUID> en XML")
             return None
 
-        except UnicodeDecodeError as e:
-            logger.warning("⚠️ Error decodificando XML como UTF-8: %s", e)
-            return None
         except Exception as e:
             logger.error("❌ Error extrayendo CUFE del XML: %s", e, exc_info=True)
             return None
@@ -378,7 +395,10 @@ class EmailReader:
                 )
                 continue
 
-            saved = self._process_attachments(attachments, nit, message_id, user_id, token)
+            # Una transacción del índice por mensaje; al cerrar se vinculan
+            # los PDFs sin CUFE al CUFE del XML del mismo correo
+            with self.store.lote(message_id):
+                saved = self._process_attachments(attachments, nit, message_id, user_id, token)
             saved_files.extend(saved)
             processed += 1
 
@@ -502,7 +522,7 @@ class EmailReader:
                         )
 
                 # Guardar con nomenclatura estándar (pasando CUFE si se extrajo)
-                path = save_attachment(content, safe_name, nit, message_id, cufe=cufe)
+                path = self.store.guardar(content, safe_name, nit, message_id, cufe=cufe)
                 if path:  # ignorar duplicados
                     logger.info("Saved %s", path)
                     saved.append(str(path))
@@ -515,14 +535,16 @@ class EmailReader:
 
     def _handle_zip(self, zip_bytes: bytes, nit: str, message_id: str, zip_name: str) -> List[str]:
         """
-        Maneja archivos ZIP con validación de seguridad y procesamiento por lotes.
+        Maneja archivos ZIP en una sola pasada y en streaming.
 
-        ESTRATEGIA (2025-12-27 - PROCESAMIENTO POR LOTES):
-        ===================================================
-        1. Extraer TODOS los archivos del ZIP en memoria
-        2. Identificar el XML y extraer el CUFE (fuente de verdad)
-        3. Usar ese CUFE para guardar AMBOS archivos (XML + PDF) con nomenclatura estándar
-        4. Garantizar atomicidad: Si hay PDF + XML, ambos se guardan con el mismo CUFE
+        ESTRATEGIA (2026-10 - STREAMING):
+        =================================
+        1. Validar límites anti zip-bomb con el directorio central
+        2. Volcar cada PDF/XML a un temporal del almacén en bloques de 64 KB,
+           calculando SHA-256 y (XML) CUFE con parser incremental en la misma
+           pasada; ningún miembro se mantiene completo en memoria
+        3. Emparejar PDF↔XML (CUFE único, nombre base o número de factura)
+        4. Registrar en el almacén moviendo los temporales (sin copiar)
 
         Args:
             zip_bytes: Contenido del ZIP
@@ -534,72 +556,76 @@ class EmailReader:
             List[str]: Rutas de archivos extraídos
         """
         saved: List[str] = []
+        miembros: List[MiembroZip] = []
 
         try:
-            with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
-                # FASE 1: Extraer TODOS los archivos del ZIP en memoria
-                archivos_zip = {}  # {nombre_sanitizado: contenido_bytes}
+            with abrir_zip(zip_bytes) as zf:
+                validar_directorio_central(zf)
+                restante = MAX_TOTAL_DESCOMPRIMIDO
 
+                # FASE 1: Volcar miembros (una sola lectura por miembro)
                 for inner in zf.infolist():
+                    if inner.is_dir():
+                        continue
                     safe_inner_name = self._sanitize_filename(inner.filename)
 
                     if not safe_inner_name.lower().endswith((".pdf", ".xml")):
                         logger.debug("Ignored file in ZIP: %s", safe_inner_name)
                         continue
 
-                    # Leer contenido
+                    temporal = self.store.archivo_temporal()
                     try:
-                        data = zf.read(inner)
-                    except Exception as exc:
-                        logger.warning(
-                            "Error reading %s from ZIP %s: %s",
-                            safe_inner_name, zip_name, exc
+                        miembro, leidos = volcar_miembro(
+                            zf, inner, temporal,
+                            lambda cabecera: self._validate_member_header(cabecera, safe_inner_name),
+                            restante
                         )
-                        continue
-
-                    # Validar contenido extraído
-                    is_valid, rejection_reason = self._validate_file_type(data, safe_inner_name)
-
-                    if not is_valid:
+                    except ZipBombError:
+                        temporal.unlink(missing_ok=True)
+                        raise
+                    except Exception as exc:
+                        temporal.unlink(missing_ok=True)
                         logger.warning(
                             "Archivo en ZIP rechazado '%s' (ZIP: %s): %s",
-                            safe_inner_name, zip_name, rejection_reason
+                            safe_inner_name, zip_name, exc
                         )
-                        self._register_rejection(f"En ZIP: {rejection_reason}")
+                        self._register_rejection(f"En ZIP: {exc}")
                         continue
 
-                    # Guardar en memoria para procesamiento por lotes
-                    archivos_zip[safe_inner_name] = data
-
-                # FASE 2: Identificar XML y extraer CUFE (fuente de verdad)
-                cufe_extraido = None
-
-                for nombre, contenido in archivos_zip.items():
-                    if nombre.lower().endswith(".xml"):
-                        cufe_extraido = self._extract_cufe_from_xml_quick(contenido)
-                        if cufe_extraido:
-                            logger.info(
-                                "✅ CUFE extraído de XML en ZIP: %s...",
-                                cufe_extraido[:20]
-                            )
-                            break  # Usar el primer XML con CUFE válido
-
-                # FASE 3: Guardar TODOS los archivos con el mismo CUFE
-                for nombre, contenido in archivos_zip.items():
-                    # Usar el CUFE extraído del XML para TODOS los archivos del ZIP
-                    # (incluyendo el PDF hermano)
-                    p = save_attachment(contenido, nombre, nit, message_id, cufe=cufe_extraido)
-                    if p:  # ignorar duplicados
-                        logger.info("Extracted %s from ZIP %s", p, zip_name)
-                        saved.append(str(p))
-                        self.stats['archivos_guardados'] += 1
+                    restante -= leidos
+                    miembro.nombre = safe_inner_name
+                    miembros.append(miembro)
+
+            # FASE 2: Emparejar PDFs con el CUFE de su XML
+            cufes_pdf = emparejar_pdfs(miembros)
+            cufes_xml = {m.cufe for m in miembros if m.extension == ".xml" and m.cufe}
+            if cufes_xml:
+                logger.info("✅ ZIP %s: %d CUFE(s) extraídos de XML", zip_name, len(cufes_xml))
+
+            # FASE 3: Registrar en el almacén (mueve cada temporal a su blob)
+            for miembro in miembros:
+                cufe = miembro.cufe if miembro.extension == ".xml" else cufes_pdf.get(miembro.nombre)
+                p = self.store.guardar_archivo(
+                    miembro.ruta_temporal, miembro.sha256, miembro.tamano,
+                    miembro.nombre, nit, message_id, cufe=cufe
+                )
+                if p:  # ignorar duplicados
+                    logger.info("Extracted %s from ZIP %s", p, zip_name)
+                    saved.append(str(p))
+                    self.stats['archivos_guardados'] += 1
 
+        except ZipBombError as exc:
+            logger.error("ZIP rechazado %s (mensaje %s): %s", zip_name, message_id, exc)
+            self._register_rejection("ZIP excede límites de descompresión")
         except zipfile.BadZipFile as exc:
             logger.error("Corrupt ZIP in message %s (nombre: %s): %s", message_id, zip_name, exc)
             self._register_rejection("ZIP corrupto")
         except Exception as exc:
             logger.error("Error processing ZIP %s: %s", zip_name, exc)
             self._register_rejection(f"Error procesando ZIP: {type(exc).__name__}")
+        finally:
+            for miembro in miembros:
+                miembro.ruta_temporal.unlink(missing_ok=True)
 
         return saved
 
@@ -0,0 +1,253 @@
+# src/modules/zip_stream.py
+"""
+Procesamiento de ZIPs en una sola pasada y en streaming.
+
+Cada miembro PDF/XML se lee en bloques de TAMANO_BLOQUE y en la misma pasada:
+- se escribe a un archivo temporal del almacén de adjuntos,
+- se calcula su SHA-256,
+- (XML) se alimenta un parser incremental de lxml que se detiene en el
+  primer cbc:UUID (CUFE) y su cbc:ID hermano (número de factura).
+
+Ningún miembro se mantiene completo en memoria. Límites anti zip-bomb:
+tamaño por miembro, tamaño total descomprimido, ratio de compresión y
+cantidad de miembros (verificados con el directorio central y durante la
+lectura, porque los tamaños declarados pueden mentir).
+
+El emparejamiento XML↔PDF de ZIPs con varias facturas se hace por nombre
+base (ad123.xml ↔ fv123.pdf, factura1.xml ↔ factura1.pdf) o por número de
+factura contenido en el nombre del PDF.
+"""
+from __future__ import annotations
+import hashlib
+import io
+import os
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from src.utils.logger import logger
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Límites anti zip-bomb
+MAX_MIEMBRO = 50 * 1024 * 1024          # igual a EmailReader.MAX_FILE_SIZE
+MAX_TOTAL_DESCOMPRIMIDO = 500 * 1024 * 1024
+MAX_RATIO_COMPRESION = 100
+MAX_MIEMBROS = 2000
+
+CBC_NS = "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2"
+_TAG_UUID = f"{{{CBC_NS}}}UUID"
+_TAG_ID = f"{{{CBC_NS}}}ID"
+_PATRON_UUID = re.compile(rb"<cbc:UUID[^>]*>([a-fA-F0-9\-]+)</cbc:UUID>")
+_PREFIJOS_DIAN = ("ad", "fv", "nc", "nd")
+
+
+class ZipBombError(Exception):
+    """El ZIP excede los límites de tamaño/ratio/miembros."""
+
+
+def normalizar_cufe(valor: str) -> str:
+    return valor.replace("-", "").lower().strip()
+
+
+class ExtractorCufeIncremental:
+    """
+    Parser incremental: recibe bloques de un XML y se detiene al encontrar
+    el primer cbc:UUID. Si el XML no es bien formado, continúa con un regex
+    sobre los bloques (con una cola corta para tags partidos entre bloques).
+    """
+
+    TAMANO_COLA = 512
+
+    def __init__(self):
+        self._parser = etree.XMLPullParser(
+            events=("end",), tag=_TAG_UUID, resolve_entities=False, no_network=True
+        )
+        self._cola = b""
+        self._error = False
+        self.cufe: Optional[str] = None
+        self.numero: Optional[str] = None
+
+    @property
+    def terminado(self) -> bool:
+        return self.cufe is not None
+
+    def alimentar(self, bloque: bytes) -> None:
+        if self.terminado:
+            return
+        ventana = self._cola + bloque
+        self._cola = ventana[-self.TAMANO_COLA:]
+        if self._error:
+            self._buscar_regex(ventana)
+            return
+        try:
+            self._parser.feed(bloque)
+            for _, elem in self._parser.read_events():
+                if elem.text and elem.text.strip():
+                    self.cufe = normalizar_cufe(elem.text)
+                    padre = elem.getparent()
+                    id_elem = padre.find(_TAG_ID) if padre is not None else None
+                    if id_elem is not None and id_elem.text:
+                        self.numero = id_elem.text.strip()
+                    self._parser = None
+                    return
+        except etree.XMLSyntaxError:
+            self._error = True
+            self._buscar_regex(ventana)
+
+    def _buscar_regex(self, datos: bytes) -> None:
+        match = _PATRON_UUID.search(datos)
+        if match:
+            self.cufe = normalizar_cufe(match.group(1).decode("ascii"))
+
+    def finalizar(self) -> Optional[str]:
+        return self.cufe
+
+
+def extraer_cufe(content: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """(CUFE, número de factura) de un XML completo, parseando solo hasta el UUID."""
+    extractor = ExtractorCufeIncremental()
+    vista = memoryview(content)
+    for inicio in range(0, len(vista), TAMANO_BLOQUE):
+        extractor.alimentar(bytes(vista[inicio:inicio + TAMANO_BLOQUE]))
+        if extractor.terminado:
+            break
+    return extractor.finalizar(), extractor.numero
+
+
+@dataclass
+class MiembroZip:
+    """Miembro PDF/XML ya volcado a un archivo temporal."""
+    nombre: str
+    extension: str
+    ruta_temporal: Path
+    sha256: str
+    tamano: int
+    cufe: Optional[str] = None
+    numero_factura: Optional[str] = None
+
+
+def validar_directorio_central(zf: zipfile.ZipFile) -> None:
+    """Límites anti zip-bomb con los tamaños declarados en el directorio central."""
+    miembros = zf.infolist()
+    if len(miembros) > MAX_MIEMBROS:
+        raise ZipBombError(f"ZIP con demasiados miembros: {len(miembros)} > {MAX_MIEMBROS}")
+    total = sum(m.file_size for m in miembros)
+    if total > MAX_TOTAL_DESCOMPRIMIDO:
+        raise ZipBombError(f"ZIP descomprimido excede el máximo: {total} > {MAX_TOTAL_DESCOMPRIMIDO}")
+
+
+def volcar_miembro(
+    zf: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    destino: Path,
+    validar_cabecera: Callable[[bytes], Tuple[bool, Optional[str]]],
+    restante_total: int
+) -> Tuple[MiembroZip, int]:
+    """
+    Escribe un miembro a `destino` en bloques, calculando hash y CUFE.
+
+    Returns:
+        (MiembroZip, bytes descomprimidos)
+
+    Raises:
+        ZipBombError: tamaño o ratio por encima de los límites
+        ValueError: cabecera inválida (magic bytes)
+    """
+    if info.file_size > MAX_MIEMBRO:
+        raise ZipBombError(f"Miembro excede tamaño máximo: {info.file_size} > {MAX_MIEMBRO}")
+    if info.compress_size and info.file_size / info.compress_size > MAX_RATIO_COMPRESION:
+        raise ZipBombError(
+            f"Ratio de compresión sospechoso: {info.file_size / info.compress_size:.0f}:1"
+        )
+
+    extension = os.path.splitext(info.filename.lower())[1]
+    extractor = ExtractorCufeIncremental() if extension == ".xml" else None
+    hasher = hashlib.sha256()
+    leidos = 0
+    limite = min(MAX_MIEMBRO, restante_total)
+
+    with zf.open(info) as origen, open(destino, "wb") as salida:
+        primero = True
+        while True:
+            bloque = origen.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            leidos += len(bloque)
+            if leidos > limite:
+                raise ZipBombError(f"Miembro excede el límite durante la lectura ({leidos} bytes)")
+            if primero:
+                es_valido, razon = validar_cabecera(bloque)
+                if not es_valido:
+                    raise ValueError(razon)
+                primero = False
+            hasher.update(bloque)
+            salida.write(bloque)
+            if extractor is not None:
+                extractor.alimentar(bloque)
+
+    if leidos == 0:
+        raise ValueError("Archivo vacío")
+
+    miembro = MiembroZip(
+        nombre=info.filename,
+        extension=extension,
+        ruta_temporal=destino,
+        sha256=hasher.hexdigest(),
+        tamano=leidos,
+    )
+    if extractor is not None:
+        miembro.cufe = extractor.finalizar()
+        miembro.numero_factura = extractor.numero
+    return miembro, leidos
+
+
+def _clave_nombre(nombre: str) -> str:
+    """Nombre base sin extensión ni prefijo DIAN (ad/fv/nc/nd) seguido de dígitos."""
+    base = os.path.splitext(os.path.basename(nombre).lower())[0]
+    for prefijo in _PREFIJOS_DIAN:
+        if base.startswith(prefijo) and base[len(prefijo):len(prefijo) + 1].isdigit():
+            return base[len(prefijo):]
+    return base
+
+
+def emparejar_pdfs(miembros: List[MiembroZip]) -> Dict[str, Optional[str]]:
+    """
+    CUFE para cada PDF del ZIP ({nombre_pdf: cufe | None}).
+
+    1. Un solo CUFE en el ZIP → todos los PDFs lo usan
+    2. Mismo nombre base que un XML (ignorando prefijos ad/fv/nc/nd)
+    3. Número de factura del XML contenido en el nombre del PDF (único)
+    """
+    xmls = [m for m in miembros if m.extension == ".xml" and m.cufe]
+    pdfs = [m for m in miembros if m.extension == ".pdf"]
+    cufes = {m.cufe for m in xmls}
+
+    if len(cufes) == 1:
+        cufe = next(iter(cufes))
+        return {p.nombre: cufe for p in pdfs}
+
+    por_nombre = {_clave_nombre(m.nombre): m.cufe for m in xmls}
+    resultado: Dict[str, Optional[str]] = {}
+    for pdf in pdfs:
+        cufe = por_nombre.get(_clave_nombre(pdf.nombre))
+        if cufe is None:
+            nombre_pdf = re.sub(r"[^a-z0-9]", "", pdf.nombre.lower())
+            candidatos = {
+                m.cufe for m in xmls
+                if m.numero_factura and re.sub(r"[^a-z0-9]", "", m.numero_factura.lower()) in nombre_pdf
+            }
+            if len(candidatos) == 1:
+                cufe = candidatos.pop()
+        if cufe is None and cufes:
+            logger.warning("⚠️ PDF %s sin XML emparejado en ZIP con %d facturas", pdf.nombre, len(cufes))
+        resultado[pdf.nombre] = cufe
+    return resultado
+
+
+def abrir_zip(zip_bytes: bytes) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(zip_bytes))
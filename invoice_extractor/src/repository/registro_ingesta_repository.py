@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import bindparam, text
+
+
+class RegistroIngestaRepository:
+    """
+    Huellas por CUFE de las facturas ya ingeridas (registro_ingesta_facturas).
+
+    La tabla la crea la migración registro_ingesta_2026_10_18 de afe-backend.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def obtener_huellas(self, cufes: Iterable[str]) -> Dict[str, str]:
+        """
+        {cufe: huella} de las facturas del lote ya ingeridas (una consulta).
+
+        Cruza con facturas: si la factura se borró, no aparece y se reingiere.
+        """
+        cufes = list({c for c in cufes if c})
+        if not cufes:
+            return {}
+        select_sql = text("""
+            SELECT r.cufe, r.huella
+            FROM registro_ingesta_facturas r
+            JOIN facturas f ON f.cufe = r.cufe
+            WHERE r.cufe IN :cufes
+        """).bindparams(bindparam("cufes", expanding=True))
+        return {cufe: huella for cufe, huella in self.session.execute(select_sql, {"cufes": cufes})}
+
+    def registrar(self, huellas: List[Tuple[str, str]]) -> None:
+        """Inserta o actualiza las huellas (executemany, misma transacción que las facturas)."""
+        if not huellas:
+            return
+        if self.session.get_bind().dialect.name == "mysql":
+            upsert = "ON DUPLICATE KEY UPDATE huella = VALUES(huella), actualizado_en = CURRENT_TIMESTAMP"
+        else:
+            upsert = "ON CONFLICT (cufe) DO UPDATE SET huella = excluded.huella, actualizado_en = CURRENT_TIMESTAMP"
+        insert_sql = text(f"""
+            INSERT INTO registro_ingesta_facturas (cufe, huella, actualizado_en)
+            VALUES (:cufe, :huella, CURRENT_TIMESTAMP)
+            {upsert}
+        """)
+        self.session.execute(insert_sql, [{"cufe": cufe, "huella": huella} for cufe, huella in huellas])
@@ -2,18 +2,54 @@
 """
 Servicio de automatización para extracción de facturas.
 Ejecuta el proceso de extracción 3 veces al día usando APScheduler.
+
+Con varias instancias del servicio, cada horario lo ejecuta una sola: la
+ejecución se reclama con el lease en BD compartido con afe-backend
+(leases_tareas_programadas). Si el servicio estuvo detenido durante un
+horario, al iniciar se ejecuta una vez para recuperarlo.
 """
 from __future__ import annotations
 import sys
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import create_engine
 from src.core.config import load_config
 from src.utils.logger import get_logger
+from src.utils.lease import LeaseDistribuido
 from src.core.app import App
 from src.services.ingest_service import IngestService
 
+NOMBRE_TRABAJO = "extraccion_facturas"
+# Horarios (hora local): 09:30, 13:00, 18:00
+HORARIOS = ((9, 30), (13, 0), (18, 0))
+JITTER_SEGUNDOS = 60
+LEASE_SEGUNDOS = 3600
+
+
+def _a_utc(fecha_local: datetime) -> datetime:
+    return fecha_local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def slot_programado(ahora: datetime) -> datetime:
+    """Horario programado más reciente <= ahora (hora local, sin jitter)."""
+    candidatos = [
+        datetime.combine(ahora.date() - timedelta(days=dias), datetime.min.time()).replace(hour=h, minute=m)
+        for dias in (0, 1) for h, m in HORARIOS
+    ]
+    return max(c for c in candidatos if c <= ahora)
+
+
+def proximo_slot(ahora: datetime) -> datetime:
+    """Próximo horario programado > ahora (hora local)."""
+    candidatos = [
+        datetime.combine(ahora.date() + timedelta(days=dias), datetime.min.time()).replace(hour=h, minute=m)
+        for dias in (0, 1) for h, m in HORARIOS
+    ]
+    return min(c for c in candidatos if c > ahora)
+
 
 class InvoiceExtractorScheduler:
     """Scheduler para automatizar la extracción de facturas"""
@@ -25,6 +61,7 @@ class InvoiceExtractorScheduler:
             self.logger = get_logger("Scheduler", self.config.LOG_LEVEL)
             self.scheduler = BlockingScheduler()
             self.execution_count = 0
+            self.lease = self._crear_lease()
 
             self.logger.info("=" * 80)
             self.logger.info("SERVICIO DE AUTOMATIZACIÓN DE EXTRACCIÓN DE FACTURAS INICIADO")
@@ -37,10 +74,46 @@ class InvoiceExtractorScheduler:
             print(f"ERROR CRÍTICO: No se pudo inicializar el scheduler: {exc}", file=sys.stderr)
             raise
 
+    def _crear_lease(self) -> Optional[LeaseDistribuido]:
+        """Lease en la BD de ingesta; sin BD el scheduler corre sin lock."""
+        try:
+            engine = create_engine(self.config.database_url, pool_pre_ping=True, pool_recycle=3600)
+            lease = LeaseDistribuido(engine)
+            self.ultimo_slot = lease.registrar(NOMBRE_TRABAJO, _a_utc(proximo_slot(datetime.now())))
+            self.logger.info(f"Lease distribuido activo ({lease.titular})")
+            return lease
+        except Exception as exc:
+            self.logger.warning(f"Lease distribuido no disponible, ejecución sin lock: {exc}")
+            self.ultimo_slot = None
+            return None
+
     def extract_invoices_job(self):
         """
         Trabajo principal que ejecuta la extracción de facturas.
         Este método es llamado por el scheduler automáticamente.
+
+        Solo ejecuta si esta instancia reclama el horario (slot) en el lease.
+        """
+        if self.lease is None:
+            self._run_extraction()
+            return
+
+        ahora = datetime.now()
+        slot = _a_utc(slot_programado(ahora))
+        with self.lease.ejecucion(
+            NOMBRE_TRABAJO, slot, LEASE_SEGUNDOS, _a_utc(proximo_slot(ahora))
+        ) as ejecucion:
+            if not ejecucion.ejecutar:
+                self.logger.info(f"Horario {slot} UTC ya reclamado por otra instancia; se omite")
+                return
+            ejecucion.error = self._run_extraction()
+
+    def _run_extraction(self) -> Optional[str]:
+        """
+        Ejecuta las fases de extracción e ingesta.
+
+        Returns:
+            None si fue exitosa, o el mensaje de error.
         """
         self.execution_count += 1
 
@@ -63,7 +136,7 @@ class InvoiceExtractorScheduler:
                     "No se procederá con la ingesta."
                 )
                 self._log_execution_summary(success=False, error="App falló")
-                return
+                return "App falló"
 
             self.logger.info("Descarga y extracción completada exitosamente")
 
@@ -76,10 +149,11 @@ class InvoiceExtractorScheduler:
             if ingest_result != 0:
                 self.logger.error(f"Ingesta finalizó con código de error: {ingest_result}")
                 self._log_execution_summary(success=False, error="Ingesta falló")
-                return
+                return "Ingesta falló"
 
             # Ejecución exitosa
             self._log_execution_summary(success=True)
+            return None
 
         except KeyboardInterrupt:
             self.logger.warning("\nEjecución interrumpida por el usuario (Ctrl+C)")
@@ -91,6 +165,7 @@ class InvoiceExtractorScheduler:
                 exc_info=True
             )
             self._log_execution_summary(success=False, error=str(exc))
+            return str(exc)
 
     def _execute_ingest(self) -> int:
         """
@@ -123,10 +198,12 @@ class InvoiceExtractorScheduler:
             stats = ingest_service.ingest_to_db()
 
             # Verificar resultados
-            if stats['total_exitosas'] == 0 and stats['total_procesadas'] > 0:
+            # Las omitidas (sin cambios desde la última ingesta) no cuentan como fallo
+            ingestadas = stats['total_procesadas'] - stats['total_omitidas']
+            if stats['total_exitosas'] == 0 and ingestadas > 0:
                 self.logger.error(
                     f"ADVERTENCIA: Ninguna factura fue ingestada exitosamente de "
-                    f"{stats['total_procesadas']} procesadas"
+                    f"{ingestadas} procesadas"
                 )
                 return 3
 
@@ -136,9 +213,10 @@ class InvoiceExtractorScheduler:
             self.logger.info(f"  Facturas procesadas: {stats['total_procesadas']}")
             self.logger.info(f"  Facturas exitosas: {stats['total_exitosas']}")
             self.logger.info(f"  Facturas fallidas: {stats['total_fallidas']}")
+            self.logger.info(f"  Facturas sin cambios: {stats['total_omitidas']}")
 
             if stats['total_fallidas'] > 0:
-                success_rate = (stats['total_exitosas'] / stats['total_procesadas']) * 100
+                success_rate = (stats['total_exitosas'] / ingestadas) * 100
                 self.logger.warning(f"  Tasa de éxito: {success_rate:.2f}%")
 
             # Mostrar estado actual de la DB
@@ -191,7 +269,7 @@ class InvoiceExtractorScheduler:
         # Ejecución a las 09:30 (9:30 AM)
         self.scheduler.add_job(
             self.extract_invoices_job,
-            trigger=CronTrigger(hour=9, minute=30),
+            trigger=CronTrigger(hour=9, minute=30, jitter=JITTER_SEGUNDOS),
             id='morning_extraction',
             name='Extracción matutina (09:30)',
             replace_existing=True
@@ -200,7 +278,7 @@ class InvoiceExtractorScheduler:
         # Ejecución a las 13:00 (1 PM)
         self.scheduler.add_job(
             self.extract_invoices_job,
-            trigger=CronTrigger(hour=13, minute=0),
+            trigger=CronTrigger(hour=13, minute=0, jitter=JITTER_SEGUNDOS),
             id='midday_extraction',
             name='Extracción mediodía (13:00)',
             replace_existing=True
@@ -209,12 +287,24 @@ class InvoiceExtractorScheduler:
         # Ejecución a las 18:00 (6 PM)
         self.scheduler.add_job(
             self.extract_invoices_job,
-            trigger=CronTrigger(hour=18, minute=0),
+            trigger=CronTrigger(hour=18, minute=0, jitter=JITTER_SEGUNDOS),
             id='evening_extraction',
             name='Extracción vespertina (18:00)',
             replace_existing=True
         )
 
+        # Recuperación: el horario más reciente no se ejecutó (servicio detenido)
+        slot = _a_utc(slot_programado(datetime.now()))
+        if self.ultimo_slot is not None and self.ultimo_slot < slot:
+            self.scheduler.add_job(
+                self.extract_invoices_job,
+                next_run_time=datetime.now() + timedelta(seconds=JITTER_SEGUNDOS),
+                id='catch_up_extraction',
+                name=f'Recuperación de ejecución perdida ({slot} UTC)',
+                replace_existing=True
+            )
+            self.logger.info(f"   Ejecución perdida ({slot} UTC): se recupera en {JITTER_SEGUNDOS}s")
+
         self.logger.info("\n CALENDARIO DE EJECUCIONES CONFIGURADO:")
         self.logger.info("   09:30 - Extracción matutina")
         self.logger.info("   13:00 - Extracción mediodía")
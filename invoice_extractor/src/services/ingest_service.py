@@ -1,10 +1,17 @@
 import os
 import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from src.core.config import load_config
 from src.services.factura_service import FacturaService
+from src.repository.registro_ingesta_repository import RegistroIngestaRepository
+from src.utils.deduplication import huella_factura
 from src.utils.logger import get_logger
 
 
@@ -18,24 +25,43 @@ class IngestService:
     - Logging detallado de progreso y errores
     - Manejo de excepciones granular
     - Estadísticas de ingesta al finalizar
+    - Registro de huellas por CUFE: las facturas sin cambios desde la última
+      ingesta se omiten (una consulta por batch, cero escrituras)
+    - Modo paralelo (INGEST_WORKERS > 1): los batches de todos los NITs se
+      reparten en un pool de workers, cada uno con su propia sesión/conexión
+    - Reintento de batches ante deadlock / lock wait timeout de MySQL
     """
     
     # Configuración de batch
     DEFAULT_BATCH_SIZE = 50
+
+    # Reintentos de un batch completo ante deadlock (1213) o lock wait timeout (1205)
+    MAX_REINTENTOS_DEADLOCK = 3
+    CODIGOS_DEADLOCK = (1213, 1205)
     
-    def __init__(self, cfg, batch_size: int = None):
+    def __init__(self, cfg, batch_size: int = None, workers: int = None):
         self.cfg = cfg
         self.logger = get_logger("IngestService")
         self.output_dir = getattr(cfg, "OUTPUT_DIR", "output")
         self.batch_size = batch_size or getattr(cfg, "INGEST_BATCH_SIZE", self.DEFAULT_BATCH_SIZE)
+        # Se desactiva solo si la tabla del registro no existe (migración pendiente)
+        self.usar_registro = getattr(cfg, "INGEST_LEDGER_ENABLED", True)
+        self.workers = max(1, workers or getattr(cfg, "INGEST_WORKERS", 1))
+
+        # Progreso agregado de todos los workers (ver get_ingest_progress)
+        self._progreso_lock = threading.Lock()
+        self._progreso = self._progreso_inicial()
         
         # Inicializar motor de base de datos
         try:
+            # Una conexión por worker: el pool por defecto (5) se amplía si hace falta
+            pool_kwargs = {"pool_size": self.workers} if self.workers > 5 else {}
             self.engine = create_engine(
                 cfg.database_url,
                 pool_pre_ping=True,  # Verificar conexiones antes de usar
                 pool_recycle=3600,   # Reciclar conexiones cada hora
-                echo=False           # Cambiar a True para debug SQL
+                echo=False,          # Cambiar a True para debug SQL
+                **pool_kwargs
             )
             self.Session = sessionmaker(bind=self.engine)
             self.logger.info("Motor de base de datos inicializado correctamente")
@@ -53,6 +79,7 @@ class IngestService:
                     'total_procesadas': int,
                     'total_exitosas': int,
                     'total_fallidas': int,
+                    'total_omitidas': int,  # sin cambios desde la última ingesta
                     'nits_procesados': list,
                     'errores': list
                 }
@@ -62,6 +89,7 @@ class IngestService:
             'total_procesadas': 0,
             'total_exitosas': 0,
             'total_fallidas': 0,
+            'total_omitidas': 0,
             'nits_procesados': [],
             'errores': []
         }
@@ -71,9 +99,9 @@ class IngestService:
             self.logger.warning("Directorio de salida no existe: %s", self.output_dir)
             return stats
         
-        # Listar todos los NITs con datos
-        nit_dirs = [d for d in os.listdir(self.output_dir) 
-                    if os.path.isdir(os.path.join(self.output_dir, d))]
+        # Listar todos los NITs con datos (orden estable entre ejecuciones)
+        nit_dirs = sorted(d for d in os.listdir(self.output_dir)
+                          if os.path.isdir(os.path.join(self.output_dir, d)))
         
         if not nit_dirs:
             self.logger.warning("No se encontraron directorios de NIT en: %s", self.output_dir)
@@ -81,14 +109,23 @@ class IngestService:
         
         self.logger.info("Iniciando ingesta de facturas. NITs encontrados: %d", len(nit_dirs))
         self.logger.info("Tamaño de batch configurado: %d facturas", self.batch_size)
+        self.logger.info("Workers de ingesta: %d", self.workers)
+        self._iniciar_progreso(len(nit_dirs))
         
+        # Modo paralelo: todos los batches se procesan antes de consolidar por NIT
+        resultados_paralelo = self._ingest_paralelo(nit_dirs) if self.workers > 1 else None
+
         # Procesar cada NIT
         for nit in nit_dirs:
             try:
-                nit_stats = self._ingest_nit(nit)
+                if resultados_paralelo is not None:
+                    nit_stats = resultados_paralelo[nit]
+                else:
+                    nit_stats = self._ingest_nit(nit)
                 stats['total_procesadas'] += nit_stats['procesadas']
                 stats['total_exitosas'] += nit_stats['exitosas']
                 stats['total_fallidas'] += nit_stats['fallidas']
+                stats['total_omitidas'] += nit_stats['omitidas']
                 stats['nits_procesados'].append(nit)
                 
                 if nit_stats['errores']:
@@ -107,6 +144,7 @@ class IngestService:
         self.logger.info("Facturas procesadas: %d", stats['total_procesadas'])
         self.logger.info("Facturas exitosas: %d", stats['total_exitosas'])
         self.logger.info("Facturas fallidas: %d", stats['total_fallidas'])
+        self.logger.info("Facturas sin cambios (omitidas): %d", stats['total_omitidas'])
         
         if stats['errores']:
             self.logger.warning("Errores encontrados: %d", len(stats['errores']))
@@ -116,33 +154,126 @@ class IngestService:
                 self.logger.warning("  ... y %d errores más", len(stats['errores']) - 10)
         
         self.logger.info("=" * 60)
+
+        with self._progreso_lock:
+            self._progreso['en_curso'] = False
+            self._progreso['fin'] = datetime.now().isoformat()
         
         return stats
 
-    def _ingest_nit(self, nit: str) -> dict:
+    def _ingest_paralelo(self, nit_dirs: list) -> dict:
         """
-        Ingesta facturas de un NIT específico con commits por batch.
-        
-        Args:
-            nit: Identificador del NIT a procesar
-            
+        Reparte los batches de todos los NITs entre `self.workers` workers.
+
+        Cada batch abre su propia sesión (una conexión del pool), así un NIT
+        grande se procesa en paralelo y no queda limitado por la latencia de
+        una sola conexión. Los consolidados se cargan a medida que hay cupo
+        en la cola (máximo 2 batches pendientes por worker) para no tener
+        todo el directorio de salida en memoria.
+
         Returns:
-            dict: Estadísticas de la ingesta del NIT
+            dict: {nit: nit_stats} con el mismo formato que _ingest_nit
         """
-        nit_stats = {
+        resultados = {}
+        pendientes = {}
+        max_pendientes = self.workers * 2
+
+        def recoger(bloquear: bool) -> None:
+            if not pendientes:
+                return
+            listos, _ = wait(list(pendientes), timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                nit, batch_number, tamaño = pendientes.pop(futuro)
+                try:
+                    batch_stats = futuro.result()
+                except Exception as exc:
+                    # _process_batch captura sus errores; esto solo cubre fallos al abrir sesión
+                    error_msg = f"NIT {nit} - Error en worker, Batch #{batch_number}: {exc}"
+                    self.logger.error(error_msg, exc_info=True)
+                    batch_stats = {'exitosas': 0, 'fallidas': tamaño, 'omitidas': 0, 'errores': [error_msg]}
+                self._acumular(resultados[nit], batch_stats)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest") as executor:
+            for nit in nit_dirs:
+                nit_stats = resultados[nit] = self._nit_stats_inicial()
+                facturas = self._cargar_consolidado(nit, nit_stats)
+                if not facturas:
+                    continue
+
+                total_facturas = len(facturas)
+                nit_stats['procesadas'] = total_facturas
+                self.logger.info("Procesando NIT %s: %d facturas encontradas", nit, total_facturas)
+
+                for batch_number, batch in self._dividir_batches(facturas):
+                    while len(pendientes) >= max_pendientes:
+                        recoger(bloquear=True)
+                    self._registrar_progreso(encolados=1)
+                    futuro = executor.submit(
+                        self._process_batch_aislado, batch, nit, batch_number, total_facturas
+                    )
+                    pendientes[futuro] = (nit, batch_number, len(batch))
+                recoger(bloquear=False)
+
+            while pendientes:
+                recoger(bloquear=True)
+
+        for nit in nit_dirs:
+            nit_stats = resultados[nit]
+            if nit_stats['procesadas']:
+                self.logger.info(
+                    "NIT %s completado: %d exitosas, %d fallidas, %d sin cambios de %d totales",
+                    nit, nit_stats['exitosas'], nit_stats['fallidas'], nit_stats['omitidas'],
+                    nit_stats['procesadas']
+                )
+        return resultados
+
+    def _process_batch_aislado(self, batch: list, nit: str, batch_number: int, total_facturas: int) -> dict:
+        """Procesa un batch en un worker con sesión propia."""
+        session = self.Session()
+        try:
+            return self._process_batch(
+                session, FacturaService(session), batch, nit, batch_number, total_facturas
+            )
+        finally:
+            session.close()
+
+    @staticmethod
+    def _nit_stats_inicial() -> dict:
+        return {
             'procesadas': 0,
             'exitosas': 0,
             'fallidas': 0,
+            'omitidas': 0,
             'errores': []
         }
-        
-        nit_path = os.path.join(self.output_dir, nit)
-        consolidado_path = os.path.join(nit_path, "consolidado.json")
+
+    @staticmethod
+    def _acumular(nit_stats: dict, batch_stats: dict) -> None:
+        nit_stats['exitosas'] += batch_stats['exitosas']
+        nit_stats['fallidas'] += batch_stats['fallidas']
+        nit_stats['omitidas'] += batch_stats['omitidas']
+        nit_stats['errores'].extend(batch_stats['errores'])
+
+    def _dividir_batches(self, facturas: list):
+        """Genera (batch_number, [(índice, factura), ...]) de tamaño self.batch_size."""
+        for inicio in range(0, len(facturas), self.batch_size):
+            batch = list(enumerate(facturas[inicio:inicio + self.batch_size], inicio + 1))
+            yield inicio // self.batch_size + 1, batch
+
+    def _cargar_consolidado(self, nit: str, nit_stats: dict):
+        """
+        Carga consolidado.json del NIT.
+
+        Returns:
+            list | None: Facturas del consolidado (None si no existe o es inválido;
+            los errores se agregan a nit_stats)
+        """
+        consolidado_path = os.path.join(self.output_dir, nit, "consolidado.json")
         
         # Verificar que existe el archivo consolidado
         if not os.path.exists(consolidado_path):
             self.logger.debug("No existe consolidado.json para NIT %s", nit)
-            return nit_stats
+            return None
         
         # Cargar facturas del consolidado
         try:
@@ -152,15 +283,31 @@ class IngestService:
             error_msg = f"Error parseando JSON del NIT {nit}: {exc}"
             self.logger.error(error_msg)
             nit_stats['errores'].append(error_msg)
-            return nit_stats
+            return None
         except Exception as exc:
             error_msg = f"Error leyendo consolidado del NIT {nit}: {exc}"
             self.logger.error(error_msg)
             nit_stats['errores'].append(error_msg)
-            return nit_stats
+            return None
         
         if not facturas:
             self.logger.debug("No hay facturas en consolidado del NIT %s", nit)
+            return None
+        return facturas
+
+    def _ingest_nit(self, nit: str) -> dict:
+        """
+        Ingesta facturas de un NIT específico con commits por batch.
+        
+        Args:
+            nit: Identificador del NIT a procesar
+            
+        Returns:
+            dict: Estadísticas de la ingesta del NIT
+        """
+        nit_stats = self._nit_stats_inicial()
+        facturas = self._cargar_consolidado(nit, nit_stats)
+        if not facturas:
             return nit_stats
         
         total_facturas = len(facturas)
@@ -171,35 +318,23 @@ class IngestService:
         factura_service = FacturaService(session)
         
         try:
-            batch = []
-            batch_number = 1
-            
-            for idx, factura in enumerate(facturas, 1):
-                nit_stats['procesadas'] += 1
-                batch.append((idx, factura))
-                
-                # Procesar batch cuando alcanza el tamaño configurado o es la última factura
-                if len(batch) >= self.batch_size or idx == total_facturas:
-                    batch_stats = self._process_batch(
-                        session, 
-                        factura_service, 
-                        batch, 
-                        nit, 
-                        batch_number,
-                        total_facturas
-                    )
-                    
-                    nit_stats['exitosas'] += batch_stats['exitosas']
-                    nit_stats['fallidas'] += batch_stats['fallidas']
-                    nit_stats['errores'].extend(batch_stats['errores'])
-                    
-                    # Limpiar batch para siguiente iteración
-                    batch = []
-                    batch_number += 1
+            for batch_number, batch in self._dividir_batches(facturas):
+                nit_stats['procesadas'] += len(batch)
+                self._registrar_progreso(encolados=1)
+                batch_stats = self._process_batch(
+                    session, 
+                    factura_service, 
+                    batch, 
+                    nit, 
+                    batch_number,
+                    total_facturas
+                )
+                self._acumular(nit_stats, batch_stats)
             
             self.logger.info(
-                "NIT %s completado: %d exitosas, %d fallidas de %d totales",
-                nit, nit_stats['exitosas'], nit_stats['fallidas'], nit_stats['procesadas']
+                "NIT %s completado: %d exitosas, %d fallidas, %d sin cambios de %d totales",
+                nit, nit_stats['exitosas'], nit_stats['fallidas'], nit_stats['omitidas'],
+                nit_stats['procesadas']
             )
             
         except Exception as exc:
@@ -220,10 +355,16 @@ class IngestService:
         batch: list, 
         nit: str,
         batch_number: int,
-        total_facturas: int
+        total_facturas: int,
+        intento: int = 1
     ) -> dict:
         """
         Procesa un batch de facturas con manejo de transacciones.
+
+        Las facturas se procesan ordenadas por CUFE: todos los workers toman
+        los locks en el mismo orden, lo que reduce los deadlocks. Si aun así
+        MySQL aborta la transacción por deadlock (InnoDB revierte el batch
+        completo), el batch se reintenta hasta MAX_REINTENTOS_DEADLOCK veces.
         
         Args:
             session: Sesión de SQLAlchemy
@@ -232,6 +373,7 @@ class IngestService:
             nit: NIT siendo procesado
             batch_number: Número del batch actual
             total_facturas: Total de facturas del NIT
+            intento: Número de intento (reintentos por deadlock)
             
         Returns:
             dict: Estadísticas del batch procesado
@@ -239,6 +381,7 @@ class IngestService:
         batch_stats = {
             'exitosas': 0,
             'fallidas': 0,
+            'omitidas': 0,
             'errores': []
         }
         
@@ -251,13 +394,30 @@ class IngestService:
             nit, batch_number, start_idx, end_idx, total_facturas, batch_size
         )
         
+        # Orden determinista de locks (sorted es estable: CUFEs repetidos conservan su orden)
+        ordenado = sorted(batch, key=lambda item: item[1].get('cufe') or '')
+
         try:
+            registro = RegistroIngestaRepository(session)
+            huellas = {idx: huella_factura(factura) for idx, factura in batch}
+            previas = self._huellas_previas(session, registro, [f.get('cufe') for _, f in batch], nit)
+            nuevas_huellas = []
+
             # Procesar cada factura del batch
-            for idx, factura in batch:
+            for idx, factura in ordenado:
+                cufe = factura.get('cufe')
+                if cufe and previas.get(cufe) == huellas[idx]:
+                    batch_stats['omitidas'] += 1
+                    continue
+
                 try:
                     cuenta_correo_id = factura.get('cuenta_correo_id')
                     factura_service.procesar_factura(factura, cuenta_correo_id=cuenta_correo_id)
                     batch_stats['exitosas'] += 1
+                    if cufe:
+                        nuevas_huellas.append((cufe, huellas[idx]))
+                        # CUFE repetido en el consolidado: la segunda copia se omite
+                        previas[cufe] = huellas[idx]
                     
                     # Log detallado solo en modo debug
                     self.logger.debug(
@@ -267,6 +427,9 @@ class IngestService:
                     )
                     
                 except Exception as exc:
+                    if self._es_deadlock(exc):
+                        # InnoDB ya revirtió la transacción: se reintenta el batch completo
+                        raise
                     batch_stats['fallidas'] += 1
                     error_msg = (
                         f"NIT {nit} - Error en factura {idx}/{total_facturas} "
@@ -280,10 +443,19 @@ class IngestService:
             
             # Commit del batch completo si hubo al menos una factura exitosa
             if batch_stats['exitosas'] > 0:
+                if self.usar_registro:
+                    registro.registrar(nuevas_huellas)
                 session.commit()
                 self.logger.info(
-                    "NIT %s - Batch #%d COMMIT exitoso: %d facturas guardadas",
-                    nit, batch_number, batch_stats['exitosas']
+                    "NIT %s - Batch #%d COMMIT exitoso: %d facturas guardadas, %d sin cambios",
+                    nit, batch_number, batch_stats['exitosas'], batch_stats['omitidas']
+                )
+            elif batch_stats['fallidas'] == 0:
+                # Todo el batch sin cambios: nada que escribir (solo cierra la lectura)
+                session.rollback()
+                self.logger.info(
+                    "NIT %s - Batch #%d sin cambios: %d facturas omitidas",
+                    nit, batch_number, batch_stats['omitidas']
                 )
             else:
                 # Si todas fallaron, hacer rollback
@@ -296,14 +468,24 @@ class IngestService:
         except SQLAlchemyError as exc:
             # Error de base de datos - hacer rollback
             session.rollback()
+            if self._es_deadlock(exc) and intento < self.MAX_REINTENTOS_DEADLOCK:
+                espera = 0.1 * intento + random.uniform(0, 0.1)
+                self.logger.warning(
+                    "NIT %s - Batch #%d: deadlock, reintento %d/%d en %.2fs",
+                    nit, batch_number, intento + 1, self.MAX_REINTENTOS_DEADLOCK, espera
+                )
+                time.sleep(espera)
+                return self._process_batch(
+                    session, factura_service, batch, nit, batch_number, total_facturas, intento + 1
+                )
             error_msg = (
                 f"NIT {nit} - Error de base de datos en Batch #{batch_number}: {exc}"
             )
             self.logger.error(error_msg, exc_info=True)
             batch_stats['errores'].append(error_msg)
             
-            # Marcar todas las facturas del batch como fallidas
-            batch_stats['fallidas'] = batch_size
+            # Marcar todas las facturas procesadas del batch como fallidas
+            batch_stats['fallidas'] = batch_size - batch_stats['omitidas']
             batch_stats['exitosas'] = 0
             
         except Exception as exc:
@@ -315,12 +497,75 @@ class IngestService:
             self.logger.error(error_msg, exc_info=True)
             batch_stats['errores'].append(error_msg)
             
-            # Marcar todas las facturas del batch como fallidas
-            batch_stats['fallidas'] = batch_size
+            # Marcar todas las facturas procesadas del batch como fallidas
+            batch_stats['fallidas'] = batch_size - batch_stats['omitidas']
             batch_stats['exitosas'] = 0
         
+        self._registrar_progreso(batch_stats=batch_stats)
         return batch_stats
 
+    @classmethod
+    def _es_deadlock(cls, exc: Exception) -> bool:
+        """True si es un deadlock (1213) o lock wait timeout (1205) de MySQL."""
+        if not isinstance(exc, SQLAlchemyError):
+            return False
+        args = getattr(getattr(exc, "orig", None), "args", None) or ()
+        return bool(args) and args[0] in cls.CODIGOS_DEADLOCK
+
+    @staticmethod
+    def _progreso_inicial() -> dict:
+        return {
+            'en_curso': False,
+            'workers': 0,
+            'inicio': None,
+            'fin': None,
+            'nits_total': 0,
+            'batches_encolados': 0,
+            'batches_completados': 0,
+            'exitosas': 0,
+            'fallidas': 0,
+            'omitidas': 0,
+        }
+
+    def _iniciar_progreso(self, nits_total: int) -> None:
+        with self._progreso_lock:
+            self._progreso = self._progreso_inicial()
+            self._progreso.update({
+                'en_curso': True,
+                'workers': self.workers,
+                'inicio': datetime.now().isoformat(),
+                'nits_total': nits_total,
+            })
+
+    def _registrar_progreso(self, encolados: int = 0, batch_stats: dict = None) -> None:
+        """Acumula el avance de cualquier worker (thread-safe)."""
+        with self._progreso_lock:
+            self._progreso['batches_encolados'] += encolados
+            if batch_stats is not None:
+                self._progreso['batches_completados'] += 1
+                for clave in ('exitosas', 'fallidas', 'omitidas'):
+                    self._progreso[clave] += batch_stats[clave]
+
+    def _huellas_previas(self, session, registro: RegistroIngestaRepository, cufes: list, nit: str) -> dict:
+        """
+        Huellas ya ingeridas de los CUFEs del batch ({} si el registro está inactivo).
+
+        Si la tabla no existe (migración de afe-backend pendiente) se desactiva
+        el registro para el resto de la ingesta y se procesa todo como antes.
+        """
+        if not self.usar_registro:
+            return {}
+        try:
+            return registro.obtener_huellas(cufes)
+        except SQLAlchemyError as exc:
+            session.rollback()
+            self.usar_registro = False
+            self.logger.warning(
+                "NIT %s - Registro de ingesta no disponible, se procesarán todas las facturas: %s",
+                nit, exc
+            )
+            return {}
+
     def verify_database_connection(self) -> bool:
         """
         Verifica que la conexión a la base de datos está activa.
@@ -349,7 +594,8 @@ class IngestService:
                 {
                     'total_facturas_db': int,
                     'facturas_por_nit': dict,
-                    'ultima_fecha_procesamiento': str
+                    'ultima_fecha_procesamiento': str,
+                    'ingesta': dict  # avance agregado de todos los workers
                 }
         """
         from sqlalchemy import text
@@ -359,6 +605,8 @@ class IngestService:
             'facturas_por_nit': {},
             'ultima_fecha_procesamiento': None
         }
+        with self._progreso_lock:
+            progress['ingesta'] = dict(self._progreso)
         
         try:
             session = self.Session()
@@ -34,6 +34,25 @@ def make_factura_key(factura: dict, keys=None) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+# Cambiar al modificar cómo FacturaService transforma el JSON: invalida las
+# huellas guardadas y fuerza una reingesta completa.
+VERSION_HUELLA = 1
+
+
+def huella_factura(factura: dict) -> str:
+    """
+    MD5 del contenido completo de la factura (JSON canónico).
+
+    Se guarda por CUFE en registro_ingesta_facturas; si no cambia, la
+    ingesta omite la factura.
+    """
+    s = json.dumps(
+        {"v": VERSION_HUELLA, "factura": factura},
+        sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False
+    )
+    return hashlib.md5(s.encode("utf-8")).hexdigest()
+
+
 def deduplicate_facturas(facturas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Devuelve una lista sin duplicados preservando la primera ocurrencia.
@@ -0,0 +1,150 @@
+# src/utils/lease.py
+"""
+Lease distribuido para el scheduler del extractor.
+
+Usa la misma tabla y el mismo protocolo que el scheduler cluster de
+afe-backend (leases_tareas_programadas): una ejecución programada (slot)
+solo la ejecuta la instancia que la reclama con un UPDATE condicional
+
+    lease vencido  AND  ultimo_slot < slot
+
+Así, con varias instancias del extractor, cada horario corre una sola vez, y
+el estado aparece en GET /api/v1/automation/scheduler/estado del backend.
+Todas las fechas son UTC naive.
+"""
+from __future__ import annotations
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from src.utils.logger import get_logger
+
+logger = get_logger("Lease")
+
+TABLA = "leases_tareas_programadas"
+
+
+def utc_ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class EjecucionLease:
+    """Resultado de reclamar un slot; `error` lo fija quien ejecuta."""
+    ejecutar: bool
+    error: Optional[str] = None
+
+
+class LeaseDistribuido:
+    """Reclamo/renovación/liberación de leases por trabajo."""
+
+    def __init__(self, engine: Engine, origen: str = "invoice_extractor", titular: Optional[str] = None):
+        self.engine = engine
+        self.origen = origen
+        self.titular = titular or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def registrar(self, nombre: str, proxima_ejecucion: Optional[datetime] = None) -> Optional[datetime]:
+        """Crea la fila del trabajo si no existe; retorna su ultimo_slot."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(f"INSERT INTO {TABLA} (nombre, origen, proxima_ejecucion) VALUES (:n, :o, :p)"),
+                    {"n": nombre, "o": self.origen, "p": proxima_ejecucion},
+                )
+        except IntegrityError:
+            if proxima_ejecucion is not None:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        text(f"UPDATE {TABLA} SET proxima_ejecucion = :p WHERE nombre = :n"),
+                        {"n": nombre, "p": proxima_ejecucion},
+                    )
+        with self.engine.connect() as conn:
+            valor = conn.execute(
+                text(f"SELECT ultimo_slot FROM {TABLA} WHERE nombre = :n"), {"n": nombre}
+            ).scalar()
+        # SQLite retorna texto; MySQL retorna datetime
+        if isinstance(valor, str):
+            valor = datetime.fromisoformat(valor)
+        return valor
+
+    def reclamar(self, nombre: str, slot: datetime, ttl_segundos: int) -> bool:
+        ahora = utc_ahora()
+        with self.engine.begin() as conn:
+            resultado = conn.execute(
+                text(
+                    f"UPDATE {TABLA} SET titular = :t, lease_expira_en = :exp, ultimo_slot = :slot, "
+                    f"ultimo_inicio = :ahora, ultimo_fin = NULL, ultimo_estado = 'en_ejecucion', "
+                    f"ultimo_error = NULL "
+                    f"WHERE nombre = :n "
+                    f"AND (lease_expira_en IS NULL OR lease_expira_en < :ahora) "
+                    f"AND (ultimo_slot IS NULL OR ultimo_slot < :slot)"
+                ),
+                {"t": self.titular, "exp": ahora + timedelta(seconds=ttl_segundos),
+                 "slot": slot, "ahora": ahora, "n": nombre},
+            )
+            return resultado.rowcount == 1
+
+    def renovar(self, nombre: str, ttl_segundos: int) -> bool:
+        with self.engine.begin() as conn:
+            resultado = conn.execute(
+                text(f"UPDATE {TABLA} SET lease_expira_en = :exp WHERE nombre = :n AND titular = :t"),
+                {"exp": utc_ahora() + timedelta(seconds=ttl_segundos), "n": nombre, "t": self.titular},
+            )
+            return resultado.rowcount == 1
+
+    def liberar(self, nombre: str, inicio: datetime, error: Optional[str] = None,
+                proxima_ejecucion: Optional[datetime] = None) -> None:
+        fin = utc_ahora()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"UPDATE {TABLA} SET lease_expira_en = NULL, ultimo_fin = :fin, "
+                    f"ultima_duracion_seg = :dur, ultimo_estado = :estado, ultimo_error = :error, "
+                    f"proxima_ejecucion = COALESCE(:proxima, proxima_ejecucion) "
+                    f"WHERE nombre = :n AND titular = :t"
+                ),
+                {"fin": fin, "dur": round((fin - inicio).total_seconds(), 3),
+                 "estado": "error" if error else "exitoso", "error": error[:500] if error else None,
+                 "proxima": proxima_ejecucion, "n": nombre, "t": self.titular},
+            )
+
+    @contextmanager
+    def ejecucion(self, nombre: str, slot: datetime, ttl_segundos: int = 3600,
+                  proxima_ejecucion: Optional[datetime] = None) -> Iterator[EjecucionLease]:
+        """
+        Context manager: reclama el slot y mantiene el lease con heartbeat.
+
+        `ejecucion.ejecutar` es False si otra instancia ya reclamó el slot.
+        """
+        if not self.reclamar(nombre, slot, ttl_segundos):
+            yield EjecucionLease(ejecutar=False)
+            return
+
+        inicio = utc_ahora()
+        ejecucion = EjecucionLease(ejecutar=True)
+        fin_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not fin_heartbeat.wait(max(ttl_segundos / 3, 1)):
+                if not self.renovar(nombre, ttl_segundos):
+                    logger.warning("Lease de '%s' perdido durante la ejecución", nombre)
+                    return
+
+        threading.Thread(target=heartbeat, name=f"heartbeat-{nombre}", daemon=True).start()
+        try:
+            yield ejecucion
+        except Exception as exc:
+            ejecucion.error = str(exc)
+            raise
+        finally:
+            fin_heartbeat.set()
+            self.liberar(nombre, inicio, ejecucion.error, proxima_ejecucion)
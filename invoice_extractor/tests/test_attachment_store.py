@@ -0,0 +1,51 @@
+import os
+
+from src.modules.attachments import AttachmentStore
+
+CUFE = "ABC123DEF456" * 4
+XML = b'<?xml version="1.0"?><Invoice><cbc:UUID>' + CUFE.encode() + b"</cbc:UUID></Invoice>"
+PDF = b"%PDF-1.4 contenido de prueba"
+
+
+def test_xml_con_cufe_crea_vista_hardlink(tmp_path):
+    store = AttachmentStore(tmp_path)
+    vista = store.guardar(XML, "FACTURA.xml", "800136505", "msg1", cufe=CUFE)
+
+    assert vista == tmp_path / "800136505" / f"{CUFE.lower()}.xml"
+    assert vista.read_bytes() == XML
+    blob = store.ruta_blob(store.buscar_por_cufe(CUFE)[0]["sha256"], ".xml")
+    assert os.path.samefile(vista, blob)
+
+
+def test_duplicado_retorna_none(tmp_path):
+    store = AttachmentStore(tmp_path)
+    assert store.guardar(XML, "FACTURA.xml", "800136505", "msg1", cufe=CUFE) is not None
+    assert store.guardar(XML, "otra_copia.xml", "800136505", "msg2", cufe=CUFE) is None
+    assert len(store.buscar_por_cufe(CUFE)) == 1
+
+
+def test_pdf_sin_cufe_se_vincula_al_xml_del_mensaje(tmp_path):
+    store = AttachmentStore(tmp_path)
+    with store.lote("msg1"):
+        store.guardar(PDF, "DOC.pdf", "800136505", "msg1")
+        store.guardar(XML, "FACTURA.xml", "800136505", "msg1", cufe=CUFE)
+
+    vista_pdf = tmp_path / "800136505" / f"{CUFE.lower()}.pdf"
+    assert vista_pdf.read_bytes() == PDF
+    assert not list((tmp_path / "800136505").glob("temp_*"))
+
+    registros = store.buscar_por_cufe(CUFE, ".pdf")
+    assert [r["nombre_original"] for r in registros] == ["DOC.pdf"]
+    assert registros[0]["vista"] == f"800136505/{CUFE.lower()}.pdf"
+
+
+def test_lote_con_error_no_registra(tmp_path):
+    store = AttachmentStore(tmp_path)
+    try:
+        with store.lote("msg1"):
+            store.guardar(XML, "FACTURA.xml", "800136505", "msg1", cufe=CUFE)
+            raise RuntimeError("fallo descargando adjunto")
+    except RuntimeError:
+        pass
+
+    assert store.buscar_por_cufe(CUFE) == []
@@ -0,0 +1,56 @@
+"""
+Corpus UBL sintético: los valores extraídos por InvoiceParserFacade deben
+coincidir con los que el generador declara como esperados.
+"""
+
+import logging
+
+import pytest
+
+from scripts.benchmarks.corpus_ubl import ConfigCorpus, GeneradorCorpus
+from src.facade.invoice_parser_facade import InvoiceParserFacade
+
+
+@pytest.fixture(autouse=True)
+def _sin_logs():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _extraer(tmp_path, documento):
+    ruta = tmp_path / documento.nombre
+    ruta.write_bytes(documento.contenido)
+    facade = InvoiceParserFacade(ruta)
+    assert facade.load()
+    return facade.extract()
+
+
+def test_corpus_deterministico_por_semilla():
+    a = [d.contenido for d in GeneradorCorpus(ConfigCorpus(documentos=5, semilla=7)).documentos()]
+    b = [d.contenido for d in GeneradorCorpus(ConfigCorpus(documentos=5, semilla=7)).documentos()]
+    assert a == b
+
+
+def test_corpus_cubre_variantes():
+    documentos = list(GeneradorCorpus(ConfigCorpus(documentos=200, proporcion_notas_credito=0.2)).documentos())
+
+    assert {d.tipo for d in documentos} == {"Invoice", "CreditNote"}
+    assert {d.envuelto for d in documentos} == {True, False}
+    assert any(b"TotalRetencion" in d.contenido for d in documentos)
+    assert any(b"WithholdingTaxTotal" in d.contenido for d in documentos)
+    assert any(d.esperado["lineas"] > 5 for d in documentos)
+
+
+def test_extraccion_coincide_con_esperado(tmp_path):
+    config = ConfigCorpus(documentos=60, proporcion_notas_credito=0.2, proporcion_retenciones=0.6)
+    for documento in GeneradorCorpus(config).documentos():
+        datos = _extraer(tmp_path, documento)
+        esperado = documento.esperado
+
+        for campo in ("numero_factura", "cufe", "nit_proveedor"):
+            assert datos[campo] == esperado[campo], (documento.nombre, campo)
+        for campo in ("subtotal", "iva", "retenciones", "total_a_pagar"):
+            assert datos[campo] == pytest.approx(esperado[campo], abs=0.011), (documento.nombre, campo)
+        if documento.tipo == "Invoice":
+            assert len(datos["items_resumen"]) == min(esperado["lineas"], 5)
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from src.modules.auth import GraphAuth, get_graph_auth
+
+
+class _TokenServer:
+    """Endpoint de tokens simulado: token-N, con demora opcional."""
+
+    def __init__(self, expires_in=3600, demora=0.0):
+        self.expires_in = expires_in
+        self.demora = demora
+        self.emitidos = 0
+        self.falla = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.demora:
+            time.sleep(self.demora)
+        if self.falla:
+            raise ConnectionError("login.microsoftonline.com no disponible")
+        with self._lock:
+            self.emitidos += 1
+            return {"access_token": f"token-{self.emitidos}", "expires_in": self.expires_in}
+
+
+def _auth(monkeypatch, servidor, **kwargs):
+    auth = GraphAuth("tenant", "client", "secret", **kwargs)
+    monkeypatch.setattr(auth, "_request_new_token", servidor)
+    return auth
+
+
+def test_instancia_unica_por_credenciales():
+    a = get_graph_auth("t-unica", "c", "s")
+    assert get_graph_auth("t-unica", "c", "s") is a
+    assert get_graph_auth("t-unica", "c", "s-rotado") is not a
+
+
+def test_renovacion_anticipada(monkeypatch):
+    servidor = _TokenServer(expires_in=3600)
+    auth = _auth(monkeypatch, servidor, margen_refresco=300)
+    assert auth.get_token() == "token-1"
+    assert auth.get_token() == "token-1"
+
+    # Quedan 200 s (< margen): se renueva antes de vencer
+    auth._expires_at = time.time() + 200
+    assert auth.get_token() == "token-2"
+
+    # Si la renovación falla y el token sigue vigente, se sigue usando
+    auth._expires_at = time.time() + 200
+    servidor.falla = True
+    assert auth.get_token() == "token-2"
+
+    auth._expires_at = time.time() - 1
+    with pytest.raises(ConnectionError):
+        auth.get_token()
+
+
+def test_single_flight(monkeypatch):
+    servidor = _TokenServer(demora=0.2)
+    auth = _auth(monkeypatch, servidor)
+
+    tokens = []
+    hilos = [threading.Thread(target=lambda: tokens.append(auth.get_token())) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert tokens == ["token-1"] * 8
+    assert servidor.emitidos == 1
+
+
+def test_cache_en_archivo_entre_procesos(monkeypatch, tmp_path):
+    servidor = _TokenServer()
+    # Dos instancias independientes = dos procesos con el mismo directorio
+    proceso_a = _auth(monkeypatch, servidor, cache_dir=str(tmp_path))
+    proceso_b = _auth(monkeypatch, servidor, cache_dir=str(tmp_path))
+
+    assert proceso_a.get_token() == "token-1"
+    assert proceso_b.get_token() == "token-1"
+    assert servidor.emitidos == 1
+    assert not [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+
+    # Un 401 en A descarta el token compartido; B lo renueva y A lo reutiliza
+    proceso_a.invalidar()
+    proceso_b._expires_at = 0.0
+    assert proceso_b.get_token() == "token-2"
+    assert proceso_a.get_token() == "token-2"
+    assert servidor.emitidos == 2
@@ -0,0 +1,112 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.services.factura_service import FacturaService
+from src.services.ingest_service import IngestService
+
+DDL = [
+    "CREATE TABLE facturas (id INTEGER PRIMARY KEY AUTOINCREMENT, cufe VARCHAR(100) UNIQUE, nit VARCHAR(20))",
+    "CREATE TABLE registro_ingesta_facturas (cufe VARCHAR(100) PRIMARY KEY, huella VARCHAR(32) NOT NULL, "
+    "actualizado_en DATETIME)",
+]
+
+
+def _escribir(output, nit, cufes):
+    (output / nit).mkdir()
+    facturas = [{"numero_factura": c, "cufe": c, "nit_proveedor": nit} for c in cufes]
+    (output / nit / "consolidado.json").write_text(json.dumps(facturas), encoding="utf-8")
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    """Output con 3 NITs y procesar_factura reemplazado por un INSERT mínimo."""
+    output = tmp_path / "output"
+    output.mkdir()
+    _escribir(output, "800000001", [f"C1-{n:02d}" for n in range(10)])
+    _escribir(output, "800000002", [f"C2-{n:02d}" for n in range(4)])
+    _escribir(output, "800000003", [f"C3-{n:02d}" for n in range(7, -1, -1)])
+
+    llamadas = []
+    hilos = set()
+    fallos = {}
+
+    def procesar_factura(self, factura_data, cuenta_correo_id=None):
+        hilos.add(threading.current_thread().name)
+        cufe = factura_data["cufe"]
+        if fallos.get(cufe):
+            fallos[cufe] -= 1
+            raise OperationalError("INSERT INTO facturas", {}, Exception(1213, "Deadlock found"))
+        llamadas.append(cufe)
+        self.factura_repo.session.execute(
+            text("INSERT INTO facturas (cufe, nit) VALUES (:cufe, :nit)"),
+            {"cufe": cufe, "nit": factura_data["nit_proveedor"]},
+        )
+
+    monkeypatch.setattr(FacturaService, "procesar_factura", procesar_factura)
+    monkeypatch.setattr(IngestService, "MAX_REINTENTOS_DEADLOCK", 3)
+
+    def crear(workers):
+        cfg = SimpleNamespace(
+            database_url=f"sqlite:///{tmp_path / 'ingesta.db'}?timeout=30", OUTPUT_DIR=str(output)
+        )
+        servicio = IngestService(cfg, batch_size=3, workers=workers)
+        with servicio.engine.begin() as conn:
+            for ddl in DDL:
+                conn.execute(text(ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS")))
+        return servicio
+
+    return SimpleNamespace(crear=crear, llamadas=llamadas, hilos=hilos, fallos=fallos)
+
+
+def test_paralelo_ingiere_todo_y_agrega_progreso(entorno):
+    servicio = entorno.crear(workers=3)
+    stats = servicio.ingest_to_db()
+
+    assert stats["total_procesadas"] == 22
+    assert stats["total_exitosas"] == 22 and stats["total_fallidas"] == 0
+    assert stats["nits_procesados"] == ["800000001", "800000002", "800000003"]
+    assert all(h.startswith("ingest") for h in entorno.hilos)
+    with servicio.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM facturas")).scalar() == 22
+
+    ingesta = servicio.get_ingest_progress()["ingesta"]
+    assert ingesta["en_curso"] is False and ingesta["workers"] == 3
+    assert ingesta["batches_encolados"] == ingesta["batches_completados"] == 4 + 2 + 3
+    assert ingesta["exitosas"] == 22
+
+    # Segunda ejecución: todo sin cambios
+    stats = servicio.ingest_to_db()
+    assert stats["total_omitidas"] == 22 and stats["total_exitosas"] == 0
+
+
+def test_orden_determinista_por_cufe(entorno):
+    servicio = entorno.crear(workers=1)
+    servicio.ingest_to_db()
+    nit3 = [c for c in entorno.llamadas if c.startswith("C3-")]
+    # Batches de 3 en orden del consolidado (7..0), cada uno ordenado por CUFE
+    assert nit3 == ["C3-05", "C3-06", "C3-07", "C3-02", "C3-03", "C3-04", "C3-00", "C3-01"]
+
+
+def test_deadlock_reintenta_el_batch(entorno):
+    entorno.fallos["C2-01"] = 2
+    servicio = entorno.crear(workers=2)
+    stats = servicio.ingest_to_db()
+
+    assert stats["total_exitosas"] == 22 and stats["total_fallidas"] == 0
+    with servicio.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM facturas")).scalar() == 22
+
+
+def test_deadlock_persistente_falla_solo_ese_batch(entorno):
+    entorno.fallos["C2-01"] = 10
+    servicio = entorno.crear(workers=2)
+    stats = servicio.ingest_to_db()
+
+    assert stats["total_fallidas"] == 3
+    assert stats["total_exitosas"] == 19
+    assert any("800000002" in e for e in stats["errores"])
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.utils.lease import LeaseDistribuido
+
+DDL = """
+CREATE TABLE leases_tareas_programadas (
+    nombre VARCHAR(100) PRIMARY KEY, origen VARCHAR(50), titular VARCHAR(150),
+    lease_expira_en DATETIME, ultimo_slot DATETIME, ultimo_inicio DATETIME, ultimo_fin DATETIME,
+    ultima_duracion_seg FLOAT, ultimo_estado VARCHAR(20), ultimo_error VARCHAR(500),
+    proxima_ejecucion DATETIME, actualizado_en DATETIME
+)
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(DDL))
+    return engine
+
+
+def test_un_slot_se_ejecuta_una_sola_vez(engine):
+    instancia_a = LeaseDistribuido(engine, titular="a")
+    instancia_b = LeaseDistribuido(engine, titular="b")
+    slot = datetime(2026, 1, 5, 14, 30)
+    assert instancia_a.registrar("extraccion_facturas") is None
+    instancia_b.registrar("extraccion_facturas")
+
+    with instancia_a.ejecucion("extraccion_facturas", slot) as ejecucion_a:
+        assert ejecucion_a.ejecutar
+        with instancia_b.ejecucion("extraccion_facturas", slot) as ejecucion_b:
+            assert not ejecucion_b.ejecutar
+
+    with instancia_b.ejecucion("extraccion_facturas", slot) as ejecucion_b:
+        assert not ejecucion_b.ejecutar
+    assert instancia_b.registrar("extraccion_facturas") == slot
+
+
+def test_error_queda_registrado(engine):
+    lease = LeaseDistribuido(engine, titular="a")
+    lease.registrar("extraccion_facturas")
+    slot = datetime(2026, 1, 5, 18, 0)
+
+    with lease.ejecucion("extraccion_facturas", slot, proxima_ejecucion=slot + timedelta(hours=15)) as ejecucion:
+        ejecucion.error = "Ingesta falló"
+
+    with engine.connect() as conn:
+        fila = conn.execute(text(
+            "SELECT ultimo_estado, ultimo_error, lease_expira_en FROM leases_tareas_programadas"
+        )).one()
+    assert fila == ("error", "Ingesta falló", None)
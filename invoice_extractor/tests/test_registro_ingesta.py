@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from src.services.factura_service import FacturaService
+from src.services.ingest_service import IngestService
+from src.utils.deduplication import huella_factura
+
+DDL = [
+    "CREATE TABLE facturas (id INTEGER PRIMARY KEY AUTOINCREMENT, cufe VARCHAR(100) UNIQUE, total_a_pagar VARCHAR(20))",
+    "CREATE TABLE registro_ingesta_facturas (cufe VARCHAR(100) PRIMARY KEY, huella VARCHAR(32) NOT NULL, "
+    "actualizado_en DATETIME)",
+]
+
+
+def _factura(n, total="100.00"):
+    return {"numero_factura": f"FE-{n}", "cufe": f"CUFE{n:04d}", "nit_proveedor": "900123456-7",
+            "total_a_pagar": total, "cuenta_correo_id": 1, "items_resumen": [{"descripcion": "Servicio"}]}
+
+
+def _escribir(output, nit, facturas):
+    (output / nit).mkdir(exist_ok=True)
+    (output / nit / "consolidado.json").write_text(json.dumps(facturas), encoding="utf-8")
+
+
+@pytest.fixture
+def ingesta(tmp_path, monkeypatch):
+    """IngestService sobre SQLite; procesar_factura se reemplaza por un upsert mínimo."""
+    output = tmp_path / "output"
+    output.mkdir()
+    cfg = SimpleNamespace(database_url=f"sqlite:///{tmp_path / 'ingesta.db'}", OUTPUT_DIR=str(output))
+    servicio = IngestService(cfg, batch_size=3)
+    with servicio.engine.begin() as conn:
+        for ddl in DDL:
+            conn.execute(text(ddl))
+
+    procesadas = []
+
+    def procesar_factura(self, factura_data, cuenta_correo_id=None):
+        procesadas.append(factura_data["cufe"])
+        self.factura_repo.session.execute(
+            text("INSERT INTO facturas (cufe, total_a_pagar) VALUES (:cufe, :total) "
+                 "ON CONFLICT (cufe) DO UPDATE SET total_a_pagar = excluded.total_a_pagar"),
+            {"cufe": factura_data["cufe"], "total": factura_data["total_a_pagar"]},
+        )
+
+    monkeypatch.setattr(FacturaService, "procesar_factura", procesar_factura)
+    return servicio, output, procesadas
+
+
+def test_huella_estable_y_sensible_al_contenido():
+    assert huella_factura({"a": 1, "b": [1, 2]}) == huella_factura({"b": [1, 2], "a": 1})
+    assert huella_factura(_factura(1)) != huella_factura(_factura(1, total="100.01"))
+
+
+def test_reingesta_sin_cambios_no_procesa(ingesta):
+    servicio, output, procesadas = ingesta
+    _escribir(output, "900123456", [_factura(n) for n in range(7)])
+
+    stats = servicio.ingest_to_db()
+    assert stats["total_exitosas"] == 7 and stats["total_omitidas"] == 0
+    assert len(procesadas) == 7
+
+    procesadas.clear()
+    stats = servicio.ingest_to_db()
+    assert stats["total_procesadas"] == 7
+    assert stats["total_exitosas"] == 0 and stats["total_omitidas"] == 7
+    assert procesadas == []
+
+
+def test_solo_cambiadas_y_nuevas(ingesta):
+    servicio, output, procesadas = ingesta
+    facturas = [_factura(n) for n in range(4)]
+    _escribir(output, "900123456", facturas)
+    servicio.ingest_to_db()
+
+    procesadas.clear()
+    facturas[2] = _factura(2, total="250.00")
+    _escribir(output, "900123456", facturas + [_factura(9)])
+    stats = servicio.ingest_to_db()
+
+    assert sorted(procesadas) == ["CUFE0002", "CUFE0009"]
+    assert stats["total_omitidas"] == 3
+    with servicio.engine.connect() as conn:
+        huella = conn.execute(text(
+            "SELECT huella FROM registro_ingesta_facturas WHERE cufe = 'CUFE0002'"
+        )).scalar()
+    assert huella == huella_factura(facturas[2])
+
+
+def test_factura_borrada_se_reingiere(ingesta):
+    servicio, output, procesadas = ingesta
+    _escribir(output, "900123456", [_factura(1), _factura(2)])
+    servicio.ingest_to_db()
+    with servicio.engine.begin() as conn:
+        conn.execute(text("DELETE FROM facturas WHERE cufe = 'CUFE0001'"))
+
+    procesadas.clear()
+    servicio.ingest_to_db()
+    assert procesadas == ["CUFE0001"]
+
+
+def test_sin_tabla_de_registro_procesa_todo(ingesta):
+    servicio, output, procesadas = ingesta
+    with servicio.engine.begin() as conn:
+        conn.execute(text("DROP TABLE registro_ingesta_facturas"))
+    _escribir(output, "900123456", [_factura(1), _factura(2)])
+
+    servicio.ingest_to_db()
+    servicio.ingest_to_db()
+    assert procesadas == ["CUFE0001", "CUFE0002"] * 2
+    assert servicio.usar_registro is False
@@ -0,0 +1,94 @@
+import io
+import zipfile
+
+import pytest
+
+from src.modules.attachments import AttachmentStore
+from src.modules.zip_stream import (
+    ExtractorCufeIncremental,
+    ZipBombError,
+    emparejar_pdfs,
+    extraer_cufe,
+    validar_directorio_central,
+    volcar_miembro,
+)
+
+CBC = "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2"
+
+
+def _xml(cufe: str, numero: str, relleno: int = 0) -> bytes:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Invoice xmlns:cbc="{CBC}"><cbc:ID>{numero}</cbc:ID><cbc:UUID schemeName="CUFE-SHA384">{cufe}</cbc:UUID>'
+        f'<cbc:Note>{"x" * relleno}</cbc:Note></Invoice>'
+    ).encode()
+
+
+def _zip(miembros: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in miembros.items():
+            zf.writestr(nombre, contenido)
+    return buffer.getvalue()
+
+
+def _volcar_todos(zip_bytes: bytes, store: AttachmentStore):
+    miembros = []
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        validar_directorio_central(zf)
+        for info in zf.infolist():
+            miembro, _ = volcar_miembro(zf, info, store.archivo_temporal(), lambda b: (True, None), 10 ** 9)
+            miembros.append(miembro)
+    return miembros
+
+
+def test_extraer_cufe_se_detiene_en_uuid():
+    cufe, numero = extraer_cufe(_xml("ABCD-1234-EF", "FE-100", relleno=500_000))
+    assert cufe == "abcd1234ef"
+    assert numero == "FE-100"
+
+
+def test_extraer_cufe_xml_mal_formado_usa_regex():
+    extractor = ExtractorCufeIncremental()
+    extractor.alimentar(b"<Invoice><a></b>")
+    extractor.alimentar(b"<cbc:UUID>abc123</cbc:UUID>")
+    assert extractor.finalizar() == "abc123"
+
+
+def test_zip_multifactura_empareja_por_nombre_y_numero(tmp_path):
+    store = AttachmentStore(tmp_path)
+    zip_bytes = _zip({
+        "ad0900001.xml": _xml("aaa111", "FE-1"),
+        "fv0900001.pdf": b"%PDF-1 uno",
+        "factura_FE2.xml": _xml("bbb222", "FE2"),
+        "Representacion grafica FE2.pdf": b"%PDF-1 dos",
+        "suelto.pdf": b"%PDF-1 tres",
+    })
+
+    miembros = _volcar_todos(zip_bytes, store)
+    cufes = emparejar_pdfs(miembros)
+
+    assert cufes["fv0900001.pdf"] == "aaa111"
+    assert cufes["Representacion grafica FE2.pdf"] == "bbb222"
+    assert cufes["suelto.pdf"] is None
+
+
+def test_zip_bomb_por_ratio(tmp_path):
+    store = AttachmentStore(tmp_path)
+    zip_bytes = _zip({"bomba.xml": b"<?xml" + b"0" * 5_000_000})
+
+    with pytest.raises(ZipBombError):
+        _volcar_todos(zip_bytes, store)
+
+
+def test_guardar_archivo_mueve_temporal_al_blob(tmp_path):
+    store = AttachmentStore(tmp_path)
+    miembro = _volcar_todos(_zip({"f.xml": _xml("ccc333", "FE-3")}), store)[0]
+
+    vista = store.guardar_archivo(
+        miembro.ruta_temporal, miembro.sha256, miembro.tamano, "f.xml", "900", "msg", cufe=miembro.cufe
+    )
+
+    assert vista == tmp_path / "900" / "ccc333.xml"
+    assert not miembro.ruta_temporal.exists()
+    assert store.ruta_blob(miembro.sha256, ".xml").exists()